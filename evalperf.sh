@@ -19,6 +19,45 @@ READ_TIMEOUT=${EVALPERF_READ_TIMEOUT:-300}
 RATE_LIMIT=${EVALPERF_RATE_LIMIT:-""}
 SLEEP_INTERVAL=${EVALPERF_SLEEP_INTERVAL:-5}
 DISABLE_TIMEOUT=${EVALPERF_NO_TIMEOUT:-false}
+FIXED_OUTPUT=${EVALPERF_FIXED_OUTPUT:-false}
+TOKENS_IN_NAME=false
+CLIENT_MONITOR=${EVALPERF_CLIENT_MONITOR:-true}
+MONITOR_INTERVAL=${EVALPERF_MONITOR_INTERVAL:-1}
+METRICS_URL=${EVALPERF_METRICS_URL:-""}
+REQUEST_TRACE=${EVALPERF_REQUEST_TRACE:-false}
+INPUT_LENS=${EVALPERF_INPUT_LEN:-""}
+TOKENIZER_PATH=${EVALPERF_TOKENIZER:-""}
+PROMPT_CACHE_DIR=${EVALPERF_PROMPT_CACHE:-"$HOME/.cache/evalperf/prompts"}
+PREFIX_LEN=${EVALPERF_PREFIX_LEN:-0}
+PREFIX_SHARES=${EVALPERF_PREFIX_SHARE:-"100"}
+PREFIX_COUNT=${EVALPERF_PREFIX_COUNT:-1}
+SYN_DATASET_FILE=""
+DRIVER=${EVALPERF_DRIVER:-"evalscope"}
+WORKLOAD=${EVALPERF_WORKLOAD:-""}
+SESSION_TURNS=${EVALPERF_TURNS:-0}
+IMAGE_RES=${EVALPERF_IMAGE_RES:-""}
+IMAGES_PER_REQUEST=${EVALPERF_IMAGES_PER_REQUEST:-1}
+IMAGE_TOKEN_PX=${EVALPERF_IMAGE_TOKEN_PX:-32}
+THINK_TIME=${EVALPERF_THINK_TIME:-0}
+TOLERANCE=${EVALPERF_TOLERANCE:-""}
+MIN_REQUESTS=${EVALPERF_MIN_REQUESTS:-100}
+WARMUP=${EVALPERF_WARMUP:-""}
+COOLDOWN=${EVALPERF_COOLDOWN:-""}
+HTTP2=${EVALPERF_HTTP2:-false}
+BALANCE=${EVALPERF_BALANCE:-"round_robin"}
+RPS_VALUES=${EVALPERF_RPS:-""}
+STEP_DURATION=${EVALPERF_DURATION:-60}
+SOAK_DURATION=${EVALPERF_SOAK:-""}
+SOAK_WINDOW=${EVALPERF_SOAK_WINDOW:-60}
+SOAK_SECONDS=""
+RESUME=${EVALPERF_RESUME:-false}
+RETRIES=${EVALPERF_RETRIES:-2}
+RETRY_BACKOFF=${EVALPERF_RETRY_BACKOFF:-30}
+POINT_ORDER=${EVALPERF_ORDER:-"given"}
+FAILED_POINTS=()
+
+# 脚本所在目录（用于调用 evalperf/ 下的 Python 辅助模块）
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 
 # ============================================================================
 # 颜色和日志函数
@@ -69,10 +108,17 @@ error() {
 # 环境检查
 # ============================================================================
 check_env() {
-    command -v evalscope &>/dev/null || {
-        error "未找到 evalscope 命令，安装: pip install evalscope"
-        exit 2
-    }
+    if [[ "$DRIVER" == "native" ]]; then
+        command -v python3 &>/dev/null || {
+            error "原生驱动需要 python3"
+            exit 2
+        }
+    else
+        command -v evalscope &>/dev/null || {
+            error "未找到 evalscope 命令，安装: pip install evalscope"
+            exit 2
+        }
+    fi
     mkdir -p "$OUTPUT_DIR" 2>/dev/null || {
         error "无法创建输出目录: $OUTPUT_DIR"
         exit 2
@@ -95,7 +141,8 @@ validate_basic_params() {
     local requests=${2:-$REQUESTS}
 
     validate_range "$parallel" 1 2048 "并发数"
-    validate_range "$requests" 1 999999 "请求数"
+    # 速率扫描的请求数由 目标速率×每步时长 推算，只是原生驱动的请求数上限（高速率长时长时可超过 evalscope 的上限），不做检查
+    [[ -z "$rate_step" ]] && validate_range "$requests" 1 999999 "请求数"
     validate_range "$MAX_TOKENS" 1 81920 "最大令牌数"
 
     if [[ ! -f "$DATASET" ]]; then
@@ -146,7 +193,15 @@ build_evalscope_command() {
     cmd="$cmd --model \"$MODEL\""
     cmd="$cmd --api \"openai\""
     cmd="$cmd --url \"$URL\""
-    cmd="$cmd --prompt \"$prompt\""
+    # 输入长度扫描时使用合成数据集（每行一个提示词），否则只发送数据集的第一个提示词
+    if [[ -n "$SYN_DATASET_FILE" ]]; then
+        cmd="$cmd --dataset line_by_line"
+        cmd="$cmd --dataset-path \"$SYN_DATASET_FILE\""
+        # line_by_line 按字符数过滤提示词，放宽上限避免长输入被丢弃
+        cmd="$cmd --max-prompt-length 100000000"
+    else
+        cmd="$cmd --prompt \"$prompt\""
+    fi
     cmd="$cmd --parallel \"$parallel\""
     cmd="$cmd --number \"$requests\""
     cmd="$cmd --max-tokens \"$MAX_TOKENS\""
@@ -165,6 +220,77 @@ build_evalscope_command() {
 
     cmd="$cmd --sleep-interval $SLEEP_INTERVAL"
 
+    # 固定输出长度：min_tokens = max_tokens 并忽略 EOS（需要服务端支持，如 vLLM / SGLang）
+    if [[ "$FIXED_OUTPUT" == "true" ]]; then
+        cmd="$cmd --min-tokens \"$MAX_TOKENS\""
+        cmd="$cmd --extra-args '{\"ignore_eos\": true}'"
+    fi
+
+    echo "$cmd"
+}
+
+# 原生驱动命令（evalperf/driver.py），参数与 evalscope perf 对应，输出目录结构相同
+build_native_command() {
+    local parallel=$1
+    local requests=$2
+    local output_dir=$3
+
+    local cmd="PYTHONPATH=\"$SCRIPT_DIR${PYTHONPATH:+:$PYTHONPATH}\" python3 -m evalperf.driver"
+    cmd="$cmd --model \"$MODEL\""
+    # 多个端点时按负载均衡策略分发请求
+    cmd="$cmd --url"
+    local endpoint_url
+    for endpoint_url in "${url_values[@]}"; do
+        cmd="$cmd \"$endpoint_url\""
+    done
+    [[ ${#url_values[@]} -gt 1 ]] && cmd="$cmd --balance $BALANCE"
+    if [[ -n "$WORKLOAD" ]]; then
+        cmd="$cmd --workload \"$WORKLOAD\""
+    elif [[ -n "$SYN_DATASET_FILE" ]]; then
+        cmd="$cmd --dataset \"$SYN_DATASET_FILE\""
+    else
+        cmd="$cmd --dataset \"$DATASET\""
+    fi
+    cmd="$cmd --parallel \"$parallel\""
+    cmd="$cmd --number \"$requests\""
+    cmd="$cmd --max-tokens \"$MAX_TOKENS\""
+    cmd="$cmd --outputs-dir \"$output_dir\""
+
+    if (( SESSION_TURNS > 0 )); then
+        cmd="$cmd --turns $SESSION_TURNS --think-time $THINK_TIME"
+    fi
+
+    # 自适应请求数：-n 为上限，置信区间收敛后提前停止
+    if [[ -n "$TOLERANCE" ]]; then
+        cmd="$cmd --tolerance $TOLERANCE --min-requests $MIN_REQUESTS"
+    fi
+
+    # 请求速率扫描的一步：按目标速率开环发放指定时长，-n 为按时长推算的请求数上限
+    [[ -n "$rate_step" ]] && cmd="$cmd --duration $STEP_DURATION"
+
+    # 浸泡测试：循环发送请求直到时长用完，按窗口统计并持续更新汇总，不保存逐请求数据
+    [[ -n "$SOAK_SECONDS" ]] && cmd="$cmd --soak --duration $SOAK_SECONDS --soak-window $SOAK_WINDOW"
+
+    # HTTP/2：所有并发共用一条连接多路复用（需要 httpx[http2]）
+    [[ "$HTTP2" == "true" ]] && cmd="$cmd --http2"
+
+    # 多模态数据集的预序列化请求体与合成数据集共用缓存目录
+    cmd="$cmd --image-token-px $IMAGE_TOKEN_PX --payload-cache \"$PROMPT_CACHE_DIR\""
+
+    if [[ "$DISABLE_TIMEOUT" != "true" ]]; then
+        cmd="$cmd --connect-timeout $CONNECT_TIMEOUT"
+        cmd="$cmd --read-timeout $READ_TIMEOUT"
+    fi
+
+    if [[ -n "$RATE_LIMIT" ]]; then
+        cmd="$cmd --rate $RATE_LIMIT"
+    fi
+
+    if [[ "$FIXED_OUTPUT" == "true" ]]; then
+        cmd="$cmd --min-tokens \"$MAX_TOKENS\""
+        cmd="$cmd --extra-args '{\"ignore_eos\": true}'"
+    fi
+
     echo "$cmd"
 }
 
@@ -175,6 +301,186 @@ get_first_prompt() {
     head -1 "$DATASET" | jq -r '.messages[0].content' 2>/dev/null || echo "Hello, how are you?"
 }
 
+# 生成（或从缓存获取）指定输入token数的合成数据集，输出数据集文件路径
+# 指定前缀共享比例时生成共享前缀数据集（input_len 为每个请求独有部分的长度）
+generate_synthetic_dataset() {
+    local input_len=$1
+    local count=$2
+    local prefix_share=$3
+    local -a gen_args=(--tokens "$input_len" --count "$count" --cache-dir "$PROMPT_CACHE_DIR")
+
+    if [[ -n "$prefix_share" ]]; then
+        gen_args+=(--prefix-tokens "$PREFIX_LEN" --prefix-share "$prefix_share" --prefix-count "$PREFIX_COUNT")
+    fi
+
+    if [[ -n "$TOKENIZER_PATH" ]]; then
+        gen_args+=(--tokenizer "$TOKENIZER_PATH")
+    else
+        # 无本地分词器时向服务端发送探测请求标定token数
+        gen_args+=(--url "$URL" --model "$MODEL")
+    fi
+
+    PYTHONPATH="$SCRIPT_DIR${PYTHONPATH:+:$PYTHONPATH}" python3 -m evalperf.prompt_gen "${gen_args[@]}"
+}
+
+# 生成合成图片数据集，输出数据集路径
+generate_image_dataset() {
+    local resolution=$1
+    local count=$2
+
+    PYTHONPATH="$SCRIPT_DIR${PYTHONPATH:+:$PYTHONPATH}" python3 -m evalperf.multimodal \
+        --resolution "$resolution" --count "$count" --images "$IMAGES_PER_REQUEST" --cache-dir "$PROMPT_CACHE_DIR"
+}
+
+# 启动客户端资源监控（监控当前shell的所有子进程，即本次测试的 evalscope 进程树）
+# 用 $BASHPID 而不是 $$：多个模型并发扫描时各自在子shell中运行，$$ 是顶层shell，会把所有模型的进程树计在一起
+# （须在后台命令之外取值，后台命令中展开的 $BASHPID 是后台进程自身）
+start_client_monitor() {
+    local monitor_file=$1
+    local shell_pid=$BASHPID
+
+    [[ "$CLIENT_MONITOR" != "true" ]] && return 0
+    command -v python3 &>/dev/null || return 0
+
+    PYTHONPATH="$SCRIPT_DIR${PYTHONPATH:+:$PYTHONPATH}" \
+        python3 -m evalperf.monitor --pid "$shell_pid" --output "$monitor_file" --interval "$MONITOR_INTERVAL" >/dev/null 2>&1 &
+    MONITOR_PID=$!
+}
+
+# 启动服务端 Prometheus 指标采集（指定 --metrics-url 时）
+start_server_metrics() {
+    local metrics_file=$1
+    local shell_pid=$BASHPID
+
+    [[ -z "$METRICS_URL" ]] && return 0
+    command -v python3 &>/dev/null || return 0
+
+    PYTHONPATH="$SCRIPT_DIR${PYTHONPATH:+:$PYTHONPATH}" \
+        python3 -m evalperf.server_metrics --url "$METRICS_URL" --output "$metrics_file" \
+        --interval "$MONITOR_INTERVAL" --pid "$shell_pid" >/dev/null 2>&1 &
+    METRICS_PID=$!
+}
+
+# 本次测试的结果目录（evalscope 输出目录结构: <output_dir>/<时间戳>/<模型>/）
+# 多个模型并发扫描时共用 output_dir，按模型名匹配，避免取到其他模型同时写入的目录
+latest_run_dir() {
+    local output_dir=$1
+    local run_dir pattern
+
+    for pattern in "${MODEL//\//_}" "${MODEL##*/}" "*"; do
+        run_dir=$(ls -td "$output_dir"/*/$pattern/ 2>/dev/null | head -1)
+        [[ -n "$run_dir" ]] && break
+    done
+    echo "${run_dir%/}"
+}
+
+# 把测试期间采集的时间序列移动到本次测试的 evalscope 输出目录
+move_to_run_dir() {
+    local src_file=$1
+    local output_dir=$2
+    local target_name=$3
+
+    local run_dir=$(latest_run_dir "$output_dir")
+    if [[ -f "$src_file" && -n "$run_dir" ]]; then
+        mv "$src_file" "${run_dir%/}/$target_name"
+        echo "${run_dir%/}/$target_name"
+    else
+        rm -f "$src_file"
+    fi
+}
+
+# 导出本次测试的请求级时间线（Perfetto / Chrome trace）
+export_request_trace() {
+    local output_dir=$1
+
+    [[ "$REQUEST_TRACE" != "true" ]] && return 0
+    command -v python3 &>/dev/null || return 0
+
+    local run_dir=$(latest_run_dir "$output_dir")
+    [[ -z "$run_dir" || ! -f "${run_dir%/}/benchmark_data.db" ]] && return 0
+
+    PYTHONPATH="$SCRIPT_DIR${PYTHONPATH:+:$PYTHONPATH}" \
+        python3 -m evalperf.request_trace "${run_dir%/}" >/dev/null 2>&1 && \
+        log "🧵 请求时间线: ${run_dir%/}/request_trace.json.gz"
+}
+
+# evalscope 只记录从实际发送开始的延迟，补充协调遗漏校正后的延迟百分位（原生驱动已直接写入）
+add_corrected_percentiles() {
+    local output_dir=$1
+
+    [[ "$DRIVER" != "evalscope" ]] && return 0
+    command -v python3 &>/dev/null || return 0
+
+    local run_dir=$(latest_run_dir "$output_dir")
+    [[ -z "$run_dir" || ! -f "${run_dir%/}/benchmark_data.db" ]] && return 0
+
+    PYTHONPATH="$SCRIPT_DIR${PYTHONPATH:+:$PYTHONPATH}" \
+        python3 -m evalperf.coordinated_omission "${run_dir%/}" >/dev/null 2>&1 || \
+        log "协调遗漏校正百分位未生成: ${run_dir%/}"
+}
+
+# 计算本次测试的稳态窗口统计（排除预热、冷却和排空阶段），与整个运行的汇总并存
+compute_steady_state() {
+    local output_dir=$1
+
+    command -v python3 &>/dev/null || return 0
+
+    local run_dir=$(latest_run_dir "$output_dir")
+    [[ -z "$run_dir" || ! -f "${run_dir%/}/benchmark_data.db" ]] && return 0
+
+    local args=()
+    [[ -n "$WARMUP" ]] && args+=(--warmup "$WARMUP")
+    [[ -n "$COOLDOWN" ]] && args+=(--cooldown "$COOLDOWN")
+    local output
+    if output=$(PYTHONPATH="$SCRIPT_DIR${PYTHONPATH:+:$PYTHONPATH}" \
+            python3 -m evalperf.steady_state "${run_dir%/}" "${args[@]}" 2>&1); then
+        log "📐 $(echo "$output" | grep '稳态输出吞吐' | sed 's/^\[INFO\] //')"
+    else
+        log "稳态窗口统计未生成: $(echo "$output" | tail -1)"
+    fi
+}
+
+# 停止客户端资源监控和服务端指标采集，并保存时间序列
+stop_collectors() {
+    local monitor_file=$1
+    local metrics_file=$2
+    local output_dir=$3
+    local saved
+
+    if [[ -n "$MONITOR_PID" ]]; then
+        kill "$MONITOR_PID" 2>/dev/null
+        wait "$MONITOR_PID" 2>/dev/null
+        MONITOR_PID=""
+        saved=$(move_to_run_dir "$monitor_file" "$output_dir" "client_monitor.csv")
+        [[ -n "$saved" ]] && log "🖥️  客户端资源监控: $saved"
+    fi
+
+    if [[ -n "$METRICS_PID" ]]; then
+        kill "$METRICS_PID" 2>/dev/null
+        wait "$METRICS_PID" 2>/dev/null
+        METRICS_PID=""
+        saved=$(move_to_run_dir "$metrics_file" "$output_dir" "server_metrics.csv")
+        [[ -n "$saved" ]] && log "📡 服务端指标: $saved"
+    fi
+}
+
+# 配置点的结果目录名，如 p64_n200_dp_short
+config_name() {
+    local parallel=$1
+    local requests=$2
+    local dataset_basename=$3
+
+    # 扫描输出长度或固定输出长度时，目录名包含最大令牌数以区分配置
+    local name="p${parallel}_n${requests}"
+    # 请求速率扫描的目录名带目标速率和时长，如 r10_p256_s60（并发数为在途请求数上限）
+    [[ -n "$rate_step" ]] && name="r${rate_step}_p${parallel}_s${STEP_DURATION}"
+    # 浸泡测试按时长运行，目录名带时长，如 soak8h_p32
+    [[ -n "$SOAK_SECONDS" ]] && name="soak${SOAK_DURATION}_p${parallel}"
+    [[ "$TOKENS_IN_NAME" == "true" ]] && name="${name}_t${MAX_TOKENS}"
+    echo "${name}_d${dataset_basename}"
+}
+
+# 运行一个配置点，失败时返回退出码（由调用方决定重试或退出）
 run_single_test() {
     local parallel=$1
     local requests=$2
@@ -182,36 +488,109 @@ run_single_test() {
 
     validate_params "$parallel" "$requests"
 
-    local name="p${parallel}_n${requests}_d${dataset_basename}"
+    local name=$(config_name "$parallel" "$requests" "$dataset_basename")
     local output_dir="$OUTPUT_DIR/$name"
     mkdir -p "$output_dir"
 
     local first_prompt=$(get_first_prompt)
-    local evalscope_cmd=$(build_evalscope_command "$parallel" "$requests" "$output_dir" "$first_prompt")
+    local evalscope_cmd prompt_desc=$first_prompt
+    if [[ "$DRIVER" == "native" ]]; then
+        evalscope_cmd=$(build_native_command "$parallel" "$requests" "$output_dir")
+        prompt_desc="数据集全部提示词 $(basename "$DATASET")"
+    else
+        evalscope_cmd=$(build_evalscope_command "$parallel" "$requests" "$output_dir" "$first_prompt")
+    fi
+    [[ -n "$SYN_DATASET_FILE" ]] && prompt_desc="合成数据集 $(basename "$(dirname "$SYN_DATASET_FILE")")/$(basename "$SYN_DATASET_FILE")"
+    [[ -n "$WORKLOAD" ]] && prompt_desc="混合负载 $(basename "$WORKLOAD")"
+    (( SESSION_TURNS > 0 )) && prompt_desc="$prompt_desc, 多轮会话 ${SESSION_TURNS} 轮 (思考时间 ${THINK_TIME}s)"
+    [[ -n "$TOLERANCE" ]] && prompt_desc="$prompt_desc, 自适应请求数 (±${TOLERANCE}%, 最少 ${MIN_REQUESTS})"
+    [[ "$HTTP2" == "true" ]] && prompt_desc="$prompt_desc, HTTP/2"
+    [[ ${#url_values[@]} -gt 1 ]] && prompt_desc="$prompt_desc, ${#url_values[@]} 个端点 ($BALANCE)"
+    local estimate="$((requests * 2 / parallel))分钟"
+    if [[ -n "$rate_step" ]]; then
+        prompt_desc="$prompt_desc, 开环 ${rate_step} req/s × ${STEP_DURATION}s"
+        estimate="${STEP_DURATION}秒（另加在途请求的排空时间）"
+    fi
+    if [[ -n "$SOAK_SECONDS" ]]; then
+        prompt_desc="$prompt_desc, 浸泡测试 ${SOAK_DURATION} (窗口 ${SOAK_WINDOW}s)"
+        estimate="${SOAK_DURATION}（窗口统计持续写入 benchmark_soak.jsonl，中断后已结束的窗口仍可汇总）"
+    fi
 
     log "🚀 性能测试开始"
-    log "📋 配置: 并发=$parallel 请求=$requests 提示=$first_prompt"
-    log "⏱️  预计耗时: $((requests * 2 / parallel))分钟"
+    log "📋 配置: 并发=$parallel 请求=$requests 提示=$prompt_desc"
+    log "⏱️  预计耗时: $estimate"
     log "----------------------------------------"
     log "🔧 执行命令: $evalscope_cmd"
 
+    local monitor_file="$output_dir/.client_monitor.$BASHPID.csv"
+    local metrics_file="$output_dir/.server_metrics.$BASHPID.csv"
+    start_client_monitor "$monitor_file"
+    start_server_metrics "$metrics_file"
+
     eval "$evalscope_cmd" 2>&1
     local exit_code=$?
 
+    stop_collectors "$monitor_file" "$metrics_file" "$output_dir"
+
     if [ $exit_code -eq 0 ]; then
+        export_request_trace "$output_dir"
+        add_corrected_percentiles "$output_dir"
+        compute_steady_state "$output_dir"
         log "✅ 测试完成"
         log "💾 结果保存: $output_dir"
     else
         error "❌ 测试执行失败 (退出码: $exit_code): 1.服务未运行 2.并发数过高 3.网络问题 4.参数错误"
-        exit 3
+        return 3
     fi
     log "----------------------------------------"
 }
 
+# 扫描清单（OUTPUT_DIR/sweep_manifest.json，见 evalperf/manifest.py）
+manifest() {
+    command -v python3 &>/dev/null || return 2
+    PYTHONPATH="$SCRIPT_DIR${PYTHONPATH:+:$PYTHONPATH}" python3 -m evalperf.manifest "$@"
+}
+
+# 扫描中的一个配置点：--resume 时跳过已有有效结果的配置点；失败时按指数退避重试 RETRIES 次，
+# 仍失败则记入清单并继续后面的配置点（扫描结束时汇报并以退出码3结束）
+run_point() {
+    local parallel=$1
+    local requests=$2
+    local dataset_basename=$3
+
+    local name=$(config_name "$parallel" "$requests" "$dataset_basename")
+    local run_dir
+    if [[ "$RESUME" == "true" ]] && run_dir=$(manifest check "$OUTPUT_DIR" "$name" --model "$MODEL"); then
+        log "⏭️  跳过已完成的配置: $name ($run_dir)"
+        manifest record "$OUTPUT_DIR" "$name" --model "$MODEL" --status skipped --run-dir "$run_dir" >/dev/null
+        return 0
+    fi
+
+    local attempt exit_code delay=$RETRY_BACKOFF
+    for ((attempt = 0; attempt <= RETRIES; attempt++)); do
+        if (( attempt > 0 )); then
+            log "🔁 ${delay}秒后重试 $name (第${attempt}/${RETRIES}次)"
+            sleep "$delay"
+            delay=$((delay * 2))
+        fi
+        manifest record "$OUTPUT_DIR" "$name" --model "$MODEL" --status running >/dev/null
+        run_single_test "$parallel" "$requests" "$dataset_basename"
+        exit_code=$?
+        if (( exit_code == 0 )); then
+            manifest record "$OUTPUT_DIR" "$name" --model "$MODEL" --status done \
+                --run-dir "$(latest_run_dir "$OUTPUT_DIR/$name")" >/dev/null
+            return 0
+        fi
+    done
+    manifest record "$OUTPUT_DIR" "$name" --model "$MODEL" --status failed --exit-code "$exit_code" >/dev/null
+    FAILED_POINTS+=("$name")
+    return "$exit_code"
+}
+
 quick_test() {
     log "⚡ 快速验证模式 (2分钟)"
     local dataset_basename=$(basename "$DATASET" .jsonl)
-    run_single_test 32 50 "$dataset_basename"
+    run_single_test 32 50 "$dataset_basename" || exit 3
     printf "\n💡 提示: 使用 -p 64 -n 200 进行完整测试\n"
 }
 
@@ -231,7 +610,7 @@ quick_verification_test() {
     SLEEP_INTERVAL=5
     RATE_LIMIT=5
     
-    run_single_test 32 50 "$dataset_basename"
+    run_single_test 32 50 "$dataset_basename" || exit 3
     
     # 恢复原始参数
     CONNECT_TIMEOUT=$original_connect_timeout
@@ -258,7 +637,7 @@ standard_performance_test() {
     SLEEP_INTERVAL=10
     RATE_LIMIT=20
     
-    run_single_test 64 200 "$dataset_basename"
+    run_single_test 64 200 "$dataset_basename" || exit 3
     
     # 恢复原始参数
     CONNECT_TIMEOUT=$original_connect_timeout
@@ -285,7 +664,7 @@ production_stress_test() {
     SLEEP_INTERVAL=15
     RATE_LIMIT=50
     
-    run_single_test 128 300 "$dataset_basename"
+    run_single_test 128 300 "$dataset_basename" || exit 3
     
     # 恢复原始参数
     CONNECT_TIMEOUT=$original_connect_timeout
@@ -312,7 +691,7 @@ extreme_stress_test() {
     SLEEP_INTERVAL=30
     RATE_LIMIT=""
     
-    run_single_test 256 500 "$dataset_basename"
+    run_single_test 256 500 "$dataset_basename" || exit 3
     
     # 恢复原始参数
     CONNECT_TIMEOUT=$original_connect_timeout
@@ -397,14 +776,43 @@ ${GREEN}参数说明${NC}:
   ${GREEN}-n <num> [num...]${NC}    请求数 (默认: 200, 环境变量: EVALPERF_REQUESTS)
   ${GREEN}-d <path>${NC}   数据集路径 (默认: ./prompts/p_short.jsonl, 环境变量: EVALPERF_DATASET)
   ${GREEN}-o <dir>${NC}    输出目录 (默认: ./results, 环境变量: EVALPERF_OUTPUT_DIR)
-  ${GREEN}-m <name>${NC}   模型名称 (默认: Qwen3-VL-235B-A22B-Instruct, 环境变量: EVALPERF_MODEL)
-  ${GREEN}-u <url>${NC}    服务URL (默认: http://100.125.1.153/v1/chat/completions, 环境变量: EVALPERF_URL)
-  ${GREEN}-t <num>${NC}    最大令牌数 (默认: 200, 环境变量: EVALPERF_MAX_TOKENS)
+  ${GREEN}-m <name> [name...]${NC} 模型名称，多个时各模型的扫描并发运行（日志写入 输出目录/sweep_<模型>.log）；写成 模型名@URL 时该模型使用单独的端点 (默认: Qwen3-VL-235B-A22B-Instruct, 环境变量: EVALPERF_MODEL)
+  ${GREEN}-u <url> [url...]${NC} 服务URL，多个时按 --balance 在客户端分发请求并按端点统计，每个URL可追加 ,model=模型名 和 ,weight=权重，自动使用原生驱动 (默认: http://100.125.1.153/v1/chat/completions, 环境变量: EVALPERF_URL)
+  ${GREEN}-t <num> [num...]${NC}    最大令牌数，多个值时依次扫描 (默认: 200, 环境变量: EVALPERF_MAX_TOKENS)
+  ${GREEN}--input-len <num> [num...]${NC} 输入长度扫描：生成指定token数的合成提示词 (环境变量: EVALPERF_INPUT_LEN)
+  ${GREEN}--prefix-len <num>${NC} 前缀缓存测试：共享前缀token数，此时 --input-len 为每个请求独有部分的长度 (默认128, 环境变量: EVALPERF_PREFIX_LEN)
+  ${GREEN}--prefix-share <pct> [pct...]${NC} 使用公共前缀的请求比例 0-100，多个值时依次扫描 (默认: 100, 环境变量: EVALPERF_PREFIX_SHARE)
+  ${GREEN}--prefix-count <num>${NC} 不同公共前缀的数量 (默认: 1, 环境变量: EVALPERF_PREFIX_COUNT)
+  ${GREEN}--tokenizer <path>${NC} 本地分词器路径，提供时合成提示词token数精确 (需要 transformers, 环境变量: EVALPERF_TOKENIZER)
+  ${GREEN}--workload <path>${NC} 混合负载定义（按权重混合多个数据集，JSON/YAML），自动使用原生驱动 (环境变量: EVALPERF_WORKLOAD)
+  ${GREEN}--image-res <WxH> [WxH...]${NC} 图片大小扫描：按分辨率生成合成图片数据集，自动使用原生驱动 (环境变量: EVALPERF_IMAGE_RES)
+  ${GREEN}--images-per-request <num>${NC} 合成图片数据集每个请求的图片数 (默认: 1, 环境变量: EVALPERF_IMAGES_PER_REQUEST)
+  ${GREEN}--turns <num>${NC} 多轮会话回放：每个并发为一个会话，每轮追加模型实际回复和下一条用户消息，-n 为总轮数；单轮数据集按顺序每 N 条拼成一个会话，自动使用原生驱动 (环境变量: EVALPERF_TURNS)
+  ${GREEN}--think-time <sec>${NC} 多轮会话两轮之间的平均思考时间（指数分布） (默认: 0, 环境变量: EVALPERF_THINK_TIME)
+  ${GREEN}--tolerance <pct>${NC} 自适应请求数：输出吞吐和 P50/P99 延迟的 95% 置信区间相对半宽都不超过该百分比时提前停止，-n 为上限，自动使用原生驱动 (环境变量: EVALPERF_TOLERANCE)
+  ${GREEN}--min-requests <num>${NC} 自适应模式下开始检查收敛前的最少请求数 (默认: 100, 环境变量: EVALPERF_MIN_REQUESTS)
+  ${GREEN}--warmup <N|Ns>${NC} 稳态统计排除的预热阶段：前 N 个请求，或前 N 秒（如 30s） (环境变量: EVALPERF_WARMUP)
+  ${GREEN}--cooldown <N|Ns>${NC} 稳态统计排除的冷却阶段：最后完成的 N 个请求，或最后 N 秒 (环境变量: EVALPERF_COOLDOWN)
+  ${GREEN}--balance <policy>${NC} 多个 -u 端点时的负载均衡策略: round_robin、least_outstanding、weighted (默认: round_robin, 环境变量: EVALPERF_BALANCE)
+  ${GREEN}--http2${NC} 使用 HTTP/2 多路复用（所有并发共用一条连接，需要 httpx[http2]），默认每个并发一条 HTTP/1.1 keep-alive 连接，自动使用原生驱动 (环境变量: EVALPERF_HTTP2=true)
+  ${GREEN}--driver <name>${NC} 压测驱动: evalscope 或 native（内置 asyncio 客户端，发送数据集全部提示词） (默认: evalscope, 环境变量: EVALPERF_DRIVER)
+  ${GREEN}--fixed-output${NC} 固定输出长度：min_tokens=max_tokens 且 ignore_eos (环境变量: EVALPERF_FIXED_OUTPUT=true)
   ${GREEN}--quick${NC}      快速验证模式 (32并发, 50请求)
   ${GREEN}--timeout <num>${NC} 连接超时秒数 (默认: 30)
   ${GREEN}--read-timeout <num>${NC} 读取超时秒数 (默认: 60)
   ${GREEN}--rate <num>${NC}  每秒请求数限制 (默认: 无限制)
+  ${GREEN}--rps <num> [num...]${NC} 请求速率扫描：每个目标速率按泊松到达开环发放 --duration 秒，-p 为在途请求数上限（默认 256），结果目录为 r<速率>_p<并发>_s<时长>，自动使用原生驱动 (环境变量: EVALPERF_RPS)
+  ${GREEN}--duration <sec>${NC} 请求速率扫描每步的时长 (默认: 60, 环境变量: EVALPERF_DURATION)
+  ${GREEN}--soak <8h|90m|3600s>${NC} 浸泡测试：以 -p 并发（或 --rate 限速）循环发送请求直到时长用完，不保存逐请求数据，每个窗口的吞吐和延迟百分位写入 benchmark_soak.jsonl，结束时给出延迟漂移和吞吐衰减，结果目录为 soak<时长>_p<并发>，自动使用原生驱动 (环境变量: EVALPERF_SOAK)
+  ${GREEN}--soak-window <sec>${NC} 浸泡测试的统计窗口秒数 (默认: 60, 环境变量: EVALPERF_SOAK_WINDOW)
+  ${GREEN}--resume${NC} 续跑扫描：结果目录中已有有效 benchmark_summary.json 的配置点直接跳过，各配置点的状态记录在 输出目录/sweep_manifest.json (环境变量: EVALPERF_RESUME=true)
+  ${GREEN}--retries <num>${NC} 配置点失败时的重试次数，用完后记为失败并继续后面的配置点，扫描结束时以退出码3结束 (默认: 2, 环境变量: EVALPERF_RETRIES)
+  ${GREEN}--retry-backoff <sec>${NC} 第一次重试前的等待秒数，之后每次加倍 (默认: 30, 环境变量: EVALPERF_RETRY_BACKOFF)
+  ${GREEN}--order <order>${NC} 配置点的运行顺序: given（参数顺序）、reverse（如先跑高并发）、shuffle（随机，避免服务端随时间的漂移与并发数混在一起） (默认: given, 环境变量: EVALPERF_ORDER)
   ${GREEN}--no-timeout${NC} 禁用所有超时限制
+  ${GREEN}--metrics-url <url>${NC} 测试期间采集服务端 Prometheus 指标，如 http://host:8000/metrics (环境变量: EVALPERF_METRICS_URL)
+  ${GREEN}--request-trace${NC} 测试完成后导出请求级时间线 request_trace.json.gz (环境变量: EVALPERF_REQUEST_TRACE=true)
+  ${GREEN}--no-monitor${NC} 不采集客户端资源（CPU/RSS/socket/调度延迟，环境变量: EVALPERF_CLIENT_MONITOR=false）
   ${GREEN}-h, --help${NC}   显示帮助信息
 
 ${GREEN}示例${NC}:
@@ -416,6 +824,20 @@ ${GREEN}示例${NC}:
   evalperf.sh -m "gpt-4" -u "http://localhost:8000/v1/chat/completions" -t 512 # 自定义模型和URL
   evalperf.sh --timeout 60 --read-timeout 120 # 设置更长的超时时间
   evalperf.sh --rate 10 # 限制为每秒10个请求
+  evalperf.sh --rps 1 2 5 10 20 50 --duration 120 # 请求速率扫描：延迟随目标速率的变化和饱和点
+  evalperf.sh -p 32 --soak 8h --soak-window 60 # 浸泡测试：8小时内每分钟的吞吐和 P99 延迟，检测延迟漂移和吞吐衰减
+  evalperf.sh -p 32 -t 128 512 2048 --fixed-output # 固定输出长度扫描
+  evalperf.sh -p 16 --input-len 128 1024 8192 32768 --tokenizer /models/Qwen3 # 输入长度扫描
+  evalperf.sh -p 32 --prefix-len 2048 --prefix-share 0 50 90 100 --prefix-count 4 # 前缀缓存收益扫描
+  evalperf.sh -p 32 64 --workload workloads/chat_mix.json # 混合负载：同一次测试中分别统计各类请求
+  evalperf.sh -p 8 32 --image-res 448x448 1024x1024 2048x2048 # 图片大小扫描：视觉预填充开销
+  evalperf.sh -p 64 -n 512 --turns 8 --think-time 2 # 多轮会话：64个并发会话，每会话8轮，各轮 TTFT vs 累积上下文
+  evalperf.sh -p 8 16 32 64 -n 5000 --tolerance 3 # 自适应请求数：各并发点精度达到 ±3% 即停止，最多5000个请求
+  evalperf.sh -p 32 64 -n 1000 --warmup 30s --cooldown 100 # 稳态统计：排除前30秒和最后100个请求
+  evalperf.sh -p 64 -n 1000 --driver native && evalperf.sh -p 64 -n 1000 --http2 # 同一负载对比 HTTP/1.1 keep-alive 与 HTTP/2 的连接阶段耗时
+  evalperf.sh -p 64 -u http://10.0.0.1:8000/v1/chat/completions http://10.0.0.2:8000/v1/chat/completions --balance least_outstanding # 多副本扩展：整体与每个端点的吞吐和延迟
+  evalperf.sh -p 8 32 -m Qwen3-32B@http://10.0.0.1:8000/v1/chat/completions Qwen3-8B@http://10.0.0.2:8000/v1/chat/completions # 两个模型的扫描并发运行
+  evalperf.sh -p 1 2 4 8 16 32 64 128 256 -n 1000 --resume # 续跑中断的扫描：跳过已完成的并发点，失败点退避重试
   evalperf.sh --no-timeout # 禁用所有超时限制（用于长时间测试）
   EVALPERF_PARALLEL=32 EVALPERF_REQUESTS=100 evalperf.sh       # 通过环境变量设置默认值
 EOF
@@ -424,22 +846,234 @@ EOF
 # ============================================================================
 # 主函数
 # ============================================================================
+# 对一个数据集运行全部 最大令牌数 × 并发 × 请求数 组合（速率扫描时为 最大令牌数 × 并发 × 目标速率），
+# 先登记到扫描清单，再按 --order 的顺序运行
+run_dataset_combinations() {
+    local dataset_basename=$1
+    local show_combination=$2
+    # 多轮会话与单轮测试的结果分开分组，如 p_short_mt4
+    (( SESSION_TURNS > 0 )) && dataset_basename="${dataset_basename}_mt${SESSION_TURNS}"
+    # HTTP/2 与 HTTP/1.1 的结果分开分组，如 p_short_h2
+    [[ "$HTTP2" == "true" ]] && dataset_basename="${dataset_basename}_h2"
+    # 多端点运行按端点数和负载均衡策略分组，如 p_short_ep3_least_outstanding
+    [[ ${#url_values[@]} -gt 1 ]] && dataset_basename="${dataset_basename}_ep${#url_values[@]}_${BALANCE}"
+
+    # 配置点: "最大令牌数 并发 请求数 目标速率"（非速率扫描时目标速率为 -）
+    local -a points=() names=()
+    local t_val p_val n_val rate_step point
+    for t_val in "${max_token_values[@]}"; do
+        MAX_TOKENS=$t_val
+        for p_val in "${parallel_values[@]}"; do
+            if [[ ${#rps_values[@]} -gt 0 ]]; then
+                for rate_step in "${rps_values[@]}"; do
+                    points+=("$t_val $p_val $(rate_step_requests "$rate_step") $rate_step")
+                    names+=("$(config_name "$p_val" 0 "$dataset_basename")")
+                done
+                rate_step=""
+                continue
+            fi
+            for n_val in "${request_values[@]}"; do
+                points+=("$t_val $p_val $n_val -")
+                names+=("$(config_name "$p_val" "$n_val" "$dataset_basename")")
+            done
+        done
+    done
+    manifest plan "$OUTPUT_DIR" "${names[@]}" --model "$MODEL" >/dev/null
+    case "$POINT_ORDER" in
+        reverse) mapfile -t points < <(printf '%s\n' "${points[@]}" | tac) ;;
+        shuffle) mapfile -t points < <(printf '%s\n' "${points[@]}" | shuf) ;;
+    esac
+
+    for point in "${points[@]}"; do
+        read -r t_val p_val n_val rate_step <<< "$point"
+        MAX_TOKENS=$t_val
+        if [[ "$rate_step" != "-" ]]; then
+            run_rate_step "$p_val" "$n_val" "$rate_step" "$dataset_basename"
+            continue
+        fi
+        rate_step=""
+        if [[ -n "$show_combination" || ${#points[@]} -gt 1 ]]; then
+            log "🔄 运行测试组合: 数据集=$dataset_basename 并发=$p_val 请求=$n_val 最大令牌数=$t_val"
+        fi
+        run_point "$p_val" "$n_val" "$dataset_basename"
+    done
+}
+
+# 速率扫描一步的请求数上限：期望到达数加5倍标准差的余量，发放窗口不会因请求数用完而提前结束
+rate_step_requests() {
+    awk -v n="$(($1 * STEP_DURATION))" 'BEGIN { printf "%d", n + 5 * sqrt(n) + 10 }'
+}
+
+# 请求速率扫描的一步：按目标速率泊松到达开环发放 STEP_DURATION 秒，并发数为在途请求数上限，
+# 写入带目标速率的结果目录，驱动输出实际发送速率和完成速率
+run_rate_step() {
+    local parallel=$1
+    local requests=$2
+    local rate_step=$3
+    local dataset_basename=$4
+    local saved_rate=$RATE_LIMIT
+
+    RATE_LIMIT=$rate_step
+    log "🔄 运行速率扫描: 数据集=$dataset_basename 目标速率=${rate_step} req/s 时长=${STEP_DURATION}s 并发上限=$parallel 最大令牌数=$MAX_TOKENS"
+    run_point "$parallel" "$requests" "$dataset_basename"
+    RATE_LIMIT=$saved_rate
+}
+
 run_test_combinations() {
     local dataset_basename=$(basename "$DATASET" .jsonl)
-    for p_val in "${parallel_values[@]}"; do
-        for n_val in "${request_values[@]}"; do
-            if [[ ${#parallel_values[@]} -gt 1 || ${#request_values[@]} -gt 1 ]]; then
-                log "🔄 运行测试组合: 并发=$p_val 请求=$n_val"
+    # 混合负载以负载定义文件名命名，如 mix_chat_mix
+    [[ -n "$WORKLOAD" ]] && dataset_basename="mix_$(basename "${WORKLOAD%.*}")"
+    run_dataset_combinations "$dataset_basename"
+}
+
+# 合成数据集扫描：输入长度（--input-len）× 前缀共享比例（--prefix-len 大于0时的 --prefix-share），
+# 每个组合生成一个合成数据集，再运行全部并发/请求/最大令牌数组合
+run_synthetic_sweep() {
+    command -v python3 &>/dev/null || {
+        error "合成数据集需要 python3"
+        exit 2
+    }
+
+    # 数据集提示词数取最大请求数，各组合共用同一份缓存
+    local max_requests=0
+    for n_val in "${request_values[@]}"; do
+        (( n_val > max_requests )) && max_requests=$n_val
+    done
+
+    # 前缀缓存测试中 --input-len 为每个请求独有部分的长度（默认128）
+    local -a lengths=("${input_len_values[@]}")
+    local -a shares=("")
+    if (( PREFIX_LEN > 0 )); then
+        [[ ${#lengths[@]} -eq 0 ]] && lengths=(128)
+        shares=("${prefix_share_values[@]}")
+    fi
+
+    for input_len in "${lengths[@]}"; do
+        validate_range "$input_len" 1 1048576 "输入长度"
+        for share in "${shares[@]}"; do
+            local total_len=$input_len
+            local dataset_basename="syn_in${input_len}"
+            if [[ -n "$share" ]]; then
+                validate_range "$share" 0 100 "前缀共享比例"
+                total_len=$((PREFIX_LEN + input_len))
+                dataset_basename="syn_px${PREFIX_LEN}_s${share}_k${PREFIX_COUNT}_in${input_len}"
+                log "📝 准备共享前缀数据集: 前缀=$PREFIX_LEN 共享比例=${share}% 前缀数=$PREFIX_COUNT 独有部分=$input_len 提示词数=$max_requests"
+            else
+                log "📝 准备合成数据集: 输入长度=$input_len 提示词数=$max_requests"
             fi
-            run_single_test "$p_val" "$n_val" "$dataset_basename"
+            SYN_DATASET_FILE=$(generate_synthetic_dataset "$input_len" "$max_requests" "$share") || {
+                error "合成数据集生成失败: $dataset_basename"
+                exit 1
+            }
+
+            # 数据集名包含长度分类（short/medium/long），以便报告按提示词长度分组
+            local length_class="long"
+            (( total_len < 4096 )) && length_class="medium"
+            (( total_len < 512 )) && length_class="short"
+            run_dataset_combinations "${dataset_basename}_${length_class}" "show"
         done
     done
+    SYN_DATASET_FILE=""
+}
+
+# 图片大小扫描：每个分辨率生成一份合成图片数据集（每个请求的图片各不相同），使用原生驱动运行全部组合
+run_image_sweep() {
+    local max_requests=0
+    for n_val in "${request_values[@]}"; do
+        (( n_val > max_requests )) && max_requests=$n_val
+    done
+
+    for resolution in "${image_res_values[@]}"; do
+        [[ "$resolution" =~ ^[0-9]+x[0-9]+$ ]] || { error "分辨率格式应为 WxH: $resolution"; exit 1; }
+        log "🖼️  准备合成图片数据集: 分辨率=$resolution 每请求图片数=$IMAGES_PER_REQUEST 请求数=$max_requests"
+        SYN_DATASET_FILE=$(generate_image_dataset "$resolution" "$max_requests") || {
+            error "合成图片数据集生成失败: $resolution"
+            exit 1
+        }
+
+        # 按估算的视觉token数归入 short/medium/long，以便报告分组
+        local width=${resolution%x*} height=${resolution#*x}
+        local image_tokens=$(( (width + IMAGE_TOKEN_PX / 2) / IMAGE_TOKEN_PX * ((height + IMAGE_TOKEN_PX / 2) / IMAGE_TOKEN_PX) * IMAGES_PER_REQUEST ))
+        local length_class="long"
+        (( image_tokens < 4096 )) && length_class="medium"
+        (( image_tokens < 512 )) && length_class="short"
+        local dataset_basename="syn_img${resolution}"
+        (( IMAGES_PER_REQUEST > 1 )) && dataset_basename="${dataset_basename}_k${IMAGES_PER_REQUEST}"
+        run_dataset_combinations "${dataset_basename}_${length_class}" "show"
+    done
+    SYN_DATASET_FILE=""
+}
+
+# 按参数选择扫描方式，运行当前模型的全部组合
+run_sweep() {
+    if [[ ${#image_res_values[@]} -gt 0 ]]; then
+        run_image_sweep
+    elif [[ ${#input_len_values[@]} -gt 0 ]] || (( PREFIX_LEN > 0 )); then
+        run_synthetic_sweep
+    else
+        run_test_combinations
+    fi
+
+    # 重试用完仍失败的配置点不中断扫描，全部运行完后汇报，修复后用 --resume 只补跑这些配置点
+    if [[ ${#FAILED_POINTS[@]} -gt 0 ]]; then
+        error "❌ ${#FAILED_POINTS[@]} 个配置点重试 ${RETRIES} 次后仍失败: ${FAILED_POINTS[*]}"
+        error "💡 修复后使用 --resume 重新运行，已完成的配置点将被跳过（清单: $OUTPUT_DIR/sweep_manifest.json）"
+        exit 3
+    fi
+}
+
+# 解析模型参数：模型名，或 模型名@URL（该模型使用单独的端点）
+set_model() {
+    local spec=$1
+
+    MODEL=${spec%%@*}
+    if [[ "$spec" == *@* ]]; then
+        URL=${spec#*@}
+        url_values=("$URL")
+    else
+        URL=${url_values[0]}
+    fi
+}
+
+# 多个模型的扫描并发运行（每个模型一个后台子 shell，日志写入 OUTPUT_DIR/sweep_<模型>.log），
+# 总耗时取决于最慢的模型而不是各模型之和；全部结束后汇报各模型结果，任一失败时以退出码3结束
+run_model_sweeps() {
+    local -a pids=() logs=()
+    local spec log_file i failed=0
+
+    for spec in "${model_values[@]}"; do
+        log_file="$OUTPUT_DIR/sweep_$(echo "${spec%%@*}" | tr '/' '_').log"
+        (
+            set_model "$spec"
+            run_sweep
+        ) > "$log_file" 2>&1 &
+        pids+=($!)
+        logs+=("$log_file")
+        log "🚀 模型 ${spec%%@*} 的扫描已在后台启动，日志: $log_file"
+    done
+
+    for i in "${!pids[@]}"; do
+        if wait "${pids[$i]}"; then
+            log "✅ 模型 ${model_values[$i]%%@*} 扫描完成"
+        else
+            error "❌ 模型 ${model_values[$i]%%@*} 扫描失败，详见 ${logs[$i]}"
+            failed=1
+        fi
+    done
+    (( failed )) && exit 3
 }
 
 main() {
     local mode="single"
     local -a parallel_values=()
     local -a request_values=()
+    local -a max_token_values=()
+    local -a input_len_values=()
+    local -a prefix_share_values=()
+    local -a image_res_values=()
+    local -a model_values=()
+    local -a url_values=()
+    local -a rps_values=()
 
     # 解析命令行参数
     while [[ $# -gt 0 ]]; do
@@ -452,19 +1086,72 @@ main() {
                    DATASET="$2"; shift 2 ;;
             -o) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
                    OUTPUT_DIR="$2"; shift 2 ;;
-            -m) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
-                   MODEL="$2"; shift 2 ;;
-            -u) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
-                   URL="$2"; shift 2 ;;
-            -t) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
-                   MAX_TOKENS="$2"; shift 2 ;;
+            -m) shift; model_values=($(parse_multi_values "-m" "$@"));
+                   for ((i=0; i<${#model_values[@]}; i++)); do shift; done ;;
+            -u) shift; url_values=($(parse_multi_values "-u" "$@"));
+                   for ((i=0; i<${#url_values[@]}; i++)); do shift; done ;;
+            --balance) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
+                       BALANCE="$2"; shift 2 ;;
+            -t) shift; max_token_values=($(parse_multi_values "-t" "$@"));
+                   for ((i=0; i<${#max_token_values[@]}; i++)); do shift; done ;;
+            --input-len) shift; input_len_values=($(parse_multi_values "--input-len" "$@"));
+                   for ((i=0; i<${#input_len_values[@]}; i++)); do shift; done ;;
+            --prefix-len) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
+                          PREFIX_LEN="$2"; shift 2 ;;
+            --prefix-share) shift; prefix_share_values=($(parse_multi_values "--prefix-share" "$@"));
+                   for ((i=0; i<${#prefix_share_values[@]}; i++)); do shift; done ;;
+            --prefix-count) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
+                            PREFIX_COUNT="$2"; shift 2 ;;
+            --tokenizer) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
+                         TOKENIZER_PATH="$2"; shift 2 ;;
+            --workload) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
+                        WORKLOAD="$2"; shift 2 ;;
+            --image-res) shift; image_res_values=($(parse_multi_values "--image-res" "$@"));
+                   for ((i=0; i<${#image_res_values[@]}; i++)); do shift; done ;;
+            --images-per-request) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
+                                  IMAGES_PER_REQUEST="$2"; shift 2 ;;
+            --turns) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
+                     SESSION_TURNS="$2"; shift 2 ;;
+            --think-time) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
+                          THINK_TIME="$2"; shift 2 ;;
+            --tolerance) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
+                         TOLERANCE="$2"; shift 2 ;;
+            --min-requests) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
+                            MIN_REQUESTS="$2"; shift 2 ;;
+            --warmup) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
+                      WARMUP="$2"; shift 2 ;;
+            --cooldown) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
+                        COOLDOWN="$2"; shift 2 ;;
+            --driver) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
+                      DRIVER="$2"; shift 2 ;;
             --timeout) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
                        CONNECT_TIMEOUT="$2"; shift 2 ;;
             --read-timeout) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
                          READ_TIMEOUT="$2"; shift 2 ;;
             --rate) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
                     RATE_LIMIT="$2"; shift 2 ;;
+            --rps) shift; rps_values=($(parse_multi_values "--rps" "$@"));
+                   for ((i=0; i<${#rps_values[@]}; i++)); do shift; done ;;
+            --duration) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
+                        STEP_DURATION="$2"; shift 2 ;;
+            --soak) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
+                    SOAK_DURATION="$2"; shift 2 ;;
+            --soak-window) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
+                           SOAK_WINDOW="$2"; shift 2 ;;
+            --resume) RESUME="true"; shift ;;
+            --retries) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
+                       RETRIES="$2"; shift 2 ;;
+            --retry-backoff) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
+                             RETRY_BACKOFF="$2"; shift 2 ;;
+            --order) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
+                     POINT_ORDER="$2"; shift 2 ;;
             --no-timeout) DISABLE_TIMEOUT="true"; shift ;;
+            --fixed-output) FIXED_OUTPUT="true"; shift ;;
+            --no-monitor) CLIENT_MONITOR="false"; shift ;;
+            --request-trace) REQUEST_TRACE="true"; shift ;;
+            --http2) HTTP2="true"; shift ;;
+            --metrics-url) [[ $# -lt 2 ]] && { error "参数 $1 需要值"; usage; exit 1; };
+                           METRICS_URL="$2"; shift 2 ;;
             --quick) mode="quick"; shift ;;
             --quick-verification) mode="quick_verification"; shift ;;
             --standard) mode="standard_performance"; shift ;;
@@ -476,8 +1163,120 @@ main() {
     done
 
     # 设置默认值
+    [[ ${#rps_values[@]} -eq 0 && -n "$RPS_VALUES" ]] && rps_values=($RPS_VALUES)
+    # 速率扫描中并发数只是在途请求数上限，默认放宽，避免客户端限制了到达速率
+    [[ ${#parallel_values[@]} -eq 0 && ${#rps_values[@]} -gt 0 ]] && parallel_values=("${EVALPERF_PARALLEL:-256}")
     [[ ${#parallel_values[@]} -eq 0 ]] && parallel_values=("$PARALLEL")
     [[ ${#request_values[@]} -eq 0 ]] && request_values=("$REQUESTS")
+    [[ ${#max_token_values[@]} -eq 0 ]] && max_token_values=("$MAX_TOKENS")
+    [[ ${#input_len_values[@]} -eq 0 && -n "$INPUT_LENS" ]] && input_len_values=($INPUT_LENS)
+    [[ ${#prefix_share_values[@]} -eq 0 ]] && prefix_share_values=($PREFIX_SHARES)
+    [[ ${#image_res_values[@]} -eq 0 && -n "$IMAGE_RES" ]] && image_res_values=($IMAGE_RES)
+    [[ ${#model_values[@]} -eq 0 ]] && model_values=($MODEL)
+    [[ ${#url_values[@]} -eq 0 ]] && url_values=($URL)
+    # 多个模型的扫描在各自的后台子 shell 中设置模型和端点
+    [[ ${#model_values[@]} -eq 1 || "$mode" != "single" ]] && set_model "${model_values[0]}"
+    if (( PREFIX_LEN > 0 )); then
+        validate_range "$PREFIX_LEN" 1 1048576 "前缀长度"
+        validate_range "$PREFIX_COUNT" 1 100000 "前缀数量"
+    fi
+    MAX_TOKENS=${max_token_values[0]}
+    if [[ ${#max_token_values[@]} -gt 1 || "$FIXED_OUTPUT" == "true" ]]; then
+        TOKENS_IN_NAME=true
+    fi
+
+    # 混合负载只有原生驱动支持
+    if [[ -n "$WORKLOAD" ]]; then
+        [[ -f "$WORKLOAD" ]] || { error "负载定义文件不存在: $WORKLOAD"; exit 1; }
+        DRIVER="native"
+    fi
+    # 图片请求（合成图片扫描或引用本地图片的数据集）由原生驱动编码和发送，evalscope 驱动只能发送文本提示词
+    if [[ ${#image_res_values[@]} -gt 0 ]]; then
+        validate_range "$IMAGES_PER_REQUEST" 1 64 "每请求图片数"
+        DRIVER="native"
+    elif [[ "$DRIVER" == "evalscope" && -f "$DATASET" ]] && grep -qE '"type"[[:space:]]*:[[:space:]]*"image(_url)?"' "$DATASET"; then
+        log "数据集包含图片，使用原生驱动"
+        DRIVER="native"
+    fi
+    # 多轮会话需要在客户端回填模型回复，只有原生驱动支持
+    if (( SESSION_TURNS > 0 )); then
+        validate_range "$SESSION_TURNS" 1 1000 "会话轮数"
+        [[ -n "$WORKLOAD" ]] && { error "--turns 不能与 --workload 同时使用"; exit 1; }
+        [[ -n "$RATE_LIMIT" ]] && log "多轮会话为闭环会话，忽略 --rate"
+        RATE_LIMIT=""
+        DRIVER="native"
+    fi
+    local exclusion
+    for exclusion in "$WARMUP" "$COOLDOWN"; do
+        if [[ -n "$exclusion" && ! "$exclusion" =~ ^[0-9]+$ && ! "$exclusion" =~ ^[0-9]+(\.[0-9]+)?s$ ]]; then
+            error "无效的预热/冷却排除量: $exclusion（请求数如 50，或秒数如 30s）"
+            exit 1
+        fi
+    done
+    # 序贯停止需要在请求完成时在线估计置信区间，只有原生驱动支持
+    if [[ -n "$TOLERANCE" ]]; then
+        if ! [[ "$TOLERANCE" =~ ^[0-9]+(\.[0-9]+)?$ ]] || [[ "$TOLERANCE" =~ ^0+(\.0+)?$ ]]; then
+            error "容差必须为大于0的百分比: $TOLERANCE"
+            exit 1
+        fi
+        validate_range "$MIN_REQUESTS" 1 999999 "最少请求数"
+        DRIVER="native"
+    fi
+    # 请求速率扫描需要按时长开环发放并统计实际速率，由原生驱动实现
+    if [[ ${#rps_values[@]} -gt 0 ]]; then
+        (( SESSION_TURNS > 0 )) && { error "--rps 不能与 --turns 同时使用（多轮会话为闭环会话）"; exit 1; }
+        local rps
+        for rps in "${rps_values[@]}"; do
+            [[ "$rps" =~ ^[0-9]+$ ]] || { error "目标速率必须为整数 req/s: $rps"; exit 1; }
+            validate_range "$rps" 1 1000 "目标速率"
+        done
+        [[ "$STEP_DURATION" =~ ^[0-9]+$ ]] || { error "每步时长必须为整数秒: $STEP_DURATION"; exit 1; }
+        validate_range "$STEP_DURATION" 1 86400 "每步时长"
+        DRIVER="native"
+    fi
+    # 浸泡测试的窗口统计由原生驱动实现；按时长运行，-n 不起作用，只运行一次
+    if [[ -n "$SOAK_DURATION" ]]; then
+        [[ "$SOAK_DURATION" =~ ^([0-9]+)([hms]?)$ ]] || { error "无效的浸泡时长: $SOAK_DURATION（如 8h、90m、3600s）"; exit 1; }
+        case "${BASH_REMATCH[2]}" in
+            h) SOAK_SECONDS=$((BASH_REMATCH[1] * 3600)) ;;
+            m) SOAK_SECONDS=$((BASH_REMATCH[1] * 60)) ;;
+            *) SOAK_SECONDS=$((BASH_REMATCH[1])) ;;
+        esac
+        SOAK_DURATION="${BASH_REMATCH[1]}${BASH_REMATCH[2]:-s}"
+        validate_range "$SOAK_SECONDS" 1 604800 "浸泡时长（秒）"
+        [[ "$SOAK_WINDOW" =~ ^[0-9]+$ ]] || { error "浸泡窗口必须为整数秒: $SOAK_WINDOW"; exit 1; }
+        validate_range "$SOAK_WINDOW" 1 3600 "浸泡窗口"
+        (( SESSION_TURNS > 0 )) && { error "--soak 不能与 --turns 同时使用"; exit 1; }
+        [[ -n "$TOLERANCE" ]] && { error "--soak 不能与 --tolerance 同时使用"; exit 1; }
+        [[ ${#rps_values[@]} -gt 0 ]] && { error "--soak 不能与 --rps 同时使用（限速浸泡请使用 --rate）"; exit 1; }
+        request_values=("${request_values[0]}")
+        DRIVER="native"
+    fi
+    # 扫描的重试和运行顺序
+    [[ "$RETRIES" =~ ^[0-9]+$ ]] || { error "重试次数必须为非负整数: $RETRIES"; exit 1; }
+    validate_range "$RETRIES" 0 100 "重试次数"
+    [[ "$RETRY_BACKOFF" =~ ^[0-9]+$ ]] || { error "重试退避必须为整数秒: $RETRY_BACKOFF"; exit 1; }
+    validate_range "$RETRY_BACKOFF" 0 3600 "重试退避"
+    case "$POINT_ORDER" in
+        given|reverse|shuffle) ;;
+        *) error "未知的运行顺序: $POINT_ORDER（可选: given, reverse, shuffle）"; exit 1 ;;
+    esac
+    # 连接阶段计时和 HTTP/2 由原生驱动实现
+    [[ "$HTTP2" == "true" ]] && DRIVER="native"
+    # 多端点负载均衡（或带 ,model= / ,weight= 的端点）由原生驱动在客户端分发
+    case "$BALANCE" in
+        round_robin|least_outstanding|weighted) ;;
+        *) error "未知的负载均衡策略: $BALANCE（可选: round_robin, least_outstanding, weighted）"; exit 1 ;;
+    esac
+    local model_spec
+    for model_spec in "${model_values[@]}" "${url_values[@]}"; do
+        [[ "$model_spec" == *@* || "$model_spec" == *,* ]] && DRIVER="native"
+    done
+    [[ ${#url_values[@]} -gt 1 ]] && DRIVER="native"
+    if [[ "$DRIVER" != "evalscope" && "$DRIVER" != "native" ]]; then
+        error "未知驱动: $DRIVER（可选: evalscope, native）"
+        exit 1
+    fi
 
     check_env
 
@@ -487,7 +1286,12 @@ main() {
         standard_performance) standard_performance_test ;;
         production_stress) production_stress_test ;;
         extreme_stress) extreme_stress_test ;;
-        single) run_test_combinations ;;
+        single)
+            if [[ ${#model_values[@]} -gt 1 ]]; then
+                run_model_sweeps
+            else
+                run_sweep
+            fi ;;
     esac
 }
 
@@ -0,0 +1,9 @@
+"""
+evalperf 压测辅助工具模块
+"""
+
+from .profiler import StageProfiler
+
+__all__ = [
+    "StageProfiler"
+]
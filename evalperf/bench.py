@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+汇总与可视化流水线的规模基准测试
+生成合成的 evalscope 结果目录树，分阶段测量墙钟耗时和峰值内存，并追加到历史记录
+
+使用方式：
+python -m evalperf.bench --runs 10,100,1000 --requests-per-run 100
+python -m evalperf.bench --runs 100000 --requests-per-run 10 --history bench_history.jsonl
+Author: AI Assistant
+Date: 2024
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from evalscope_aggregator import EvalscopeDataAggregator
+from visualize.data_loader import DataLoader
+from visualize.html_generator import HTMLGenerator
+
+
+# 合成数据的配置空间
+PARALLELS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+DATASETS = {'p_short': 14, 'p_medium': 512, 'p_long': 2048}  # 数据集 -> 平均输入token数
+MODELS = ['Qwen3-VL-235B-A22B-Instruct', 'Qwen3-32B']
+PERCENTILES = ['10%', '25%', '50%', '66%', '75%', '80%', '90%', '95%', '98%', '99%']
+
+# evalscope benchmark_data.db 的 result 表结构
+RESULT_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS result (
+    request TEXT,
+    start_time REAL,
+    chunk_times TEXT,
+    success INTEGER,
+    response_messages TEXT,
+    completed_time REAL,
+    latency REAL,
+    first_chunk_latency REAL,
+    n_chunks INTEGER,
+    chunk_time REAL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    max_gpu_memory_cost REAL,
+    time_per_output_token REAL
+)'''
+
+# 单次写入数据库的批大小，百万级请求时避免在内存中构造全部行
+DB_BATCH_SIZE = 10000
+
+# 阶段耗时随规模增长的指数超过该值时视为超线性（疑似 O(n²)）
+SUPERLINEAR_EXPONENT = 1.5
+
+
+class SyntheticTreeGenerator:
+    """合成 evalscope 结果目录树"""
+
+    def __init__(self, root: str, requests_per_run: int = 100, max_tokens: int = 200, seed: int = 0):
+        self.root = Path(root)
+        self.requests_per_run = requests_per_run
+        self.max_tokens = max_tokens
+        self.rng = random.Random(seed)
+
+    @staticmethod
+    def _throughput(parallel: int, input_tokens: int) -> float:
+        """按 USL 形状生成输出吞吐，长输入的单请求速度更低"""
+        single = 40.0 / (1 + input_tokens / 4096)
+        return single * parallel / (1 + 0.02 * (parallel - 1) + 0.0001 * parallel * (parallel - 1))
+
+    def generate(self, runs: int) -> Path:
+        """
+        生成目录树
+        Args:
+            runs: 运行目录数量（配置 × 重复次数）
+        Returns:
+            Path: 结果根目录
+        """
+        configs = [(model, dataset, parallel)
+                   for model in MODELS for dataset in DATASETS for parallel in PARALLELS]
+        start = datetime(2025, 1, 1)
+        for i in range(runs):
+            model, dataset, parallel = configs[i % len(configs)]
+            timestamp = (start + timedelta(minutes=i)).strftime('%Y%m%d_%H%M%S')
+            config_name = f"p{parallel}_n{self.requests_per_run}_d{dataset}"
+            run_dir = self.root / config_name / timestamp / model
+            run_dir.mkdir(parents=True, exist_ok=True)
+            self._write_run(run_dir, model, dataset, parallel)
+        return self.root
+
+    def _write_run(self, run_dir: Path, model: str, dataset: str, parallel: int) -> None:
+        """写入单次运行的四个输出文件"""
+        input_tokens = DATASETS[dataset]
+        output_tokens = int(self.max_tokens * 0.6)
+        throughput = self._throughput(parallel, input_tokens) * self.rng.uniform(0.95, 1.05)
+        latency = output_tokens * parallel / throughput
+        ttft = 0.05 + input_tokens / 20000 + 0.002 * parallel
+        tpot = (latency - ttft) / max(output_tokens - 1, 1)
+        time_taken = latency * math.ceil(self.requests_per_run / parallel)
+
+        requests = self._write_db(run_dir / 'benchmark_data.db', input_tokens, output_tokens,
+                                  latency, ttft, tpot, parallel)
+        latencies = sorted(r[0] for r in requests)
+        ttfts = sorted(r[1] for r in requests)
+        outputs = sorted(r[2] for r in requests)
+
+        summary = {
+            'Time taken for tests (s)': round(time_taken, 4),
+            'Number of concurrency': parallel,
+            'Total requests': self.requests_per_run,
+            'Succeed requests': self.requests_per_run,
+            'Failed requests': 0,
+            'Output token throughput (tok/s)': round(throughput, 4),
+            'Total token throughput (tok/s)': round(throughput * (1 + input_tokens / output_tokens), 4),
+            'Request throughput (req/s)': round(self.requests_per_run / time_taken, 4),
+            'Average latency (s)': round(sum(latencies) / len(latencies), 4),
+            'Average time to first token (s)': round(sum(ttfts) / len(ttfts), 4),
+            'Average time per output token (s)': round(tpot, 4),
+            'Average inter-token latency (s)': round(tpot, 4),
+            'Average input tokens per request': float(input_tokens),
+            'Average output tokens per request': sum(outputs) / len(outputs)
+        }
+        args = {
+            'model': model,
+            'parallel': parallel,
+            'number': self.requests_per_run,
+            'max_tokens': self.max_tokens,
+            'dataset': 'openqa',
+            'dataset_path': f"./prompts/{dataset}.jsonl",
+            'stream': True,
+            'prompt': 'x' * input_tokens
+        }
+        percentiles = []
+        for label in PERCENTILES:
+            idx = min(len(latencies) - 1, int(len(latencies) * float(label[:-1]) / 100))
+            percentiles.append({
+                'Percentiles': label,
+                'TTFT (s)': round(ttfts[idx], 4),
+                'ITL (s)': round(tpot, 4),
+                'TPOT (s)': round(tpot, 4),
+                'Latency (s)': round(latencies[idx], 4),
+                'Input tokens': input_tokens,
+                'Output tokens': outputs[idx],
+                'Output (tok/s)': round(outputs[idx] / latencies[idx], 4),
+                'Total (tok/s)': round((outputs[idx] + input_tokens) / latencies[idx], 4)
+            })
+
+        for name, payload in [('benchmark_summary.json', summary), ('benchmark_args.json', args),
+                              ('benchmark_percentile.json', percentiles)]:
+            with open(run_dir / name, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, indent=4, ensure_ascii=False)
+
+    def _write_db(self, db_file: Path, input_tokens: int, output_tokens: int, latency: float,
+                  ttft: float, tpot: float, parallel: int) -> List[tuple]:
+        """
+        分批写入请求级数据
+        Returns:
+            List[tuple]: 每个请求的 (延迟, TTFT, 输出token数)，用于计算汇总和百分位
+        """
+        if db_file.exists():
+            db_file.unlink()
+        conn = sqlite3.connect(str(db_file))
+        conn.execute(RESULT_TABLE_SQL)
+        request_json = json.dumps({'messages': [{'role': 'user', 'content': 'x' * min(input_tokens, 64)}],
+                                   'max_tokens': self.max_tokens, 'stream': True})
+
+        samples = []
+        batch = []
+        slots = [0.0] * parallel
+        for i in range(self.requests_per_run):
+            slot = i % parallel
+            start = slots[slot]
+            first = ttft * self.rng.lognormvariate(0, 0.25)
+            tokens = max(1, int(output_tokens * self.rng.uniform(0.8, 1.2)))
+            total = first + tpot * (tokens - 1) * self.rng.lognormvariate(0, 0.1)
+            slots[slot] = start + total
+            chunk_times = [round(start + first + tpot * k, 4) for k in range(tokens)]
+            batch.append((request_json, start, json.dumps(chunk_times), 1, '["ok"]', start + total,
+                          total, first, tokens, total / tokens, input_tokens, tokens, 0.0, (total - first) / tokens))
+            samples.append((total, first, tokens))
+            if len(batch) >= DB_BATCH_SIZE:
+                conn.executemany('INSERT INTO result VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)', batch)
+                batch = []
+        if batch:
+            conn.executemany('INSERT INTO result VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)', batch)
+        conn.commit()
+        conn.close()
+        return samples
+
+
+class StageMeter:
+    """测量阶段墙钟耗时和峰值RSS"""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict] = {}
+
+    @staticmethod
+    def _reset_peak_rss() -> bool:
+        """重置进程峰值RSS（Linux 4.0+ 支持向 clear_refs 写 5）"""
+        try:
+            with open('/proc/self/clear_refs', 'w') as f:
+                f.write('5')
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def _peak_rss_mb() -> float:
+        """读取进程峰值RSS（MB），无 /proc 时回退到 getrusage（进程生命周期峰值）"""
+        try:
+            with open('/proc/self/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage / 1024 / 1024 if sys.platform == 'darwin' else usage / 1024
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """测量一个阶段，阶段内的标准输出被丢弃以免大规模时刷屏"""
+        per_stage = self._reset_peak_rss()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+        self.stages[name] = {
+            'wall_s': round(time.perf_counter() - start, 4),
+            'peak_rss_mb': round(self._peak_rss_mb(), 1),
+            'peak_rss_scope': 'stage' if per_stage else 'process'
+        }
+
+
+def run_pipeline(results_dir: Path, work_dir: Path, meter: StageMeter) -> Dict[str, int]:
+    """
+    依次执行 scan / ingest / aggregate / export / load / render
+    Args:
+        results_dir: 合成结果目录
+        work_dir: 导出文件和报告的输出目录
+        meter: 阶段测量器
+    Returns:
+        Dict[str, int]: 各阶段处理的数据量
+    """
+    aggregator = EvalscopeDataAggregator(str(results_dir))
+    with meter.stage('scan'):
+        result_dirs = aggregator.scan_results_directory()
+    with meter.stage('ingest'):
+        aggregator.raw_data = [aggregator.extract_single_run(d) for d in result_dirs]
+    with meter.stage('aggregate'):
+        stats = aggregator.calculate_aggregated_statistics()
+    raw_csv = work_dir / 'bench_raw.csv'
+    with meter.stage('export'):
+        aggregator.export_csv(str(raw_csv), 'raw')
+        aggregator.export_csv(str(work_dir / 'bench_stats.csv'), 'stats')
+
+    loader = DataLoader(str(raw_csv))
+    with meter.stage('load'):
+        loader.load_data()
+    with meter.stage('render'):
+        HTMLGenerator(loader.get_data(), str(work_dir / 'bench_report.html'), raw_csv.name,
+                      use_cache=False).generate_html_report()
+
+    return {'result_dirs': len(result_dirs), 'raw_rows': len(aggregator.raw_data), 'stats_rows': len(stats)}
+
+
+def _git_commit() -> Optional[str]:
+    """获取当前代码版本"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=Path(__file__).parent, stderr=subprocess.DEVNULL,
+                                       text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(runs: int, requests_per_run: int, work_dir: Path, seed: int = 0) -> Dict:
+    """
+    生成指定规模的目录树并测量流水线各阶段
+    Args:
+        runs: 运行目录数量
+        requests_per_run: 每个 benchmark_data.db 的请求数
+        work_dir: 工作目录
+        seed: 随机种子
+    Returns:
+        Dict: 本次基准测试记录
+    """
+    results_dir = work_dir / 'results'
+    meter = StageMeter()
+    with meter.stage('generate'):
+        SyntheticTreeGenerator(str(results_dir), requests_per_run, seed=seed).generate(runs)
+    counts = run_pipeline(results_dir, work_dir, meter)
+
+    return {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'runs': runs,
+        'requests_per_run': requests_per_run,
+        'counts': counts,
+        'stages': meter.stages,
+        'pipeline_wall_s': round(sum(s['wall_s'] for name, s in meter.stages.items() if name != 'generate'), 4)
+    }
+
+
+def find_superlinear_stages(records: List[Dict]) -> List[Dict]:
+    """
+    比较相邻规模的阶段耗时，估计增长指数 log(t2/t1) / log(n2/n1)
+    Args:
+        records: 按运行数量递增的基准测试记录
+    Returns:
+        List[Dict]: 增长指数超过阈值的阶段
+    """
+    findings = []
+    for small, large in zip(records, records[1:]):
+        if large['runs'] <= small['runs']:
+            continue
+        for name, stage in large['stages'].items():
+            base = small['stages'].get(name, {}).get('wall_s', 0)
+            # 过短的阶段受计时噪声影响大，不参与判断
+            if name == 'generate' or base < 0.05:
+                continue
+            exponent = math.log(stage['wall_s'] / base) / math.log(large['runs'] / small['runs'])
+            if exponent > SUPERLINEAR_EXPONENT:
+                findings.append({'stage': name, 'from_runs': small['runs'], 'to_runs': large['runs'],
+                                 'exponent': round(exponent, 2)})
+    return findings
+
+
+def print_record(record: Dict) -> None:
+    """打印单个规模的阶段测量结果"""
+    print(f"[INFO] runs={record['runs']}, requests/run={record['requests_per_run']}, "
+          f"流水线总耗时 {record['pipeline_wall_s']:.2f}s")
+    print(f"  {'阶段':<12}{'耗时(s)':>12}{'峰值RSS(MB)':>14}")
+    for name, stage in record['stages'].items():
+        print(f"  {name:<12}{stage['wall_s']:>12.3f}{stage['peak_rss_mb']:>14.1f}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='汇总与可视化流水线规模基准测试')
+    parser.add_argument('--runs', default='10,100,1000',
+                        help='运行目录数量，逗号分隔多个规模 (默认: 10,100,1000)')
+    parser.add_argument('--requests-per-run', type=int, default=100,
+                        help='每个 benchmark_data.db 的请求数 (默认: 100)')
+    parser.add_argument('--work-dir', help='工作目录 (默认: 临时目录，结束后删除)')
+    parser.add_argument('--keep', action='store_true', help='保留生成的目录树和报告')
+    parser.add_argument('--history', default='bench_history.jsonl',
+                        help='历史记录文件，每个规模追加一行JSON (默认: bench_history.jsonl)')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子 (默认: 0)')
+    args = parser.parse_args()
+
+    try:
+        scales = sorted(int(x) for x in args.runs.split(','))
+    except ValueError:
+        print(f"[ERROR] 无效的 --runs 参数: {args.runs}")
+        sys.exit(1)
+
+    base_dir = Path(args.work_dir) if args.work_dir else Path(tempfile.mkdtemp(prefix='evalperf_bench_'))
+    records = []
+    try:
+        for runs in scales:
+            work_dir = base_dir / f"runs_{runs}"
+            if work_dir.exists():
+                shutil.rmtree(work_dir)
+            work_dir.mkdir(parents=True)
+            record = run_benchmark(runs, args.requests_per_run, work_dir, args.seed)
+            records.append(record)
+            print_record(record)
+            with open(args.history, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    finally:
+        if not args.keep:
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+    print(f"[INFO] 历史记录已追加到: {args.history}")
+    for finding in find_superlinear_stages(records):
+        print(f"[WARNING] 阶段 {finding['stage']} 在 runs {finding['from_runs']} → {finding['to_runs']} "
+              f"的增长指数为 {finding['exponent']}，疑似超线性")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+连接阶段耗时与连接复用统计模块
+原生驱动为每个请求记录连接各阶段的耗时（秒）：
+- 建连阶段（只在新建连接的请求上有值）：DNS 解析、TCP 连接、TLS 握手
+- 请求阶段：请求发送、首字节（请求发完到收到状态行）、响应头、响应体传输
+以及连接是否复用、实际使用的 HTTP 版本，写入 benchmark_data.db，按运行汇总为 benchmark_connections.json。
+
+默认请求从 HTTP/1.1 keep-alive 连接池中取最近归还的连接（每条连接同时只承载一个请求）；--http2 时所有 worker 共用一个 httpx 客户端，
+请求作为同一连接上的并发流多路复用（需要安装 httpx[http2]，标准库不支持 HTTP/2）。
+HTTP/2 模式的阶段耗时来自 httpcore 的 trace 事件：DNS 解析计入 TCP 连接，响应头在一个 HEADERS 帧中到达，
+首字节时间即收齐响应头的时间（响应头耗时记为0）
+Author: AI Assistant
+Date: 2024
+"""
+
+import json
+import math
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# 连接统计文件（保存在运行目录中，与 benchmark_summary.json 同级）
+CONNECTIONS_FILE = 'benchmark_connections.json'
+
+# 请求记录中的阶段耗时字段 -> 汇总名
+PHASES = {
+    'dns_time': 'DNS lookup',
+    'connect_time': 'TCP connect',
+    'tls_time': 'TLS handshake',
+    'send_time': 'Request send',
+    'ttfb_time': 'Time to first byte',
+    'headers_time': 'Response headers',
+    'body_time': 'Body transfer'
+}
+
+# 只在新建连接的请求上有值的阶段
+CONNECT_PHASES = ('dns_time', 'connect_time', 'tls_time')
+
+
+def new_timing(http_version: Optional[str] = None) -> Dict:
+    """单个请求的连接计时（未到达的阶段为 None）"""
+    timing = {field: None for field in PHASES}
+    timing['reused'] = None
+    timing['http_version'] = http_version
+    return timing
+
+
+def create_http2_client(url: str, parallel: int, connect_timeout: Optional[float] = None,
+                        read_timeout: Optional[float] = None):
+    """
+    创建所有 worker 共用的 HTTP/2 客户端
+    https 通过 ALPN 协商（服务端不支持时回退 HTTP/1.1），http 使用先验知识的 h2c
+    Args:
+        url: 接口地址
+        parallel: 并发数（连接数上限，正常情况下所有请求复用一条连接）
+        connect_timeout: 连接超时秒数
+        read_timeout: 单次读取超时秒数
+    Returns:
+        httpx.AsyncClient: 客户端
+    """
+    try:
+        import httpx
+        import h2  # noqa: F401
+    except ImportError:
+        raise ValueError("HTTP/2 需要安装 httpx[http2]: pip install 'httpx[http2]'")
+    return httpx.AsyncClient(
+        http1=url.startswith('https'), http2=True,
+        timeout=httpx.Timeout(connect=connect_timeout, read=read_timeout, write=None, pool=None),
+        limits=httpx.Limits(max_connections=parallel, max_keepalive_connections=parallel))
+
+
+class HTTP2Connection:
+    """worker 对共用 HTTP/2 客户端的封装，接口与 driver.HTTPConnection 相同（post / close / timing）"""
+
+    def __init__(self, client, url: str, api_key: Optional[str] = None):
+        import httpx
+        self.client = client
+        self.url = url
+        self.headers = {'Content-Type': 'application/json', 'Accept': 'application/json, text/event-stream'}
+        if api_key:
+            self.headers['Authorization'] = f'Bearer {api_key}'
+        self.timing = new_timing()
+        # 连接由客户端连接池管理，不区分重连
+        self.request_start: Optional[float] = None
+        self._errors = httpx.HTTPError
+
+    def close(self) -> None:
+        """连接由共用客户端管理，出错的连接由连接池丢弃"""
+
+    async def post(self, body, on_data: Callable[[bytes], None]) -> int:
+        """
+        发送 POST 请求，响应体到达时分段回调
+        Args:
+            body: JSON 请求体
+            on_data: 响应体数据回调（按到达顺序调用）
+        Returns:
+            int: HTTP 状态码
+        """
+        timing = self.timing = new_timing()
+        marks: Dict[str, float] = {}
+
+        async def trace(event: str, info: Dict) -> None:
+            # connection.connect_tcp.started / http2.send_request_headers.complete 等，去掉协议前缀
+            marks[event.split('.', 1)[1]] = time.perf_counter()
+
+        try:
+            async with self.client.stream('POST', self.url, content=bytes(body), headers=self.headers,
+                                          extensions={'trace': trace}) as response:
+                async for data in response.aiter_raw():
+                    on_data(data)
+                finished = time.perf_counter()
+        except self._errors as e:
+            raise ConnectionError(f"{type(e).__name__}: {e}") from e
+
+        def span(start: str, end: str) -> Optional[float]:
+            return marks[end] - marks[start] if start in marks and end in marks else None
+
+        timing['reused'] = 'connect_tcp.started' not in marks
+        timing['http_version'] = response.http_version
+        timing['connect_time'] = span('connect_tcp.started', 'connect_tcp.complete')
+        timing['tls_time'] = span('start_tls.started', 'start_tls.complete')
+        timing['send_time'] = span('send_request_headers.started', 'send_request_body.complete')
+        timing['ttfb_time'] = span('send_request_body.complete', 'receive_response_headers.complete')
+        timing['headers_time'] = 0.0
+        if 'receive_response_headers.complete' in marks:
+            timing['body_time'] = finished - marks['receive_response_headers.complete']
+        return response.status_code
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """最近秩百分位（输入已排序）"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(math.ceil(q / 100 * len(ordered))) - 1))]
+
+
+def summarize_connection_phases(records: List[Dict]) -> Dict:
+    """
+    按运行汇总连接复用和各阶段耗时（毫秒），建连阶段只统计新建连接的请求
+    Args:
+        records: 请求记录（包含 new_timing 的字段）
+    Returns:
+        Dict: 写入 benchmark_connections.json 的汇总
+    """
+    timed = [r for r in records if r.get('reused') is not None]
+    new_connections = sum(1 for r in timed if not r['reused'])
+    versions = Counter(r['http_version'] for r in timed if r.get('http_version'))
+    phases = {}
+    for field, name in PHASES.items():
+        values = sorted(r[field] * 1000 for r in timed if r.get(field) is not None)
+        phases[name] = {
+            'samples': len(values),
+            'Average (ms)': round(sum(values) / len(values), 3) if values else 0.0,
+            'P50 (ms)': round(_percentile(values, 50), 3),
+            'P99 (ms)': round(_percentile(values, 99), 3)
+        }
+    return {
+        'HTTP version': versions.most_common(1)[0][0] if versions else '',
+        'Requests': len(timed),
+        'New connections': new_connections,
+        'Connection reuse (%)': round((len(timed) - new_connections) / len(timed) * 100, 2) if timed else 0.0,
+        'phases': phases
+    }
+
+
+def summarize_connections(connections_file: Path) -> Dict[str, float]:
+    """
+    把连接统计展开为列：conn_new、conn_reuse_pct、各阶段平均耗时 conn_<阶段>_ms 和 conn_ttfb_p99_ms
+    没有连接统计的运行（evalscope 驱动）返回空字典
+    Args:
+        connections_file: benchmark_connections.json 路径
+    Returns:
+        Dict[str, float]: 展开后的列
+    """
+    if not connections_file.exists():
+        return {}
+    try:
+        with open(connections_file, 'r', encoding='utf-8') as f:
+            connections = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"警告：无法读取连接统计 {connections_file}: {e}")
+        return {}
+
+    phases = connections.get('phases', {})
+    columns = {
+        'conn_new': connections.get('New connections', 0),
+        'conn_reuse_pct': connections.get('Connection reuse (%)', 0)
+    }
+    for field, name in PHASES.items():
+        columns[f"conn_{field[:-len('_time')]}_ms"] = phases.get(name, {}).get('Average (ms)', 0)
+    columns['conn_ttfb_p99_ms'] = phases.get(PHASES['ttfb_time'], {}).get('P99 (ms)', 0)
+    return columns
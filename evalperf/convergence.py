@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+测量精度与序贯提前停止模块
+随请求完成在线估计输出吞吐和延迟百分位的置信区间：
+- 吞吐：批均值法（按完成顺序等分为若干批，批吞吐的 t 区间）
+- 延迟百分位：顺序统计量区间（不依赖分布假设，样本不足以给出上下界时视为未收敛）
+自适应模式下所有指标的相对半宽都低于容差（且达到最少请求数）时停止发放新请求；
+非自适应运行同样记录达到的精度，写入 benchmark_convergence.json 供汇总脚本展示
+Author: AI Assistant
+Date: 2024
+"""
+
+import json
+import math
+from pathlib import Path
+from statistics import NormalDist
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# 精度报告文件（保存在运行目录中，与 benchmark_summary.json 同级）
+CONVERGENCE_FILE = 'benchmark_convergence.json'
+
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_MIN_REQUESTS = 100
+DEFAULT_PERCENTILES = (50, 99)
+
+# 批均值法的批数上限和每批最少请求数（批数少于 MIN_BATCHES 时无法给出吞吐区间）
+MAX_BATCHES = 20
+MIN_BATCHES = 5
+MIN_BATCH_SIZE = 10
+
+# 两次收敛检查之间请求数的最小增长比例（检查需要排序，避免每个请求都检查）
+CHECK_GROWTH = 0.05
+
+
+def t_quantile(df: int, confidence: float) -> float:
+    """双侧 t 分布分位数（Cornish-Fisher 展开，df >= 4 时误差小于 1%）"""
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    return (z + (z ** 3 + z) / (4 * df) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3))
+
+
+def quantile_interval(ordered: Sequence[float], q: float,
+                      confidence: float = DEFAULT_CONFIDENCE) -> Optional[Tuple[float, float, float]]:
+    """
+    百分位的顺序统计量置信区间（正态近似的二项秩区间）
+    Args:
+        ordered: 已排序的样本
+        q: 百分位（0-100）
+        confidence: 置信水平
+    Returns:
+        Optional[Tuple[float, float, float]]: (估计值, 下界, 上界)，样本数不足时为 None
+    """
+    n = len(ordered)
+    if not n:
+        return None
+    p = q / 100
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    spread = z * math.sqrt(n * p * (1 - p))
+    lower = math.floor(n * p - spread)
+    upper = math.ceil(n * p + spread)
+    if lower < 1 or upper > n:
+        return None
+    estimate = ordered[min(n - 1, max(0, math.ceil(p * n) - 1))]
+    return estimate, ordered[lower - 1], ordered[upper - 1]
+
+
+def throughput_interval(completions: Sequence[Tuple[float, float]], start_time: float,
+                        confidence: float = DEFAULT_CONFIDENCE) -> Optional[Tuple[float, float, float]]:
+    """
+    吞吐的批均值置信区间
+    Args:
+        completions: 按完成时间排序的 (完成时间, token数)
+        start_time: 测试开始时间（第一批的起点）
+        confidence: 置信水平
+    Returns:
+        Optional[Tuple[float, float, float]]: (整体吞吐, 下界, 上界)，批数不足时为 None
+    """
+    batches = min(MAX_BATCHES, len(completions) // MIN_BATCH_SIZE)
+    if batches < MIN_BATCHES:
+        return None
+    size = len(completions) // batches
+    rates = []
+    previous_end = start_time
+    for i in range(batches):
+        batch = completions[i * size:(i + 1) * size]
+        end = batch[-1][0]
+        if end <= previous_end:
+            return None
+        rates.append(sum(tokens for _, tokens in batch) / (end - previous_end))
+        previous_end = end
+    duration = completions[-1][0] - start_time
+    estimate = sum(tokens for _, tokens in completions) / duration if duration > 0 else 0.0
+    mean = sum(rates) / batches
+    std = math.sqrt(sum((r - mean) ** 2 for r in rates) / (batches - 1))
+    half = t_quantile(batches - 1, confidence) * std / math.sqrt(batches)
+    return estimate, estimate - half, estimate + half
+
+
+class ConvergenceTracker:
+    """
+    在线记录完成的请求，按需计算各指标的置信区间
+    tolerance 为 None 时只记录（用于报告达到的精度），不触发停止
+    """
+
+    def __init__(self, tolerance_pct: Optional[float] = None, min_requests: int = DEFAULT_MIN_REQUESTS,
+                 percentiles: Sequence[int] = DEFAULT_PERCENTILES, confidence: float = DEFAULT_CONFIDENCE):
+        self.tolerance_pct = tolerance_pct
+        self.min_requests = min_requests
+        self.percentiles = list(percentiles)
+        self.confidence = confidence
+        self.requests = 0
+        self.start_time: Optional[float] = None
+        self.completions: List[Tuple[float, float]] = []
+        self.latencies: List[float] = []
+        self.converged = False
+        self._next_check = min_requests
+
+    def add(self, record: Dict) -> bool:
+        """
+        记录一个完成的请求
+        Returns:
+            bool: 自适应模式下是否已收敛（应停止发放新请求）
+        """
+        self.requests += 1
+        if self.start_time is None or record['start_time'] < self.start_time:
+            self.start_time = record['start_time']
+        if record['success']:
+            self.completions.append((record['completed_time'], record['completion_tokens']))
+            self.latencies.append(record['completed_time'] - record['start_time'])
+        if self.tolerance_pct is None or self.converged or self.requests < self._next_check:
+            return self.converged
+        self._next_check = max(self.requests + 1, math.ceil(self.requests * (1 + CHECK_GROWTH)))
+        metrics = self.intervals()
+        self.converged = all(m is not None and m['relative_half_width_pct'] <= self.tolerance_pct
+                             for m in metrics.values())
+        return self.converged
+
+    def intervals(self) -> Dict[str, Optional[Dict]]:
+        """
+        各指标当前的置信区间
+        Returns:
+            Dict[str, Optional[Dict]]: 指标名到 估计值/上下界/相对半宽(%)，样本不足时为 None
+        """
+        results = {}
+        completions = sorted(self.completions)
+        results['output_throughput'] = throughput_interval(completions, self.start_time or 0.0, self.confidence)
+        ordered = sorted(self.latencies)
+        for q in self.percentiles:
+            results[f'latency_p{q}'] = quantile_interval(ordered, q, self.confidence)
+
+        metrics = {}
+        for name, interval in results.items():
+            if interval is None:
+                metrics[name] = None
+                continue
+            estimate, low, high = interval
+            metrics[name] = {
+                'estimate': round(estimate, 4),
+                'ci_low': round(low, 4),
+                'ci_high': round(high, 4),
+                'relative_half_width_pct': round((high - low) / 2 / estimate * 100, 2) if estimate else float('inf')
+            }
+        return metrics
+
+    def report(self, max_requests: int) -> Dict:
+        """精度报告（写入 benchmark_convergence.json）"""
+        return {
+            'adaptive': self.tolerance_pct is not None,
+            'tolerance_pct': self.tolerance_pct,
+            'confidence': self.confidence,
+            'min_requests': self.min_requests,
+            'max_requests': max_requests,
+            'requests': self.requests,
+            'converged': self.converged,
+            'stopped_early': self.converged and self.requests < max_requests,
+            'metrics': self.intervals()
+        }
+
+
+def summarize_convergence(convergence_file: Path) -> Dict[str, float]:
+    """
+    把精度报告展开为列：converged、stopped_early 和各指标的置信区间相对半宽 ci_<指标>_pct
+    样本不足以给出区间的指标记为 -1，没有精度报告的运行返回空字典
+    Args:
+        convergence_file: benchmark_convergence.json 路径
+    Returns:
+        Dict[str, float]: 展开后的列
+    """
+    if not convergence_file.exists():
+        return {}
+    try:
+        with open(convergence_file, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"警告：无法读取精度报告 {convergence_file}: {e}")
+        return {}
+
+    columns = {
+        'converged': int(bool(report.get('converged'))),
+        'stopped_early': int(bool(report.get('stopped_early')))
+    }
+    for name, metric in (report.get('metrics') or {}).items():
+        columns[f'ci_{name}_pct'] = metric['relative_half_width_pct'] if metric else -1
+    return columns
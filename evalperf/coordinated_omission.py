@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+协调遗漏（coordinated omission）校正模块
+压测客户端在慢响应期间不会发出本应发出的请求（闭环并发的 worker 被阻塞，限速模式下请求在客户端排队等待空闲并发），
+记录的延迟分布因此漏掉了用户在这段时间内会经历的高延迟，百分位偏乐观。校正方式：
+- 原生驱动限速模式：延迟从计划发送时间（泊松到达时刻）开始计量，包含在客户端排队的时间
+- 闭环并发或没有计划发送时间时：按 HdrHistogram 的 recordValueWithExpectedInterval 回填，
+  延迟超过期望发送间隔的请求按间隔补充 延迟-间隔、延迟-2×间隔 ... 的样本
+
+校正后的百分位以 "Latency CO (s)" / "TTFT CO (s)" 列写入 benchmark_percentile.json，与原始列并存。
+evalscope 运行由 evalperf.sh 在测试后调用本模块补充：
+python -m evalperf.coordinated_omission <evalscope输出目录>
+Author: AI Assistant
+Date: 2024
+"""
+
+import argparse
+import json
+import math
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from evalperf.request_trace import iter_db_requests, resolve_db_file
+
+
+# benchmark_percentile.json 中校正后的列
+LATENCY_CO_COLUMN = 'Latency CO (s)'
+TTFT_CO_COLUMN = 'TTFT CO (s)'
+
+
+def _median(values: Sequence[float]) -> float:
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2] if ordered else 0.0
+
+
+def expected_interval(latencies: Sequence[float], parallel: int, rate: Optional[float] = None,
+                      think_time: float = 0.0) -> float:
+    """
+    每个并发的期望发送间隔
+    限速模式为 并发数/速率；闭环并发为正常响应时间（延迟中位数）加上思考时间
+    """
+    if rate and rate > 0:
+        return parallel / rate
+    return _median(latencies) + (think_time or 0.0)
+
+
+def backfill(values: Sequence[float], interval: float) -> List[float]:
+    """
+    HdrHistogram 式回填：每个超过期望间隔的样本补充 值-间隔、值-2×间隔 ... 直到小于间隔
+    Args:
+        values: 记录的延迟
+        interval: 期望发送间隔
+    Returns:
+        List[float]: 原始样本加回填样本
+    """
+    result = list(values)
+    if interval <= 0:
+        return result
+    for value in values:
+        missing = value - interval
+        while missing >= interval:
+            result.append(missing)
+            missing -= interval
+    return result
+
+
+def corrected_columns(records: List[Dict], metrics: List[Dict[str, float]], parallel: int,
+                      rate: Optional[float] = None, think_time: float = 0.0) -> Dict[str, List[float]]:
+    """
+    校正后的延迟分布（已排序）
+    所有请求都有计划发送时间（intended_time）时从计划时间计量延迟和 TTFT，否则回填延迟
+    Args:
+        records: 成功的请求记录
+        metrics: 与 records 一一对应的 latency / ttft
+        parallel: 并发数
+        rate: 限速模式的每秒请求数
+        think_time: 多轮会话的平均思考时间
+    Returns:
+        Dict[str, List[float]]: 列名到排序后的样本
+    """
+    if records and all(r.get('intended_time') is not None for r in records):
+        return {
+            LATENCY_CO_COLUMN: sorted(r['completed_time'] - r['intended_time'] for r in records),
+            TTFT_CO_COLUMN: sorted(m['ttft'] + r['start_time'] - r['intended_time'] for r, m in zip(records, metrics))
+        }
+    latencies = [m['latency'] for m in metrics]
+    interval = expected_interval(latencies, parallel, rate, think_time)
+    return {LATENCY_CO_COLUMN: sorted(backfill(latencies, interval))}
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """最近秩百分位（输入已排序）"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(math.ceil(q / 100 * len(ordered))) - 1))]
+
+
+def add_corrected_percentiles(percentile_file: Path, db_file: Path, run_args: Dict) -> Optional[float]:
+    """
+    为 evalscope 的 benchmark_percentile.json 补充回填校正后的延迟列（原有列不变，重复执行结果相同）
+    Returns:
+        Optional[float]: 校正后的 P99 延迟，没有成功请求时为 None
+    """
+    latencies = [r['completed_time'] - r['start_time'] for r in iter_db_requests(db_file) if r['success']]
+    if not latencies:
+        return None
+    interval = expected_interval(latencies, run_args.get('parallel') or 1, run_args.get('rate'),
+                                 run_args.get('think_time') or 0.0)
+    corrected = sorted(backfill(latencies, interval))
+
+    with open(percentile_file, 'r', encoding='utf-8') as f:
+        percentiles = json.load(f)
+    for row in percentiles:
+        q = float(str(row.get('Percentiles', '0')).rstrip('%'))
+        row[LATENCY_CO_COLUMN] = round(_percentile(corrected, q), 4)
+    tmp_file = percentile_file.with_suffix('.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(percentiles, f, indent=4, ensure_ascii=False)
+    tmp_file.replace(percentile_file)
+    return _percentile(corrected, 99)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='为 evalscope 结果补充协调遗漏校正后的延迟百分位')
+    parser.add_argument('path', help='evalscope 输出目录（包含 benchmark_data.db 和 benchmark_percentile.json）')
+    args = parser.parse_args()
+
+    db_file = resolve_db_file(Path(args.path))
+    percentile_file = db_file.parent / 'benchmark_percentile.json'
+    if not db_file.exists() or not percentile_file.exists():
+        print(f"[ERROR] 缺少 benchmark_data.db 或 benchmark_percentile.json: {db_file.parent}")
+        sys.exit(1)
+
+    run_args: Dict = {}
+    args_file = db_file.parent / 'benchmark_args.json'
+    if args_file.exists():
+        with open(args_file, 'r', encoding='utf-8') as f:
+            run_args = json.load(f)
+    p99 = add_corrected_percentiles(percentile_file, db_file, run_args)
+    if p99 is None:
+        print("[WARNING] 没有成功的请求，未写入校正百分位")
+        sys.exit(2)
+    print(f"[INFO] 协调遗漏校正后 P99 延迟 {p99:.3f}s，已写入: {percentile_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,1128 @@
+#!/usr/bin/env python3
+"""
+原生压测驱动模块
+基于 asyncio 的 OpenAI 兼容接口压测客户端（仅依赖标准库），用于 evalscope 不支持的负载形态
+（如按权重混合多个数据集、多轮会话回放、多模态图片请求）
+输出目录结构与文件格式与 evalscope perf 一致（benchmark_summary.json / benchmark_args.json /
+benchmark_percentile.json / benchmark_data.db），汇总和可视化工具无需区分
+
+使用方式（由 evalperf.sh 在 --driver native 或 --workload 时自动调用）：
+python -m evalperf.driver --url http://host:8000/v1/chat/completions --model Qwen3-32B \\
+    --workload workload.json --parallel 32 --number 200 --outputs-dir ./perf_results/p32_n200_dmix
+多轮会话（每个并发为一个会话，轮间思考时间服从均值为 think-time 的指数分布）：
+python -m evalperf.driver ... --dataset prompts/p_short.jsonl --turns 4 --think-time 2 --parallel 32 --number 200
+自适应请求数（吞吐和 P50/P99 延迟的 95% 置信区间相对半宽都低于 5% 时提前停止，--number 为上限）：
+python -m evalperf.driver ... --tolerance 5 --min-requests 100 --number 2000
+开环限速按时长运行（泊松到达 10 req/s 持续 60 秒，--number 为请求数上限，--parallel 为在途请求数上限）：
+python -m evalperf.driver ... --rate 10 --duration 60 --parallel 256 --number 1000
+浸泡测试（连续运行 8 小时，不保存逐请求数据，每分钟一个窗口写入 benchmark_soak.jsonl 并更新汇总，见 evalperf.soak）：
+python -m evalperf.driver ... --soak --duration 28800 --soak-window 60 --parallel 32
+HTTP/2 多路复用（所有并发共用一条连接，需要 httpx[http2]；连接阶段耗时写入 benchmark_connections.json）：
+python -m evalperf.driver ... --http2 --parallel 64
+多端点负载均衡（每个地址可追加 ,model=模型名 和 ,weight=权重，结果按端点写入 benchmark_endpoints.json）：
+python -m evalperf.driver --url http://10.0.0.1:8000/v1/chat/completions http://10.0.0.2:8000/v1/chat/completions \\
+    --balance least_outstanding --model Qwen3-32B ...
+Author: AI Assistant
+Date: 2024
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import signal
+import socket
+import sqlite3
+import ssl
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from evalperf.connections import (CONNECTIONS_FILE, PHASES, HTTP2Connection, create_http2_client, new_timing,
+                                  summarize_connection_phases)
+from evalperf.convergence import CONVERGENCE_FILE, DEFAULT_MIN_REQUESTS, ConvergenceTracker
+from evalperf.coordinated_omission import LATENCY_CO_COLUMN, corrected_columns
+from evalperf.endpoints import BALANCE_POLICIES, ENDPOINTS_FILE, Endpoint, LoadBalancer, parse_endpoints
+from evalperf.multimodal import (DEFAULT_IMAGE_TOKEN_PX, load_multimodal_dataset, parse_resolution,
+                                 prompts_have_images)
+from evalperf.payload_cache import DEFAULT_CACHE_DIR, compile_payloads
+from evalperf.soak import DEFAULT_WINDOW_SECONDS, SCHEDULE_LENGTH, SoakRecorder, print_drift
+from evalperf.workload import (CLASSES_FILE, TURNS_FILE, WorkloadClass, build_schedule, load_prompts,
+                               load_sessions, load_workload_spec)
+
+
+PERCENTILES = [10, 25, 50, 66, 75, 80, 90, 95, 98, 99]
+
+# 与 evalscope benchmark_data.db 一致的 result 表，额外记录请求类别、多轮会话的会话编号和轮次、估算的视觉token数、
+# 限速模式下的计划发送时间，连接各阶段耗时、是否复用连接和 HTTP 版本（见 evalperf.connections），以及多端点运行中请求发往的端点
+RESULT_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS result (
+    request TEXT,
+    start_time REAL,
+    chunk_times TEXT,
+    success INTEGER,
+    response_messages TEXT,
+    completed_time REAL,
+    latency REAL,
+    first_chunk_latency REAL,
+    n_chunks INTEGER,
+    chunk_time REAL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    max_gpu_memory_cost REAL,
+    time_per_output_token REAL,
+    request_class TEXT,
+    session_id INTEGER,
+    turn INTEGER,
+    image_tokens INTEGER,
+    intended_time REAL,
+    dns_time REAL,
+    connect_time REAL,
+    tls_time REAL,
+    send_time REAL,
+    ttfb_time REAL,
+    headers_time REAL,
+    body_time REAL,
+    reused INTEGER,
+    http_version TEXT,
+    endpoint TEXT
+)'''
+
+
+class HTTPConnection:
+    """
+    最小化的 HTTP/1.1 keep-alive 连接，同一时间只承载一个请求，出错后下次请求时重连
+    服务端关闭空闲连接（keep-alive 超时）后不再复用；复用的连接在收到任何响应字节前断开时，在新连接上重发一次
+    """
+
+    def __init__(self, url: str, connect_timeout: Optional[float] = None, read_timeout: Optional[float] = None,
+                 api_key: Optional[str] = None):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.secure = parts.scheme == 'https'
+        self.port = parts.port or (443 if self.secure else 80)
+        self.path = parts.path or '/'
+        if parts.query:
+            self.path += '?' + parts.query
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.api_key = api_key
+        # 除 Content-Length 外的请求头固定，只编码一次
+        headers = [
+            f"POST {self.path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            "Content-Type: application/json",
+            "Accept: application/json, text/event-stream",
+            "Connection: keep-alive"
+        ]
+        if api_key:
+            headers.append(f"Authorization: Bearer {api_key}")
+        self._header_prefix = ('\r\n'.join(headers) + '\r\nContent-Length: ').encode('latin-1')
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        # 最近一个请求的连接阶段耗时（见 evalperf.connections）
+        self.timing = new_timing()
+        # 最近一个请求因连接已失效而重连时，重连完成的时间（请求延迟从此时算起，不计客户端造成的重连耗时）
+        self.request_start: Optional[float] = None
+
+    async def _connect(self, reconnect: bool = False) -> bool:
+        """
+        建立连接（已连接且服务端未关闭时复用），分阶段记录 DNS 解析、TCP 连接和 TLS 握手耗时
+        Args:
+            reconnect: 复用的连接已断开，重发前新建连接
+        Returns:
+            bool: 是否复用了已有连接
+        """
+        if self.writer is not None and not self.writer.is_closing() and not self.reader.at_eof():
+            return True
+        stale = reconnect or self.writer is not None
+        self.close()
+        await asyncio.wait_for(self._open(), self.connect_timeout)
+        if stale:
+            self.request_start = time.time()
+        return False
+
+    async def _open(self) -> None:
+        loop = asyncio.get_running_loop()
+        ssl_context = ssl.create_default_context() if self.secure else None
+        resolve_start = time.perf_counter()
+        addresses = await loop.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)
+        connect_start = time.perf_counter()
+        address = addresses[0][4]
+        if ssl_context is not None and not hasattr(asyncio.StreamWriter, 'start_tls'):
+            # Python 3.11 以前没有 StreamWriter.start_tls，TLS 握手计入 TCP 连接耗时
+            self.reader, self.writer = await asyncio.open_connection(address[0], address[1], ssl=ssl_context,
+                                                                     server_hostname=self.host)
+            tls_start = tls_end = time.perf_counter()
+        else:
+            self.reader, self.writer = await asyncio.open_connection(address[0], address[1])
+            tls_start = time.perf_counter()
+            if ssl_context is not None:
+                await self.writer.start_tls(ssl_context, server_hostname=self.host)
+            tls_end = time.perf_counter()
+        self.timing['dns_time'] = connect_start - resolve_start
+        self.timing['connect_time'] = tls_start - connect_start
+        self.timing['tls_time'] = tls_end - tls_start if ssl_context is not None else None
+
+    def close(self) -> None:
+        """关闭连接"""
+        if self.writer is not None:
+            self.writer.close()
+        self.reader, self.writer = None, None
+
+    async def _read(self, coro):
+        """带读取超时的读操作（超时针对单次读取，长时间流式输出不受影响）"""
+        return await asyncio.wait_for(coro, self.read_timeout)
+
+    async def post(self, body, on_data: Callable[[bytes], None]) -> int:
+        """
+        发送 POST 请求，响应体到达时分段回调
+        Args:
+            body: JSON 请求体（bytes 或 mmap 缓存的 memoryview 切片，与请求头分开写入，不拼接复制）
+            on_data: 响应体数据回调（按到达顺序调用）
+        Returns:
+            int: HTTP 状态码
+        """
+        self.request_start = None
+        try:
+            return await self._exchange(body, on_data)
+        except OSError:
+            # 服务端在请求到达前关闭了空闲连接：请求未被处理，在新连接上重发一次
+            if not self.timing['reused'] or self.timing['ttfb_time'] is not None:
+                raise
+            self.close()
+            return await self._exchange(body, on_data, reconnect=True)
+
+    async def _exchange(self, body, on_data: Callable[[bytes], None], reconnect: bool = False) -> int:
+        """在当前连接上完成一次请求和响应"""
+        timing = self.timing = new_timing()
+        timing['reused'] = await self._connect(reconnect)
+        send_start = time.perf_counter()
+        self.writer.write(b'%s%d\r\n\r\n' % (self._header_prefix, len(body)))
+        self.writer.write(body)
+        await self.writer.drain()
+        sent = time.perf_counter()
+        timing['send_time'] = sent - send_start
+
+        status_line = await self._read(self.reader.readline())
+        if not status_line:
+            raise ConnectionError("服务端关闭了连接")
+        first_byte = time.perf_counter()
+        timing['ttfb_time'] = first_byte - sent
+        version, status = status_line.split()[:2]
+        timing['http_version'] = version.decode('latin-1')
+        status = int(status)
+        response_headers = {}
+        while True:
+            line = await self._read(self.reader.readline())
+            if line in (b'\r\n', b'\n', b''):
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            response_headers[key.strip().lower()] = value.strip()
+        headers_end = time.perf_counter()
+        timing['headers_time'] = headers_end - first_byte
+
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size = int((await self._read(self.reader.readline())).split(b';')[0], 16)
+                if size == 0:
+                    # 跳过 trailer 直到空行
+                    while (await self._read(self.reader.readline())) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                data = await self._read(self.reader.readexactly(size + 2))
+                on_data(data[:-2])
+        elif 'content-length' in response_headers:
+            remaining = int(response_headers['content-length'])
+            while remaining > 0:
+                data = await self._read(self.reader.read(min(remaining, 65536)))
+                if not data:
+                    raise ConnectionError("响应体不完整")
+                remaining -= len(data)
+                on_data(data)
+        else:
+            while True:
+                data = await self._read(self.reader.read(65536))
+                if not data:
+                    break
+                on_data(data)
+            self.close()
+        timing['body_time'] = time.perf_counter() - headers_end
+
+        if response_headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status
+
+
+class BenchmarkDriver:
+    """
+    闭环并发压测：parallel 个 worker 依次发送请求；指定 rate 时按泊松过程发放请求、并发数上限为 parallel
+    指定 sessions 时为多轮会话模式：每个 worker 依次回放会话，每轮追加实际回复和下一条用户消息，
+    number 为总轮数（请求数），达到后正在进行的会话提前结束
+    指定 payloads 时发送预序列化的请求体（见 evalperf.payload_cache），记录中的请求文本在测试结束后补齐；
+    多模态数据集的记录只保存引用本地图片路径的原始请求
+    指定 tolerance_pct 时为自适应请求数：各指标置信区间收敛后不再发放新请求（正在进行的请求照常完成），
+    number 为请求数上限
+    指定 http2 时所有 worker 共用一个 HTTP/2 客户端（同一连接上多路复用），否则请求从各端点共用的 HTTP/1.1 连接池中
+    取最近归还的空闲连接（后进先出：限速模式下在途请求少时只反复使用少量仍然存活的连接），没有空闲连接时新建；
+    会话模式每个 worker 独占一条连接
+    指定多个 endpoints 时按 balance 策略分发请求（见 evalperf.endpoints），连接池按端点区分
+    指定 duration 时按时长运行：限速模式只发放 duration 秒内到达的请求，闭环模式到时不再发送新请求（number 均为上限）
+    指定 recorder 时为浸泡模式（见 evalperf.soak）：请求记录交给 recorder 计入窗口统计后丢弃，循环发送请求直到 duration，
+    请求队列有界，客户端内存不随运行时长增长
+    """
+
+    def __init__(self, url: str, model: str, classes: List[WorkloadClass], parallel: int, number: int,
+                 max_tokens: int, stream: bool = True, rate: Optional[float] = None,
+                 connect_timeout: Optional[float] = None, read_timeout: Optional[float] = None,
+                 api_key: Optional[str] = None, min_tokens: Optional[int] = None,
+                 extra_args: Optional[Dict] = None, seed: int = 0,
+                 sessions: Optional[List[Dict]] = None, think_time: float = 0.0,
+                 tolerance_pct: Optional[float] = None, min_requests: int = DEFAULT_MIN_REQUESTS,
+                 http2: bool = False, endpoints: Optional[List[Endpoint]] = None,
+                 balance: str = 'round_robin', duration: Optional[float] = None,
+                 recorder: Optional[SoakRecorder] = None):
+        self.url = url
+        self.model = model
+        self.classes = classes
+        self.parallel = parallel
+        self.number = number
+        self.max_tokens = max_tokens
+        self.stream = stream
+        self.rate = rate
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.api_key = api_key
+        self.min_tokens = min_tokens
+        self.extra_args = extra_args or {}
+        self.seed = seed
+        self.sessions = sessions
+        self.think_time = think_time
+        self.duration = duration
+        self.deadline: Optional[float] = None
+        # 限速模式的发放窗口 (开始, 结束)，用于计算实际达到的发送速率
+        self.issue_window: Optional[Tuple[float, float]] = None
+        self.recorder = recorder
+        self.payloads: Optional[Dict] = None
+        self.tracker = ConvergenceTracker(tolerance_pct, min_requests)
+        self.endpoints = endpoints or [Endpoint(url, model)]
+        self.balancer = LoadBalancer(self.endpoints, balance)
+        self.http2_client = (create_http2_client(url, parallel * len(self.endpoints), connect_timeout, read_timeout)
+                             if http2 else None)
+        # 端点序号 -> 空闲连接（按归还顺序，末尾为最近使用的连接）
+        self._idle_connections: Dict[int, List] = {}
+
+    def _expired(self) -> bool:
+        """是否已达到运行时长"""
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def _open_connection(self, endpoint: Endpoint):
+        """到端点的新连接：HTTP/2 模式共用客户端，否则为一条 HTTP/1.1 keep-alive 连接"""
+        if self.http2_client is not None:
+            return HTTP2Connection(self.http2_client, endpoint.url, self.api_key)
+        return HTTPConnection(endpoint.url, self.connect_timeout, self.read_timeout, self.api_key)
+
+    def _acquire_connection(self, index: int):
+        """从连接池取端点最近归还的空闲连接（最可能仍被服务端保持），没有时新建"""
+        idle = self._idle_connections.setdefault(index, [])
+        return idle.pop() if idle else self._open_connection(self.endpoints[index])
+
+    def _release_connection(self, index: int, connection) -> None:
+        """请求完成后归还连接（出错的连接已关闭，下次使用时重连）"""
+        self._idle_connections[index].append(connection)
+
+    def _close_connections(self) -> None:
+        """关闭连接池中的全部连接"""
+        for idle in self._idle_connections.values():
+            for connection in idle:
+                connection.close()
+        self._idle_connections.clear()
+
+    def _build_body(self, workload_class: WorkloadClass, messages: List[Dict], model: Optional[str] = None) -> Dict:
+        """构造单个请求的请求体（model 为端点的模型名，默认使用 self.model）"""
+        max_tokens = workload_class.max_tokens or self.max_tokens
+        body = {'model': model or self.model, 'messages': messages, 'max_tokens': max_tokens, 'stream': self.stream}
+        if self.stream:
+            body['stream_options'] = {'include_usage': True}
+        if self.min_tokens:
+            # 固定输出长度模式（min_tokens == max_tokens）下，各类别的 min_tokens 跟随该类的 max_tokens
+            body['min_tokens'] = max_tokens if self.min_tokens >= self.max_tokens else min(self.min_tokens, max_tokens)
+        body.update(self.extra_args)
+        return body
+
+    async def _send(self, connection, class_name: str, body: Optional[Dict],
+                    payload=None) -> Dict:
+        """
+        发送单个请求并记录时间点
+        Args:
+            connection: worker 的连接（HTTPConnection 或 HTTP2Connection）
+            class_name: 请求类别
+            body: 请求体（写入记录），发送预序列化请求体时为 None
+            payload: 预序列化的请求体，None 时发送 body 的 JSON 编码
+        Returns:
+            Dict: 请求记录（时间为 Unix 时间戳，便于与服务端指标对齐）
+        """
+        record = {
+            'request_class': class_name, 'request': json.dumps(body, ensure_ascii=False) if body is not None else '',
+            'chunk_times': [], 'success': False, 'response': '', 'prompt_tokens': 0, 'completion_tokens': 0,
+            'error': '', 'session_id': None, 'turn': None, 'image_tokens': 0, 'intended_time': None
+        }
+        buffer = bytearray()
+        text_parts: List[str] = []
+        usage: Dict = {}
+
+        def handle_event(payload: bytes) -> None:
+            if payload == b'[DONE]':
+                return
+            event = json.loads(payload)
+            if event.get('usage'):
+                usage.update(event['usage'])
+            for choice in event.get('choices') or []:
+                delta = choice.get('delta') or {}
+                content = delta.get('content') or delta.get('reasoning_content')
+                if content:
+                    record['chunk_times'].append(time.time())
+                    text_parts.append(content)
+
+        def on_data(data: bytes) -> None:
+            buffer.extend(data)
+            if not self.stream:
+                return
+            # SSE: 按行解析 data: 事件
+            while True:
+                newline = buffer.find(b'\n')
+                if newline < 0:
+                    break
+                line = bytes(buffer[:newline]).strip()
+                del buffer[:newline + 1]
+                if line.startswith(b'data:'):
+                    handle_event(line[5:].strip())
+
+        if payload is None:
+            payload = record['request'].encode('utf-8')
+        record['start_time'] = time.time()
+        try:
+            status = await connection.post(payload, on_data)
+            if status != 200:
+                record['error'] = f"HTTP {status}: {bytes(buffer[:500]).decode('utf-8', errors='replace')}"
+            elif not self.stream:
+                response = json.loads(bytes(buffer))
+                usage.update(response.get('usage') or {})
+                message = (response.get('choices') or [{}])[0].get('message') or {}
+                text_parts.append(message.get('content') or '')
+                record['success'] = True
+            else:
+                record['success'] = bool(record['chunk_times']) or bool(usage)
+                if not record['success']:
+                    record['error'] = '响应中没有任何输出'
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+            connection.close()
+            record['error'] = f"{type(e).__name__}: {e}"
+        record['completed_time'] = time.time()
+        if connection.request_start is not None:
+            # 空闲连接已被服务端关闭（如会话思考时间超过 keep-alive 超时）而重连，重连耗时不计入请求延迟
+            record['start_time'] = connection.request_start
+        record.update(connection.timing)
+
+        if not self.stream and record['success']:
+            record['chunk_times'] = [record['completed_time']]
+        record['response'] = ''.join(text_parts)
+        record['prompt_tokens'] = usage.get('prompt_tokens', 0)
+        # 服务端未返回 usage 时按流式分块数估算输出token数
+        record['completion_tokens'] = usage.get('completion_tokens', len(record['chunk_times']))
+        return record
+
+    async def _worker(self, queue: asyncio.Queue, results: List[Dict]) -> None:
+        """
+        从队列取请求直到收到结束标记；测量已收敛或到时后不再发送，只取走剩余的请求（有界队列的发放方不会阻塞）
+        每个请求从连接池取连接，完成后归还
+        """
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                break
+            if self.tracker.converged or self._expired():
+                continue
+            item, intended_time = entry
+            class_index, prompt_index = item
+            workload_class = self.classes[class_index]
+            index = self.balancer.acquire()
+            endpoint = self.endpoints[index]
+            connection = self._acquire_connection(index)
+            try:
+                if self.payloads:
+                    payload, info = self.payloads[item]
+                    record = await self._send(connection, workload_class.name, None, payload)
+                    record['request_key'] = item
+                    record['image_tokens'] = info.get('image_tokens', 0)
+                else:
+                    body = self._build_body(workload_class, workload_class.prompts[prompt_index], endpoint.model)
+                    record = await self._send(connection, workload_class.name, body)
+            finally:
+                self._release_connection(index, connection)
+                self.balancer.release(index)
+            record['intended_time'] = intended_time
+            record['endpoint'] = endpoint.name
+            if self.recorder is not None:
+                self.recorder.add(record)
+                continue
+            results.append(record)
+            self.tracker.add(record)
+
+    async def _session_worker(self, session_ids: Iterator[int], budget: List[int], results: List[Dict],
+                              rng: random.Random) -> None:
+        """
+        依次回放会话直到总轮数用完；某轮失败时放弃该会话的剩余轮次（上下文已不完整）
+        每个会话开始时选择端点，同一会话的各轮发往同一端点
+        """
+        connections: Dict[int, object] = {}
+        workload_class = self.classes[0]
+        try:
+            while budget[0] > 0 and not self._expired():
+                session_id = next(session_ids)
+                session = self.sessions[session_id % len(self.sessions)]
+                messages = list(session['system'])
+                index = self.balancer.acquire()
+                endpoint = self.endpoints[index]
+                if index not in connections:
+                    connections[index] = self._open_connection(endpoint)
+                try:
+                    for turn, content in enumerate(session['turns'], 1):
+                        if turn > 1 and self.think_time:
+                            await asyncio.sleep(rng.expovariate(1 / self.think_time))
+                        if budget[0] <= 0 or self._expired():
+                            break
+                        budget[0] -= 1
+                        messages.append({'role': 'user', 'content': content})
+                        record = await self._send(connections[index], workload_class.name,
+                                                  self._build_body(workload_class, messages, endpoint.model))
+                        record['session_id'], record['turn'] = session_id, turn
+                        record['endpoint'] = endpoint.name
+                        results.append(record)
+                        if self.tracker.add(record):
+                            budget[0] = 0
+                        if not record['success']:
+                            break
+                        messages.append({'role': 'assistant', 'content': record['response']})
+                finally:
+                    self.balancer.release(index)
+        finally:
+            for connection in connections.values():
+                connection.close()
+
+    async def _run_sessions(self) -> List[Dict]:
+        if self.duration:
+            self.deadline = time.time() + self.duration
+        session_ids = itertools.count()
+        budget = [self.number]
+        results: List[Dict] = []
+        await asyncio.gather(*[self._session_worker(session_ids, budget, results,
+                                                    random.Random(self.seed * 100003 + i))
+                               for i in range(self.parallel)])
+        return results
+
+    async def _run(self) -> List[Dict]:
+        try:
+            if self.sessions:
+                return await self._run_sessions()
+            return await self._run_requests()
+        finally:
+            if self.http2_client is not None:
+                await self.http2_client.aclose()
+
+    async def _tick(self) -> None:
+        """浸泡模式每秒结束已到时的窗口（没有请求完成时窗口照常落盘）"""
+        while True:
+            await asyncio.sleep(1)
+            self.recorder.tick(time.time())
+
+    async def _run_requests(self) -> List[Dict]:
+        if self.recorder is not None:
+            # 浸泡模式循环发送固定长度的请求序列直到时长用完，队列只缓存少量待发请求
+            schedule = itertools.cycle(build_schedule(self.classes, SCHEDULE_LENGTH, self.seed))
+            queue: asyncio.Queue = asyncio.Queue(maxsize=self.parallel * 2)
+        else:
+            schedule = build_schedule(self.classes, self.number, self.seed)
+            queue = asyncio.Queue()
+        results: List[Dict] = []
+        workers = [asyncio.ensure_future(self._worker(queue, results)) for _ in range(self.parallel)]
+
+        # 限速模式按绝对时间表发放（泊松到达），计划发送时间随请求记录，用于协调遗漏校正
+        rng = random.Random(self.seed)
+        start, offset = time.time(), 0.0
+        ticker = None
+        if self.recorder is not None:
+            self.recorder.begin(start)
+            ticker = asyncio.ensure_future(self._tick())
+        # 闭环模式到时不再发送新请求；限速模式按计划发送时间截止发放，已到达的请求照常发送（排队时间计入校正后的延迟）
+        if self.duration and not self.rate:
+            self.deadline = start + self.duration
+        window_end = None
+        for item in schedule:
+            intended_time = None
+            if self.rate:
+                next_offset = offset + rng.expovariate(self.rate)
+                if self.duration and next_offset > self.duration:
+                    window_end = start + self.duration
+                    break
+                offset = next_offset
+                intended_time = start + offset
+                await asyncio.sleep(max(0.0, intended_time - time.time()))
+            if self.tracker.converged or self._expired():
+                break
+            await queue.put((item, intended_time))
+        if self.rate:
+            # 按时长运行时窗口为整个时长；请求数上限先用完（或已收敛）时截止到最后一个请求的计划发送时间
+            self.issue_window = (start, window_end or start + offset)
+        for _ in workers:
+            await queue.put(None)
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            if ticker is not None:
+                ticker.cancel()
+            self._close_connections()
+        return results
+
+    def run(self) -> List[Dict]:
+        """
+        执行压测
+        Returns:
+            List[Dict]: 全部请求记录（按完成顺序）
+        """
+        records = asyncio.run(self._run())
+        self._fill_requests(records)
+        return records
+
+    def _fill_requests(self, records: List[Dict]) -> None:
+        """为发送预序列化请求体的记录补齐请求文本（每个提示词只编码一次，不在发送路径上）"""
+        requests: Dict = {}
+        for record in records:
+            key = record.pop('request_key', None)
+            if key is None:
+                continue
+            if key not in requests:
+                workload_class = self.classes[key[0]]
+                requests[key] = json.dumps(self._build_body(workload_class, workload_class.prompts[key[1]]),
+                                           ensure_ascii=False)
+            record['request'] = requests[key]
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """最近秩百分位（输入已排序）"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(math.ceil(q / 100 * len(ordered))) - 1))]
+
+
+def _request_metrics(record: Dict) -> Dict[str, float]:
+    """单个成功请求的 TTFT / TPOT / ITL"""
+    latency = record['completed_time'] - record['start_time']
+    chunk_times = record['chunk_times']
+    ttft = chunk_times[0] - record['start_time'] if chunk_times else latency
+    tokens = record['completion_tokens']
+    gaps = [b - a for a, b in zip(chunk_times, chunk_times[1:])]
+    return {
+        'latency': latency,
+        'ttft': ttft,
+        'tpot': (latency - ttft) / (tokens - 1) if tokens > 1 else 0.0,
+        'itl': sum(gaps) / len(gaps) if gaps else 0.0
+    }
+
+
+def summarize_requests(records: List[Dict], time_taken: float, parallel: int) -> Dict[str, float]:
+    """
+    按 evalscope benchmark_summary.json 的字段计算汇总指标
+    Args:
+        records: 请求记录
+        time_taken: 测试总耗时（秒）
+        parallel: 并发数
+    Returns:
+        Dict[str, float]: 汇总指标
+    """
+    succeeded = [r for r in records if r['success']]
+    metrics = [_request_metrics(r) for r in succeeded]
+    n = len(succeeded)
+    input_tokens = sum(r['prompt_tokens'] for r in succeeded)
+    output_tokens = sum(r['completion_tokens'] for r in succeeded)
+    image_tokens = sum(r.get('image_tokens', 0) for r in succeeded)
+
+    def avg(key: str) -> float:
+        return round(sum(m[key] for m in metrics) / n, 4) if n else 0.0
+
+    summary = {
+        'Time taken for tests (s)': round(time_taken, 4),
+        'Number of concurrency': parallel,
+        'Total requests': len(records),
+        'Succeed requests': n,
+        'Failed requests': len(records) - n,
+        'Output token throughput (tok/s)': round(output_tokens / time_taken, 4) if time_taken else 0.0,
+        'Total token throughput (tok/s)': round((input_tokens + output_tokens) / time_taken, 4) if time_taken else 0.0,
+        'Request throughput (req/s)': round(n / time_taken, 4) if time_taken else 0.0,
+        'Average latency (s)': avg('latency'),
+        'Average time to first token (s)': avg('ttft'),
+        'Average time per output token (s)': avg('tpot'),
+        'Average inter-token latency (s)': avg('itl'),
+        'Average input tokens per request': round(input_tokens / n, 4) if n else 0.0,
+        'Average output tokens per request': round(output_tokens / n, 4) if n else 0.0
+    }
+    # 多模态请求额外记录估算的视觉token数（已包含在服务端统计的输入token数中）
+    if image_tokens:
+        summary['Average image tokens per request'] = round(image_tokens / n, 4)
+    return summary
+
+
+def compute_percentiles(records: List[Dict], parallel: int = 1, rate: Optional[float] = None,
+                        think_time: float = 0.0) -> List[Dict]:
+    """
+    按 evalscope benchmark_percentile.json 的格式计算各百分位，另加协调遗漏校正后的延迟列
+    （见 evalperf.coordinated_omission；parallel / rate / think_time 用于确定回填的期望发送间隔）
+    """
+    succeeded = [r for r in records if r['success']]
+    metrics = [_request_metrics(r) for r in succeeded]
+    columns = {
+        'TTFT (s)': sorted(m['ttft'] for m in metrics),
+        'ITL (s)': sorted(m['itl'] for m in metrics),
+        'TPOT (s)': sorted(m['tpot'] for m in metrics),
+        'Latency (s)': sorted(m['latency'] for m in metrics),
+        'Input tokens': sorted(r['prompt_tokens'] for r in succeeded),
+        'Output tokens': sorted(r['completion_tokens'] for r in succeeded),
+        'Output (tok/s)': sorted(r['completion_tokens'] / m['latency'] for r, m in zip(succeeded, metrics) if m['latency'] > 0),
+        'Total (tok/s)': sorted((r['prompt_tokens'] + r['completion_tokens']) / m['latency']
+                                for r, m in zip(succeeded, metrics) if m['latency'] > 0),
+        **corrected_columns(succeeded, metrics, parallel, rate, think_time)
+    }
+    return [{'Percentiles': f'{q}%', **{name: round(_percentile(values, q), 4) for name, values in columns.items()}}
+            for q in PERCENTILES]
+
+
+def summarize_classes(records: List[Dict], classes: List[WorkloadClass], time_taken: float,
+                      parallel: int) -> Dict[str, Dict]:
+    """
+    每类请求的汇总（同一次测试中的各类延迟和吞吐，吞吐按整个测试时长计算）
+    Returns:
+        Dict[str, Dict]: 类别名到汇总指标
+    """
+    result = {}
+    for workload_class in classes:
+        subset = [r for r in records if r['request_class'] == workload_class.name]
+        summary = _subset_summary(subset, records, time_taken, parallel)
+        summary['Max tokens'] = workload_class.max_tokens
+        result[workload_class.name] = summary
+    return result
+
+
+def summarize_endpoints_requests(records: List[Dict], endpoints: List[Endpoint], time_taken: float,
+                                 parallel: int) -> Dict[str, Dict]:
+    """
+    每个端点的汇总（同一次测试中各副本的吞吐和延迟，吞吐按整个测试时长计算，各端点之和为整体吞吐）
+    Returns:
+        Dict[str, Dict]: 端点名到汇总指标
+    """
+    result = {}
+    for endpoint in endpoints:
+        subset = [r for r in records if r.get('endpoint') == endpoint.name]
+        summary = _subset_summary(subset, records, time_taken, parallel)
+        summary.update({'URL': endpoint.url, 'Model': endpoint.model, 'Weight': endpoint.weight})
+        result[endpoint.name] = summary
+    return result
+
+
+def _subset_summary(subset: List[Dict], records: List[Dict], time_taken: float, parallel: int) -> Dict:
+    """一部分请求的汇总指标，另加占比和 P99 延迟 / TTFT"""
+    summary = summarize_requests(subset, time_taken, parallel)
+    metrics = [_request_metrics(r) for r in subset if r['success']]
+    summary['Share (%)'] = round(len(subset) / len(records) * 100, 2) if records else 0.0
+    summary['P99 latency (s)'] = round(_percentile(sorted(m['latency'] for m in metrics), 99), 4)
+    summary['P99 time to first token (s)'] = round(_percentile(sorted(m['ttft'] for m in metrics), 99), 4)
+    return summary
+
+
+def summarize_session_turns(records: List[Dict]) -> Dict[str, Dict]:
+    """
+    多轮会话按轮次汇总：各轮的平均上下文长度（服务端统计的输入token数）与延迟，观察上下文增长对 TTFT 的影响
+    Returns:
+        Dict[str, Dict]: 轮次（字符串）到汇总指标
+    """
+    result = {}
+    for turn in sorted({r['turn'] for r in records if r.get('turn')}):
+        subset = [r for r in records if r.get('turn') == turn]
+        succeeded = [r for r in subset if r['success']]
+        metrics = [_request_metrics(r) for r in succeeded]
+        n = len(succeeded)
+        result[str(turn)] = {
+            'Total requests': len(subset),
+            'Succeed requests': n,
+            'Average context tokens': round(sum(r['prompt_tokens'] for r in succeeded) / n, 2) if n else 0.0,
+            'Average output tokens per request': round(sum(r['completion_tokens'] for r in succeeded) / n, 2) if n else 0.0,
+            'Average time to first token (s)': round(sum(m['ttft'] for m in metrics) / n, 4) if n else 0.0,
+            'P99 time to first token (s)': round(_percentile(sorted(m['ttft'] for m in metrics), 99), 4),
+            'Average latency (s)': round(sum(m['latency'] for m in metrics) / n, 4) if n else 0.0
+        }
+    return result
+
+
+def summarize_offered_load(records: List[Dict], rate: float, window: Tuple[float, float]) -> Dict[str, float]:
+    """
+    开环限速运行的目标速率与实际速率：发放窗口内实际开始发送、成功完成的请求数除以窗口时长
+    （在途请求数达到并发上限时请求排队，实际发送速率低于目标；服务端处理不过来时完成速率低于目标）
+    Args:
+        records: 请求记录
+        rate: 目标速率（req/s）
+        window: 发放窗口 (开始, 结束)
+    Returns:
+        Dict[str, float]: 合并到 benchmark_summary.json 的字段
+    """
+    start, end = window
+    duration = end - start
+    sent = sum(1 for r in records if r['start_time'] <= end)
+    completed = sum(1 for r in records if r['success'] and r['completed_time'] <= end)
+    return {
+        'Target rate (req/s)': rate,
+        'Achieved rate (req/s)': round(sent / duration, 4) if duration > 0 else 0.0,
+        'Completed rate (req/s)': round(completed / duration, 4) if duration > 0 else 0.0
+    }
+
+
+def write_request_db(db_file: Path, records: List[Dict]) -> None:
+    """按开始时间顺序写入请求级数据（与 evalscope benchmark_data.db 的 result 表兼容）"""
+    conn = sqlite3.connect(str(db_file))
+    conn.execute(RESULT_TABLE_SQL)
+    rows = []
+    for r in sorted(records, key=lambda x: x['start_time']):
+        latency = r['completed_time'] - r['start_time']
+        metrics = _request_metrics(r) if r['success'] else {'ttft': None, 'tpot': None}
+        n_chunks = len(r['chunk_times'])
+        rows.append((r['request'], r['start_time'], json.dumps(r['chunk_times']), int(r['success']),
+                     json.dumps([r['response'] if r['success'] else r['error']], ensure_ascii=False),
+                     r['completed_time'], latency, metrics['ttft'], n_chunks,
+                     latency / n_chunks if n_chunks else None, r['prompt_tokens'], r['completion_tokens'],
+                     0.0, metrics['tpot'], r['request_class'], r.get('session_id'), r.get('turn'),
+                     r.get('image_tokens', 0), r.get('intended_time'),
+                     *[r.get(field) for field in PHASES], r.get('reused'), r.get('http_version'),
+                     r.get('endpoint')))
+    conn.executemany('INSERT INTO result VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)', rows)
+    conn.commit()
+    conn.close()
+
+
+def write_run_outputs(run_dir: Path, args: Dict, records: List[Dict], time_taken: float,
+                      classes: List[WorkloadClass], convergence: Optional[Dict] = None,
+                      connections: Optional[Dict] = None, endpoints: Optional[List[Endpoint]] = None,
+                      offered_load: Optional[Dict] = None) -> Dict:
+    """
+    写入与 evalscope 相同的输出文件（限速运行的目标与实际速率合并到 benchmark_summary.json）；
+    多于一类请求时额外写入 benchmark_classes.json，
+    多轮会话模式额外写入按轮次的 benchmark_turns.json，给出精度报告时写入 benchmark_convergence.json，
+    给出连接统计时写入 benchmark_connections.json，多于一个端点时写入 benchmark_endpoints.json
+    Returns:
+        Dict: 汇总指标
+    """
+    run_dir.mkdir(parents=True, exist_ok=True)
+    summary = summarize_requests(records, time_taken, args['parallel'])
+    if offered_load:
+        summary.update(offered_load)
+    outputs = [('benchmark_summary.json', summary), ('benchmark_args.json', args),
+               ('benchmark_percentile.json', compute_percentiles(records, args['parallel'], args.get('rate'),
+                                                                 args.get('think_time') or 0.0))]
+    if len(classes) > 1:
+        outputs.append((CLASSES_FILE, summarize_classes(records, classes, time_taken, args['parallel'])))
+    turns = summarize_session_turns(records)
+    if turns:
+        outputs.append((TURNS_FILE, turns))
+    if convergence:
+        outputs.append((CONVERGENCE_FILE, convergence))
+    if connections:
+        outputs.append((CONNECTIONS_FILE, connections))
+    if endpoints and len(endpoints) > 1:
+        outputs.append((ENDPOINTS_FILE, summarize_endpoints_requests(records, endpoints, time_taken,
+                                                                     args['parallel'])))
+    for name, payload in outputs:
+        with open(run_dir / name, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, indent=4, ensure_ascii=False)
+    write_request_db(run_dir / 'benchmark_data.db', records)
+    return summary
+
+
+def run_soak(driver: BenchmarkDriver, run_args: Dict, run_dir: Path) -> None:
+    """
+    浸泡测试：窗口统计随运行写入运行目录；收到 Ctrl+C 或 SIGTERM 时停止发送，写入已完成的部分并给出漂移分析
+    Args:
+        driver: 压测驱动
+        run_args: 运行参数（写入 benchmark_args.json）
+        run_dir: 运行目录
+    """
+    driver.recorder = SoakRecorder(run_dir, run_args, _request_metrics, run_args['soak_window'])
+    print(f"[INFO] 浸泡测试: 持续 {run_args['duration'] / 3600:.2f}h, 窗口 {run_args['soak_window']:g}s, "
+          f"窗口统计写入 {run_dir}")
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    interrupted = False
+    try:
+        driver.run()
+    except KeyboardInterrupt:
+        interrupted = True
+        print("[WARNING] 浸泡测试被中断，保存已完成的窗口")
+    drift = driver.recorder.close(time.time())
+    summary = driver.recorder.summary()
+
+    print(f"[INFO] 完成 {summary['Succeed requests']}/{summary['Total requests']} 个请求, "
+          f"耗时 {summary['Time taken for tests (s)'] / 3600:.2f}h, "
+          f"输出吞吐 {summary['Output token throughput (tok/s)']:.1f} tok/s")
+    print_drift(drift)
+    print(f"[INFO] 结果保存: {run_dir}")
+    if summary['Failed requests']:
+        print(f"[WARNING] {summary['Failed requests']} 个请求失败，各窗口的首个错误见 benchmark_soak.jsonl")
+    # 全部失败时以非零退出码结束，与 evalscope 一致；被中断时与 Ctrl+C 的惯例一致
+    if interrupted:
+        sys.exit(130)
+    sys.exit(0 if summary['Succeed requests'] else 3)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='原生 asyncio 压测驱动（输出与 evalscope perf 兼容）')
+    parser.add_argument('--url', required=True, nargs='+',
+                        help='OpenAI 兼容接口地址，多个时按 --balance 分发请求；'
+                             '每个地址可追加 ,model=模型名 和 ,weight=权重（见 evalperf.endpoints）')
+    parser.add_argument('--balance', choices=BALANCE_POLICIES, default='round_robin',
+                        help='多端点的负载均衡策略 (默认: round_robin)')
+    parser.add_argument('--model', required=True, help='模型名称')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--workload', help='混合负载定义文件（JSON / YAML）')
+    source.add_argument('--dataset', help='单一数据集（.jsonl messages 格式或 .txt 每行一个提示词），依次发送全部提示词')
+    parser.add_argument('--parallel', type=int, default=1, help='并发数 (默认: 1)')
+    parser.add_argument('--number', type=int, default=100,
+                        help='请求总数，多轮会话模式下为总轮数，自适应模式下为上限 (默认: 100)')
+    parser.add_argument('--max-tokens', type=int, default=200, help='最大输出token数，负载定义中的类别可单独覆盖 (默认: 200)')
+    parser.add_argument('--min-tokens', type=int, help='最小输出token数（与 max-tokens 相同时为固定输出长度）')
+    parser.add_argument('--extra-args', help='合并到请求体中的额外参数（JSON）')
+    parser.add_argument('--rate', type=float, help='每秒发放请求数（泊松到达），默认不限制')
+    parser.add_argument('--duration', type=float,
+                        help='按时长运行（秒）：限速模式只发放该时长内到达的请求，闭环模式到时不再发送新请求，'
+                             '--number 为请求数上限')
+    parser.add_argument('--soak', action='store_true',
+                        help='浸泡测试：循环发送请求直到 --duration，不保存逐请求数据，按窗口统计并持续更新汇总（见 evalperf.soak）')
+    parser.add_argument('--soak-window', type=float, default=DEFAULT_WINDOW_SECONDS,
+                        help=f'浸泡测试的统计窗口秒数 (默认: {DEFAULT_WINDOW_SECONDS})')
+    parser.add_argument('--no-stream', action='store_true', help='使用非流式请求（TTFT 等于总延迟）')
+    parser.add_argument('--connect-timeout', type=float, help='连接超时秒数')
+    parser.add_argument('--read-timeout', type=float, help='单次读取超时秒数')
+    parser.add_argument('--api-key', help='API 密钥（Bearer）')
+    parser.add_argument('--http2', action='store_true',
+                        help='使用 HTTP/2（所有并发共用一条连接多路复用，需要 httpx[http2]），默认每个并发一条 HTTP/1.1 keep-alive 连接')
+    parser.add_argument('--turns', type=int,
+                        help='多轮会话模式：每个会话的轮数（数据集中的多轮对话按其 user 消息回放，最多取前 N 轮；'
+                             '单轮数据集按顺序每 N 条拼成一个会话），每个并发为一个会话')
+    parser.add_argument('--think-time', type=float, default=0.0,
+                        help='多轮会话中两轮之间的平均思考时间（秒，指数分布） (默认: 0)')
+    parser.add_argument('--image-resolution',
+                        help='多模态数据集：把所有图片缩放到 WxH（需要 Pillow），默认保持原图（按原图大小分组统计）')
+    parser.add_argument('--image-token-px', type=int, default=DEFAULT_IMAGE_TOKEN_PX,
+                        help=f'估算视觉token数时每个token对应的边长像素（Qwen2/2.5-VL 为 28） (默认: {DEFAULT_IMAGE_TOKEN_PX})')
+    parser.add_argument('--payload-cache', default=DEFAULT_CACHE_DIR,
+                        help=f'预序列化请求体的缓存目录 (默认: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--no-payload-cache', action='store_true',
+                        help='不使用预序列化请求体，每个请求发送时编码（文本数据集，用于对比客户端开销）')
+    parser.add_argument('--tolerance', type=float,
+                        help='自适应请求数：输出吞吐和 P50/P99 延迟的 95%% 置信区间相对半宽（%%）都不超过该值时提前停止')
+    parser.add_argument('--min-requests', type=int, default=DEFAULT_MIN_REQUESTS,
+                        help=f'自适应模式下开始检查收敛前的最少请求数 (默认: {DEFAULT_MIN_REQUESTS})')
+    parser.add_argument('--seed', type=int, default=0, help='请求序列随机种子 (默认: 0)')
+    parser.add_argument('--outputs-dir', required=True, help='输出目录，结果写入 <outputs-dir>/<时间戳>/<模型>/')
+    args = parser.parse_args()
+    if args.turns and args.workload:
+        print("[ERROR] 多轮会话模式（--turns）需要使用 --dataset")
+        sys.exit(1)
+    if args.turns and args.rate:
+        print("[WARNING] 多轮会话模式为闭环会话，忽略 --rate")
+        args.rate = None
+    if args.duration is not None and args.duration <= 0:
+        print("[ERROR] --duration 必须大于0")
+        sys.exit(1)
+    if args.soak and not args.duration:
+        print("[ERROR] 浸泡测试（--soak）需要指定 --duration")
+        sys.exit(1)
+    if args.soak and (args.turns or args.tolerance):
+        print("[ERROR] 浸泡测试（--soak）不支持多轮会话（--turns）和自适应请求数（--tolerance）")
+        sys.exit(1)
+    if args.soak and args.soak_window <= 0:
+        print("[ERROR] --soak-window 必须大于0")
+        sys.exit(1)
+    if args.rate and args.duration and not args.soak and args.rate * args.duration > args.number:
+        print(f"[WARNING] 请求数上限 {args.number} 小于 {args.rate:g} req/s × {args.duration:g}s，"
+              f"发放窗口将在请求数用完时提前结束")
+    if args.tolerance is not None and args.tolerance <= 0:
+        print("[ERROR] --tolerance 必须大于0")
+        sys.exit(1)
+    if args.tolerance and args.min_requests > args.number:
+        print(f"[WARNING] --min-requests {args.min_requests} 大于请求数上限 {args.number}，不会提前停止")
+
+    sessions = None
+    multimodal = False
+    try:
+        if args.workload:
+            workload_name, classes = load_workload_spec(args.workload)
+            if any(prompts_have_images(c.prompts) for c in classes):
+                raise ValueError("混合负载暂不支持图片数据集，请使用 --dataset")
+        else:
+            workload_name = ''
+            classes = [WorkloadClass(Path(args.dataset).stem, load_prompts(args.dataset))]
+            multimodal = prompts_have_images(classes[0].prompts)
+            if multimodal and args.turns:
+                raise ValueError("多轮会话模式暂不支持图片数据集")
+            if args.turns:
+                sessions = load_sessions(args.dataset, args.turns)
+        extra_args = json.loads(args.extra_args) if args.extra_args else None
+        image_resolution = parse_resolution(args.image_resolution) if args.image_resolution else None
+        endpoints = parse_endpoints(args.url, args.model)
+        # 各端点模型名相同时请求体可以预序列化；不同时按端点的模型名在发送时编码
+        models = {e.model for e in endpoints}
+        if len(models) > 1 and multimodal:
+            raise ValueError("多模型端点暂不支持图片数据集（图片请求体预序列化时已包含模型名）")
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    model = endpoints[0].model if len(models) == 1 else args.model
+    try:
+        driver = BenchmarkDriver(endpoints[0].url, model, classes, args.parallel, args.number, args.max_tokens,
+                                 stream=not args.no_stream, rate=args.rate, connect_timeout=args.connect_timeout,
+                                 read_timeout=args.read_timeout, api_key=args.api_key, min_tokens=args.min_tokens,
+                                 extra_args=extra_args, seed=args.seed, sessions=sessions,
+                                 think_time=args.think_time, tolerance_pct=args.tolerance,
+                                 min_requests=args.min_requests, http2=args.http2, endpoints=endpoints,
+                                 balance=args.balance, duration=args.duration)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    if multimodal:
+        # 图片只编码一次：完整请求体写入载荷缓存，运行时 mmap 映射发送；请求按图片大小分组统计
+        print("[INFO] 多模态数据集: 准备预序列化请求体...")
+        try:
+            dataset = load_multimodal_dataset(args.dataset, lambda messages: driver._build_body(classes[0], messages),
+                                              image_resolution, args.image_token_px, args.payload_cache)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+        classes = driver.classes = dataset.classes
+        driver.payloads = dataset.payloads
+        print(f"[INFO] 载荷缓存{'命中' if dataset.cached else '已生成'}: {dataset.cache.directory}")
+    elif not sessions and not args.no_payload_cache and len(models) == 1:
+        # 多轮会话的请求体随实际回复变化，每轮发送时编码
+        try:
+            driver.payloads, cache, cached = compile_payloads(classes, driver._build_body, args.payload_cache)
+        except OSError as e:
+            print(f"[ERROR] 无法写入载荷缓存: {e}")
+            sys.exit(1)
+        print(f"[INFO] 载荷缓存{'命中' if cached else '已生成'}: {cache.directory}")
+    if sessions:
+        print(f"[INFO] 开始多轮会话压测: 并发会话={args.parallel} 总轮数={args.number} "
+              f"会话={len(sessions)} 思考时间={args.think_time}s")
+    else:
+        print(f"[INFO] 开始压测: 并发={args.parallel} 请求={'循环至时长' if args.soak else args.number} 类别={[c.name for c in classes]}")
+    if args.rate:
+        print(f"[INFO] 开环限速: 目标 {args.rate:g} req/s (泊松到达)"
+              + (f", 持续 {args.duration:g}s" if args.duration else ''))
+    elif args.duration and not args.soak:
+        print(f"[INFO] 按时长运行: {args.duration:g}s")
+    if len(endpoints) > 1:
+        print(f"[INFO] 多端点 ({args.balance}): " + ', '.join(f"{e.name} (模型 {e.model}, 权重 {e.weight:g})"
+                                                             for e in endpoints))
+    if args.tolerance:
+        print(f"[INFO] 自适应请求数: 置信区间相对半宽 <= {args.tolerance}% 时停止 "
+              f"(最少 {args.min_requests}，最多 {args.number} 个请求)")
+    run_args = {
+        'driver': 'native',
+        'model': args.model,
+        'url': endpoints[0].url,
+        'endpoints': [e.to_dict() for e in endpoints],
+        'balance': args.balance if len(endpoints) > 1 else '',
+        'parallel': args.parallel,
+        'number': args.number,
+        'max_tokens': args.max_tokens,
+        'min_tokens': args.min_tokens,
+        'extra_args': extra_args,
+        'rate': args.rate,
+        'duration': args.duration or 0.0,
+        'soak': args.soak,
+        'soak_window': args.soak_window if args.soak else 0.0,
+        'stream': not args.no_stream,
+        'dataset': 'workload' if args.workload else 'line_by_line' if args.dataset.endswith('.txt') else 'openqa',
+        'dataset_path': args.dataset,
+        'workload': workload_name,
+        'workload_spec': args.workload,
+        'workload_classes': {c.name: {'weight': c.weight, 'max_tokens': c.max_tokens or args.max_tokens}
+                             for c in classes},
+        'image_resolution': args.image_resolution or '',
+        'image_token_px': args.image_token_px if multimodal else 0,
+        'session_turns': args.turns or 0,
+        'think_time': args.think_time if args.turns else 0.0,
+        'tolerance_pct': args.tolerance or 0.0,
+        'min_requests': args.min_requests if args.tolerance else 0,
+        'seed': args.seed,
+        'http_version': 'HTTP/2' if args.http2 else 'HTTP/1.1'
+    }
+    run_dir = Path(args.outputs_dir) / datetime.now().strftime('%Y%m%d_%H%M%S') / args.model.replace('/', '_')
+    if args.soak:
+        run_soak(driver, run_args, run_dir)
+        return
+
+    start = time.monotonic()
+    records = driver.run()
+    time_taken = time.monotonic() - start
+
+    # 记录实际协商的 HTTP 版本（https 下服务端不支持 HTTP/2 时回退 HTTP/1.1）
+    connections = summarize_connection_phases(records)
+    run_args['http_version'] = connections['HTTP version'] or run_args['http_version']
+    convergence = driver.tracker.report(args.number)
+    offered_load = (summarize_offered_load(records, args.rate, driver.issue_window)
+                    if driver.issue_window else None)
+    summary = write_run_outputs(run_dir, run_args, records, time_taken, classes, convergence, connections,
+                                endpoints, offered_load)
+
+    print(f"[INFO] 完成 {summary['Succeed requests']}/{summary['Total requests']} 个请求, "
+          f"耗时 {time_taken:.1f}s, 输出吞吐 {summary['Output token throughput (tok/s)']:.1f} tok/s")
+    if offered_load:
+        print(f"[INFO] 速率: 目标 {args.rate:g} req/s, 实际发送 {offered_load['Achieved rate (req/s)']:.2f} req/s, "
+              f"完成 {offered_load['Completed rate (req/s)']:.2f} req/s "
+              f"(发放窗口 {driver.issue_window[1] - driver.issue_window[0]:.1f}s)")
+    if len(endpoints) > 1:
+        for name, metrics in summarize_endpoints_requests(records, endpoints, time_taken, args.parallel).items():
+            print(f"[INFO] 端点 {name}: 请求 {metrics['Total requests']} ({metrics['Share (%)']:.1f}%, "
+                  f"失败 {metrics['Failed requests']}), 输出吞吐 {metrics['Output token throughput (tok/s)']:.1f} tok/s, "
+                  f"平均延迟 {metrics['Average latency (s)']:.3f}s, P99 {metrics['P99 latency (s)']:.3f}s")
+    for turn, metrics in summarize_session_turns(records).items():
+        print(f"[INFO] 第{turn}轮: 上下文 {metrics['Average context tokens']:.0f} tokens, "
+              f"TTFT {metrics['Average time to first token (s)']:.3f}s, 延迟 {metrics['Average latency (s)']:.3f}s")
+    phases = connections['phases']
+    print(f"[INFO] 连接: {run_args['http_version']}, 新建 {connections['New connections']} 个 "
+          f"(复用率 {connections['Connection reuse (%)']:.1f}%), 建连 TCP {phases['TCP connect']['Average (ms)']:.1f}ms "
+          f"TLS {phases['TLS handshake']['Average (ms)']:.1f}ms, 首字节 {phases['Time to first byte']['Average (ms)']:.1f}ms "
+          f"(P99 {phases['Time to first byte']['P99 (ms)']:.1f}ms), 响应体 {phases['Body transfer']['Average (ms)']:.1f}ms")
+    with open(run_dir / 'benchmark_percentile.json', 'r', encoding='utf-8') as f:
+        p99 = next((row for row in json.load(f) if row['Percentiles'] == '99%'), {})
+    if p99.get(LATENCY_CO_COLUMN):
+        print(f"[INFO] P99 延迟: 原始 {p99['Latency (s)']:.3f}s, 协调遗漏校正 {p99[LATENCY_CO_COLUMN]:.3f}s "
+              f"({'按计划发送时间计量' if args.rate else '按期望发送间隔回填'})")
+    precision = ', '.join(f"{name} ±{metric['relative_half_width_pct']}%" if metric else f"{name} 样本不足"
+                          for name, metric in convergence['metrics'].items())
+    if convergence['stopped_early']:
+        print(f"[INFO] 已收敛，提前停止于 {convergence['requests']}/{args.number} 个请求: {precision}")
+    elif args.tolerance and not convergence['converged']:
+        print(f"[WARNING] 达到请求数上限仍未收敛到 ±{args.tolerance}%: {precision}")
+    else:
+        print(f"[INFO] 测量精度（95% 置信区间相对半宽）: {precision}")
+    print(f"[INFO] 结果保存: {run_dir}")
+    failed = [r for r in records if not r['success']]
+    if failed:
+        print(f"[WARNING] {len(failed)} 个请求失败，首个错误: {failed[0]['error']}")
+    # 全部失败时以非零退出码结束，与 evalscope 一致
+    sys.exit(0 if len(failed) < len(records) else 3)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+多端点负载均衡模块
+原生驱动可以同时压测多个副本（或多个模型）的端点，在客户端按策略分发请求，一次运行同时得到整体和每个端点的吞吐与延迟：
+- round_robin：依次轮询
+- weighted：平滑加权轮询（与 nginx 相同），按权重比例分发
+- least_outstanding：发往 在途请求数/权重 最小的端点，响应慢的副本自动少分；负载相同时轮流分配
+多轮会话按会话分配端点（同一会话的各轮发往同一端点，保留服务端的前缀缓存）
+
+端点格式：URL[,model=模型名][,weight=权重]，未指定模型时使用 --model，例如
+python -m evalperf.driver --url http://10.0.0.1:8000/v1/chat/completions "http://10.0.0.2:8000/v1/chat/completions,weight=2" \\
+    --balance weighted --model Qwen3-32B ...
+每个端点的汇总写入运行目录的 benchmark_endpoints.json，整体指标仍在 benchmark_summary.json 中
+Author: AI Assistant
+Date: 2024
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+
+# 每个端点的汇总文件（保存在运行目录中，与 benchmark_summary.json 同级）
+ENDPOINTS_FILE = 'benchmark_endpoints.json'
+
+BALANCE_POLICIES = ('round_robin', 'least_outstanding', 'weighted')
+
+# 汇总列: 列名后缀 -> benchmark_endpoints.json 中的字段
+ENDPOINT_METRICS = {
+    'requests': 'Total requests',
+    'failed': 'Failed requests',
+    'share_pct': 'Share (%)',
+    'latency': 'Average latency (s)',
+    'p99_latency': 'P99 latency (s)',
+    'ttft': 'Average time to first token (s)',
+    'p99_ttft': 'P99 time to first token (s)',
+    'output_throughput': 'Output token throughput (tok/s)',
+    'request_throughput': 'Request throughput (req/s)'
+}
+
+
+class Endpoint:
+    """一个压测端点：地址、模型名、分发权重和用于统计的名称（默认为 主机:端口）"""
+
+    def __init__(self, url: str, model: str, weight: float = 1.0, name: str = ''):
+        self.url = url
+        self.model = model
+        self.weight = weight
+        self.name = name or urlsplit(url).netloc
+
+    def to_dict(self) -> Dict:
+        return {'name': self.name, 'url': self.url, 'model': self.model, 'weight': self.weight}
+
+
+def parse_endpoints(specs: List[str], default_model: str) -> List[Endpoint]:
+    """
+    解析端点列表
+    Args:
+        specs: URL[,model=模型名][,weight=权重]
+        default_model: 未指定模型时使用的模型名
+    Returns:
+        List[Endpoint]: 端点（名称唯一：同一地址的不同模型追加模型名，仍重复时追加序号）
+    """
+    endpoints = []
+    for spec in specs:
+        url, *options = [part.strip() for part in spec.split(',')]
+        if urlsplit(url).scheme not in ('http', 'https') or not urlsplit(url).hostname:
+            raise ValueError(f"无效的端点地址: {url}")
+        model, weight = default_model, 1.0
+        for option in options:
+            key, _, value = option.partition('=')
+            if key == 'model' and value:
+                model = value
+            elif key == 'weight':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+                if weight <= 0:
+                    raise ValueError(f"端点权重必须为正数: {spec}")
+            else:
+                raise ValueError(f"无效的端点选项 {option}（可选: model=模型名, weight=权重）: {spec}")
+        endpoints.append(Endpoint(url, model, weight))
+
+    names = [e.name for e in endpoints]
+    for endpoint in endpoints:
+        if names.count(endpoint.name) > 1:
+            endpoint.name = f'{endpoint.name}/{endpoint.model}'
+    names = [e.name for e in endpoints]
+    for i, endpoint in enumerate(endpoints):
+        if names.count(endpoint.name) > 1:
+            endpoint.name = f'{endpoint.name}#{i + 1}'
+    return endpoints
+
+
+class LoadBalancer:
+    """客户端负载均衡：acquire 选择端点并计入在途请求，请求完成后 release"""
+
+    def __init__(self, endpoints: List[Endpoint], policy: str = 'round_robin'):
+        if policy not in BALANCE_POLICIES:
+            raise ValueError(f"未知的负载均衡策略: {policy}（可选: {', '.join(BALANCE_POLICIES)}）")
+        self.endpoints = endpoints
+        self.policy = policy
+        self.outstanding = [0] * len(endpoints)
+        self._next = 0
+        self._current_weights = [0.0] * len(endpoints)
+
+    def acquire(self) -> int:
+        """
+        选择下一个请求的端点
+        Returns:
+            int: 端点下标
+        """
+        count = len(self.endpoints)
+        if count == 1:
+            index = 0
+        elif self.policy == 'weighted':
+            # 平滑加权轮询：每次所有端点加上自身权重，选当前值最大的并减去总权重
+            total = 0.0
+            for i, endpoint in enumerate(self.endpoints):
+                self._current_weights[i] += endpoint.weight
+                total += endpoint.weight
+            index = max(range(count), key=self._current_weights.__getitem__)
+            self._current_weights[index] -= total
+        elif self.policy == 'least_outstanding':
+            order = [(self._next + i) % count for i in range(count)]
+            index = min(order, key=lambda i: self.outstanding[i] / self.endpoints[i].weight)
+            self._next = (index + 1) % count
+        else:
+            index = self._next
+            self._next = (index + 1) % count
+        self.outstanding[index] += 1
+        return index
+
+    def release(self, index: int) -> None:
+        """请求（多轮会话为整个会话）完成"""
+        self.outstanding[index] -= 1
+
+
+def summarize_endpoints(endpoints_file: Path) -> Dict[str, float]:
+    """
+    把每个端点的汇总展开为 ep_<端点>_<指标> 列，单端点的运行返回空字典
+    Args:
+        endpoints_file: benchmark_endpoints.json 路径
+    Returns:
+        Dict[str, float]: 展开后的列
+    """
+    if not endpoints_file.exists():
+        return {}
+    try:
+        with open(endpoints_file, 'r', encoding='utf-8') as f:
+            endpoints = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"警告：无法读取端点汇总 {endpoints_file}: {e}")
+        return {}
+
+    columns = {}
+    for name, metrics in endpoints.items():
+        for suffix, key in ENDPOINT_METRICS.items():
+            columns[f'ep_{name}_{suffix}'] = metrics.get(key, 0)
+    return columns
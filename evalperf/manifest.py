@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+扫描清单模块
+evalperf.sh 把一次扫描的全部配置点及其状态记录在输出目录的 sweep_manifest.json 中：
+- pending：已计划、尚未运行
+- running：正在运行（扫描被中断时停留在此状态）
+- done：完成，记录结果目录
+- failed：重试用完仍失败，记录退出码
+- skipped：续跑时已有有效结果而跳过
+配置点以 结果目录名/模型名 标识（同一输出目录中并发扫描的多个模型各自记录）。
+--resume 续跑时，结果目录中已有有效 benchmark_summary.json（有成功请求且失败比例不超过 MAX_FAILED_PCT）的配置点直接跳过，
+判断以结果文件为准，清单之前的扫描结果同样会被跳过。多个模型的扫描并发写入时用文件锁串行化
+
+使用方式（由 evalperf.sh 调用）：
+python -m evalperf.manifest plan <输出目录> --model Qwen3-32B p8_n200_dp_short p16_n200_dp_short
+python -m evalperf.manifest check <输出目录> p8_n200_dp_short --model Qwen3-32B   # 已完成时输出结果目录，退出码0
+python -m evalperf.manifest record <输出目录> p8_n200_dp_short --model Qwen3-32B --status done --run-dir ...
+python -m evalperf.manifest show <输出目录>
+Author: AI Assistant
+Date: 2024
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+
+# 扫描清单（保存在输出目录中，与各配置的结果目录同级）
+MANIFEST_FILE = 'sweep_manifest.json'
+LOCK_FILE = '.sweep_manifest.lock'
+
+STATUSES = ('pending', 'running', 'done', 'failed', 'skipped')
+
+# 有效结果允许的失败请求比例上限（%），超过时续跑会重新运行该配置点（如连接问题导致大量请求失败的运行）
+MAX_FAILED_PCT = 5.0
+
+
+def model_dir_names(model: str) -> List[str]:
+    """结果目录中模型子目录可能的名称（原生驱动把 / 替换为 _，evalscope 取最后一段）"""
+    return list(dict.fromkeys([model.replace('/', '_'), model.split('/')[-1]]))
+
+
+def is_valid_summary(summary_file: Path, max_failed_pct: float = MAX_FAILED_PCT) -> bool:
+    """
+    benchmark_summary.json 可以解析，至少有一个成功请求，且失败请求比例不超过 max_failed_pct
+    Args:
+        summary_file: benchmark_summary.json 路径
+        max_failed_pct: 失败请求比例上限（%）
+    Returns:
+        bool: 是否为有效结果
+    """
+    try:
+        with open(summary_file, 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if not isinstance(summary, dict):
+        return False
+    succeeded = summary.get('Succeed requests') or 0
+    failed = summary.get('Failed requests') or 0
+    total = summary.get('Total requests') or succeeded + failed
+    return succeeded > 0 and failed * 100 <= max_failed_pct * total
+
+
+def find_completed_run(output_dir: Path, config: str, model: str,
+                       max_failed_pct: float = MAX_FAILED_PCT) -> Optional[Path]:
+    """
+    查找配置点最近一次有效的运行
+    Args:
+        output_dir: 扫描输出目录
+        config: 结果目录名，如 p8_n200_dp_short
+        model: 模型名
+        max_failed_pct: 有效结果的失败请求比例上限（%）
+    Returns:
+        Optional[Path]: 运行目录（<时间戳>/<模型>），没有有效结果时为 None
+    """
+    names = model_dir_names(model)
+    runs = sorted((output_dir / config).glob('*/*/benchmark_summary.json'), reverse=True)
+    for summary_file in runs:
+        if summary_file.parent.name in names and is_valid_summary(summary_file, max_failed_pct):
+            return summary_file.parent
+    return None
+
+
+def load_manifest(output_dir: Path) -> Dict:
+    """读取扫描清单（不存在或无法解析时为空清单）"""
+    try:
+        with open(output_dir / MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    manifest.setdefault('points', {})
+    return manifest
+
+
+@contextmanager
+def locked_manifest(output_dir: Path) -> Iterator[Dict]:
+    """加锁读取扫描清单，退出时写回（先写临时文件再替换）"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(output_dir / LOCK_FILE, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        manifest = load_manifest(output_dir)
+        yield manifest
+        manifest['updated'] = datetime.now().isoformat(timespec='seconds')
+        path = output_dir / MANIFEST_FILE
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=4, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+def _entry(manifest: Dict, config: str, model: str) -> Dict:
+    return manifest['points'].setdefault(f'{config}/{model}', {
+        'config': config, 'model': model, 'status': 'pending', 'attempts': 0
+    })
+
+
+def plan_points(output_dir: Path, configs: List[str], model: str) -> None:
+    """登记计划运行的配置点（已完成的配置点保持原状态）"""
+    with locked_manifest(output_dir) as manifest:
+        for config in configs:
+            entry = _entry(manifest, config, model)
+            if entry['status'] not in ('done', 'skipped'):
+                entry['status'] = 'pending'
+
+
+def record_point(output_dir: Path, config: str, model: str, status: str,
+                 exit_code: Optional[int] = None, run_dir: Optional[str] = None) -> Dict:
+    """
+    更新配置点的状态（进入 running 时尝试次数加1；进入 running 或 done 时清除上次失败的退出码）
+    Returns:
+        Dict: 更新后的记录
+    """
+    now = datetime.now().isoformat(timespec='seconds')
+    with locked_manifest(output_dir) as manifest:
+        entry = _entry(manifest, config, model)
+        entry['status'] = status
+        entry['updated'] = now
+        if status == 'running':
+            entry['attempts'] += 1
+            entry['started'] = now
+        if status in ('running', 'done'):
+            entry.pop('exit_code', None)
+        if exit_code is not None:
+            entry['exit_code'] = exit_code
+        if run_dir:
+            entry['run_dir'] = run_dir
+        return dict(entry)
+
+
+def print_manifest(output_dir: Path) -> None:
+    """按状态输出扫描清单"""
+    points = list(load_manifest(output_dir)['points'].values())
+    if not points:
+        print(f"[WARNING] 没有扫描清单: {output_dir / MANIFEST_FILE}")
+        return
+    counts = {status: sum(1 for p in points if p['status'] == status) for status in STATUSES}
+    print(f"[INFO] 扫描清单: {len(points)} 个配置点, " + ', '.join(f"{status} {count}"
+                                                           for status, count in counts.items() if count))
+    for point in points:
+        detail = f"尝试 {point['attempts']} 次"
+        if point.get('exit_code') is not None and point['status'] == 'failed':
+            detail += f", 退出码 {point['exit_code']}"
+        if point.get('run_dir'):
+            detail += f", {point['run_dir']}"
+        print(f"  [{point['status']}] {point['config']} ({point['model']}): {detail}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='扫描清单：记录各配置点的状态，续跑时跳过已有有效结果的配置点')
+    commands = parser.add_subparsers(dest='command', required=True)
+    plan = commands.add_parser('plan', help='登记计划运行的配置点')
+    plan.add_argument('output_dir', help='扫描输出目录')
+    plan.add_argument('configs', nargs='+', help='结果目录名')
+    plan.add_argument('--model', required=True, help='模型名称')
+    check = commands.add_parser('check', help='配置点已有有效结果时输出运行目录（退出码0），否则退出码1')
+    check.add_argument('output_dir', help='扫描输出目录')
+    check.add_argument('config', help='结果目录名')
+    check.add_argument('--model', required=True, help='模型名称')
+    check.add_argument('--max-failed-pct', type=float, default=MAX_FAILED_PCT,
+                       help=f'有效结果的失败请求比例上限，%% (默认: {MAX_FAILED_PCT:g})')
+    record = commands.add_parser('record', help='更新配置点的状态')
+    record.add_argument('output_dir', help='扫描输出目录')
+    record.add_argument('config', help='结果目录名')
+    record.add_argument('--model', required=True, help='模型名称')
+    record.add_argument('--status', required=True, choices=STATUSES, help='状态')
+    record.add_argument('--exit-code', type=int, help='测试退出码')
+    record.add_argument('--run-dir', help='运行目录')
+    show = commands.add_parser('show', help='输出扫描清单')
+    show.add_argument('output_dir', help='扫描输出目录')
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir)
+    try:
+        if args.command == 'plan':
+            plan_points(output_dir, args.configs, args.model)
+        elif args.command == 'check':
+            run_dir = find_completed_run(output_dir, args.config, args.model, args.max_failed_pct)
+            if run_dir is None:
+                sys.exit(1)
+            print(run_dir)
+        elif args.command == 'record':
+            entry = record_point(output_dir, args.config, args.model, args.status, args.exit_code, args.run_dir)
+            print(f"[INFO] {entry['config']} ({entry['model']}): {entry['status']}, 尝试 {entry['attempts']} 次")
+        else:
+            print_manifest(output_dir)
+    except OSError as e:
+        print(f"[ERROR] 无法读写扫描清单: {e}")
+        sys.exit(2)
+
+
+if __name__ == '__main__':
+    main()
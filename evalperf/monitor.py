@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+压测客户端资源监控模块
+从 /proc 采样压测进程树的 CPU、RSS、socket 数、上下文切换和调度延迟，用于判断吞吐平台期是否由客户端饱和导致
+
+使用方式（由 evalperf.sh 在每次测试期间自动启动）：
+python -m evalperf.monitor --pid <压测进程或其父shell的PID> --output client_monitor.csv --interval 1
+Author: AI Assistant
+Date: 2024
+"""
+
+import argparse
+import csv
+import math
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+# 时间序列文件名（保存在 evalscope 输出目录中，与 benchmark_summary.json 同级）
+MONITOR_FILE = 'client_monitor.csv'
+
+MONITOR_FIELDS = [
+    'time', 'elapsed_s', 'processes', 'cpu_pct', 'rss_mb', 'sockets',
+    'ctx_switches_per_s', 'sched_lag_ms', 'host_cpu_pct'
+]
+
+# 客户端饱和判定阈值
+# cpu_pct 以单核为 100%，evalscope 的 asyncio 事件循环是单线程的，接近 100% 即已饱和
+CLIENT_CPU_SATURATION_PCT = 90.0
+HOST_CPU_SATURATION_PCT = 90.0
+# 监控进程自身采样线程的唤醒延迟（不是压测进程事件循环的延迟），超过该值说明整机调度已拥塞
+SCHED_LAG_SATURATION_MS = 50.0
+
+
+class ClientResourceMonitor:
+    """压测客户端进程树资源采样器"""
+
+    def __init__(self, pid: int, output_file: str, interval: float = 1.0):
+        self.pid = pid
+        self.output_file = Path(output_file)
+        self.interval = interval
+        self.clock_ticks = os.sysconf('SC_CLK_TCK')
+        self.page_size_mb = os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+        self._stopped = False
+
+    def _process_tree(self) -> List[int]:
+        """获取根进程及其所有后代进程（不含监控进程自身）"""
+        children: Dict[int, List[int]] = {}
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            stat = self._read_stat(int(entry))
+            if stat:
+                children.setdefault(int(stat[1]), []).append(int(entry))
+
+        tree, stack = [], [self.pid]
+        while stack:
+            pid = stack.pop()
+            if pid != os.getpid():
+                tree.append(pid)
+            stack.extend(children.get(pid, []))
+        return tree
+
+    @staticmethod
+    def _read_stat(pid: int) -> Optional[List[str]]:
+        """
+        读取 /proc/<pid>/stat 中进程名之后的字段
+        Returns:
+            Optional[List[str]]: 从 state 开始的字段列表（下标1为ppid，11/12为utime/stime，21为rss页数）
+        """
+        try:
+            with open(f'/proc/{pid}/stat', 'r') as f:
+                content = f.read()
+        except OSError:
+            return None
+        # 进程名可能包含空格和括号，从最后一个右括号之后开始解析
+        return content[content.rfind(')') + 2:].split()
+
+    @staticmethod
+    def _read_ctx_switches(pid: int) -> int:
+        """读取自愿与非自愿上下文切换次数之和"""
+        total = 0
+        try:
+            with open(f'/proc/{pid}/status', 'r') as f:
+                for line in f:
+                    if line.startswith(('voluntary_ctxt_switches', 'nonvoluntary_ctxt_switches')):
+                        total += int(line.split()[1])
+        except OSError:
+            pass
+        return total
+
+    @staticmethod
+    def _count_sockets(pid: int) -> int:
+        """统计进程打开的 socket 数"""
+        count = 0
+        try:
+            for fd in os.listdir(f'/proc/{pid}/fd'):
+                try:
+                    if os.readlink(f'/proc/{pid}/fd/{fd}').startswith('socket:'):
+                        count += 1
+                except OSError:
+                    continue
+        except OSError:
+            pass
+        return count
+
+    @staticmethod
+    def _read_host_cpu() -> Tuple[int, int]:
+        """读取整机 CPU 的 (忙碌, 总计) jiffies"""
+        with open('/proc/stat', 'r') as f:
+            values = [int(v) for v in f.readline().split()[1:]]
+        idle = values[3] + (values[4] if len(values) > 4 else 0)
+        return sum(values) - idle, sum(values)
+
+    def _snapshot(self) -> Dict:
+        """采集一次进程树的累计计数"""
+        ticks, rss_pages, ctx, sockets, processes = 0, 0, 0, 0, 0
+        for pid in self._process_tree():
+            stat = self._read_stat(pid)
+            if not stat:
+                continue
+            processes += 1
+            ticks += int(stat[11]) + int(stat[12])
+            rss_pages += int(stat[21])
+            ctx += self._read_ctx_switches(pid)
+            sockets += self._count_sockets(pid)
+        host_busy, host_total = self._read_host_cpu()
+        return {
+            'time': time.time(),
+            'mono': time.monotonic(),
+            'ticks': ticks,
+            'rss_mb': rss_pages * self.page_size_mb,
+            'ctx': ctx,
+            'sockets': sockets,
+            'processes': processes,
+            'host_busy': host_busy,
+            'host_total': host_total
+        }
+
+    def _alive(self) -> bool:
+        """根进程是否仍在运行"""
+        stat = self._read_stat(self.pid)
+        return stat is not None and stat[0] != 'Z'
+
+    def stop(self, *_) -> None:
+        """停止采样（SIGTERM/SIGINT 处理函数）"""
+        self._stopped = True
+
+    def run(self) -> int:
+        """
+        按固定间隔采样直到根进程退出或收到停止信号，每个样本立即写入CSV
+        sched_lag_ms 为本监控进程采样线程实际唤醒时间与计划时间之差，反映客户端主机的调度延迟，
+        不等同于压测进程事件循环的延迟
+        Returns:
+            int: 样本数量
+        """
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        count = 0
+        with open(self.output_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=MONITOR_FIELDS)
+            writer.writeheader()
+
+            prev = self._snapshot()
+            start = prev['mono']
+            next_wake = start + self.interval
+            while not self._stopped and self._alive():
+                time.sleep(max(0.0, next_wake - time.monotonic()))
+                lag_ms = max(0.0, (time.monotonic() - next_wake) * 1000)
+                next_wake += self.interval
+                if self._stopped:
+                    break
+
+                cur = self._snapshot()
+                if cur['processes'] == 0:
+                    break
+                dt = cur['mono'] - prev['mono']
+                host_total = cur['host_total'] - prev['host_total']
+                writer.writerow({
+                    'time': round(cur['time'], 3),
+                    'elapsed_s': round(cur['mono'] - start, 3),
+                    'processes': cur['processes'],
+                    'cpu_pct': round(max(0, cur['ticks'] - prev['ticks']) / self.clock_ticks / dt * 100, 1),
+                    'rss_mb': round(cur['rss_mb'], 1),
+                    'sockets': cur['sockets'],
+                    'ctx_switches_per_s': round(max(0, cur['ctx'] - prev['ctx']) / dt, 1),
+                    'sched_lag_ms': round(lag_ms, 2),
+                    'host_cpu_pct': round((cur['host_busy'] - prev['host_busy']) / host_total * 100, 1) if host_total else 0
+                })
+                f.flush()
+                prev = cur
+                count += 1
+        return count
+
+
+def summarize_client_monitor(monitor_file: Path) -> Dict[str, float]:
+    """
+    汇总客户端资源时间序列，文件不存在时各列为0（保证所有记录列一致）
+    Args:
+        monitor_file: client_monitor.csv 路径
+    Returns:
+        Dict[str, float]: 汇总列
+    """
+    summary = {
+        'client_cpu_avg_pct': 0, 'client_cpu_max_pct': 0, 'client_rss_max_mb': 0,
+        'client_sockets_max': 0, 'client_ctx_switches_per_s': 0, 'client_sched_lag_p99_ms': 0,
+        'client_host_cpu_max_pct': 0, 'client_saturated': 0
+    }
+    if not monitor_file.exists():
+        return summary
+
+    samples: Dict[str, List[float]] = {field: [] for field in MONITOR_FIELDS}
+    try:
+        with open(monitor_file, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                for field in MONITOR_FIELDS:
+                    # 旧版本写出的调度延迟列名为 loop_lag_ms
+                    value = row[field] if field != 'sched_lag_ms' or field in row else row['loop_lag_ms']
+                    samples[field].append(float(value))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"警告：无法读取客户端监控数据 {monitor_file}: {e}")
+        return summary
+    if not samples['cpu_pct']:
+        return summary
+
+    def p(values: List[float], q: float) -> float:
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(math.ceil(q * len(ordered))) - 1)]
+
+    summary.update({
+        'client_cpu_avg_pct': round(sum(samples['cpu_pct']) / len(samples['cpu_pct']), 1),
+        'client_cpu_max_pct': max(samples['cpu_pct']),
+        'client_rss_max_mb': max(samples['rss_mb']),
+        'client_sockets_max': int(max(samples['sockets'])),
+        'client_ctx_switches_per_s': round(sum(samples['ctx_switches_per_s']) / len(samples['ctx_switches_per_s']), 1),
+        'client_sched_lag_p99_ms': p(samples['sched_lag_ms'], 0.99),
+        'client_host_cpu_max_pct': max(samples['host_cpu_pct'])
+    })
+    # 用 P90 而非最大值判断饱和，避免启动瞬间的尖峰造成误判
+    saturated = (p(samples['cpu_pct'], 0.9) >= CLIENT_CPU_SATURATION_PCT
+                 or p(samples['host_cpu_pct'], 0.9) >= HOST_CPU_SATURATION_PCT
+                 or summary['client_sched_lag_p99_ms'] >= SCHED_LAG_SATURATION_MS)
+    summary['client_saturated'] = int(saturated)
+    return summary
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='压测客户端资源监控')
+    parser.add_argument('--pid', type=int, required=True,
+                        help='监控的根进程PID（包含其所有后代进程）')
+    parser.add_argument('--output', required=True, help='时间序列CSV输出路径')
+    parser.add_argument('--interval', type=float, default=1.0, help='采样间隔秒数 (默认: 1.0)')
+    args = parser.parse_args()
+
+    if not Path('/proc/stat').exists():
+        print("[WARNING] 当前系统没有 /proc，跳过客户端资源监控")
+        sys.exit(0)
+
+    monitor = ClientResourceMonitor(args.pid, args.output, args.interval)
+    count = monitor.run()
+    print(f"[INFO] 客户端资源监控结束，共 {count} 个样本: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+多模态（图片）负载模块
+数据集为 .jsonl messages 格式，content 可以是列表，图片部分引用本地文件（相对路径相对于数据集所在目录）：
+{"messages": [{"role": "user", "content": [
+    {"type": "image", "image": "images/cat.jpg", "resize": "1024x768"},
+    {"type": "text", "text": "描述这张图片"}]}]}
+也接受 OpenAI 格式 {"type": "image_url", "image_url": {"url": "images/cat.jpg"}}；resize 和全局分辨率需要 Pillow
+
+图片在首次使用时 base64 编码，完整请求体一次性序列化到载荷缓存（见 evalperf.payload_cache），
+客户端不再为每个请求重复编码数 MB 的图片
+
+使用方式（生成合成图片数据集，打印数据集路径）：
+python -m evalperf.multimodal --resolution 1024x1024 --count 200 [--images 2]
+Author: AI Assistant
+Date: 2024
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import mimetypes
+import os
+import random
+import struct
+import sys
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from evalperf.payload_cache import DEFAULT_CACHE_DIR, PayloadCache
+from evalperf.workload import WorkloadClass, load_prompts
+
+
+# 每个视觉token对应的边长像素（Qwen3-VL: patch 16 × 合并 2；Qwen2/2.5-VL 为 28）
+DEFAULT_IMAGE_TOKEN_PX = 32
+
+# 合成图片的文本提示
+SYNTHETIC_IMAGE_PROMPT = '请详细描述这张图片的内容。'
+
+# 合成图片的色块边长（像素），随机色块使 PNG 大小接近真实照片而不是纯噪声
+SYNTHETIC_BLOCK_PX = 8
+
+
+def parse_resolution(text: str) -> Tuple[int, int]:
+    """解析 WxH 格式的分辨率"""
+    try:
+        width, height = (int(v) for v in text.lower().split('x'))
+    except ValueError:
+        raise ValueError(f"分辨率格式应为 WxH: {text}")
+    if width <= 0 or height <= 0:
+        raise ValueError(f"分辨率必须大于0: {text}")
+    return width, height
+
+
+def image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """
+    从文件头读取图片宽高（PNG / JPEG / GIF / WebP，仅标准库），无法识别时尝试 Pillow
+    Returns:
+        Optional[Tuple[int, int]]: (宽, 高)，无法识别时为 None
+    """
+    if data[:8] == b'\x89PNG\r\n\x1a\n' and len(data) >= 24:
+        return struct.unpack('>II', data[16:24])
+    if data[:6] in (b'GIF87a', b'GIF89a') and len(data) >= 10:
+        return struct.unpack('<HH', data[6:10])
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP' and len(data) >= 30:
+        chunk = data[12:16]
+        if chunk == b'VP8X':
+            return 1 + int.from_bytes(data[24:27], 'little'), 1 + int.from_bytes(data[27:30], 'little')
+        if chunk == b'VP8 ':
+            width, height = struct.unpack('<HH', data[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b'VP8L':
+            bits = int.from_bytes(data[21:25], 'little')
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if data[:2] == b'\xff\xd8':
+        i = 2
+        while i + 9 < len(data):
+            if data[i] != 0xFF:
+                i += 1
+                continue
+            marker = data[i + 1]
+            if marker == 0xFF or marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                i += 1 if marker == 0xFF else 2
+                continue
+            # SOF0-SOF15（不含 DHT / JPG / DAC）包含图片尺寸
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack('>HH', data[i + 5:i + 9])
+                return width, height
+            i += 2 + struct.unpack('>H', data[i + 2:i + 4])[0]
+    try:
+        from io import BytesIO
+        from PIL import Image
+        with Image.open(BytesIO(data)) as image:
+            return image.size
+    except Exception:
+        return None
+
+
+def estimate_image_tokens(width: int, height: int, token_px: int = DEFAULT_IMAGE_TOKEN_PX) -> int:
+    """
+    估算单张图片的视觉token数（按 Qwen-VL 的方式把边长取整到 token_px 的倍数）
+    实际值随模型的最小/最大像素限制变化，以服务端统计的输入token数为准
+    """
+    if not width or not height:
+        return 0
+    return max(1, round(width / token_px)) * max(1, round(height / token_px))
+
+
+def _mime_type(data: bytes, path: str) -> str:
+    """图片的 MIME 类型（按文件头判断，无法识别时按扩展名）"""
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'image/png'
+    if data[:2] == b'\xff\xd8':
+        return 'image/jpeg'
+    if data[:4] == b'GIF8':
+        return 'image/gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+
+def _resize_image(data: bytes, resolution: Tuple[int, int]) -> bytes:
+    """缩放图片到指定分辨率（需要 Pillow），JPEG 保持 JPEG，其他格式输出 PNG"""
+    try:
+        from io import BytesIO
+        from PIL import Image
+    except ImportError:
+        raise ValueError("缩放图片需要安装 Pillow (pip install pillow)")
+    with Image.open(BytesIO(data)) as image:
+        fmt = 'JPEG' if image.format == 'JPEG' else 'PNG'
+        resized = image.convert('RGB' if fmt == 'JPEG' else image.mode).resize(resolution)
+        output = BytesIO()
+        resized.save(output, format=fmt, **({'quality': 90} if fmt == 'JPEG' else {}))
+        return output.getvalue()
+
+
+def _iter_image_parts(messages: List[Dict]) -> Iterator[Dict]:
+    """遍历 messages 中的图片部分"""
+    for message in messages:
+        content = message.get('content')
+        if not isinstance(content, list):
+            continue
+        for part in content:
+            if isinstance(part, dict) and part.get('type') in ('image', 'image_url'):
+                yield part
+
+
+def _image_ref(part: Dict) -> str:
+    """图片部分引用的路径或 URL"""
+    if part.get('type') == 'image':
+        return part.get('image', '')
+    image_url = part.get('image_url')
+    return image_url.get('url', '') if isinstance(image_url, dict) else image_url or ''
+
+
+def _is_local(ref: str) -> bool:
+    """是否为需要客户端编码的本地文件（data URL 和远程 URL 原样发送）"""
+    return not ref.startswith(('data:', 'http://', 'https://'))
+
+
+def _local_path(ref: str, base_dir: Path) -> Path:
+    """本地图片的绝对路径（支持 file:// 前缀）"""
+    path = Path(ref[len('file://'):] if ref.startswith('file://') else ref).expanduser()
+    return path if path.is_absolute() else base_dir / path
+
+
+def prompts_have_images(prompts: List[List[Dict]]) -> bool:
+    """提示词中是否包含图片"""
+    return any(True for messages in prompts for _ in _iter_image_parts(messages))
+
+
+def encode_messages(messages: List[Dict], base_dir: Path, resolution: Optional[Tuple[int, int]] = None,
+                    token_px: int = DEFAULT_IMAGE_TOKEN_PX) -> Tuple[List[Dict], Dict]:
+    """
+    把 messages 中的本地图片编码为 base64 data URL
+    Args:
+        messages: 原始 messages（图片引用本地文件）
+        base_dir: 相对路径的基准目录
+        resolution: 统一缩放到的分辨率，None 时保持原图（单个图片的 resize 字段优先）
+        token_px: 每个视觉token对应的边长像素
+    Returns:
+        Tuple[List[Dict], Dict]: 编码后的 messages，以及图片信息（数量、最大图片的宽高、估算的视觉token数）
+    """
+    info = {'images': 0, 'width': 0, 'height': 0, 'image_tokens': 0}
+    encoded = []
+    for message in messages:
+        content = message.get('content')
+        if not isinstance(content, list):
+            encoded.append(message)
+            continue
+        parts = []
+        for part in content:
+            if not isinstance(part, dict) or part.get('type') not in ('image', 'image_url'):
+                parts.append(part)
+                continue
+            ref = _image_ref(part)
+            info['images'] += 1
+            if not _is_local(ref):
+                parts.append({'type': 'image_url', 'image_url': {'url': ref}})
+                continue
+            path = _local_path(ref, base_dir)
+            with open(path, 'rb') as f:
+                data = f.read()
+            target = parse_resolution(part['resize']) if part.get('resize') else resolution
+            if target:
+                data = _resize_image(data, target)
+            size = image_size(data) or (0, 0)
+            if size[0] * size[1] > info['width'] * info['height']:
+                info['width'], info['height'] = size
+            info['image_tokens'] += estimate_image_tokens(size[0], size[1], token_px)
+            data_url = f"data:{_mime_type(data, str(path))};base64,{base64.b64encode(data).decode('ascii')}"
+            parts.append({'type': 'image_url', 'image_url': {'url': data_url}})
+        encoded.append({**message, 'content': parts})
+    return encoded, info
+
+
+def image_class_name(info: Dict) -> str:
+    """按图片大小分组的请求类别名，如 img_1024x768、多图请求 img2_1024x768（以最大的一张为准）"""
+    if not info['images']:
+        return 'text'
+    count = f"{info['images']}" if info['images'] > 1 else ''
+    return f"img{count}_{info['width']}x{info['height']}"
+
+
+class MultimodalDataset:
+    """按图片大小分组的多模态数据集，请求体来自 mmap 映射的载荷缓存"""
+
+    def __init__(self, classes: List[WorkloadClass], payloads: Dict[Tuple[int, int], Tuple[memoryview, Dict]],
+                 cache: PayloadCache, cached: bool):
+        self.classes = classes
+        self.payloads = payloads
+        self.cache = cache
+        self.cached = cached
+
+
+def _cache_key(dataset_path: str, prompts: List[List[Dict]], params: Dict,
+               resolution: Optional[Tuple[int, int]], token_px: int) -> str:
+    """载荷缓存键：数据集内容、引用的图片文件（路径、大小、修改时间）和请求参数"""
+    digest = hashlib.sha256()
+    with open(dataset_path, 'rb') as f:
+        digest.update(hashlib.sha256(f.read()).digest())
+    base_dir = Path(dataset_path).resolve().parent
+    for messages in prompts:
+        for part in _iter_image_parts(messages):
+            ref = _image_ref(part)
+            if _is_local(ref):
+                stat = _local_path(ref, base_dir).stat()
+                digest.update(f"{ref}|{stat.st_size}|{stat.st_mtime_ns}|{part.get('resize', '')}".encode('utf-8'))
+    digest.update(json.dumps([params, resolution, token_px], sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def load_multimodal_dataset(dataset_path: str, build_body: Callable[[List[Dict]], Dict],
+                            resolution: Optional[Tuple[int, int]] = None, token_px: int = DEFAULT_IMAGE_TOKEN_PX,
+                            cache_dir: str = DEFAULT_CACHE_DIR) -> MultimodalDataset:
+    """
+    加载多模态数据集：首次使用时编码图片并序列化全部请求体，之后直接映射缓存
+    请求按图片大小分为多个类别（类别权重为该类请求数），各类延迟写入 benchmark_classes.json
+    Args:
+        dataset_path: .jsonl 数据集
+        build_body: messages 到请求体的函数（模型、max_tokens、stream 等参数参与缓存键）
+        resolution: 统一缩放到的分辨率
+        token_px: 每个视觉token对应的边长像素
+        cache_dir: 缓存根目录
+    Returns:
+        MultimodalDataset: 请求类别和每个请求的预序列化请求体
+    """
+    prompts = load_prompts(dataset_path)
+    base_dir = Path(dataset_path).resolve().parent
+    cache = PayloadCache(cache_dir, _cache_key(dataset_path, prompts, build_body([]), resolution, token_px))
+    cached = cache.exists()
+    if not cached:
+        def entries() -> Iterator[Tuple[bytes, Dict]]:
+            for messages in prompts:
+                encoded, info = encode_messages(messages, base_dir, resolution, token_px)
+                yield json.dumps(build_body(encoded), ensure_ascii=False).encode('utf-8'), info
+        cache.write(entries())
+
+    classes: List[WorkloadClass] = []
+    positions: Dict[str, int] = {}
+    payloads: Dict[Tuple[int, int], Tuple[memoryview, Dict]] = {}
+    for messages, (payload, info) in zip(prompts, cache.open()):
+        name = image_class_name(info)
+        if name not in positions:
+            positions[name] = len(classes)
+            classes.append(WorkloadClass(name, [], weight=0))
+        workload_class = classes[positions[name]]
+        payloads[(positions[name], len(workload_class.prompts))] = (payload, info)
+        workload_class.prompts.append(messages)
+        workload_class.weight += 1
+    return MultimodalDataset(classes, payloads, cache, cached)
+
+
+def _png(width: int, height: int, rows: Iterator[bytes]) -> bytes:
+    """编码 RGB PNG（仅标准库）"""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF)
+    raw = b''.join(b'\x00' + row for row in rows)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw, 6)) + chunk(b'IEND', b''))
+
+
+def synthetic_image(width: int, height: int, rng: random.Random) -> bytes:
+    """随机色块 PNG（每张图片内容不同，避免命中服务端的多模态缓存）"""
+    block = SYNTHETIC_BLOCK_PX
+    columns = (width + block - 1) // block
+
+    def rows() -> Iterator[bytes]:
+        for y in range(0, height, block):
+            colors = rng.randbytes(columns * 3)
+            row = b''.join(colors[i * 3:i * 3 + 3] * block for i in range(columns))[:width * 3]
+            for _ in range(min(block, height - y)):
+                yield row
+
+    return _png(width, height, rows())
+
+
+def generate_synthetic_dataset(resolution: Tuple[int, int], count: int, images_per_request: int = 1,
+                               seed: int = 0, cache_dir: str = DEFAULT_CACHE_DIR) -> Path:
+    """
+    生成合成图片数据集（已存在时直接返回），每个请求的图片各不相同
+    Args:
+        resolution: 图片分辨率 (宽, 高)
+        count: 请求数
+        images_per_request: 每个请求的图片数
+        seed: 随机种子
+        cache_dir: 缓存根目录
+    Returns:
+        Path: 数据集 .jsonl 路径（图片保存在同目录的 images/ 下）
+    """
+    width, height = resolution
+    directory = Path(cache_dir) / 'images' / f'img{width}x{height}_k{images_per_request}_n{count}_s{seed}'
+    dataset_file = directory / 'dataset.jsonl'
+    if dataset_file.exists():
+        return dataset_file
+
+    (directory / 'images').mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        content = []
+        for j in range(images_per_request):
+            name = f'images/{i:05d}_{j}.png'
+            with open(directory / name, 'wb') as f:
+                f.write(synthetic_image(width, height, rng))
+            content.append({'type': 'image', 'image': name})
+        content.append({'type': 'text', 'text': SYNTHETIC_IMAGE_PROMPT})
+        lines.append(json.dumps({'messages': [{'role': 'user', 'content': content}]}, ensure_ascii=False))
+    tmp_file = dataset_file.with_suffix('.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_file, dataset_file)
+    return dataset_file
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='生成合成图片数据集（随机色块 PNG），输出数据集路径')
+    parser.add_argument('--resolution', required=True, help='图片分辨率 WxH，如 1024x1024')
+    parser.add_argument('--count', type=int, required=True, help='请求数')
+    parser.add_argument('--images', type=int, default=1, help='每个请求的图片数 (默认: 1)')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子 (默认: 0)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help=f'缓存目录 (默认: {DEFAULT_CACHE_DIR})')
+    args = parser.parse_args()
+
+    try:
+        resolution = parse_resolution(args.resolution)
+        dataset_file = generate_synthetic_dataset(resolution, args.count, args.images, args.seed, args.cache_dir)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        sys.exit(1)
+    print(dataset_file)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+预序列化请求体缓存模块
+原生驱动在加载数据集时把每个请求的完整 JSON 请求体（模型、messages、max_tokens、stream 等）一次性序列化，
+依次拼接写入一个连续文件（payloads.bin），偏移和长度写入 index.json。运行时 mmap 映射，
+请求体以 memoryview 切片直接写入连接，热路径上没有 JSON 编码和复制
+
+缓存按数据集内容和请求参数的哈希命名，并发数、请求数不同的扫描点共用同一份缓存
+Author: AI Assistant
+Date: 2024
+"""
+
+import hashlib
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from evalperf.workload import WorkloadClass
+
+
+DEFAULT_CACHE_DIR = os.path.expanduser('~/.cache/evalperf')
+
+
+class PayloadCache:
+    """
+    预序列化请求体的磁盘缓存：payloads.bin 为所有请求体依次拼接，index.json 记录每个请求体的偏移、长度和元数据
+    运行时 mmap 映射，请求体以 memoryview 切片发送
+    """
+
+    def __init__(self, cache_dir: str, key: str):
+        self.directory = Path(cache_dir) / 'payloads' / key
+        self.data_file = self.directory / 'payloads.bin'
+        self.index_file = self.directory / 'index.json'
+        self._mmap: Optional[mmap.mmap] = None
+
+    def exists(self) -> bool:
+        """缓存是否已完整写入（index.json 最后写入）"""
+        return self.index_file.exists() and self.data_file.exists()
+
+    def write(self, entries: Iterator[Tuple[bytes, Dict]]) -> None:
+        """
+        逐个写入请求体（不在内存中保留全部请求体）
+        Args:
+            entries: (请求体字节, 元数据) 序列
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        index = []
+        tmp_data = self.data_file.with_suffix('.tmp')
+        with open(tmp_data, 'wb') as f:
+            for body, meta in entries:
+                index.append({'offset': f.tell(), 'length': len(body), **meta})
+                f.write(body)
+        os.replace(tmp_data, self.data_file)
+        tmp_index = self.index_file.with_suffix('.tmp')
+        with open(tmp_index, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(tmp_index, self.index_file)
+
+    def open(self) -> List[Tuple[memoryview, Dict]]:
+        """
+        映射缓存文件
+        Returns:
+            List[Tuple[memoryview, Dict]]: 按写入顺序的 (请求体切片, 元数据)
+        """
+        with open(self.index_file, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if not index:
+            return []
+        with open(self.data_file, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        return [(view[entry['offset']:entry['offset'] + entry['length']], entry) for entry in index]
+
+
+def _classes_key(classes: List[WorkloadClass], build_body: Callable[[WorkloadClass, List[Dict]], Dict]) -> str:
+    """缓存键：各类别的提示词内容和请求参数（以空 messages 构造的请求体代表模型、max_tokens、stream 等）"""
+    digest = hashlib.sha256()
+    for workload_class in classes:
+        params = build_body(workload_class, [])
+        digest.update(json.dumps([workload_class.name, params], sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        for messages in workload_class.prompts:
+            digest.update(json.dumps(messages, ensure_ascii=False).encode('utf-8'))
+            digest.update(b'\n')
+    return digest.hexdigest()[:16]
+
+
+def compile_payloads(classes: List[WorkloadClass], build_body: Callable[[WorkloadClass, List[Dict]], Dict],
+                     cache_dir: str = DEFAULT_CACHE_DIR) -> Tuple[Dict[Tuple[int, int], Tuple[memoryview, Dict]],
+                                                                  PayloadCache, bool]:
+    """
+    把每个类别的每个提示词预序列化为请求体（缓存不存在时生成），并映射到内存
+    Args:
+        classes: 请求类别
+        build_body: (类别, messages) 到请求体的函数
+        cache_dir: 缓存根目录
+    Returns:
+        Tuple: ((类别下标, 提示词下标) 到 (请求体切片, 元数据) 的映射, 缓存, 是否命中已有缓存)
+    """
+    cache = PayloadCache(cache_dir, _classes_key(classes, build_body))
+    cached = cache.exists()
+    if not cached:
+        cache.write((json.dumps(build_body(workload_class, messages), ensure_ascii=False).encode('utf-8'), {})
+                    for workload_class in classes for messages in workload_class.prompts)
+
+    keys = [(class_index, prompt_index) for class_index, workload_class in enumerate(classes)
+            for prompt_index in range(len(workload_class.prompts))]
+    return dict(zip(keys, cache.open())), cache, cached
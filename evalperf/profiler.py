@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+流水线阶段性能剖析模块
+Author: AI Assistant
+Date: 2024
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Iterator
+
+
+class ProfileSpan:
+    """单个阶段的计时区间，可附加计数器（文件数、字节数、行数等）"""
+
+    def __init__(self, name: str, category: str, args: Dict):
+        self.name = name
+        self.category = category
+        self.args = dict(args)
+        self.counters: Dict[str, float] = {}
+        self.start_ns = 0
+        self.end_ns = 0
+
+    def add(self, **counters: float) -> None:
+        """累加计数器"""
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+
+class _NullSpan:
+    """未启用剖析时使用的空区间"""
+
+    def add(self, **counters: float) -> None:
+        pass
+
+
+class StageProfiler:
+    """基于单调时钟的阶段剖析器，输出汇总表和 Chrome/Perfetto trace"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.spans: List[ProfileSpan] = []
+        self._origin_ns = time.perf_counter_ns()
+        self._stack: List[ProfileSpan] = []
+
+    @contextmanager
+    def stage(self, name: str, category: str = 'stage', **args) -> Iterator:
+        """
+        记录一个阶段的耗时
+        Args:
+            name: 阶段名称（汇总表按名称聚合）
+            category: trace 分类
+            args: 附加到 trace 事件上的参数
+        """
+        if not self.enabled:
+            yield _NullSpan()
+            return
+
+        span = ProfileSpan(name, category, args)
+        self._stack.append(span)
+        span.start_ns = time.perf_counter_ns()
+        try:
+            yield span
+        finally:
+            span.end_ns = time.perf_counter_ns()
+            self._stack.pop()
+            self.spans.append(span)
+            # 计数器同时累加到外层阶段，便于在顶层阶段看到总量
+            for parent in self._stack:
+                parent.add(**span.counters)
+
+    def get_summary(self) -> List[Dict]:
+        """
+        按阶段名称聚合
+        Returns:
+            List[Dict]: 每个阶段的调用次数、总耗时、最大耗时和计数器合计，按首次出现顺序
+        """
+        summary: Dict[str, Dict] = {}
+        for span in sorted(self.spans, key=lambda s: s.start_ns):
+            item = summary.setdefault(span.name, {
+                'name': span.name,
+                'calls': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'counters': {}
+            })
+            duration_ms = (span.end_ns - span.start_ns) / 1e6
+            item['calls'] += 1
+            item['total_ms'] += duration_ms
+            item['max_ms'] = max(item['max_ms'], duration_ms)
+            for key, value in span.counters.items():
+                item['counters'][key] = item['counters'].get(key, 0) + value
+        return list(summary.values())
+
+    def print_summary(self) -> None:
+        """打印阶段耗时汇总表"""
+        if not self.enabled:
+            return
+
+        summary = self.get_summary()
+        print("=== 阶段耗时剖析 ===")
+        print(f"{'阶段':<28}{'次数':>8}{'总耗时(ms)':>14}{'最大(ms)':>12}  计数器")
+        for item in summary:
+            counters = ', '.join(f"{k}={v:g}" for k, v in sorted(item['counters'].items()))
+            print(f"{item['name']:<28}{item['calls']:>8}{item['total_ms']:>14.1f}{item['max_ms']:>12.1f}  {counters}")
+
+    def write_trace(self, trace_file: str) -> Path:
+        """
+        写入 Chrome trace event 格式（可在 chrome://tracing 或 ui.perfetto.dev 打开）
+        Args:
+            trace_file: 输出路径
+        Returns:
+            Path: trace 文件路径
+        """
+        pid = os.getpid()
+        tid = threading.get_ident() % 100000
+        events = [{
+            'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+            'args': {'name': Path(sys.argv[0]).name}
+        }]
+        for span in sorted(self.spans, key=lambda s: s.start_ns):
+            events.append({
+                'name': span.name,
+                'cat': span.category,
+                'ph': 'X',
+                'ts': (span.start_ns - self._origin_ns) / 1000,
+                'dur': (span.end_ns - span.start_ns) / 1000,
+                'pid': pid,
+                'tid': tid,
+                'args': {**span.args, **span.counters}
+            })
+
+        path = Path(trace_file)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+        print(f"[INFO] trace 已写入: {path}")
+        return path
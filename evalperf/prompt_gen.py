@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+合成提示词生成模块
+生成指定输入token数的提示词数据集（evalscope line_by_line 格式，每行一个提示词），用于输入长度扫描和前缀缓存测试
+- 本地有 transformers 分词器时按分词器精确截断到目标token数
+- 否则向服务端发送探测请求，用返回的 usage.prompt_tokens 标定每个单词的token数；无法标定时按每词1个token估算
+生成结果按 (分词器, 长度, 数量, 种子) 缓存在磁盘上
+
+使用方式（由 evalperf.sh --input-len 自动调用，输出数据集文件路径）：
+python -m evalperf.prompt_gen --tokens 1024 --count 200 [--tokenizer /path/to/tokenizer]
+python -m evalperf.prompt_gen --tokens 128 --prefix-tokens 2048 --prefix-share 90 --prefix-count 4 --count 200
+Author: AI Assistant
+Date: 2024
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+# 默认缓存目录
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'evalperf', 'prompts')
+
+# 输入长度分类阈值（token数）: 小于 short 上限为 short，小于 medium 上限为 medium，其余为 long
+INPUT_LENGTH_CLASSES = [('short', 512), ('medium', 4096)]
+
+# 常见英文单词，在主流 BPE 分词器中（带前导空格）基本都是单个token
+WORDS = (
+    "the of and to in is that for it as was with be by on not he this are or his from at which but have an "
+    "they you were her she there been one all we their has would when if so no will can more other its who "
+    "time some them than may only new also these two first any into after could like most over such where "
+    "made many well our before through must back years much way good down should because each just those "
+    "people how too little state world very still own see men work long get here between both life being "
+    "under never day same another know while last might great old year off come since against go came right "
+    "used take three house use during without again place around however home small found thought went say "
+    "part once general high upon school every does group number system water between need large often hand"
+).split()
+
+
+def classify_input_length(tokens: float) -> str:
+    """按输入token数分类为 short / medium / long"""
+    for name, upper in INPUT_LENGTH_CLASSES:
+        if tokens < upper:
+            return name
+    return 'long'
+
+
+class SyntheticPromptGenerator:
+    """精确token数的合成提示词生成器"""
+
+    def __init__(self, tokenizer_path: Optional[str] = None, cache_dir: str = DEFAULT_CACHE_DIR,
+                 url: Optional[str] = None, model: Optional[str] = None):
+        self.tokenizer_path = tokenizer_path
+        self.cache_dir = Path(cache_dir)
+        self.url = url
+        self.model = model
+        self.tokenizer = self._load_tokenizer(tokenizer_path) if tokenizer_path else None
+        self._tokens_per_word: Optional[float] = None
+        self._method: Optional[str] = None
+
+    @staticmethod
+    def _load_tokenizer(tokenizer_path: str):
+        """加载本地分词器（可选依赖 transformers）"""
+        try:
+            from transformers import AutoTokenizer
+        except ImportError:
+            print("[WARNING] 未安装 transformers，改用服务端标定的单词token比", file=sys.stderr)
+            return None
+        return AutoTokenizer.from_pretrained(tokenizer_path, trust_remote_code=True)
+
+    def _tokenizer_fingerprint(self) -> str:
+        """
+        分词器指纹：本地目录按其中分词器文件的内容计算哈希（同名目录、原地更新都能区分），
+        Hub 模型名按完整名称计算
+        """
+        path = Path(self.tokenizer_path)
+        digest = hashlib.sha256()
+        if path.is_dir():
+            for file in sorted(path.iterdir()):
+                if file.is_file() and (file.name.startswith(('tokenizer', 'special_tokens', 'vocab', 'merges'))
+                                       or file.suffix in ('.model', '.tiktoken')):
+                    digest.update(file.name.encode('utf-8'))
+                    digest.update(file.read_bytes())
+        else:
+            digest.update(self.tokenizer_path.encode('utf-8'))
+        return digest.hexdigest()[:12]
+
+    def get_method(self) -> str:
+        """获取当前使用的计数方式（同时作为缓存键的一部分）"""
+        if self.tokenizer is not None:
+            if self._method is None:
+                self._method = f"tokenizer:{Path(self.tokenizer_path).name}@{self._tokenizer_fingerprint()}"
+            return self._method
+        return f"words:{self.get_tokens_per_word():.4f}"
+
+    def _probe_prompt_tokens(self, text: str) -> Optional[int]:
+        """向服务端发送 max_tokens=1 的请求，读取 usage.prompt_tokens"""
+        body = json.dumps({'model': self.model, 'max_tokens': 1, 'stream': False,
+                           'messages': [{'role': 'user', 'content': text}]}).encode('utf-8')
+        request = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                return json.loads(response.read().decode('utf-8'))['usage']['prompt_tokens']
+        except (urllib.error.URLError, OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def get_tokens_per_word(self) -> float:
+        """
+        标定每个单词的token数：用两个不同长度的探测提示词求斜率，消除聊天模板的固定开销
+        标定结果按 (服务地址, 模型) 缓存；无法标定时返回1.0
+        """
+        if self._tokens_per_word is not None:
+            return self._tokens_per_word
+
+        self._tokens_per_word = 1.0
+        if not (self.url and self.model):
+            return self._tokens_per_word
+
+        calibration_file = self.cache_dir / 'calibration.json'
+        key = f"{self.url}|{self.model}"
+        calibration = {}
+        if calibration_file.exists():
+            try:
+                with open(calibration_file, 'r', encoding='utf-8') as f:
+                    calibration = json.load(f)
+            except (OSError, ValueError):
+                calibration = {}
+        if key in calibration:
+            self._tokens_per_word = calibration[key]
+            return self._tokens_per_word
+
+        rng = random.Random(0)
+        small, large = 100, 1000
+        small_tokens = self._probe_prompt_tokens(' '.join(rng.choice(WORDS) for _ in range(small)))
+        large_tokens = self._probe_prompt_tokens(' '.join(rng.choice(WORDS) for _ in range(large)))
+        if small_tokens is None or large_tokens is None or large_tokens <= small_tokens:
+            print("[WARNING] 无法从服务端标定token数，按每个单词1个token估算", file=sys.stderr)
+            return self._tokens_per_word
+
+        self._tokens_per_word = (large_tokens - small_tokens) / (large - small)
+        calibration[key] = self._tokens_per_word
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(calibration_file, 'w', encoding='utf-8') as f:
+            json.dump(calibration, f, indent=2)
+        return self._tokens_per_word
+
+    def count_tokens(self, text: str) -> int:
+        """计算提示词内容的token数（不含聊天模板）"""
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False))
+        return round(len(text.split()) * self.get_tokens_per_word())
+
+    def generate_prompt(self, rng: random.Random, tokens: int) -> str:
+        """
+        生成一个token数为 tokens 的提示词
+        Args:
+            rng: 随机数生成器
+            tokens: 目标token数
+        Returns:
+            str: 单行提示词
+        """
+        if self.tokenizer is None:
+            n_words = max(1, round(tokens / self.get_tokens_per_word()))
+            return ' '.join(rng.choice(WORDS) for _ in range(n_words))
+
+        # 先多生成一些单词，再按token截断；解码后重新编码的长度可能有偏差，逐个单词微调
+        words = [rng.choice(WORDS) for _ in range(int(tokens * 1.2) + 8)]
+        ids = self.tokenizer.encode(' '.join(words), add_special_tokens=False)[:tokens]
+        text = self.tokenizer.decode(ids).replace('\n', ' ').strip()
+        for _ in range(32):
+            actual = self.count_tokens(text)
+            if actual == tokens:
+                break
+            if actual > tokens:
+                text = text.rsplit(' ', 1)[0]
+            else:
+                text = f"{text} {rng.choice(WORDS)}"
+        return text
+
+    def _cache_paths(self, name: str, *params) -> Tuple[Path, Path]:
+        """数据集文件及元数据文件路径（按计数方式和生成参数哈希）"""
+        raw_key = '|'.join(str(p) for p in (self.get_method(),) + params)
+        key = hashlib.sha256(raw_key.encode('utf-8')).hexdigest()[:12]
+        dataset_file = self.cache_dir / f"{name}_{key}.txt"
+        return dataset_file, dataset_file.with_name(dataset_file.name + '.meta.json')
+
+    def _write_dataset(self, dataset_file: Path, meta_file: Path, prompts: List[str], meta: Dict) -> None:
+        """原子写入数据集，并在元数据中记录实际token数范围"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        actual = [self.count_tokens(p) for p in prompts]
+        tmp_file = dataset_file.with_name(dataset_file.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(prompts) + '\n')
+        os.replace(tmp_file, dataset_file)
+        meta.update({
+            'method': self.get_method(),
+            'exact': self.tokenizer is not None,
+            'actual_min': min(actual),
+            'actual_max': max(actual)
+        })
+        with open(meta_file, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False)
+
+    def get_dataset(self, tokens: int, count: int, seed: int = 0) -> Path:
+        """
+        获取（必要时生成并缓存）合成数据集
+        Args:
+            tokens: 每个提示词的目标token数
+            count: 提示词数量
+            seed: 随机种子
+        Returns:
+            Path: 数据集文件路径（每行一个提示词）
+        """
+        dataset_file, meta_file = self._cache_paths(f"syn_in{tokens}_n{count}", tokens, count, seed)
+        if dataset_file.exists() and meta_file.exists():
+            return dataset_file
+
+        rng = random.Random(seed)
+        prompts = [self.generate_prompt(rng, tokens) for _ in range(count)]
+        self._write_dataset(dataset_file, meta_file, prompts,
+                            {'input_tokens_target': tokens, 'count': count, 'seed': seed})
+        return dataset_file
+
+    def get_prefix_dataset(self, prefix_tokens: int, suffix_tokens: int, share_pct: float, prefix_count: int,
+                           count: int, seed: int = 0) -> Path:
+        """
+        获取（必要时生成并缓存）共享前缀数据集，用于测量前缀缓存（prefix caching）的收益
+        共享请求的前缀从 prefix_count 个公共前缀中轮流选取；其余请求使用各自独有的随机前缀，
+        所有请求的总长度相同，TTFT 的差异只来自可命中缓存的比例
+        Args:
+            prefix_tokens: 前缀token数（模拟系统提示词）
+            suffix_tokens: 每个请求独有部分的token数
+            share_pct: 使用公共前缀的请求比例（0-100）
+            prefix_count: 不同公共前缀的数量
+            count: 提示词数量
+            seed: 随机种子
+        Returns:
+            Path: 数据集文件路径（每行一个提示词）
+        """
+        dataset_file, meta_file = self._cache_paths(
+            f"syn_px{prefix_tokens}_s{share_pct:g}_k{prefix_count}_in{suffix_tokens}_n{count}",
+            prefix_tokens, suffix_tokens, share_pct, prefix_count, count, seed)
+        if dataset_file.exists() and meta_file.exists():
+            return dataset_file
+
+        rng = random.Random(seed)
+        shared_prefixes = [self.generate_prompt(rng, prefix_tokens) for _ in range(prefix_count)]
+        # 精确按比例选出共享请求，再打乱顺序
+        shared_total = round(count * share_pct / 100)
+        is_shared = [True] * shared_total + [False] * (count - shared_total)
+        rng.shuffle(is_shared)
+
+        prompts = []
+        shared_index = 0
+        for shared in is_shared:
+            if shared:
+                prefix = shared_prefixes[shared_index % prefix_count]
+                shared_index += 1
+            else:
+                prefix = self.generate_prompt(rng, prefix_tokens)
+            prompts.append(f"{prefix} {self.generate_prompt(rng, suffix_tokens)}")
+
+        # 可命中缓存的输入token比例上限：共享请求中除每个前缀首次出现外，前缀部分均可复用
+        reusable = max(0, shared_total - min(prefix_count, shared_total))
+        hit_potential = reusable / count * prefix_tokens / (prefix_tokens + suffix_tokens) * 100 if count else 0
+        self._write_dataset(dataset_file, meta_file, prompts, {
+            'input_tokens_target': prefix_tokens + suffix_tokens,
+            'prefix_tokens': prefix_tokens,
+            'prefix_share_pct': share_pct,
+            'prefix_count': prefix_count,
+            'cache_hit_potential_pct': round(hit_potential, 2),
+            'count': count,
+            'seed': seed
+        })
+        return dataset_file
+
+
+def load_dataset_meta(dataset_path: str) -> Dict:
+    """读取合成数据集的元数据（非合成数据集返回空字典）"""
+    if not dataset_path:
+        return {}
+    meta_file = Path(f"{dataset_path}.meta.json")
+    if not meta_file.exists():
+        return {}
+    try:
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='生成指定token数的合成提示词数据集')
+    parser.add_argument('--tokens', type=int, required=True,
+                        help='每个提示词的目标token数（指定 --prefix-tokens 时为每个请求独有部分的token数）')
+    parser.add_argument('--prefix-tokens', type=int, default=0, help='共享前缀token数，大于0时生成共享前缀数据集')
+    parser.add_argument('--prefix-share', type=float, default=100.0, help='使用公共前缀的请求比例 0-100 (默认: 100)')
+    parser.add_argument('--prefix-count', type=int, default=1, help='不同公共前缀的数量 (默认: 1)')
+    parser.add_argument('--count', type=int, default=100, help='提示词数量 (默认: 100)')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子 (默认: 0)')
+    parser.add_argument('--tokenizer', help='本地分词器路径（需要 transformers），提供时token数精确')
+    parser.add_argument('--url', help='服务地址，无本地分词器时用于标定单词token比')
+    parser.add_argument('--model', help='模型名称，用于标定请求')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help=f'缓存目录 (默认: {DEFAULT_CACHE_DIR})')
+    args = parser.parse_args()
+
+    generator = SyntheticPromptGenerator(args.tokenizer, args.cache_dir, args.url, args.model)
+    # 只向标准输出打印数据集路径，便于 shell 脚本获取
+    if args.prefix_tokens > 0:
+        if not 0 <= args.prefix_share <= 100 or args.prefix_count < 1:
+            print("[ERROR] --prefix-share 必须在 0-100 之间，--prefix-count 至少为 1", file=sys.stderr)
+            sys.exit(1)
+        print(generator.get_prefix_dataset(args.prefix_tokens, args.tokens, args.prefix_share,
+                                           args.prefix_count, args.count, args.seed))
+    else:
+        print(generator.get_dataset(args.tokens, args.count, args.seed))
+
+
+if __name__ == '__main__':
+    main()
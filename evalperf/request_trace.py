@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+请求级时间线导出模块
+将一次运行的每个请求导出为 Chrome trace / Perfetto 可读的时间线：发送、首token、流式分块、完成或失败，
+并附带在途请求数计数器轨道。按开始时间流式读取和写出，百万请求的运行也无需把整个 trace 放入内存
+
+使用方式：
+python -m evalperf.request_trace <evalscope输出目录或benchmark_data.db> [-o request_trace.json.gz] [--no-chunks]
+Author: AI Assistant
+Date: 2024
+"""
+
+import argparse
+import gzip
+import heapq
+import json
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+
+# 默认输出文件名（与 benchmark_data.db 同级）
+REQUEST_TRACE_FILE = 'request_trace.json.gz'
+
+# 从数据库按批读取的行数
+FETCH_BATCH_SIZE = 5000
+
+
+class StreamingTraceWriter:
+    """流式写出 Chrome trace event JSON（逐个事件写入，不在内存中保留事件列表）"""
+
+    def __init__(self, output_file: str):
+        self.output_file = Path(output_file)
+        self._file: Optional[TextIO] = None
+        self._first = True
+        self.event_count = 0
+
+    def __enter__(self) -> 'StreamingTraceWriter':
+        if self.output_file.suffix == '.gz':
+            self._file = gzip.open(self.output_file, 'wt', encoding='utf-8')
+        else:
+            self._file = open(self.output_file, 'w', encoding='utf-8')
+        self._file.write('{"displayTimeUnit":"ms","traceEvents":[\n')
+        return self
+
+    def write(self, event: Dict) -> None:
+        """写入单个事件"""
+        if not self._first:
+            self._file.write(',\n')
+        self._file.write(json.dumps(event, ensure_ascii=False, separators=(',', ':')))
+        self._first = False
+        self.event_count += 1
+
+    def __exit__(self, *exc) -> None:
+        self._file.write('\n]}\n')
+        self._file.close()
+
+
+def iter_db_requests(db_file: Path, extra_columns: Tuple[str, ...] = ()) -> Iterator[Dict]:
+    """
+    按开始时间顺序流式读取 evalscope benchmark_data.db 的请求记录
+    Args:
+        db_file: 数据库路径
+        extra_columns: 额外读取的列（在同一查询中读取，按列名放入记录）
+    Yields:
+        Dict: 请求记录（start_time、completed_time、first_chunk_latency、chunk_times、success、token数）
+    """
+    conn = sqlite3.connect(str(db_file))
+    try:
+        cursor = conn.cursor()
+        extra = ''.join(f', {column}' for column in extra_columns)
+        cursor.execute("SELECT start_time, completed_time, first_chunk_latency, chunk_times, success, "
+                       f"prompt_tokens, completion_tokens{extra} FROM result ORDER BY start_time")
+        while True:
+            rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                yield {
+                    'start_time': row[0] or 0.0,
+                    'completed_time': row[1] or row[0] or 0.0,
+                    'first_chunk_latency': row[2],
+                    'chunk_times': row[3],
+                    'success': bool(row[4]),
+                    'prompt_tokens': row[5] or 0,
+                    'completion_tokens': row[6] or 0,
+                    **dict(zip(extra_columns, row[7:]))
+                }
+    finally:
+        conn.close()
+
+
+def _parse_chunk_times(chunk_times) -> List[float]:
+    """解析分块时间（数据库中为JSON字符串，驱动记录中可能已是列表）"""
+    if not chunk_times:
+        return []
+    if isinstance(chunk_times, str):
+        try:
+            chunk_times = json.loads(chunk_times)
+        except ValueError:
+            return []
+    return [t for t in chunk_times if isinstance(t, (int, float))]
+
+
+def write_request_trace(requests: Iterable[Dict], output_file: str, include_chunks: bool = True,
+                        process_name: str = 'evalperf') -> Dict[str, int]:
+    """
+    把按开始时间排序的请求记录写为 trace
+    每个请求占用一条并发“通道”（线程轨道），通道按先结束先复用分配，轨道数即峰值并发
+    Args:
+        requests: 按 start_time 升序的请求记录（时间单位为秒）
+        output_file: 输出路径，.gz 结尾时 gzip 压缩
+        include_chunks: 是否为流式分块写入瞬时事件
+        process_name: trace 中显示的进程名
+    Returns:
+        Dict[str, int]: 请求数、失败数、事件数和峰值并发
+    """
+    pid = 1
+    origin: Optional[float] = None
+    active: List[Tuple[float, int]] = []  # (结束时间, 通道)
+    free_lanes: List[int] = []
+    lane_count = 0
+    stats = {'requests': 0, 'failed': 0, 'events': 0, 'peak_in_flight': 0}
+
+    def us(t: float) -> float:
+        return round((t - origin) * 1e6, 1)
+
+    with StreamingTraceWriter(output_file) as writer:
+        writer.write({'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': process_name}})
+
+        def release_until(t: float) -> None:
+            while active and active[0][0] <= t:
+                end, lane = heapq.heappop(active)
+                heapq.heappush(free_lanes, lane)
+                writer.write({'name': 'in_flight', 'ph': 'C', 'pid': pid, 'ts': us(end),
+                              'args': {'requests': len(active)}})
+
+        for req in requests:
+            start = req['start_time']
+            end = max(req['completed_time'], start)
+            if origin is None:
+                origin = start
+            release_until(start)
+
+            if free_lanes:
+                lane = heapq.heappop(free_lanes)
+            else:
+                lane_count += 1
+                lane = lane_count
+                writer.write({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': lane,
+                              'args': {'name': f'slot {lane:04d}'}})
+            heapq.heappush(active, (end, lane))
+            stats['requests'] += 1
+            stats['peak_in_flight'] = max(stats['peak_in_flight'], len(active))
+            writer.write({'name': 'in_flight', 'ph': 'C', 'pid': pid, 'ts': us(start),
+                          'args': {'requests': len(active)}})
+
+            success = req['success']
+            if not success:
+                stats['failed'] += 1
+            args = {'prompt_tokens': req.get('prompt_tokens', 0),
+                    'completion_tokens': req.get('completion_tokens', 0),
+                    'latency_s': round(end - start, 6)}
+            writer.write({'name': 'request' if success else 'request (error)', 'cat': 'request', 'ph': 'X',
+                          'pid': pid, 'tid': lane, 'ts': us(start), 'dur': round((end - start) * 1e6, 1),
+                          'args': args, **({} if success else {'cname': 'terrible'})})
+
+            ttft = req.get('first_chunk_latency')
+            if success and ttft:
+                first = start + ttft
+                writer.write({'name': 'prefill', 'cat': 'phase', 'ph': 'X', 'pid': pid, 'tid': lane,
+                              'ts': us(start), 'dur': round(ttft * 1e6, 1)})
+                writer.write({'name': 'decode', 'cat': 'phase', 'ph': 'X', 'pid': pid, 'tid': lane,
+                              'ts': us(first), 'dur': round(max(0.0, end - first) * 1e6, 1)})
+
+            if include_chunks:
+                for t in _parse_chunk_times(req.get('chunk_times')):
+                    writer.write({'name': 'chunk', 'cat': 'chunk', 'ph': 'i', 's': 't',
+                                  'pid': pid, 'tid': lane, 'ts': us(t)})
+
+            if not success:
+                writer.write({'name': 'error', 'cat': 'request', 'ph': 'i', 's': 't',
+                              'pid': pid, 'tid': lane, 'ts': us(end)})
+
+        release_until(float('inf'))
+        stats['events'] = writer.event_count
+    return stats
+
+
+def resolve_db_file(path: Path) -> Path:
+    """接受 evalscope 输出目录或数据库文件路径"""
+    return path / 'benchmark_data.db' if path.is_dir() else path
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='导出请求级时间线（Chrome trace / Perfetto）')
+    parser.add_argument('path', help='evalscope 输出目录（包含 benchmark_data.db）或数据库文件')
+    parser.add_argument('-o', '--output',
+                        help=f'输出文件，.gz 结尾时压缩 (默认: 与数据库同目录的 {REQUEST_TRACE_FILE})')
+    parser.add_argument('--no-chunks', action='store_true', help='不写入流式分块事件（减小文件体积）')
+    args = parser.parse_args()
+
+    db_file = resolve_db_file(Path(args.path))
+    if not db_file.exists():
+        print(f"[ERROR] 文件不存在: {db_file}")
+        sys.exit(1)
+
+    output_file = args.output or str(db_file.parent / REQUEST_TRACE_FILE)
+    stats = write_request_trace(iter_db_requests(db_file), output_file, include_chunks=not args.no_chunks,
+                                process_name=f"{db_file.parent.parent.name}/{db_file.parent.name}")
+    print(f"[INFO] 请求时间线已写入: {output_file}")
+    print(f"[INFO] 请求 {stats['requests']} 个 (失败 {stats['failed']}), 事件 {stats['events']} 个, "
+          f"峰值并发 {stats['peak_in_flight']}")
+    print("[INFO] 可在 https://ui.perfetto.dev 或 chrome://tracing 中打开")
+
+
+if __name__ == '__main__':
+    main()
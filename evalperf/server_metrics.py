@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+推理服务指标采集模块
+测试期间轮询服务端 Prometheus /metrics 端点（vLLM / SGLang），记录运行中/排队请求数、KV Cache 使用率和抢占次数，
+用于解释延迟拐点出现的原因
+
+使用方式（由 evalperf.sh 在指定 --metrics-url 时自动启动）：
+python -m evalperf.server_metrics --url http://host:8000/metrics --output server_metrics.csv --interval 1
+Author: AI Assistant
+Date: 2024
+"""
+
+import argparse
+import csv
+import math
+import os
+import signal
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# 时间序列文件名（保存在 evalscope 输出目录中，与 benchmark_summary.json 同级）
+SERVER_METRICS_FILE = 'server_metrics.csv'
+
+SERVER_METRICS_FIELDS = ['time', 'elapsed_s', 'running', 'waiting', 'kv_cache_usage_pct', 'preemptions_total']
+
+# 各推理引擎的指标名映射: 字段 -> (指标名候选列表, 比例值是否需要乘100)
+# 同一字段的多个标签序列（如多个模型或多个 DP rank）求和
+ENGINE_METRICS = {
+    'running': (['vllm:num_requests_running', 'sglang:num_running_reqs'], False),
+    'waiting': (['vllm:num_requests_waiting', 'sglang:num_queue_reqs'], False),
+    'kv_cache_usage_pct': (['vllm:kv_cache_usage_perc', 'vllm:gpu_cache_usage_perc', 'sglang:token_usage'], True),
+    'preemptions_total': (['vllm:num_preemptions_total', 'sglang:num_retracted_reqs_total'], False)
+}
+
+
+def parse_prometheus_text(text: str) -> Dict[str, float]:
+    """
+    解析 Prometheus 文本格式，按指标名对所有标签序列求和
+    Args:
+        text: /metrics 响应内容
+    Returns:
+        Dict[str, float]: 指标名到数值之和
+    """
+    values: Dict[str, float] = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        # 形如 name{label="a b"} 1.0 [timestamp]，标签值中可能包含空格
+        if '{' in line:
+            name = line[:line.index('{')]
+            rest = line[line.rindex('}') + 1:].split()
+        else:
+            name, *rest = line.split()
+        if not rest:
+            continue
+        try:
+            value = float(rest[0])
+        except ValueError:
+            continue
+        if math.isnan(value):
+            continue
+        values[name] = values.get(name, 0.0) + value
+    return values
+
+
+def extract_engine_metrics(values: Dict[str, float]) -> Dict[str, Optional[float]]:
+    """
+    从解析后的指标中提取引擎状态字段
+    Returns:
+        Dict[str, Optional[float]]: 字段到数值，引擎未暴露的字段为None
+    """
+    result: Dict[str, Optional[float]] = {}
+    for field, (names, is_ratio) in ENGINE_METRICS.items():
+        result[field] = None
+        for name in names:
+            if name in values:
+                result[field] = values[name] * 100 if is_ratio else values[name]
+                break
+    return result
+
+
+class ServerMetricsScraper:
+    """Prometheus /metrics 轮询器"""
+
+    def __init__(self, url: str, output_file: str, interval: float = 1.0, timeout: float = 2.0,
+                 pid: Optional[int] = None):
+        self.url = url
+        self.output_file = Path(output_file)
+        self.interval = interval
+        self.timeout = timeout
+        self.pid = pid
+        self._stopped = False
+
+    def stop(self, *_) -> None:
+        """停止采样（SIGTERM/SIGINT 处理函数）"""
+        self._stopped = True
+
+    def _alive(self) -> bool:
+        """被跟随的进程是否仍在运行（未指定时始终运行到收到停止信号）"""
+        return self.pid is None or os.path.exists(f'/proc/{self.pid}')
+
+    def scrape(self) -> Optional[Dict[str, Optional[float]]]:
+        """抓取一次指标，失败时返回None"""
+        try:
+            with urllib.request.urlopen(self.url, timeout=self.timeout) as response:
+                text = response.read().decode('utf-8', errors='replace')
+        except (urllib.error.URLError, OSError, ValueError):
+            return None
+        return extract_engine_metrics(parse_prometheus_text(text))
+
+    def run(self) -> int:
+        """
+        按固定间隔抓取直到收到停止信号，每个样本立即写入CSV
+        时间列为 Unix 时间戳，可与请求级数据的发送/完成时间对齐
+        Returns:
+            int: 成功抓取的样本数量
+        """
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        count, failures = 0, 0
+        with open(self.output_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=SERVER_METRICS_FIELDS)
+            writer.writeheader()
+
+            start = time.monotonic()
+            next_wake = start
+            while not self._stopped and self._alive():
+                sample = self.scrape()
+                if sample is None:
+                    failures += 1
+                else:
+                    writer.writerow({
+                        'time': round(time.time(), 3),
+                        'elapsed_s': round(time.monotonic() - start, 3),
+                        **{field: '' if value is None else round(value, 3) for field, value in sample.items()}
+                    })
+                    f.flush()
+                    count += 1
+                next_wake += self.interval
+                time.sleep(max(0.0, next_wake - time.monotonic()))
+
+        if failures:
+            print(f"[WARNING] {failures} 次抓取 {self.url} 失败")
+        return count
+
+
+def summarize_server_metrics(metrics_file: Path) -> Dict[str, float]:
+    """
+    汇总服务端指标时间序列，文件不存在或引擎未暴露对应指标时为0（保证所有记录列一致）
+    Args:
+        metrics_file: server_metrics.csv 路径
+    Returns:
+        Dict[str, float]: 排队深度、运行请求数、KV Cache 使用率的平均/峰值以及测试期间的抢占次数
+    """
+    summary = {
+        'server_running_avg': 0, 'server_running_max': 0,
+        'server_waiting_avg': 0, 'server_waiting_max': 0,
+        'server_kv_cache_avg_pct': 0, 'server_kv_cache_max_pct': 0,
+        'server_preemptions': 0
+    }
+    if not metrics_file.exists():
+        return summary
+
+    series: Dict[str, List[float]] = {field: [] for field in SERVER_METRICS_FIELDS}
+    try:
+        with open(metrics_file, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                for field in SERVER_METRICS_FIELDS:
+                    if row.get(field) not in (None, ''):
+                        series[field].append(float(row[field]))
+    except (OSError, ValueError) as e:
+        print(f"警告：无法读取服务端指标 {metrics_file}: {e}")
+        return summary
+
+    for field, prefix in [('running', 'server_running'), ('waiting', 'server_waiting'),
+                          ('kv_cache_usage_pct', 'server_kv_cache')]:
+        values = series[field]
+        if values:
+            suffix = '_pct' if field == 'kv_cache_usage_pct' else ''
+            summary[f'{prefix}_avg{suffix}'] = round(sum(values) / len(values), 2)
+            summary[f'{prefix}_max{suffix}'] = max(values)
+    # 抢占次数是累计计数器，取测试期间的增量
+    if series['preemptions_total']:
+        summary['server_preemptions'] = max(0, series['preemptions_total'][-1] - series['preemptions_total'][0])
+    return summary
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='推理服务 Prometheus 指标采集')
+    parser.add_argument('--url', required=True, help='/metrics 端点地址，如 http://localhost:8000/metrics')
+    parser.add_argument('--output', required=True, help='时间序列CSV输出路径')
+    parser.add_argument('--interval', type=float, default=1.0, help='采样间隔秒数 (默认: 1.0)')
+    parser.add_argument('--pid', type=int, help='跟随的进程PID，该进程退出后停止采样')
+    args = parser.parse_args()
+
+    scraper = ServerMetricsScraper(args.url, args.output, args.interval, pid=args.pid)
+    count = scraper.run()
+    print(f"[INFO] 服务端指标采集结束，共 {count} 个样本: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
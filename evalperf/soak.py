@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+浸泡测试（长时间稳定性测试）模块
+多小时的测试中逐请求保存数据会让客户端内存和 benchmark_data.db 持续增长，且只在结束时汇总。浸泡模式下原生驱动不保存请求记录，
+每个请求完成时计入固定大小、可合并的对数分桶直方图（相对误差约1%），并按完成时间切分为固定时长的窗口（默认1分钟）：
+- 每个窗口结束时把该窗口的请求数、吞吐和延迟百分位追加一行到 benchmark_soak.jsonl 并立即落盘
+- 各窗口合并为整个运行的直方图，同时改写 benchmark_summary.json / benchmark_percentile.json（写临时文件后替换），
+  进程被杀时已结束的窗口和截至上一窗口的汇总仍然可用，汇总脚本照常读取
+- 最近若干窗口合并为滚动统计，在日志中输出
+- 结束时比较开头与结尾若干窗口的延迟和吞吐，并按窗口序列拟合每小时的变化趋势，写入 benchmark_soak.json
+客户端内存只与直方图桶数和并发数有关，每个已结束的窗口只保留一行摘要（24 小时按分钟约1440行），不保存逐请求数据
+
+使用方式（由 evalperf.sh --soak 调用原生驱动）：
+python -m evalperf.driver ... --soak --duration 28800 --soak-window 60 --parallel 32
+python -m evalperf.soak <运行目录>   # 运行被中断时从 benchmark_soak.jsonl 重新计算漂移
+Author: AI Assistant
+Date: 2024
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from evalperf.coordinated_omission import LATENCY_CO_COLUMN
+
+
+# 每个窗口一行的时间序列和整个运行的漂移分析（保存在运行目录中，与 benchmark_summary.json 同级）
+SOAK_WINDOWS_FILE = 'benchmark_soak.jsonl'
+SOAK_FILE = 'benchmark_soak.json'
+
+DEFAULT_WINDOW_SECONDS = 60
+DEFAULT_ROLLING_WINDOWS = 5
+
+# 循环发送的请求序列长度（按类别权重抽样，足够长以保持混合负载的比例）
+SCHEDULE_LENGTH = 10000
+
+# 漂移分析比较开头与结尾各多少个窗口（运行较短时取窗口数的四分之一）
+DRIFT_WINDOWS = 10
+
+PERCENTILES = [10, 25, 50, 66, 75, 80, 90, 95, 98, 99]
+
+# 直方图分桶：小于 MIN_VALUE 的值计入0号桶，其余按 (1 + RELATIVE_ERROR) 等比分桶，超出上限的值计入最后一个桶
+RELATIVE_ERROR = 0.01
+MIN_VALUE = 1e-4
+MAX_BUCKET = 2500
+_LOG_BASE = math.log1p(RELATIVE_ERROR)
+
+# benchmark_percentile.json 的列 -> 单个请求的指标
+HISTOGRAM_COLUMNS = {
+    'TTFT (s)': 'ttft',
+    'ITL (s)': 'itl',
+    'TPOT (s)': 'tpot',
+    'Latency (s)': 'latency',
+    'Input tokens': 'input_tokens',
+    'Output tokens': 'output_tokens',
+    'Output (tok/s)': 'output_rate',
+    'Total (tok/s)': 'total_rate',
+    LATENCY_CO_COLUMN: 'latency_co'
+}
+
+# 汇总列: 列名后缀 -> benchmark_soak.json 中的字段
+SOAK_METRICS = {
+    'windows': 'Windows',
+    'hours': 'Duration (h)',
+    'p50_latency_drift_pct': 'P50 latency drift (%)',
+    'p99_latency_drift_pct': 'P99 latency drift (%)',
+    'p99_ttft_drift_pct': 'P99 TTFT drift (%)',
+    'throughput_change_pct': 'Output throughput change (%)',
+    'p99_latency_trend_pct_per_h': 'P99 latency trend (%/h)',
+    'throughput_trend_pct_per_h': 'Output throughput trend (%/h)',
+    'empty_windows': 'Empty windows'
+}
+
+
+class LogHistogram:
+    """对数分桶直方图：桶数有上限，两个直方图按桶相加即可合并，百分位的相对误差不超过桶宽"""
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+
+    @staticmethod
+    def bucket(value: float) -> int:
+        if value < MIN_VALUE:
+            return 0
+        return min(MAX_BUCKET, int(math.log(value / MIN_VALUE) / _LOG_BASE) + 1)
+
+    @staticmethod
+    def bucket_value(index: int) -> float:
+        """桶的代表值（桶上下界的几何中点）"""
+        if index == 0:
+            return 0.0
+        return MIN_VALUE * math.exp((index - 0.5) * _LOG_BASE)
+
+    def add(self, value: float) -> None:
+        index = self.bucket(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+
+    def merge(self, other: 'LogHistogram') -> None:
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+
+    def percentile(self, q: float) -> float:
+        """最近秩百分位"""
+        if not self.total:
+            return 0.0
+        rank = max(1, int(math.ceil(q / 100 * self.total)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return self.bucket_value(index)
+        return self.bucket_value(max(self.counts))
+
+
+class WindowStats:
+    """一段时间内完成的请求的计数、token 数和各指标直方图（可合并）"""
+
+    def __init__(self, index: int = 0, start: float = 0.0):
+        self.index = index
+        self.start = start
+        self.requests = 0
+        self.succeeded = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.sums = {'latency': 0.0, 'ttft': 0.0, 'tpot': 0.0, 'itl': 0.0}
+        self.first_error = ''
+        self.histograms = {name: LogHistogram() for name in HISTOGRAM_COLUMNS.values()}
+
+    def add(self, record: Dict, metrics: Optional[Dict[str, float]]) -> None:
+        """
+        计入一个请求
+        Args:
+            record: 请求记录
+            metrics: 成功请求的延迟 / TTFT / TPOT / ITL，失败请求为 None
+        """
+        self.requests += 1
+        if metrics is None:
+            self.first_error = self.first_error or record.get('error', '')
+            return
+        self.succeeded += 1
+        self.input_tokens += record['prompt_tokens']
+        self.output_tokens += record['completion_tokens']
+        for name in self.sums:
+            self.sums[name] += metrics[name]
+        values = dict(metrics, input_tokens=record['prompt_tokens'], output_tokens=record['completion_tokens'])
+        if metrics['latency'] > 0:
+            values['output_rate'] = record['completion_tokens'] / metrics['latency']
+            values['total_rate'] = (record['prompt_tokens'] + record['completion_tokens']) / metrics['latency']
+        if record.get('intended_time'):
+            values['latency_co'] = record['completed_time'] - record['intended_time']
+        for name, histogram in self.histograms.items():
+            if name in values:
+                histogram.add(values[name])
+
+    def merge(self, other: 'WindowStats') -> None:
+        self.requests += other.requests
+        self.succeeded += other.succeeded
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        for name in self.sums:
+            self.sums[name] += other.sums[name]
+        self.first_error = self.first_error or other.first_error
+        for name, histogram in self.histograms.items():
+            histogram.merge(other.histograms[name])
+
+    def summary(self, duration: float, parallel: int) -> Dict[str, float]:
+        """按 evalscope benchmark_summary.json 的字段汇总"""
+        n = self.succeeded
+
+        def avg(name: str) -> float:
+            return round(self.sums[name] / n, 4) if n else 0.0
+
+        def per_second(value: float) -> float:
+            return round(value / duration, 4) if duration > 0 else 0.0
+
+        return {
+            'Time taken for tests (s)': round(duration, 4),
+            'Number of concurrency': parallel,
+            'Total requests': self.requests,
+            'Succeed requests': n,
+            'Failed requests': self.requests - n,
+            'Output token throughput (tok/s)': per_second(self.output_tokens),
+            'Total token throughput (tok/s)': per_second(self.input_tokens + self.output_tokens),
+            'Request throughput (req/s)': per_second(n),
+            'Average latency (s)': avg('latency'),
+            'Average time to first token (s)': avg('ttft'),
+            'Average time per output token (s)': avg('tpot'),
+            'Average inter-token latency (s)': avg('itl'),
+            'Average input tokens per request': round(self.input_tokens / n, 4) if n else 0.0,
+            'Average output tokens per request': round(self.output_tokens / n, 4) if n else 0.0
+        }
+
+    def percentiles(self) -> List[Dict]:
+        """按 benchmark_percentile.json 的格式给出各百分位（没有计划发送时间时不含协调遗漏校正列）"""
+        columns = {column: self.histograms[name] for column, name in HISTOGRAM_COLUMNS.items()
+                   if name != 'latency_co' or self.histograms[name].total}
+        # token 数为整数，去掉分桶代表值的小数
+        digits = {column: 0 if column in ('Input tokens', 'Output tokens') else 4 for column in columns}
+        return [{'Percentiles': f'{q}%', **{column: round(histogram.percentile(q), digits[column])
+                                            for column, histogram in columns.items()}}
+                for q in PERCENTILES]
+
+    def window_line(self, offset: float, duration: float, partial: bool = False) -> Dict:
+        """benchmark_soak.jsonl 中该窗口的一行"""
+        latency, ttft = self.histograms['latency'], self.histograms['ttft']
+        return {
+            'window': self.index,
+            'time': datetime.fromtimestamp(self.start).isoformat(timespec='seconds'),
+            'start_offset_s': round(offset, 3),
+            'duration_s': round(duration, 3),
+            'partial': partial,
+            'requests': self.requests,
+            'failed': self.requests - self.succeeded,
+            'output_throughput': round(self.output_tokens / duration, 4) if duration > 0 else 0.0,
+            'request_throughput': round(self.succeeded / duration, 4) if duration > 0 else 0.0,
+            'latency': round(self.sums['latency'] / self.succeeded, 4) if self.succeeded else 0.0,
+            'p50_latency': round(latency.percentile(50), 4),
+            'p99_latency': round(latency.percentile(99), 4),
+            'p99_ttft': round(ttft.percentile(99), 4),
+            'first_error': self.first_error[:200]
+        }
+
+
+def _write_json(path: Path, payload) -> None:
+    """先写临时文件再替换，进程在写入过程中被杀时保留上一版本"""
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=4, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _relative_change(before: List[float], after: List[float]) -> float:
+    """结尾相对开头的平均值变化（%）"""
+    base = sum(before) / len(before) if before else 0.0
+    if base <= 0:
+        return 0.0
+    return round((sum(after) / len(after) - base) / base * 100, 2)
+
+
+def _trend_per_hour(values: List[float], window_seconds: float) -> float:
+    """按窗口序列最小二乘拟合的斜率，换算为每小时相对平均值的变化（%）"""
+    n = len(values)
+    mean = sum(values) / n if n else 0.0
+    if n < 2 or mean <= 0:
+        return 0.0
+    x_mean = (n - 1) / 2
+    slope = (sum((i - x_mean) * (v - mean) for i, v in enumerate(values))
+             / sum((i - x_mean) ** 2 for i in range(n)))
+    return round(slope * (3600 / window_seconds) / mean * 100, 2)
+
+
+def analyze_drift(windows: List[Dict], window_seconds: float) -> Dict:
+    """
+    分析长时间运行中的延迟漂移和吞吐衰减（只使用完整且有成功请求的窗口）
+    Args:
+        windows: benchmark_soak.jsonl 的各行
+        window_seconds: 窗口时长（秒）
+    Returns:
+        Dict: 写入 benchmark_soak.json 的分析结果
+    """
+    full = [w for w in windows if not w['partial']]
+    active = [w for w in full if w['requests'] > w['failed']]
+    compare = max(1, min(DRIFT_WINDOWS, len(active) // 4))
+    head, tail = active[:compare], active[-compare:]
+
+    def column(rows: List[Dict], key: str) -> List[float]:
+        return [row[key] for row in rows]
+
+    return {
+        'Windows': len(windows),
+        'Window (s)': window_seconds,
+        'Duration (h)': round(sum(w['duration_s'] for w in windows) / 3600, 3),
+        'Compared windows': compare if active else 0,
+        'Empty windows': len(full) - len(active),
+        'Failed requests': sum(w['failed'] for w in windows),
+        'P50 latency drift (%)': _relative_change(column(head, 'p50_latency'), column(tail, 'p50_latency')),
+        'P99 latency drift (%)': _relative_change(column(head, 'p99_latency'), column(tail, 'p99_latency')),
+        'P99 TTFT drift (%)': _relative_change(column(head, 'p99_ttft'), column(tail, 'p99_ttft')),
+        'Output throughput change (%)': _relative_change(column(head, 'output_throughput'),
+                                                         column(tail, 'output_throughput')),
+        'P99 latency trend (%/h)': _trend_per_hour(column(active, 'p99_latency'), window_seconds),
+        'Output throughput trend (%/h)': _trend_per_hour(column(full, 'output_throughput'), window_seconds)
+    }
+
+
+class SoakRecorder:
+    """
+    浸泡模式的请求接收器：按完成时间把请求计入当前窗口，窗口结束时落盘并更新整个运行的汇总，
+    只保留当前窗口、整个运行和最近 rolling 个窗口的直方图
+    """
+
+    def __init__(self, run_dir: Path, run_args: Dict, request_metrics: Callable[[Dict], Dict[str, float]],
+                 window_seconds: float = DEFAULT_WINDOW_SECONDS, rolling: int = DEFAULT_ROLLING_WINDOWS):
+        self.run_dir = run_dir
+        self.run_args = run_args
+        self.parallel = run_args['parallel']
+        self.request_metrics = request_metrics
+        self.window_seconds = window_seconds
+        self.rolling: deque = deque(maxlen=rolling)
+        self.total = WindowStats()
+        self.current: Optional[WindowStats] = None
+        self.start_time: Optional[float] = None
+        self.windows: List[Dict] = []
+        run_dir.mkdir(parents=True, exist_ok=True)
+        _write_json(run_dir / 'benchmark_args.json', run_args)
+        self._windows_file = open(run_dir / SOAK_WINDOWS_FILE, 'w', encoding='utf-8')
+
+    def begin(self, start_time: float) -> None:
+        """运行开始（窗口从此时刻起按固定时长切分）"""
+        self.start_time = start_time
+        self.current = WindowStats(0, start_time)
+
+    def add(self, record: Dict) -> None:
+        """计入一个完成的请求（先结束完成时间之前的窗口）"""
+        self.tick(record['completed_time'])
+        self.current.add(record, self.request_metrics(record) if record['success'] else None)
+
+    def tick(self, now: float) -> None:
+        """结束 now 之前的所有窗口（没有请求完成的窗口照常记录为空窗口，便于发现服务中断）"""
+        while now >= self.current.start + self.window_seconds:
+            self._flush(self.current, self.window_seconds)
+            self.current = WindowStats(self.current.index + 1, self.current.start + self.window_seconds)
+
+    def _flush(self, window: WindowStats, duration: float, partial: bool = False) -> None:
+        line = window.window_line(window.start - self.start_time, duration, partial)
+        self._windows_file.write(json.dumps(line, ensure_ascii=False) + '\n')
+        self._windows_file.flush()
+        os.fsync(self._windows_file.fileno())
+        # 漂移分析只需要每个窗口的一行摘要；窗口数超过一天（按分钟）时内存仍只有几百 KB
+        self.windows.append(line)
+        self.total.merge(window)
+        self.rolling.append(window)
+        self._write_summary(window.start + duration - self.start_time)
+
+        recent = WindowStats()
+        for item in self.rolling:
+            recent.merge(item)
+        elapsed = int(line['start_offset_s'])
+        print(f"[INFO] 浸泡窗口 {line['window']} (+{elapsed // 3600}:{elapsed % 3600 // 60:02d}:{elapsed % 60:02d}): 请求 {line['requests']} "
+              f"(失败 {line['failed']}), 输出吞吐 {line['output_throughput']:.1f} tok/s, P99 延迟 {line['p99_latency']:.3f}s; "
+              f"最近 {len(self.rolling)} 个窗口 P99 {recent.histograms['latency'].percentile(99):.3f}s", flush=True)
+
+    def _write_summary(self, duration: float) -> None:
+        """改写整个运行的汇总和百分位（截至最近结束的窗口）"""
+        _write_json(self.run_dir / 'benchmark_summary.json', self.total.summary(duration, self.parallel))
+        _write_json(self.run_dir / 'benchmark_percentile.json', self.total.percentiles())
+
+    def close(self, end_time: float) -> Dict:
+        """
+        结束运行：写入最后一个不完整的窗口、最终汇总和漂移分析
+        Returns:
+            Dict: 漂移分析结果
+        """
+        if self.start_time is None:
+            # 发送第一个请求前被中断
+            self.begin(end_time)
+        if self.current is not None:
+            self.tick(end_time)
+            duration = end_time - self.current.start
+            if self.current.requests and duration > 0:
+                self._flush(self.current, duration, partial=True)
+            self.current = None
+        if not self.windows:
+            self._write_summary(end_time - self.start_time)
+        self._windows_file.close()
+        drift = analyze_drift(self.windows, self.window_seconds)
+        _write_json(self.run_dir / SOAK_FILE, drift)
+        return drift
+
+    def summary(self) -> Dict[str, float]:
+        """整个运行的汇总（与最后写入的 benchmark_summary.json 相同）"""
+        with open(self.run_dir / 'benchmark_summary.json', 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+def load_windows(windows_file: Path) -> List[Dict]:
+    """读取 benchmark_soak.jsonl（忽略进程被杀时写了一半的最后一行）"""
+    windows = []
+    with open(windows_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                windows.append(json.loads(line))
+            except ValueError:
+                break
+    return windows
+
+
+def summarize_soak(soak_file: Path) -> Dict[str, float]:
+    """
+    把漂移分析展开为 soak_<指标> 列，非浸泡模式的运行返回空字典
+    Args:
+        soak_file: benchmark_soak.json 路径
+    Returns:
+        Dict[str, float]: 展开后的列
+    """
+    if not soak_file.exists():
+        return {}
+    try:
+        with open(soak_file, 'r', encoding='utf-8') as f:
+            soak = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"警告：无法读取浸泡测试分析 {soak_file}: {e}")
+        return {}
+    return {f'soak_{suffix}': soak.get(key, 0) for suffix, key in SOAK_METRICS.items()}
+
+
+def print_drift(drift: Dict) -> None:
+    """输出漂移分析"""
+    print(f"[INFO] 浸泡测试: {drift['Windows']} 个窗口 ({drift['Duration (h)']:.2f}h), 空窗口 {drift['Empty windows']}, "
+          f"失败 {drift['Failed requests']} 个请求")
+    print(f"[INFO] 结尾 vs 开头 {drift['Compared windows']} 个窗口: P50 延迟 {drift['P50 latency drift (%)']:+.1f}%, "
+          f"P99 延迟 {drift['P99 latency drift (%)']:+.1f}%, P99 TTFT {drift['P99 TTFT drift (%)']:+.1f}%, "
+          f"输出吞吐 {drift['Output throughput change (%)']:+.1f}%")
+    print(f"[INFO] 趋势: P99 延迟 {drift['P99 latency trend (%/h)']:+.1f}%/h, "
+          f"输出吞吐 {drift['Output throughput trend (%/h)']:+.1f}%/h")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='从 benchmark_soak.jsonl 计算浸泡测试的延迟漂移和吞吐衰减')
+    parser.add_argument('path', help='浸泡测试的运行目录（包含 benchmark_soak.jsonl）')
+    parser.add_argument('--window', type=float,
+                        help='窗口时长秒数 (默认: 读取 benchmark_args.json)')
+    args = parser.parse_args()
+
+    run_dir = Path(args.path)
+    windows_file = run_dir / SOAK_WINDOWS_FILE
+    if not windows_file.exists():
+        print(f"[ERROR] 文件不存在: {windows_file}")
+        sys.exit(1)
+    window_seconds = args.window
+    if not window_seconds:
+        args_file = run_dir / 'benchmark_args.json'
+        run_args = json.loads(args_file.read_text(encoding='utf-8')) if args_file.exists() else {}
+        window_seconds = run_args.get('soak_window') or DEFAULT_WINDOW_SECONDS
+    windows = load_windows(windows_file)
+    if not windows:
+        print("[WARNING] 没有已结束的窗口")
+        sys.exit(2)
+
+    drift = analyze_drift(windows, window_seconds)
+    _write_json(run_dir / SOAK_FILE, drift)
+    print_drift(drift)
+    print(f"[INFO] 漂移分析已写入: {run_dir / SOAK_FILE}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+稳态窗口统计模块
+运行开头的请求包含建连和引擎预热，结尾的请求处于排空阶段（在途请求数低于并发数），两者都会拉低或拉高整体统计。
+本模块从 benchmark_data.db 中找出稳态窗口并重新计算汇总指标和百分位，写入 benchmark_steady_state.json，
+与整个运行的 benchmark_summary.json 并存，汇总脚本可任选其一：
+- 闭环并发（未指定 rate、无思考时间）时窗口为在途请求数达到并发数到排空开始之间
+- 在此基础上按请求数或时间排除预热和冷却阶段（如 --warmup 50 排除前50个请求，--warmup 30s 排除前30秒）
+- 延迟类指标只统计完全落在窗口内的请求，吞吐按窗口内完成的请求和窗口时长计算
+
+使用方式（由 evalperf.sh 在每次测试后自动调用）：
+python -m evalperf.steady_state <evalscope输出目录> [--warmup 50|30s] [--cooldown 50|30s]
+Author: AI Assistant
+Date: 2024
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from evalperf.driver import compute_percentiles, summarize_requests
+from evalperf.request_trace import _parse_chunk_times, iter_db_requests, resolve_db_file
+
+
+# 稳态统计文件（保存在运行目录中，与 benchmark_summary.json 同级）
+STEADY_STATE_FILE = 'benchmark_steady_state.json'
+
+# 汇总列: 列名 -> benchmark_steady_state.json 中 summary 的字段
+STEADY_METRICS = {
+    'steady_output_throughput': 'Output token throughput (tok/s)',
+    'steady_request_throughput': 'Request throughput (req/s)',
+    'steady_latency': 'Average latency (s)',
+    'steady_ttft': 'Average time to first token (s)'
+}
+
+
+def parse_exclusion(value: Optional[str]) -> Tuple[int, float]:
+    """
+    解析排除量：纯数字为请求数，以 s 结尾为秒数
+    Returns:
+        Tuple[int, float]: (请求数, 秒数)
+    """
+    if not value:
+        return 0, 0.0
+    value = value.strip()
+    try:
+        if value.endswith('s'):
+            seconds = float(value[:-1])
+            if seconds < 0:
+                raise ValueError
+            return 0, seconds
+        count = int(value)
+        if count < 0:
+            raise ValueError
+        return count, 0.0
+    except ValueError:
+        raise ValueError(f"无效的排除量: {value}（请求数如 50，或秒数如 30s）")
+
+
+def full_concurrency_span(records: List[Dict], parallel: int) -> Optional[Tuple[float, float]]:
+    """
+    在途请求数达到并发数的时间段：从首次达到到最后一次降到并发数以下
+    Returns:
+        Optional[Tuple[float, float]]: (开始, 结束)，从未达到并发数时为 None
+    """
+    events = sorted([(r['start_time'], 1) for r in records] + [(r['completed_time'], -1) for r in records])
+    in_flight = 0
+    start = end = None
+    for t, delta in events:
+        was_full = in_flight >= parallel
+        in_flight += delta
+        if in_flight >= parallel and start is None:
+            start = t
+        if was_full and in_flight < parallel:
+            end = t
+    if start is None or end is None or end <= start:
+        return None
+    return start, end
+
+
+def steady_state_window(records: List[Dict], parallel: int, closed_loop: bool = True,
+                        warmup: Tuple[int, float] = (0, 0.0),
+                        cooldown: Tuple[int, float] = (0, 0.0)) -> Dict:
+    """
+    计算稳态窗口
+    Args:
+        records: 请求记录（start_time / completed_time）
+        parallel: 目标并发数
+        closed_loop: 是否为闭环并发（是时窗口限制在在途请求数达到并发数的时间段内）
+        warmup: 排除的预热 (请求数, 秒数)
+        cooldown: 排除的冷却 (请求数, 秒数)
+    Returns:
+        Dict: 窗口起止时间和各项限制的说明
+    """
+    starts = sorted(r['start_time'] for r in records)
+    completions = sorted(r['completed_time'] for r in records)
+    run_start, run_end = starts[0], completions[-1]
+    t0, t1 = run_start, run_end
+    criteria = []
+
+    if closed_loop:
+        span = full_concurrency_span(records, parallel)
+        if span:
+            t0, t1 = span
+            criteria.append('concurrency')
+        else:
+            print(f"[WARNING] 在途请求数从未达到并发数 {parallel}，稳态窗口不按并发数限制")
+    warmup_requests, warmup_seconds = warmup
+    if warmup_requests:
+        t0 = max(t0, starts[min(warmup_requests, len(starts) - 1)])
+        criteria.append(f'warmup_{warmup_requests}')
+    if warmup_seconds:
+        t0 = max(t0, run_start + warmup_seconds)
+        criteria.append(f'warmup_{warmup_seconds:g}s')
+    cooldown_requests, cooldown_seconds = cooldown
+    if cooldown_requests:
+        t1 = min(t1, completions[max(0, len(completions) - cooldown_requests - 1)])
+        criteria.append(f'cooldown_{cooldown_requests}')
+    if cooldown_seconds:
+        t1 = min(t1, run_end - cooldown_seconds)
+        criteria.append(f'cooldown_{cooldown_seconds:g}s')
+
+    return {
+        'start': t0,
+        'end': t1,
+        'start_offset_s': round(t0 - run_start, 4),
+        'end_offset_s': round(t1 - run_start, 4),
+        'duration_s': round(t1 - t0, 4),
+        'run_duration_s': round(run_end - run_start, 4),
+        'criteria': criteria
+    }
+
+
+def steady_state_stats(records: List[Dict], parallel: int, closed_loop: bool = True,
+                       warmup: Tuple[int, float] = (0, 0.0),
+                       cooldown: Tuple[int, float] = (0, 0.0),
+                       rate: Optional[float] = None, think_time: float = 0.0) -> Optional[Dict]:
+    """
+    稳态窗口内的汇总指标和百分位（字段与 benchmark_summary.json / benchmark_percentile.json 相同，
+    rate / think_time 用于协调遗漏校正的期望发送间隔）
+    Returns:
+        Optional[Dict]: window / summary / percentiles，窗口为空时为 None
+    """
+    if not records:
+        return None
+    window = steady_state_window(records, parallel, closed_loop, warmup, cooldown)
+    t0, t1 = window['start'], window['end']
+    inside = [r for r in records if r['start_time'] >= t0 and r['completed_time'] <= t1]
+    if t1 <= t0 or not inside:
+        return None
+
+    duration = t1 - t0
+    summary = summarize_requests(inside, duration, parallel)
+    # 吞吐按窗口内完成的请求计算（包括窗口开始前发出的请求），避免只计完整落在窗口内的请求而低估
+    completed = [r for r in records if t0 <= r['completed_time'] <= t1 and r['success']]
+    output_tokens = sum(r['completion_tokens'] for r in completed)
+    input_tokens = sum(r['prompt_tokens'] for r in completed)
+    summary['Output token throughput (tok/s)'] = round(output_tokens / duration, 4)
+    summary['Total token throughput (tok/s)'] = round((input_tokens + output_tokens) / duration, 4)
+    summary['Request throughput (req/s)'] = round(len(completed) / duration, 4)
+
+    window['requests'] = len(inside)
+    window['excluded_requests'] = len(records) - len(inside)
+    del window['start'], window['end']
+    return {'window': window, 'summary': summary,
+            'percentiles': compute_percentiles(inside, parallel, rate, think_time)}
+
+
+def load_db_records(db_file: Path) -> List[Dict]:
+    """读取 benchmark_data.db 中的请求记录（分块时间解析为列表，原生驱动的数据库另有计划发送时间）"""
+    conn = sqlite3.connect(str(db_file))
+    try:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(result)")}
+    finally:
+        conn.close()
+    # 计划发送时间与其他列在同一查询中读取，开始时间相同的请求也不会错位
+    extra_columns = ('intended_time',) if 'intended_time' in columns else ()
+    records = []
+    for request in iter_db_requests(db_file, extra_columns):
+        request['chunk_times'] = _parse_chunk_times(request['chunk_times'])
+        records.append(request)
+    return records
+
+
+def summarize_steady_state(steady_file: Path) -> Dict[str, float]:
+    """
+    把稳态统计展开为 steady_<指标> 列，没有稳态统计的运行返回空字典
+    Args:
+        steady_file: benchmark_steady_state.json 路径
+    Returns:
+        Dict[str, float]: 展开后的列
+    """
+    if not steady_file.exists():
+        return {}
+    try:
+        with open(steady_file, 'r', encoding='utf-8') as f:
+            steady = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"警告：无法读取稳态统计 {steady_file}: {e}")
+        return {}
+
+    window = steady.get('window', {})
+    columns = {
+        'steady_requests': window.get('requests', 0),
+        'steady_window_s': window.get('duration_s', 0)
+    }
+    for column, key in STEADY_METRICS.items():
+        columns[column] = steady.get('summary', {}).get(key, 0)
+    return columns
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='计算稳态窗口统计（排除预热、冷却和排空阶段）')
+    parser.add_argument('path', help='evalscope 输出目录（包含 benchmark_data.db 和 benchmark_args.json）')
+    parser.add_argument('--warmup', help='排除的预热：请求数（如 50）或秒数（如 30s）')
+    parser.add_argument('--cooldown', help='排除的冷却：请求数（如 50）或秒数（如 30s）')
+    parser.add_argument('--parallel', type=int, help='目标并发数 (默认: 读取 benchmark_args.json)')
+    parser.add_argument('-o', '--output', help=f'输出文件 (默认: 运行目录下的 {STEADY_STATE_FILE})')
+    args = parser.parse_args()
+
+    db_file = resolve_db_file(Path(args.path))
+    if not db_file.exists():
+        print(f"[ERROR] 文件不存在: {db_file}")
+        sys.exit(1)
+    try:
+        warmup = parse_exclusion(args.warmup)
+        cooldown = parse_exclusion(args.cooldown)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    run_args: Dict = {}
+    args_file = db_file.parent / 'benchmark_args.json'
+    if args_file.exists():
+        with open(args_file, 'r', encoding='utf-8') as f:
+            run_args = json.load(f)
+    parallel = args.parallel or run_args.get('parallel') or 1
+    # 限速发放（开环）或多轮会话的思考时间下在途请求数本就低于并发数，只按预热/冷却排除
+    closed_loop = (run_args.get('rate') or 0) <= 0 and not run_args.get('think_time')
+
+    stats = steady_state_stats(load_db_records(db_file), parallel, closed_loop, warmup, cooldown,
+                               run_args.get('rate'), run_args.get('think_time') or 0.0)
+    if stats is None:
+        print("[WARNING] 稳态窗口内没有完整的请求，请减小预热/冷却排除量或增加请求数")
+        sys.exit(2)
+    output_file = Path(args.output) if args.output else db_file.parent / STEADY_STATE_FILE
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, indent=4, ensure_ascii=False)
+
+    window, summary = stats['window'], stats['summary']
+    print(f"[INFO] 稳态窗口: {window['start_offset_s']:.1f}s - {window['end_offset_s']:.1f}s "
+          f"(共 {window['run_duration_s']:.1f}s), 请求 {window['requests']} 个 (排除 {window['excluded_requests']})")
+    print(f"[INFO] 稳态输出吞吐 {summary['Output token throughput (tok/s)']:.1f} tok/s, "
+          f"平均延迟 {summary['Average latency (s)']:.3f}s, 平均TTFT {summary['Average time to first token (s)']:.3f}s")
+    print(f"[INFO] 稳态统计已写入: {output_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+负载定义模块
+- 混合负载：按权重混合多个数据集（每类可单独设置 max_tokens），在同一次测试中同时发送，用于观察长输入预填充对短请求的干扰
+- 多轮会话：按会话回放多轮对话，每轮追加模型的实际回复和下一条用户消息，上下文逐轮增长
+
+负载定义文件（JSON，安装 PyYAML 时也支持 YAML）：
+{
+  "name": "chat_mix",
+  "classes": [
+    {"name": "short", "dataset": "prompts/p_short.jsonl", "weight": 70, "max_tokens": 128},
+    {"name": "medium", "dataset": "prompts/p_medium.jsonl", "weight": 25},
+    {"name": "long", "dataset": "prompts/p_long.jsonl", "weight": 5, "max_tokens": 512}
+  ]
+}
+Author: AI Assistant
+Date: 2024
+"""
+
+import json
+import random
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+# 每类请求的汇总文件（保存在运行目录中，与 benchmark_summary.json 同级）
+CLASSES_FILE = 'benchmark_classes.json'
+
+# 多轮会话按轮次的汇总文件
+TURNS_FILE = 'benchmark_turns.json'
+
+# 由单轮数据集拼接会话时每个会话的默认轮数
+DEFAULT_SESSION_TURNS = 4
+
+# 汇总列: 列名后缀 -> benchmark_classes.json 中的字段
+CLASS_METRICS = {
+    'requests': 'Total requests',
+    'share_pct': 'Share (%)',
+    'latency': 'Average latency (s)',
+    'p99_latency': 'P99 latency (s)',
+    'ttft': 'Average time to first token (s)',
+    'p99_ttft': 'P99 time to first token (s)',
+    'output_throughput': 'Output token throughput (tok/s)',
+    'input_tokens': 'Average input tokens per request',
+    'output_tokens': 'Average output tokens per request',
+    'image_tokens': 'Average image tokens per request'
+}
+
+# 按轮次汇总列: 列名后缀 -> benchmark_turns.json 中的字段
+TURN_METRICS = {
+    'requests': 'Total requests',
+    'context_tokens': 'Average context tokens',
+    'ttft': 'Average time to first token (s)',
+    'p99_ttft': 'P99 time to first token (s)',
+    'latency': 'Average latency (s)'
+}
+
+
+class WorkloadClass:
+    """一类请求：数据集、权重和该类的最大输出token数"""
+
+    def __init__(self, name: str, prompts: List[List[Dict]], weight: float = 1.0,
+                 max_tokens: Optional[int] = None):
+        self.name = name
+        self.prompts = prompts
+        self.weight = weight
+        self.max_tokens = max_tokens
+
+
+def load_prompts(dataset_path: str) -> List[List[Dict]]:
+    """
+    读取数据集中的全部提示词
+    Args:
+        dataset_path: .jsonl（每行 {"messages": [...]}）或 .txt（每行一个提示词，即 line_by_line 格式）
+    Returns:
+        List[List[Dict]]: 每个请求的 messages 列表
+    """
+    prompts = []
+    with open(dataset_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if dataset_path.endswith('.jsonl'):
+                item = json.loads(line)
+                prompts.append(item['messages'] if 'messages' in item
+                               else [{'role': 'user', 'content': item.get('question') or item.get('prompt', '')}])
+            else:
+                prompts.append([{'role': 'user', 'content': line}])
+    if not prompts:
+        raise ValueError(f"数据集为空: {dataset_path}")
+    return prompts
+
+
+def load_sessions(dataset_path: str, turns: Optional[int] = None) -> List[Dict]:
+    """
+    读取多轮会话
+    数据集中包含多条 user 消息的行作为一个会话（其中的 assistant 消息会被回放时的实际回复替换）；
+    只有单条 user 消息的行按顺序每 turns 条拼成一个会话
+    Args:
+        dataset_path: .jsonl（messages 格式）或 .txt（每行一个提示词）
+        turns: 会话轮数上限（拼接单轮数据集时为每个会话的轮数）
+    Returns:
+        List[Dict]: 会话列表，每个会话包含 system（前置的系统消息）和 turns（各轮用户消息内容）
+    """
+    turns = turns or DEFAULT_SESSION_TURNS
+    sessions, pending = [], []
+    for messages in load_prompts(dataset_path):
+        user_turns = [m['content'] for m in messages if m.get('role') == 'user']
+        if len(user_turns) > 1:
+            sessions.append({'system': [m for m in messages if m.get('role') == 'system'],
+                             'turns': user_turns[:turns]})
+            continue
+        pending.extend(user_turns)
+        if len(pending) >= turns:
+            sessions.append({'system': [], 'turns': pending[:turns]})
+            pending = []
+    if pending:
+        sessions.append({'system': [], 'turns': pending})
+    return sessions
+
+
+def _read_spec(spec_file: Path) -> Dict:
+    """读取负载定义文件（YAML 为可选依赖）"""
+    with open(spec_file, 'r', encoding='utf-8') as f:
+        content = f.read()
+    if spec_file.suffix in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("读取 YAML 负载定义需要安装 PyYAML，或改用 JSON 格式")
+        return yaml.safe_load(content)
+    return json.loads(content)
+
+
+def load_workload_spec(spec_path: str) -> Tuple[str, List[WorkloadClass]]:
+    """
+    读取负载定义文件
+    数据集的相对路径先相对于定义文件所在目录查找，找不到时相对于当前目录
+    Args:
+        spec_path: 负载定义文件路径
+    Returns:
+        Tuple[str, List[WorkloadClass]]: 负载名称和请求类别列表
+    """
+    spec_file = Path(spec_path)
+    spec = _read_spec(spec_file)
+    classes = []
+    for item in spec.get('classes', []):
+        dataset = Path(item['dataset'])
+        if not dataset.is_absolute() and (spec_file.parent / dataset).exists():
+            dataset = spec_file.parent / dataset
+        weight = float(item.get('weight', 1))
+        if weight <= 0:
+            raise ValueError(f"类别 {item.get('name')} 的权重必须大于0")
+        classes.append(WorkloadClass(
+            name=item.get('name') or dataset.stem,
+            prompts=load_prompts(str(dataset)),
+            weight=weight,
+            max_tokens=item.get('max_tokens')
+        ))
+    if not classes:
+        raise ValueError(f"负载定义中没有任何类别: {spec_path}")
+    return spec.get('name') or spec_file.stem, classes
+
+
+def build_schedule(classes: List[WorkloadClass], number: int, seed: int = 0) -> List[Tuple[int, int]]:
+    """
+    按权重生成请求序列，同一种子下序列固定，便于不同并发数之间对比
+    Args:
+        classes: 请求类别
+        number: 请求总数
+        seed: 随机种子
+    Returns:
+        List[Tuple[int, int]]: 每个请求的 (类别下标, 提示词下标)，类内提示词依次轮转
+    """
+    rng = random.Random(seed)
+    picks = rng.choices(range(len(classes)), weights=[c.weight for c in classes], k=number)
+    cursors = [0] * len(classes)
+    schedule = []
+    for index in picks:
+        schedule.append((index, cursors[index] % len(classes[index].prompts)))
+        cursors[index] += 1
+    return schedule
+
+
+def summarize_turns(turns_file: Path) -> Dict[str, float]:
+    """
+    把多轮会话按轮次的汇总展开为 turn<轮次>_<指标> 列，非会话模式的运行返回空字典
+    Args:
+        turns_file: benchmark_turns.json 路径
+    Returns:
+        Dict[str, float]: 展开后的列
+    """
+    if not turns_file.exists():
+        return {}
+    try:
+        with open(turns_file, 'r', encoding='utf-8') as f:
+            turns = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"警告：无法读取轮次汇总 {turns_file}: {e}")
+        return {}
+
+    columns = {}
+    for turn, metrics in sorted(turns.items(), key=lambda item: int(item[0])):
+        for suffix, key in TURN_METRICS.items():
+            columns[f'turn{turn}_{suffix}'] = metrics.get(key, 0)
+    return columns
+
+
+def summarize_request_classes(classes_file: Path) -> Dict[str, float]:
+    """
+    把每类请求的汇总展开为 class_<类别>_<指标> 列，非混合负载的运行返回空字典
+    Args:
+        classes_file: benchmark_classes.json 路径
+    Returns:
+        Dict[str, float]: 展开后的列
+    """
+    if not classes_file.exists():
+        return {}
+    try:
+        with open(classes_file, 'r', encoding='utf-8') as f:
+            classes = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"警告：无法读取分类汇总 {classes_file}: {e}")
+        return {}
+
+    columns = {}
+    for name, metrics in classes.items():
+        for suffix, key in CLASS_METRICS.items():
+            columns[f'class_{name}_{suffix}'] = metrics.get(key, 0)
+    return columns
@@ -11,6 +11,7 @@ Evalscope 测试结果数据汇总脚本
 
 使用方式：
 python evalscope_aggregator.py --results-dir ./results --format csv --output summary.csv
+python evalscope_aggregator.py --results-dir ./results --profile   # 输出各阶段耗时和trace
 """
 
 import os
@@ -20,19 +21,46 @@ import argparse
 import statistics
 import sqlite3
 from pathlib import Path
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Tuple, Optional
+from evalperf.connections import CONNECTIONS_FILE, summarize_connections
+from evalperf.convergence import CONVERGENCE_FILE, summarize_convergence
+from evalperf.endpoints import ENDPOINTS_FILE, summarize_endpoints
+from evalperf.profiler import StageProfiler
+from evalperf.monitor import MONITOR_FILE, summarize_client_monitor
+from evalperf.server_metrics import SERVER_METRICS_FILE, summarize_server_metrics
+from evalperf.soak import SOAK_FILE, summarize_soak
+from evalperf.steady_state import STEADY_STATE_FILE, summarize_steady_state
+from evalperf.prompt_gen import classify_input_length, load_dataset_meta
+from evalperf.workload import CLASSES_FILE, TURNS_FILE, summarize_request_classes, summarize_turns
 
 
 class EvalscopeDataAggregator:
     """Evalscope测试结果数据汇总器"""
     
-    def __init__(self, results_dir: str):
+    def __init__(self, results_dir: str, profiler: Optional[StageProfiler] = None, steady_state: bool = False):
         self.results_dir = Path(results_dir)
+        self.steady_state = steady_state
         self.raw_data = []
         self.aggregated_data = {}
+        self.profiler = profiler or StageProfiler(enabled=False)
+    
+    def _load_json(self, json_file: Path) -> Any:
+        """读取JSON文件（记录读取的文件数和字节数）"""
+        with self.profiler.stage('json_parse', 'io', file=json_file.name) as span:
+            with open(json_file, 'r', encoding='utf-8') as f:
+                content = f.read()
+            span.add(files_read=1, bytes_read=len(content.encode('utf-8')))
+            return json.loads(content)
     
     def scan_results_directory(self) -> List[Path]:
         """扫描results目录，返回所有有效的测试结果目录路径"""
+        with self.profiler.stage('scan') as span:
+            result_dirs = self._scan_results_directory()
+            span.add(result_dirs=len(result_dirs))
+        return result_dirs
+    
+    def _scan_results_directory(self) -> List[Path]:
+        """遍历 配置/时间戳/模型 三级目录"""
         result_dirs = []
         
         if not self.results_dir.exists():
@@ -43,12 +71,12 @@ class EvalscopeDataAggregator:
         for config_dir in self.results_dir.iterdir():
             if not config_dir.is_dir():
                 continue
-                
+            
             # 遍历时间戳目录
             for timestamp_dir in config_dir.iterdir():
                 if not timestamp_dir.is_dir():
                     continue
-                    
+                
                 # 遍历模型目录
                 for model_dir in timestamp_dir.iterdir():
                     if not model_dir.is_dir():
@@ -71,20 +99,28 @@ class EvalscopeDataAggregator:
         
         # 读取summary数据
         summary_file = result_dir / "benchmark_summary.json"
-        with open(summary_file, 'r', encoding='utf-8') as f:
-            summary_data = json.load(f)
+        summary_data = self._load_json(summary_file)
         
         # 读取args数据
         args_file = result_dir / "benchmark_args.json"
-        with open(args_file, 'r', encoding='utf-8') as f:
-            args_data = json.load(f)
+        args_data = self._load_json(args_file)
         
         # 读取百分位数数据
         percentile_data = {}
+        percentile_list = None
         percentile_file = result_dir / "benchmark_percentile.json"
         if percentile_file.exists():
-            with open(percentile_file, 'r', encoding='utf-8') as f:
-                percentile_list = json.load(f)
+            percentile_list = self._load_json(percentile_file)
+        
+        # 使用稳态窗口统计时，汇总指标和百分位替换为 benchmark_steady_state.json 中的值（没有时保留整个运行的值）
+        steady_file = result_dir / STEADY_STATE_FILE
+        window = 'full'
+        if self.steady_state and steady_file.exists():
+            steady_data = self._load_json(steady_file)
+            summary_data = {**summary_data, **steady_data['summary']}
+            percentile_list = steady_data['percentiles']
+            window = 'steady'
+        if percentile_list:
             for item in percentile_list:
                 percentile = item.get('Percentiles', '').replace('%', 'p')
                 for key, value in item.items():
@@ -96,23 +132,39 @@ class EvalscopeDataAggregator:
         db_file = result_dir / "benchmark_data.db"
         if db_file.exists():
             try:
-                import sqlite3
-                conn = sqlite3.connect(str(db_file))
-                cursor = conn.cursor()
-                cursor.execute("SELECT AVG(max_gpu_memory_cost), MAX(max_gpu_memory_cost), MIN(max_gpu_memory_cost) FROM result")
-                db_avg, db_max, db_min = cursor.fetchone()
-                db_data = {
-                    'avg_gpu_memory': db_avg or 0,
-                    'max_gpu_memory': db_max or 0,
-                    'min_gpu_memory': db_min or 0
-                }
-                conn.close()
+                with self.profiler.stage('sqlite_query', 'io', file=db_file.name) as span:
+                    conn = sqlite3.connect(str(db_file))
+                    cursor = conn.cursor()
+                    cursor.execute("SELECT AVG(max_gpu_memory_cost), MAX(max_gpu_memory_cost), MIN(max_gpu_memory_cost), COUNT(*) "
+                                   "FROM result")
+                    db_avg, db_max, db_min, db_rows = cursor.fetchone()
+                    # 输出长度只统计成功的请求（失败请求没有完整输出）
+                    cursor.execute("SELECT MIN(completion_tokens), MAX(completion_tokens), SUM(completion_tokens >= ?), "
+                                   "COUNT(*) FROM result WHERE success = 1", (args_data.get('max_tokens') or 0,))
+                    out_min, out_max, out_exact, succeeded = cursor.fetchone()
+                    db_data = {
+                        'avg_gpu_memory': db_avg or 0,
+                        'max_gpu_memory': db_max or 0,
+                        'min_gpu_memory': db_min or 0,
+                        'output_tokens_min': out_min or 0,
+                        'output_tokens_max': out_max or 0,
+                        'output_exact_pct': (out_exact or 0) / succeeded * 100 if succeeded else 0
+                    }
+                    conn.close()
+                    span.add(files_read=1, bytes_read=db_file.stat().st_size, rows=db_rows)
             except Exception as e:
                 print(f"警告：无法读取数据库 {db_file}: {e}")
         
-        # 提取prompt长度（基于内容估算）
-        prompt = args_data.get('prompt', '')
-        prompt_length = 'long' if len(prompt) > 50 else 'short'
+        # 提取prompt长度：优先按实际平均输入token数分类，没有token统计时按提示词字符数估算
+        input_tokens = summary_data.get('Average input tokens per request', 0)
+        if input_tokens:
+            prompt_length = classify_input_length(input_tokens)
+        else:
+            prompt = args_data.get('prompt') or ''
+            prompt_length = 'long' if len(prompt) > 50 else 'short'
+        
+        # 合成数据集（--input-len / --prefix-len 扫描）的生成参数，其他数据集为0
+        dataset_meta = load_dataset_meta(args_data.get('dataset_path') or '')
         
         # 合并数据为统一格式
         record = {
@@ -123,13 +175,32 @@ class EvalscopeDataAggregator:
             'parallel': args_data.get('parallel', 0),
             'prompt_length': prompt_length,
             'max_tokens': args_data.get('max_tokens', 0),
+            'input_tokens_target': dataset_meta.get('input_tokens_target', 0),
+            'workload': args_data.get('workload') or '',
+            'prefix_tokens': dataset_meta.get('prefix_tokens', 0),
+            'prefix_share_pct': dataset_meta.get('prefix_share_pct', 0),
+            'prefix_count': dataset_meta.get('prefix_count', 0),
+            'cache_hit_potential_pct': dataset_meta.get('cache_hit_potential_pct', 0),
+            'image_resolution': args_data.get('image_resolution') or '',
+            'session_turns': args_data.get('session_turns') or 0,
+            'think_time': args_data.get('think_time') or 0,
+            'http_version': args_data.get('http_version') or '',
+            'endpoints': len(args_data.get('endpoints') or []) or 1,
+            'balance': args_data.get('balance') or '',
+            'target_rate': max(args_data.get('rate') or 0, 0),
+            'duration': args_data.get('duration') or 0,
+            'fixed_output': int(self._is_fixed_output(args_data)),
             'requests': summary_data.get('Total requests', 0),
+            'window': window,
+            'result_dir': str(result_dir),
             
             # 性能指标
             'time_taken': summary_data.get('Time taken for tests (s)', 0),
             'output_throughput': summary_data.get('Output token throughput (tok/s)', 0),
             'total_throughput': summary_data.get('Total token throughput (tok/s)', 0),
             'request_throughput': summary_data.get('Request throughput (req/s)', 0),
+            'achieved_rate': summary_data.get('Achieved rate (req/s)', 0),
+            'completed_rate': summary_data.get('Completed rate (req/s)', 0),
             
             # 延迟指标
             'latency': summary_data.get('Average latency (s)', 0),
@@ -138,8 +209,12 @@ class EvalscopeDataAggregator:
             'inter_token_latency': summary_data.get('Average inter-token latency (s)', 0),
             
             # Token指标
-            'input_tokens': summary_data.get('Average input tokens per request', 0),
+            'input_tokens': input_tokens,
+            'image_tokens': summary_data.get('Average image tokens per request', 0),
             'output_tokens': summary_data.get('Average output tokens per request', 0),
+            'output_tokens_min': db_data.get('output_tokens_min', 0),
+            'output_tokens_max': db_data.get('output_tokens_max', 0),
+            'output_exact_pct': db_data.get('output_exact_pct', 0),
             
             # GPU内存指标
             'avg_gpu_memory': db_data.get('avg_gpu_memory', 0),
@@ -147,11 +222,50 @@ class EvalscopeDataAggregator:
             'min_gpu_memory': db_data.get('min_gpu_memory', 0),
         }
         
+        # 客户端资源监控汇总（由 evalperf.sh 在测试期间采集）
+        record.update(summarize_client_monitor(result_dir / MONITOR_FILE))
+        
+        # 服务端引擎指标汇总（测试期间从 Prometheus /metrics 采集）
+        record.update(summarize_server_metrics(result_dir / SERVER_METRICS_FILE))
+        
+        # 混合负载中每类请求的延迟和吞吐（class_<类别>_<指标> 列）
+        record.update(summarize_request_classes(result_dir / CLASSES_FILE))
+        
+        # 多轮会话各轮的上下文长度和延迟（turn<轮次>_<指标> 列）
+        record.update(summarize_turns(result_dir / TURNS_FILE))
+        
+        # 原生驱动记录的测量精度（converged 和 ci_<指标>_pct 置信区间相对半宽列）
+        record.update(summarize_convergence(result_dir / CONVERGENCE_FILE))
+        
+        # 原生驱动记录的连接复用和各阶段耗时（conn_<阶段>_ms 列）
+        record.update(summarize_connections(result_dir / CONNECTIONS_FILE))
+        
+        # 多端点运行中每个端点的吞吐和延迟（ep_<端点>_<指标> 列）
+        record.update(summarize_endpoints(result_dir / ENDPOINTS_FILE))
+        
+        # 稳态窗口（排除预热、冷却和排空阶段）的主要指标（steady_<指标> 列）
+        record.update(summarize_steady_state(steady_file))
+        
+        # 浸泡测试开头与结尾的延迟漂移和吞吐衰减（soak_<指标> 列）
+        record.update(summarize_soak(result_dir / SOAK_FILE))
+        
         # 添加百分位数数据
         record.update(percentile_data)
         
         return record
     
+    @staticmethod
+    def _is_fixed_output(args_data: Dict[str, Any]) -> bool:
+        """是否为固定输出长度模式（min_tokens 等于 max_tokens，或设置了 ignore_eos）"""
+        extra_args = args_data.get('extra_args') or {}
+        if isinstance(extra_args, str):
+            try:
+                extra_args = json.loads(extra_args)
+            except ValueError:
+                extra_args = {}
+        max_tokens = args_data.get('max_tokens')
+        return bool(extra_args.get('ignore_eos')) or (bool(max_tokens) and args_data.get('min_tokens') == max_tokens)
+    
     def collect_raw_data(self) -> None:
         """收集所有原始数据"""
         result_dirs = self.scan_results_directory()
@@ -164,7 +278,9 @@ class EvalscopeDataAggregator:
         
         for result_dir in result_dirs:
             try:
-                record = self.extract_single_run(result_dir)
+                run_name = f"{result_dir.parent.parent.name}/{result_dir.parent.name}"
+                with self.profiler.stage('extract_run', 'run', run=run_name):
+                    record = self.extract_single_run(result_dir)
                 self.raw_data.append(record)
                 print(f"已处理: {result_dir.parent.parent.name}/{result_dir.parent.name}")
             except Exception as e:
@@ -172,15 +288,15 @@ class EvalscopeDataAggregator:
         
         print(f"成功收集 {len(self.raw_data)} 条原始数据记录")
     
-    def aggregate_by_config(self) -> Dict[str, List[Dict[str, Any]]]:
-        """按配置分组汇总数据"""
+    def aggregate_by_config(self) -> Dict[Tuple[str, str], List[Dict[str, Any]]]:
+        """按 (配置, 模型) 分组汇总数据（多个模型并发扫描时写入相同的配置目录，不能混在一起平均）"""
         aggregated = {}
         
         for record in self.raw_data:
-            config = record['config']
-            if config not in aggregated:
-                aggregated[config] = []
-            aggregated[config].append(record)
+            key = (record['config'], record['model'])
+            if key not in aggregated:
+                aggregated[key] = []
+            aggregated[key].append(record)
         
         return aggregated
     
@@ -208,26 +324,37 @@ class EvalscopeDataAggregator:
     
     def calculate_aggregated_statistics(self) -> List[Dict[str, Any]]:
         """计算汇总统计信息"""
+        with self.profiler.stage('aggregate') as span:
+            stats_list = self._calculate_aggregated_statistics()
+            span.add(rows=len(self.raw_data))
+        return stats_list
+    
+    def _calculate_aggregated_statistics(self) -> List[Dict[str, Any]]:
+        """按 (配置, 模型) 分组并计算各数值字段的统计指标"""
         self.aggregated_data = self.aggregate_by_config()
         stats_list = []
         
-        for config, records in self.aggregated_data.items():
+        for (config, model), records in self.aggregated_data.items():
             if not records:
                 continue
             
             # 提取数值字段进行统计
             numeric_fields = [
-                'output_throughput', 'total_throughput', 'request_throughput',
+                'output_throughput', 'total_throughput', 'request_throughput', 'achieved_rate', 'completed_rate',
                 'latency', 'ttft', 'token_latency', 'inter_token_latency',
-                'input_tokens', 'output_tokens', 'time_taken',
-                'avg_gpu_memory', 'max_gpu_memory', 'min_gpu_memory'
+                'input_tokens', 'image_tokens', 'output_tokens', 'output_exact_pct', 'time_taken',
+                'avg_gpu_memory', 'max_gpu_memory', 'min_gpu_memory',
+                'client_cpu_avg_pct', 'client_cpu_max_pct', 'client_rss_max_mb',
+                'client_sched_lag_p99_ms', 'client_host_cpu_max_pct', 'client_saturated',
+                'server_running_avg', 'server_running_max', 'server_waiting_avg', 'server_waiting_max',
+                'server_kv_cache_avg_pct', 'server_kv_cache_max_pct', 'server_preemptions'
             ]
             
-            # 添加百分位数字段
+            # 添加百分位数字段、混合负载的分类字段、多轮会话的轮次字段、测量精度字段、稳态窗口字段、连接阶段字段、端点字段和浸泡测试字段
             percentile_fields = []
             for record in records:
                 for key in record.keys():
-                    if key.startswith(('p10_', 'p25_', 'p50_', 'p66_', 'p75_', 'p80_', 'p90_', 'p95_', 'p98_', 'p99_')):
+                    if key.startswith(('p10_', 'p25_', 'p50_', 'p66_', 'p75_', 'p80_', 'p90_', 'p95_', 'p98_', 'p99_', 'class_', 'turn', 'ci_', 'converged', 'steady_', 'conn_', 'ep_', 'soak_')):
                         if key not in percentile_fields:
                             percentile_fields.append(key)
             
@@ -236,15 +363,29 @@ class EvalscopeDataAggregator:
             stats_record = {
                 'config': config,
                 'count': len(records),
-                'model': records[0]['model'],
+                'model': model,
                 'parallel': records[0]['parallel'],
                 'prompt_length': records[0]['prompt_length'],
-                'max_tokens': records[0]['max_tokens']
+                'max_tokens': records[0]['max_tokens'],
+                'input_tokens_target': records[0]['input_tokens_target'],
+                'workload': records[0]['workload'],
+                'prefix_tokens': records[0]['prefix_tokens'],
+                'prefix_share_pct': records[0]['prefix_share_pct'],
+                'prefix_count': records[0]['prefix_count'],
+                'cache_hit_potential_pct': records[0]['cache_hit_potential_pct'],
+                'image_resolution': records[0]['image_resolution'],
+                'session_turns': records[0]['session_turns'],
+                'think_time': records[0]['think_time'],
+                'http_version': records[0]['http_version'],
+                'endpoints': records[0]['endpoints'],
+                'balance': records[0]['balance'],
+                'target_rate': records[0]['target_rate'],
+                'duration': records[0]['duration']
             }
             
             # 为每个数值字段计算统计指标
             for field in numeric_fields:
-                values = [record[field] for record in records if record[field] is not None]
+                values = [record[field] for record in records if record.get(field) is not None]
                 field_stats = self.calculate_statistics(values)
                 
                 # 添加到统计记录中
@@ -271,18 +412,27 @@ class EvalscopeDataAggregator:
         
         with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
             if data_type == 'raw':
-                fieldnames = list(self.raw_data[0].keys())
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                fieldnames = self._collect_fieldnames(self.raw_data)
+                writer = csv.DictWriter(csvfile, fieldnames=fieldnames, restval=0)
                 writer.writeheader()
                 writer.writerows(self.raw_data)
             else:
-                fieldnames = list(stats_data[0].keys())
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                fieldnames = self._collect_fieldnames(stats_data)
+                writer = csv.DictWriter(csvfile, fieldnames=fieldnames, restval=0)
                 writer.writeheader()
                 writer.writerows(stats_data)
         
         print(f"已导出 {data_type} 数据到: {filename}")
     
+    @staticmethod
+    def _collect_fieldnames(records: List[Dict[str, Any]]) -> List[str]:
+        """所有记录的列名并集（保持首次出现的顺序），混合负载的分类列和多轮会话的轮次列只存在于部分记录中，缺失处写0"""
+        fieldnames = {}
+        for record in records:
+            for key in record:
+                fieldnames.setdefault(key, None)
+        return list(fieldnames)
+    
     def export_json(self, filename: str, data_type: str = 'raw') -> None:
         """导出为JSON格式"""
         if data_type == 'raw' and not self.raw_data:
@@ -315,11 +465,18 @@ def main():
                        help='输出文件名前缀 (默认: summary)')
     parser.add_argument('--data-type', choices=['raw', 'stats', 'both'], default='both',
                        help='数据类型：raw=原始数据, stats=统计数据, both=两者 (默认: both)')
+    parser.add_argument('--steady-state', action='store_true',
+                       help='使用稳态窗口统计（benchmark_steady_state.json，排除预热、冷却和排空阶段）代替整个运行的汇总指标和百分位')
+    parser.add_argument('--profile', action='store_true',
+                       help='记录各阶段耗时（扫描/解析/查询/聚合/导出），打印汇总表并输出trace')
+    parser.add_argument('--profile-output',
+                       help='trace文件路径 (默认: <output>_profile_trace.json)')
     
     args = parser.parse_args()
     
     # 创建汇总器
-    aggregator = EvalscopeDataAggregator(args.results_dir)
+    profiler = StageProfiler(enabled=args.profile)
+    aggregator = EvalscopeDataAggregator(args.results_dir, profiler, steady_state=args.steady_state)
     
     # 收集数据
     aggregator.collect_raw_data()
@@ -329,19 +486,23 @@ def main():
         return
     
     # 导出数据
-    if args.data_type in ['raw', 'both']:
-        if args.format == 'csv':
-            aggregator.export_csv(f"{args.output}_raw.csv", 'raw')
-        else:
-            aggregator.export_json(f"{args.output}_raw.json", 'raw')
-    
-    if args.data_type in ['stats', 'both']:
-        if args.format == 'csv':
-            aggregator.export_csv(f"{args.output}_stats.csv", 'stats')
-        else:
-            aggregator.export_json(f"{args.output}_stats.json", 'stats')
+    for data_type in ['raw', 'stats']:
+        if args.data_type not in [data_type, 'both']:
+            continue
+        filename = f"{args.output}_{data_type}.{args.format}"
+        with profiler.stage('export', data_type=data_type) as span:
+            if args.format == 'csv':
+                aggregator.export_csv(filename, data_type)
+            else:
+                aggregator.export_json(filename, data_type)
+            if os.path.exists(filename):
+                span.add(files_written=1, bytes_written=os.path.getsize(filename))
     
     print("数据汇总完成！")
+    
+    if args.profile:
+        profiler.print_summary()
+        profiler.write_trace(args.profile_output or f"{args.output}_profile_trace.json")
 
 
 if __name__ == "__main__":
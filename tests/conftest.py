@@ -0,0 +1,95 @@
+"""
+测试公共夹具
+FakeServer 是在后台线程中运行的最小 OpenAI 兼容流式接口，keep-alive 空闲超时很短，用于复现连接复用问题
+Author: AI Assistant
+Date: 2024
+"""
+
+import asyncio
+import json
+import threading
+from typing import Optional
+
+import pytest
+
+
+class FakeServer:
+    """
+    流式返回固定回复的 HTTP/1.1 服务端
+    Args:
+        idle_timeout: keep-alive 空闲超时秒数，超时后服务端关闭连接
+        max_requests: 每条连接处理的请求数上限，之后收到的请求不响应、直接关闭连接（模拟关闭与请求到达竞争）
+    """
+
+    def __init__(self, idle_timeout: float = 0.2, max_requests: Optional[int] = None):
+        self.idle_timeout = idle_timeout
+        self.max_requests = max_requests
+        self.connections = 0
+        self.requests = 0
+        self.port = 0
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.port}/v1/chat/completions'
+
+    def start(self) -> None:
+        self._server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self._handle, '127.0.0.1', 0), self._loop)
+        self._thread.start()
+        self.port = self._server.result(5).sockets[0].getsockname()[1]
+
+    def stop(self) -> None:
+        server = self._server.result()
+        self._loop.call_soon_threadsafe(server.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        served = 0
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    if key.strip().lower() == 'content-length':
+                        length = int(value)
+                await reader.readexactly(length)
+                if self.max_requests is not None and served >= self.max_requests:
+                    break
+                served += 1
+                self.requests += 1
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n'
+                             b'Transfer-Encoding: chunked\r\n\r\n')
+                events = [{'choices': [{'delta': {'content': token}}]} for token in ('你', '好')]
+                events.append({'choices': [], 'usage': {'prompt_tokens': 5, 'completion_tokens': 2}})
+                for event in events:
+                    data = f'data: {json.dumps(event)}\n\n'.encode('utf-8')
+                    writer.write(b'%x\r\n%s\r\n' % (len(data), data))
+                data = b'data: [DONE]\n\n'
+                writer.write(b'%x\r\n%s\r\n0\r\n\r\n' % (len(data), data))
+                await writer.drain()
+        except (OSError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+@pytest.fixture
+def fake_server():
+    """keep-alive 空闲超时 0.2 秒的服务端"""
+    server = FakeServer()
+    server.start()
+    yield server
+    server.stop()
@@ -0,0 +1,69 @@
+"""
+对比与趋势分析的配置对齐测试
+Author: AI Assistant
+Date: 2024
+"""
+
+from visualize.compare import RunComparator
+from visualize.trend import TrendAnalyzer
+
+
+def row(test_name, parallel, throughput, target_rate=0, duration=0, timestamp='20240101_000000'):
+    return {
+        'test_name': test_name, 'parallel': parallel, 'max_tokens': 256, 'target_rate': target_rate,
+        'duration': duration, 'timestamp': timestamp, 'model': 'Qwen3-32B',
+        'output_token_throughput': throughput, 'qps': throughput / 100, 'avg_latency_ms': 1.0,
+        'p99_latency_ms': 2.0, 'avg_ttft_ms': 0.1
+    }
+
+
+def sweep(scale=1.0, timestamp='20240101_000000'):
+    return [
+        row('r10_p256_s60_dp_short', 256, 1000 * scale, 10, 60, timestamp),
+        row('r40_p256_s60_dp_short', 256, 4000 * scale, 40, 60, timestamp),
+        row('p256_n1000_dp_short', 256, 9000 * scale, timestamp=timestamp),
+    ]
+
+
+def test_compare_aligns_rate_steps_separately():
+    result = RunComparator(sweep(), sweep(0.5)).compare()
+    assert result['matched_configs'] == 3
+    throughput = {(c['target_rate'], c['baseline']) for c in result['comparisons']
+                  if c['metric'] == 'output_token_throughput'}
+    assert throughput == {(10, 1000), (40, 4000), (0, 9000)}
+    assert result['verdict'] == 'regression'
+
+
+def test_trend_keeps_rate_steps_in_separate_series():
+    data = sweep(timestamp='20240101_000000') + sweep(timestamp='20240102_000000')
+    series = TrendAnalyzer(data).build_series()
+    assert len(series) == 3
+    assert sorted(item['run_count'] for item in series.values()) == [2, 2, 2]
+
+
+def test_compare_does_not_pool_models():
+    other = [dict(r, model='Llama-3-8B', output_token_throughput=r['output_token_throughput'] * 3) for r in sweep()]
+    result = RunComparator(sweep() + other, sweep() + other).compare()
+    assert result['matched_configs'] == 6
+    assert result['verdict'] == 'pass'
+    llama = [c for c in result['comparisons'] if c['model'] == 'Llama-3-8B' and c['metric'] == 'output_token_throughput']
+    assert sorted(c['baseline'] for c in llama) == [3000, 12000, 27000]
+    # 只有基线中有的模型不参与对齐
+    result = RunComparator(sweep() + other, sweep()).compare()
+    assert result['matched_configs'] == 3
+    assert len(result['unmatched_baseline']) == 3
+
+
+def test_trend_keys_series_on_config_name():
+    data = [row('p256_n1000_t256_dp_short', 256, 9000), row('p256_n1000_t1024_dp_short', 256, 3000),
+            row('p256_n1000_t256_dp_short', 256, 9100, timestamp='20240102_000000')]
+    series = TrendAnalyzer(data).build_series()
+    assert sorted(series) == ['Qwen3-32B / p256_n1000_t1024_dp_short', 'Qwen3-32B / p256_n1000_t256_dp_short']
+    assert series['Qwen3-32B / p256_n1000_t256_dp_short']['run_count'] == 2
+
+
+def test_rolling_baseline_windows_by_calendar_days():
+    days = ['2024-01-01', '2024-01-02', '2024-01-10', '2024-01-11']
+    baseline = TrendAnalyzer.rolling_baseline([1.0, 3.0, 10.0, 20.0], days, 7)
+    # 1 月 10 日之前 7 天内没有运行，不沿用 1 月 1、2 日的值
+    assert baseline == [None, 1.0, None, 10.0]
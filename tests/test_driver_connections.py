@@ -0,0 +1,130 @@
+"""
+原生驱动 keep-alive 连接复用与重连测试
+Author: AI Assistant
+Date: 2024
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from evalperf.driver import BenchmarkDriver, HTTPConnection
+from evalperf.workload import WorkloadClass
+from tests.conftest import FakeServer
+
+
+BODY = b'{"model": "fake", "messages": [], "stream": true}'
+
+
+def post_twice(url: str, pause: float):
+    """在同一条连接上发送两个请求，返回两次的状态码和连接计时"""
+    async def run():
+        connection = HTTPConnection(url, connect_timeout=5, read_timeout=5)
+        results = []
+        try:
+            for i in range(2):
+                if i:
+                    await asyncio.sleep(pause)
+                status = await connection.post(BODY, lambda data: None)
+                results.append((status, dict(connection.timing)))
+        finally:
+            connection.close()
+        return results
+    return asyncio.run(run())
+
+
+def test_reuses_live_connection(fake_server):
+    (first, first_timing), (second, second_timing) = post_twice(fake_server.url, 0)
+    assert (first, second) == (200, 200)
+    assert first_timing['reused'] is False
+    assert second_timing['reused'] is True
+    assert fake_server.connections == 1
+
+
+def test_reconnects_after_keepalive_timeout(fake_server):
+    # 服务端已关闭空闲连接：不复用，新建连接
+    (first, _), (second, second_timing) = post_twice(fake_server.url, fake_server.idle_timeout * 3)
+    assert (first, second) == (200, 200)
+    assert second_timing['reused'] is False
+    assert second_timing['connect_time'] is not None
+    assert fake_server.connections == 2
+
+
+def test_reconnect_time_not_counted_in_latency(fake_server):
+    async def run():
+        connection = HTTPConnection(fake_server.url, connect_timeout=5, read_timeout=5)
+        try:
+            await connection.post(BODY, lambda data: None)
+            first_start = connection.request_start
+            await asyncio.sleep(fake_server.idle_timeout * 3)
+            before = time.time()
+            await connection.post(BODY, lambda data: None)
+            return first_start, before, connection.request_start
+        finally:
+            connection.close()
+    first_start, before, reconnected = asyncio.run(run())
+    # 新连接上的第一个请求照常计入建连耗时，空闲失效后的重连不计入
+    assert first_start is None
+    assert reconnected is not None and reconnected >= before
+
+
+def test_session_turns_survive_think_time_longer_than_keepalive(fake_server):
+    sessions = [{'system': [], 'turns': [f'第{turn}轮' for turn in range(1, 5)]}]
+    driver = BenchmarkDriver(fake_server.url, 'fake', [WorkloadClass('default', [])], parallel=1, number=4,
+                             max_tokens=16, connect_timeout=5, read_timeout=5, sessions=sessions,
+                             think_time=fake_server.idle_timeout * 2)
+    records = driver.run()
+    assert len(records) == 4
+    assert all(r['success'] for r in records), [r['error'] for r in records if not r['success']]
+    assert sorted(r['turn'] for r in records) == [1, 2, 3, 4]
+    reconnected = [r for r in records if r['turn'] > 1 and not r['reused']]
+    assert reconnected
+    for record in reconnected:
+        # 重连耗时不计入该轮延迟
+        assert record['completed_time'] - record['start_time'] < 1
+
+
+def test_rate_mode_reuses_most_recent_connection(fake_server):
+    # 到达间隔（平均 0.05 秒）短于空闲超时，在途请求很少：连接池后进先出，少量连接持续复用
+    prompts = [[{'role': 'user', 'content': '你好'}]]
+    driver = BenchmarkDriver(fake_server.url, 'fake', [WorkloadClass('default', prompts)],
+                             parallel=16, number=1000, max_tokens=16, rate=20, duration=1.5, connect_timeout=5,
+                             read_timeout=5)
+    records = driver.run()
+    assert records
+    assert all(r['success'] for r in records), [r['error'] for r in records if not r['success']]
+    assert sum(1 for r in records if r['reused']) / len(records) > 0.5
+    assert fake_server.connections < len(records) / 2
+
+
+def test_retries_once_when_reused_connection_drops():
+    # 服务端收到请求后未响应就关闭连接（客户端复用时尚未察觉）：在新连接上重发一次
+    server = FakeServer(idle_timeout=5, max_requests=1)
+    server.start()
+    try:
+        (first, _), (second, second_timing) = post_twice(server.url, 0)
+    finally:
+        server.stop()
+    assert (first, second) == (200, 200)
+    assert second_timing['reused'] is False
+    assert server.connections == 2
+    assert server.requests == 2
+
+
+def test_new_connection_failure_is_not_retried():
+    server = FakeServer(idle_timeout=5, max_requests=0)
+    server.start()
+
+    async def run():
+        connection = HTTPConnection(server.url, connect_timeout=5, read_timeout=5)
+        try:
+            await connection.post(BODY, lambda data: None)
+        finally:
+            connection.close()
+    try:
+        with pytest.raises(ConnectionError):
+            asyncio.run(run())
+    finally:
+        server.stop()
+    assert server.connections == 1
@@ -0,0 +1,61 @@
+"""
+扫描清单续跑判断测试
+Author: AI Assistant
+Date: 2024
+"""
+
+import json
+
+from evalperf.manifest import find_completed_run, is_valid_summary, load_manifest, plan_points, record_point
+
+
+def write_summary(output_dir, config, timestamp, model, succeeded, failed):
+    run_dir = output_dir / config / timestamp / model
+    run_dir.mkdir(parents=True)
+    summary = {'Total requests': succeeded + failed, 'Succeed requests': succeeded, 'Failed requests': failed}
+    (run_dir / 'benchmark_summary.json').write_text(json.dumps(summary), encoding='utf-8')
+    return run_dir
+
+
+def test_summary_validity(tmp_path):
+    assert is_valid_summary(write_summary(tmp_path, 'c', 't1', 'm', 200, 0) / 'benchmark_summary.json')
+    assert is_valid_summary(write_summary(tmp_path, 'c', 't2', 'm', 190, 10) / 'benchmark_summary.json')
+    # 200 个请求失败 199 个：不是有效结果
+    assert not is_valid_summary(write_summary(tmp_path, 'c', 't3', 'm', 1, 199) / 'benchmark_summary.json')
+    assert not is_valid_summary(write_summary(tmp_path, 'c', 't4', 'm', 0, 0) / 'benchmark_summary.json')
+    broken = tmp_path / 'broken.json'
+    broken.write_text('{', encoding='utf-8')
+    assert not is_valid_summary(broken)
+    assert not is_valid_summary(tmp_path / 'missing.json')
+
+
+def test_resume_skips_only_mostly_successful_runs(tmp_path):
+    good = write_summary(tmp_path, 'p8_n200_dp', '20240101_000000', 'Qwen3-32B', 200, 0)
+    write_summary(tmp_path, 'p8_n200_dp', '20240102_000000', 'Qwen3-32B', 1, 199)
+    write_summary(tmp_path, 'p16_n200_dp', '20240101_000000', 'Qwen3-32B', 120, 80)
+    # 最近一次运行失败过多时取更早的有效运行
+    assert find_completed_run(tmp_path, 'p8_n200_dp', 'Qwen3-32B') == good
+    assert find_completed_run(tmp_path, 'p16_n200_dp', 'Qwen3-32B') is None
+    assert find_completed_run(tmp_path, 'p16_n200_dp', 'Qwen3-32B', max_failed_pct=50) is not None
+    # 其他模型的结果不算
+    assert find_completed_run(tmp_path, 'p8_n200_dp', 'Llama-3-8B') is None
+
+
+def test_model_directory_names(tmp_path):
+    native = write_summary(tmp_path, 'p8_n200_dp', '20240101_000000', 'org_Qwen3-32B', 200, 0)
+    assert find_completed_run(tmp_path, 'p8_n200_dp', 'org/Qwen3-32B') == native
+
+
+def test_manifest_records_attempts(tmp_path):
+    plan_points(tmp_path, ['p8', 'p16'], 'm')
+    record_point(tmp_path, 'p8', 'm', 'running')
+    record_point(tmp_path, 'p8', 'm', 'failed', exit_code=3)
+    entry = record_point(tmp_path, 'p8', 'm', 'running')
+    # 重试开始后不再显示上次失败的退出码
+    assert 'exit_code' not in entry
+    entry = record_point(tmp_path, 'p8', 'm', 'done', run_dir='p8/t/m')
+    assert entry['attempts'] == 2 and entry['status'] == 'done' and 'exit_code' not in entry
+    plan_points(tmp_path, ['p8', 'p16'], 'm')
+    points = load_manifest(tmp_path)['points']
+    assert points['p8/m']['status'] == 'done'
+    assert points['p16/m']['status'] == 'pending'
@@ -0,0 +1,83 @@
+"""
+帕累托前沿、拐点检测和推荐工作并发测试（固定数据集）
+Author: AI Assistant
+Date: 2024
+"""
+
+from visualize.statistics import StatisticsCalculator
+
+
+# 并发, 输出吞吐, P50/P99 延迟（秒）：8 之后吞吐基本不再增长，32 被 16 支配
+POINTS = [
+    (1, 100, 0.8, 1.0),
+    (2, 195, 0.85, 1.1),
+    (4, 380, 0.9, 1.3),
+    (8, 700, 1.2, 1.8),
+    (16, 760, 2.0, 3.0),
+    (32, 740, 4.0, 6.0),
+]
+
+
+def rows(model='Qwen3-32B', dataset='short', max_tokens=None, scale=1):
+    data = []
+    for parallel, throughput, p50, p99 in POINTS:
+        throughput *= scale
+        tokens = f'_t{max_tokens}' if max_tokens else ''
+        data.append({
+            'model': model, 'test_name': f'p{parallel}_n200{tokens}_d{dataset}', 'parallel': parallel,
+            'max_tokens': max_tokens or 0,
+            'qps': throughput / 100, 'output_token_throughput': throughput, 'latency': p50,
+            'p50_latency_ms': p50, 'p99_latency_ms': p99
+        })
+    return data
+
+
+def points():
+    return [{'parallel': n, 'throughput': x, 'p50_latency': p50, 'p99_latency': p99} for n, x, p50, p99 in POINTS]
+
+
+def test_pareto_frontier_drops_dominated_points():
+    frontier = StatisticsCalculator.pareto_frontier(points(), 'p99_latency')
+    assert [p['parallel'] for p in frontier] == [1, 2, 4, 8, 16]
+    # 延迟相同时只保留吞吐更高的点
+    tied = points() + [{'parallel': 12, 'throughput': 720, 'p50_latency': 2.0, 'p99_latency': 3.0}]
+    assert [p['parallel'] for p in StatisticsCalculator.pareto_frontier(tied, 'p99_latency')] == [1, 2, 4, 8, 16]
+
+
+def test_knee_is_last_point_before_marginal_throughput_collapses():
+    knee, saturated = StatisticsCalculator.find_knee(points())
+    assert knee['parallel'] == 8
+    assert saturated
+    knee, saturated = StatisticsCalculator.find_knee(points()[:4])
+    assert knee['parallel'] == 8
+    assert not saturated
+
+
+def test_recommended_parallel_respects_knee_and_slo():
+    [result] = StatisticsCalculator(rows()).calculate_operating_points()
+    assert (result['model'], result['dataset'], result['points']) == ('Qwen3-32B', 'short', 6)
+    assert result['frontier_p99'] == [1, 2, 4, 8, 16]
+    assert result['knee_parallel'] == 8
+    assert result['recommended_parallel'] == 8
+    [result] = StatisticsCalculator(rows(), slo_p99_latency=1.5).calculate_operating_points()
+    assert result['recommended_parallel'] == 4
+    assert result['recommended_p99_latency'] == 1.3
+
+
+def test_operating_points_are_grouped_per_model_and_dataset():
+    # 重复运行按并发数取平均，不同模型和数据集分别分析
+    data = rows() + rows() + rows(model='Llama-3-8B') + rows(dataset='long')
+    results = StatisticsCalculator(data).calculate_operating_points()
+    assert [(r['model'], r['dataset'], r['points']) for r in results] == [
+        ('Llama-3-8B', 'short', 6), ('Qwen3-32B', 'long', 6), ('Qwen3-32B', 'short', 6)]
+    assert all(r['knee_throughput'] == 700 for r in results)
+
+
+def test_output_lengths_are_separate_configs():
+    # 输出长度扫描：同一并发、同一数据集的不同 max_tokens 不能平均成一个工作点
+    data = rows(max_tokens=128, scale=10) + rows(max_tokens=1024)
+    results = StatisticsCalculator(data).calculate_operating_points()
+    assert [(r['dataset'], r['max_tokens']) for r in results] == [('short', 128), ('short', 1024)]
+    assert [r['knee_throughput'] for r in results] == [7000, 700]
+    scalability = StatisticsCalculator(data).calculate_scalability_models()
+    assert [r['max_tokens'] for r in scalability] == [128, 1024]
@@ -0,0 +1,53 @@
+"""
+报告构建缓存过期片段清理测试
+Author: AI Assistant
+Date: 2024
+"""
+
+from visualize.report_cache import ReportCache
+
+
+def build(cache_dir, report, payloads):
+    """用一组输入构建报告，返回本次构建的缓存"""
+    cache = ReportCache(str(cache_dir))
+    for namespace, payload in payloads.items():
+        cache.get_or_build(ReportCache.compute_key(namespace, payload), lambda: {'payload': payload})
+    report.write_text('<html></html>', encoding='utf-8')
+    cache.save(report)
+    return cache
+
+
+def fragments(cache_dir):
+    return sorted(p.stem for p in cache_dir.glob('*-*.json'))
+
+
+def test_refresh_evicts_fragments_no_longer_used(tmp_path):
+    cache_dir, report = tmp_path / '.report_cache', tmp_path / 'report.html'
+    build(cache_dir, report, {'qps': [1, 2], 'stats': [3]})
+    cache = build(cache_dir, report, {'qps': [1, 2], 'stats': [4]})
+    assert cache.get_stats() == {'hits': 1, 'misses': 1, 'evicted': 1}
+    assert fragments(cache_dir) == sorted([ReportCache.compute_key('qps', [1, 2]),
+                                           ReportCache.compute_key('stats', [4])])
+
+
+def test_reports_sharing_cache_keep_each_others_fragments(tmp_path):
+    cache_dir = tmp_path / '.report_cache'
+    first, second = tmp_path / 'a.html', tmp_path / 'b.html'
+    build(cache_dir, first, {'qps': [1]})
+    build(cache_dir, second, {'qps': [2]})
+    assert len(fragments(cache_dir)) == 2
+    # 报告文件删除后，其片段在下次构建时清理
+    first.unlink()
+    cache = build(cache_dir, second, {'qps': [2]})
+    assert cache.evicted == 1
+    assert fragments(cache_dir) == [ReportCache.compute_key('qps', [2])]
+
+
+def test_stats_key_covers_every_column(tmp_path):
+    from visualize.html_generator import HTMLGenerator
+    row = {'test_name': 'r10_p256_s60_dp_short', 'parallel': 256, 'model': 'Qwen3-32B', 'qps': 10.0,
+           'target_rate': 10, 'duration': 60, 'max_tokens': 256}
+    generator = HTMLGenerator([row], str(tmp_path / 'report.html'), 'report.csv', use_cache=False)
+    key = generator._get_stats_key([row])
+    for column, value in (('target_rate', 20), ('duration', 120), ('max_tokens', 1024), ('soak_windows', 4)):
+        assert generator._get_stats_key([dict(row, **{column: value})]) != key
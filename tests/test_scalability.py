@@ -0,0 +1,85 @@
+"""
+通用可扩展性定律拟合与利特尔定律校验测试（固定数据集）
+Author: AI Assistant
+Date: 2024
+"""
+
+import pytest
+
+from visualize.statistics import StatisticsCalculator
+
+
+PARALLELS = [1, 2, 4, 8, 16, 32, 64]
+MODEL = {'lambda': 100, 'sigma': 0.05, 'kappa': 0.001}
+
+
+def throughputs(model=MODEL):
+    return [StatisticsCalculator.usl_predict(model, n) for n in PARALLELS]
+
+
+def test_fit_recovers_usl_parameters():
+    fitted = StatisticsCalculator.fit_usl(PARALLELS, throughputs())
+    assert fitted['lambda'] == pytest.approx(100, rel=1e-6)
+    assert fitted['sigma'] == pytest.approx(0.05, rel=1e-6)
+    assert fitted['kappa'] == pytest.approx(0.001, rel=1e-6)
+    # N* = sqrt((1 - σ) / κ) ≈ 30.8
+    assert fitted['peak_parallel'] == 31
+    assert fitted['peak_throughput'] == pytest.approx(StatisticsCalculator.usl_predict(MODEL, 31))
+    assert fitted['mape'] < 1e-6
+
+
+def test_fit_without_coherency_has_no_peak():
+    fitted = StatisticsCalculator.fit_usl(PARALLELS, throughputs({'lambda': 50, 'sigma': 0.1, 'kappa': 0.0}))
+    assert fitted['sigma'] == pytest.approx(0.1, rel=1e-6)
+    assert fitted['kappa'] == 0
+    assert fitted['peak_parallel'] is None
+
+
+def test_fit_clamps_negative_coefficients():
+    # 超线性扩展的数据没有非负解，退化后的系数不为负
+    fitted = StatisticsCalculator.fit_usl([1, 2, 4, 8], [10, 25, 60, 140])
+    assert fitted['sigma'] >= 0 and fitted['kappa'] >= 0
+
+
+def test_fit_needs_three_distinct_parallels():
+    assert StatisticsCalculator.fit_usl([1, 2], [100, 190]) is None
+    assert StatisticsCalculator.fit_usl([1, 2, 2, 4], [100, 190, 0, 0]) is None
+
+
+def test_scalability_models_predict_untested_parallels_and_flag_client_limits():
+    data = []
+    for n, qps in zip(PARALLELS, throughputs()):
+        # 64 并发时实测在途请求数只有一半：客户端未能维持目标并发
+        latency = n / qps * (0.5 if n == 64 else 1.0)
+        data.append({'model': 'Qwen3-32B', 'test_name': f'p{n}_n200_dshort', 'parallel': n, 'qps': qps,
+                     'output_token_throughput': qps * 10, 'latency': latency,
+                     'p50_latency_ms': latency, 'p99_latency_ms': latency})
+    [result] = StatisticsCalculator(data).calculate_scalability_models()
+    assert result['qps_model']['peak_parallel'] == 31
+    assert result['throughput_model']['lambda'] == pytest.approx(1000, rel=1e-3)
+    assert result['client_limited_parallels'] == [64]
+    predicted = {p['parallel']: p for p in result['predictions']}
+    assert not set(predicted) & set(PARALLELS)
+    assert {31, 48, 96, 128} <= set(predicted)
+    assert predicted[48]['qps'] == pytest.approx(StatisticsCalculator.usl_predict(MODEL, 48), rel=1e-3)
+    assert predicted[48]['latency_s'] == pytest.approx(48 / predicted[48]['qps'])
+
+
+def test_chart_overlay_uses_per_model_fits():
+    from visualize.chart_data import ChartDataExtractor
+    data = []
+    for name, scale in (('Qwen3-32B', 1), ('Llama-3-8B', 3)):
+        for n, qps in zip(PARALLELS, throughputs()):
+            data.append({'model': name, 'test_name': f'p{n}_n200_dp_short', 'parallel': n, 'qps': qps * scale,
+                         'output_token_throughput': qps * scale * 10, 'latency': n / qps / scale,
+                         'p50_latency_ms': 1.0, 'p99_latency_ms': 2.0})
+    # 速率扫描的一步不参与拟合
+    data.append(dict(data[-1], test_name='r10_p64_s60_dp_short', qps=1.0, target_rate=10, duration=60))
+    overlay = ChartDataExtractor(data)._get_usl_overlay('qps_model', PARALLELS)
+    fits = StatisticsCalculator(data).calculate_scalability_models()
+    assert len(overlay['datasets']) == len(fits) == 2
+    for dataset, fit in zip(overlay['datasets'], fits):
+        assert fit['model'] in dataset['label']
+        assert dataset['data'][0] == pytest.approx(StatisticsCalculator.usl_predict(fit['qps_model'], 1), rel=1e-3)
+    # 预测峰值（31）在已测试范围内，横轴不追加
+    assert overlay['labels'] == PARALLELS
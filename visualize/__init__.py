@@ -8,6 +8,9 @@ from .statistics import StatisticsCalculator
 from .chart_data import ChartDataExtractor
 from .html_generator import HTMLGenerator
 from .templates import HTMLTemplates
+from .report_cache import ReportCache
+from .compare import RunComparator
+from .trend import TrendAnalyzer
 
 __version__ = "1.0.0"
 __all__ = [
@@ -16,5 +19,8 @@ __all__ = [
     "StatisticsCalculator",
     "ChartDataExtractor",
     "HTMLGenerator",
-    "HTMLTemplates"
+    "HTMLTemplates",
+    "ReportCache",
+    "RunComparator",
+    "TrendAnalyzer"
 ]
@@ -5,13 +5,17 @@ Author: AI Assistant
 Date: 2024
 """
 
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 import json
+from visualize.statistics import StatisticsCalculator
 
 
 class ChartDataExtractor:
     """图表数据提取器"""
     
+    # USL 拟合曲线的颜色（每个 模型/数据集/max_tokens 一条，依次取用）
+    USL_COLORS = ['#667eea', '#28a745', '#ff6b6b', '#ffc107', '#17a2b8', '#6f42c1', '#fd7e14', '#20c997']
+    
     def __init__(self, data: List[Dict]):
         # 按并发数排序数据，确保图表横轴有序
         self.data = sorted(data, key=lambda x: x['parallel'])
@@ -38,6 +42,973 @@ class ChartDataExtractor:
         
         return groups
     
+    def _get_usl_overlay(self, model_key: str, parallels: List) -> Dict:
+        """
+        生成叠加在柱状图上的USL拟合折线数据集，拟合结果与统计卡片相同
+        （StatisticsCalculator.calculate_scalability_models，每个 模型/数据集/max_tokens 一条，不含速率扫描和浸泡测试）
+        Args:
+            model_key: 拟合结果字段（qps_model 或 throughput_model）
+            parallels: 图表横轴的并发数标签
+        Returns:
+            Dict: 包含扩展后的横轴标签和折线数据集
+        """
+        fits = [item for item in StatisticsCalculator(self.data).calculate_scalability_models() if item[model_key]]
+        
+        # 预测峰值超出已测试范围时，追加到横轴以便显示
+        labels = list(parallels)
+        max_tested = max(labels) if labels else 0
+        labels.extend(sorted({item[model_key]['peak_parallel'] for item in fits
+                              if item[model_key]['peak_parallel'] and item[model_key]['peak_parallel'] > max_tested}))
+        
+        datasets = []
+        for i, item in enumerate(fits):
+            model = item[model_key]
+            color = self.USL_COLORS[i % len(self.USL_COLORS)]
+            datasets.append({
+                'type': 'line',
+                'label': (f'USL 拟合 ({item["model"]}, {item["dataset"]}, max_tokens {item["max_tokens"]}, '
+                          f'误差 {model["mape"]:.1f}%)'),
+                'data': [round(StatisticsCalculator.usl_predict(model, n), 4) for n in labels],
+                'borderColor': color,
+                'backgroundColor': color,
+                'borderDash': [6, 4],
+                'borderWidth': 2,
+                'pointRadius': 0,
+                'fill': False,
+                'tension': 0.3
+            })
+        
+        return {'labels': labels, 'datasets': datasets}
+    
+    def has_client_metrics(self) -> bool:
+        """数据中是否包含客户端资源监控汇总"""
+        return any(row.get('client_cpu_max_pct') for row in self.data)
+    
+    def get_client_chart_config(self) -> Dict:
+        """
+        获取客户端资源与吞吐对照图表配置（柱为吞吐，折线为客户端/整机CPU，红点为客户端饱和的运行）
+        Returns:
+            Dict: 客户端资源图表的配置对象
+        """
+        labels = [f"{row['test_name']}" for row in self.data]
+        saturated_colors = ['#dc3545' if row.get('client_saturated') else '#667eea' for row in self.data]
+        
+        datasets = [
+            {
+                'type': 'bar',
+                'label': 'Token 吞吐量',
+                'data': [row['output_token_throughput'] for row in self.data],
+                'backgroundColor': 'rgba(40, 167, 69, 0.5)',
+                'borderColor': '#28a745',
+                'borderWidth': 1,
+                'yAxisID': 'y'
+            },
+            {
+                'type': 'line',
+                'label': '客户端进程 CPU 平均 (% 单核)',
+                'data': [row.get('client_cpu_avg_pct', 0) for row in self.data],
+                'borderColor': '#667eea',
+                'backgroundColor': '#667eea',
+                'pointBackgroundColor': saturated_colors,
+                'pointBorderColor': saturated_colors,
+                'pointRadius': 5,
+                'fill': False,
+                'yAxisID': 'y1'
+            },
+            {
+                'type': 'line',
+                'label': '客户端整机 CPU 峰值 (%)',
+                'data': [row.get('client_host_cpu_max_pct', 0) for row in self.data],
+                'borderColor': '#ffc107',
+                'backgroundColor': '#ffc107',
+                'borderDash': [6, 4],
+                'pointRadius': 3,
+                'fill': False,
+                'yAxisID': 'y1'
+            }
+        ]
+        
+        return {
+            'type': 'bar',
+            'data': {
+                'labels': labels,
+                'datasets': datasets
+            },
+            'options': {
+                'responsive': True,
+                'maintainAspectRatio': False,
+                'plugins': {
+                    'legend': {'display': True},
+                    'tooltip': {
+                        'backgroundColor': 'rgba(0,0,0,0.8)',
+                        'padding': 12,
+                        'titleFont': {'size': 14},
+                        'bodyFont': {'size': 13}
+                    }
+                },
+                'scales': {
+                    'x': {
+                        'title': {
+                            'display': True,
+                            'text': '测试配置',
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'grid': {'display': False}
+                    },
+                    'y': {
+                        'title': {
+                            'display': True,
+                            'text': 'Tokens/秒',
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'beginAtZero': True
+                    },
+                    'y1': {
+                        'position': 'right',
+                        'title': {
+                            'display': True,
+                            'text': 'CPU (%)',
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'beginAtZero': True,
+                        'grid': {'drawOnChartArea': False}
+                    }
+                }
+            }
+        }
+    
+    def has_output_length_metrics(self) -> bool:
+        """数据中是否包含请求/实际输出长度对照（新版汇总脚本输出）"""
+        return any('output_exact_pct' in row for row in self.data)
+    
+    def get_output_length_chart_config(self) -> Dict:
+        """
+        获取请求与实际输出长度对照图表配置（柱为平均实际输出，折线为请求的最大令牌数及实际最小/最大值）
+        Returns:
+            Dict: 输出长度图表的配置对象
+        """
+        labels = [f"{row['test_name']}" for row in self.data]
+        fixed_colors = ['#28a745' if row.get('fixed_output') else '#667eea' for row in self.data]
+        
+        datasets = [
+            {
+                'type': 'bar',
+                'label': '平均实际输出 tokens (绿色为固定输出长度)',
+                'data': [row.get('output_tokens', 0) for row in self.data],
+                'backgroundColor': fixed_colors,
+                'borderWidth': 1
+            },
+            {
+                'type': 'line',
+                'label': '请求 max_tokens',
+                'data': [row.get('max_tokens', 0) for row in self.data],
+                'borderColor': '#ff6b6b',
+                'backgroundColor': '#ff6b6b',
+                'pointRadius': 4,
+                'fill': False
+            },
+            {
+                'type': 'line',
+                'label': '实际最小输出',
+                'data': [row.get('output_tokens_min', 0) for row in self.data],
+                'borderColor': '#adb5bd',
+                'backgroundColor': '#adb5bd',
+                'borderDash': [4, 4],
+                'pointRadius': 2,
+                'fill': False
+            },
+            {
+                'type': 'line',
+                'label': '实际最大输出',
+                'data': [row.get('output_tokens_max', 0) for row in self.data],
+                'borderColor': '#6c757d',
+                'backgroundColor': '#6c757d',
+                'borderDash': [4, 4],
+                'pointRadius': 2,
+                'fill': False
+            }
+        ]
+        
+        return {
+            'type': 'bar',
+            'data': {
+                'labels': labels,
+                'datasets': datasets
+            },
+            'options': {
+                'responsive': True,
+                'maintainAspectRatio': False,
+                'plugins': {
+                    'legend': {'display': True},
+                    'tooltip': {
+                        'backgroundColor': 'rgba(0,0,0,0.8)',
+                        'padding': 12,
+                        'titleFont': {'size': 14},
+                        'bodyFont': {'size': 13}
+                    }
+                },
+                'scales': {
+                    'x': {
+                        'title': {
+                            'display': True,
+                            'text': '测试配置',
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'grid': {'display': False}
+                    },
+                    'y': {
+                        'title': {
+                            'display': True,
+                            'text': '输出 tokens',
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'beginAtZero': True
+                    }
+                }
+            }
+        }
+    
+    def has_input_length_metrics(self) -> bool:
+        """数据中是否包含输入长度扫描（至少两个不同的合成数据集目标输入长度）"""
+        rows = [row for row in self.data if row.get('input_tokens_target') and not row.get('prefix_tokens')]
+        return len({row['input_tokens_target'] for row in rows}) > 1
+    
+    @staticmethod
+    def _ttft_seconds(row: Dict) -> float:
+        """平均TTFT（秒）：汇总CSV中 ttft 单位为秒，已是标准格式的数据只有 avg_ttft_ms"""
+        return row.get('ttft', row.get('avg_ttft_ms', 0) / 1000) or 0
+    
+    def _get_sweep_chart_config(self, rows: List[Dict], x_key: str, x_title: str, series_key, series_label,
+                                primary: Tuple, secondary: Tuple) -> Dict:
+        """
+        获取扫描类图表配置：横轴为扫描参数，每个系列两条折线（实线为主指标，虚线为右轴的次指标）
+        Args:
+            rows: 参与绘图的数据行
+            x_key: 横轴字段
+            x_title: 横轴标题
+            series_key: 数据行到系列键的函数
+            series_label: 系列键到图例文本的函数
+            primary: (指标名, 左轴标题, 数据行到数值的函数)
+            secondary: (指标名, 右轴标题, 数据行到数值的函数，返回None表示缺失)
+        Returns:
+            Dict: 图表配置对象
+        """
+        x_values = sorted({row[x_key] for row in rows})
+        series_keys = sorted({series_key(row) for row in rows})
+        palette = ['#667eea', '#ff6b6b', '#28a745', '#ffc107', '#17a2b8', '#6f42c1', '#fd7e14', '#20c997']
+        
+        datasets = []
+        for i, key in enumerate(series_keys):
+            color = palette[i % len(palette)]
+            points = {row[x_key]: row for row in rows if series_key(row) == key}
+            for (name, _, value), axis, dash, radius in [(primary, 'y', None, 4), (secondary, 'y1', [6, 4], 2)]:
+                dataset = {
+                    'label': f'{name} ({series_label(key)})',
+                    'data': [value(points[x]) if x in points else None for x in x_values],
+                    'borderColor': color,
+                    'backgroundColor': color,
+                    'pointRadius': radius,
+                    'fill': False,
+                    'spanGaps': True,
+                    'yAxisID': axis
+                }
+                if dash:
+                    dataset['borderDash'] = dash
+                datasets.append(dataset)
+        
+        return {
+            'type': 'line',
+            'data': {
+                'labels': x_values,
+                'datasets': datasets
+            },
+            'options': {
+                'responsive': True,
+                'maintainAspectRatio': False,
+                'plugins': {
+                    'legend': {'display': True},
+                    'tooltip': {
+                        'backgroundColor': 'rgba(0,0,0,0.8)',
+                        'padding': 12,
+                        'titleFont': {'size': 14},
+                        'bodyFont': {'size': 13}
+                    }
+                },
+                'scales': {
+                    'x': {
+                        'title': {
+                            'display': True,
+                            'text': x_title,
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'grid': {'display': False}
+                    },
+                    'y': {
+                        'type': 'linear',
+                        'position': 'left',
+                        'title': {
+                            'display': True,
+                            'text': primary[1],
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'beginAtZero': True
+                    },
+                    'y1': {
+                        'type': 'linear',
+                        'position': 'right',
+                        'title': {
+                            'display': True,
+                            'text': secondary[1],
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'beginAtZero': True,
+                        'grid': {'drawOnChartArea': False}
+                    }
+                }
+            }
+        }
+    
+    def get_input_length_chart_config(self) -> Dict:
+        """
+        获取输入长度扫描图表配置（每个并发数一条TTFT折线，虚线为预填充吞吐）
+        Returns:
+            Dict: 输入长度图表的配置对象
+        """
+        rows = [row for row in self.data if row.get('input_tokens_target') and not row.get('prefix_tokens')]
+        
+        def prefill(row: Dict) -> Optional[float]:
+            ttft = self._ttft_seconds(row)
+            return round(row.get('input_tokens', 0) / ttft, 1) if ttft else None
+        
+        return self._get_sweep_chart_config(
+            rows, 'input_tokens_target', '输入长度 (tokens)',
+            series_key=lambda row: row['parallel'],
+            series_label=lambda key: f'并发 {key}',
+            primary=('TTFT', 'TTFT (秒)', lambda row: round(self._ttft_seconds(row), 4)),
+            secondary=('预填充吞吐', '预填充吞吐 (tokens/s)', prefill)
+        )
+    
+    def has_prefix_share_metrics(self) -> bool:
+        """数据中是否包含前缀共享比例扫描（至少两个不同的共享比例）"""
+        return len({row.get('prefix_share_pct') for row in self.data if row.get('prefix_tokens')}) > 1
+    
+    def get_prefix_share_chart_config(self) -> Dict:
+        """
+        获取前缀共享比例图表配置（横轴为共享比例，每个 并发/前缀长度/输入长度 组合一条TTFT折线，虚线为输出吞吐）
+        Returns:
+            Dict: 前缀缓存图表的配置对象
+        """
+        rows = [row for row in self.data if row.get('prefix_tokens')]
+        return self._get_sweep_chart_config(
+            rows, 'prefix_share_pct', '使用公共前缀的请求比例 (%)',
+            series_key=lambda row: (row['parallel'], row['prefix_tokens'], row.get('prefix_count', 1),
+                                    row.get('input_tokens_target', 0)),
+            series_label=lambda key: f'并发 {key[0]}, 前缀 {key[1]}×{key[2]}, 输入 {key[3]}',
+            primary=('TTFT', 'TTFT (秒)', lambda row: round(self._ttft_seconds(row), 4)),
+            secondary=('输出吞吐', '输出吞吐 (tokens/s)', lambda row: row.get('output_token_throughput', 0))
+        )
+    
+    def has_image_size_metrics(self) -> bool:
+        """数据中是否包含多模态图片大小扫描（至少两个不同的平均视觉token数）"""
+        return len({row['image_tokens'] for row in self.data if row.get('image_tokens')}) > 1
+    
+    def get_image_size_chart_config(self) -> Dict:
+        """
+        获取图片大小图表配置（横轴为每请求估算的视觉token数，每个并发数一条TTFT折线，虚线为平均延迟）
+        Returns:
+            Dict: 图片大小图表的配置对象
+        """
+        rows = [row for row in self.data if row.get('image_tokens')]
+        return self._get_sweep_chart_config(
+            rows, 'image_tokens', '每请求视觉token数（估算）',
+            series_key=lambda row: row['parallel'],
+            series_label=lambda key: f'并发 {key}',
+            primary=('TTFT', 'TTFT (秒)', lambda row: round(self._ttft_seconds(row), 4)),
+            secondary=('平均延迟', '平均延迟 (秒)',
+                       lambda row: round(row.get('latency', row.get('avg_latency_ms', 0) / 1000) or 0, 4))
+        )
+    
+    def has_offered_load_metrics(self) -> bool:
+        """数据中是否包含开环速率扫描（至少两个不同的目标速率）"""
+        return len({row['target_rate'] for row in self.data if StatisticsCalculator.is_rate_step(row)}) > 1
+    
+    def get_offered_load_chart_config(self) -> Dict:
+        """
+        获取延迟-负载图表配置（横轴为目标请求速率，每个 模型/数据集/max_tokens/并发上限 一条P99延迟折线，虚线为完成速率，
+        灰色虚线为理想完成速率（等于目标），红叉标记饱和点）
+        Returns:
+            Dict: 延迟-负载图表的配置对象
+        """
+        rows = [row for row in self.data if StatisticsCalculator.is_rate_step(row)]
+        
+        def series_key(row: Dict) -> Tuple:
+            return (str(row.get('model') or ''), StatisticsCalculator.get_dataset_name(row),
+                    StatisticsCalculator.get_max_tokens(row), row['parallel'])
+        
+        def series_label(key: Tuple) -> str:
+            return f'{key[0]}, {key[1]}, max_tokens {key[2]}, 并发上限 {key[3]}'
+        
+        config = self._get_sweep_chart_config(
+            rows, 'target_rate', '目标请求速率 (req/s)',
+            series_key=series_key,
+            series_label=series_label,
+            primary=('P99 延迟', 'P99 延迟 (秒，含客户端排队)',
+                     lambda row: round(StatisticsCalculator.offered_load_p99(row), 4)),
+            secondary=('完成速率', '请求速率 (req/s)', lambda row: row.get('completed_rate') or None)
+        )
+        
+        x_values = config['data']['labels']
+        datasets = config['data']['datasets']
+        datasets.append({
+            'label': '理想完成速率（等于目标）',
+            'data': x_values,
+            'borderColor': '#adb5bd',
+            'backgroundColor': '#adb5bd',
+            'borderDash': [2, 2],
+            'pointRadius': 0,
+            'fill': False,
+            'yAxisID': 'y1'
+        })
+        for curve in StatisticsCalculator(self.data).calculate_offered_load_curves():
+            if curve['saturation_rate'] is None:
+                continue
+            p99 = {p['target_rate']: p['p99_latency'] for p in curve['points']}
+            datasets.append({
+                'label': f"饱和点 ({series_label((curve['model'], curve['dataset'], curve['max_tokens'], curve['parallel']))}: "
+                         f"{curve['saturation_rate']:g} req/s)",
+                'data': [round(p99[x], 4) if x == curve['saturation_rate'] else None for x in x_values],
+                'borderColor': '#dc3545',
+                'backgroundColor': '#dc3545',
+                'pointStyle': 'crossRot',
+                'pointRadius': 12,
+                'pointBorderWidth': 3,
+                'showLine': False,
+                'yAxisID': 'y'
+            })
+        return config
+    
+    def has_workload_mix_metrics(self) -> bool:
+        """数据中是否包含混合负载的分类统计"""
+        return any(StatisticsCalculator.get_row_classes(row) for row in self.data)
+    
+    def get_workload_mix_chart_config(self) -> Dict:
+        """
+        获取混合负载分类图表配置（柱为各类请求的平均TTFT，折线为各类请求的P99延迟，横轴为混合负载运行）
+        Returns:
+            Dict: 混合负载图表的配置对象
+        """
+        rows = [row for row in self.data if StatisticsCalculator.get_row_classes(row)]
+        class_names = []
+        for row in rows:
+            for name in StatisticsCalculator.get_row_classes(row):
+                if name not in class_names:
+                    class_names.append(name)
+        palette = ['#667eea', '#ff6b6b', '#28a745', '#ffc107', '#17a2b8', '#6f42c1', '#fd7e14', '#20c997']
+        
+        datasets = []
+        for i, name in enumerate(class_names):
+            color = palette[i % len(palette)]
+            datasets.append({
+                'type': 'bar',
+                'label': f'{name} 平均 TTFT (秒)',
+                'data': [row.get(f'class_{name}_ttft', 0) for row in rows],
+                'backgroundColor': color,
+                'borderWidth': 1,
+                'yAxisID': 'y'
+            })
+            datasets.append({
+                'type': 'line',
+                'label': f'{name} P99 延迟 (秒)',
+                'data': [row.get(f'class_{name}_p99_latency', 0) for row in rows],
+                'borderColor': color,
+                'backgroundColor': color,
+                'borderDash': [6, 4],
+                'pointRadius': 4,
+                'fill': False,
+                'yAxisID': 'y1'
+            })
+        
+        return {
+            'type': 'bar',
+            'data': {
+                'labels': [f"{row['test_name']}" for row in rows],
+                'datasets': datasets
+            },
+            'options': {
+                'responsive': True,
+                'maintainAspectRatio': False,
+                'plugins': {
+                    'legend': {'display': True},
+                    'tooltip': {
+                        'backgroundColor': 'rgba(0,0,0,0.8)',
+                        'padding': 12,
+                        'titleFont': {'size': 14},
+                        'bodyFont': {'size': 13}
+                    }
+                },
+                'scales': {
+                    'x': {
+                        'title': {
+                            'display': True,
+                            'text': '测试配置',
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'grid': {'display': False}
+                    },
+                    'y': {
+                        'type': 'linear',
+                        'position': 'left',
+                        'title': {
+                            'display': True,
+                            'text': '平均 TTFT (秒)',
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'beginAtZero': True
+                    },
+                    'y1': {
+                        'type': 'linear',
+                        'position': 'right',
+                        'title': {
+                            'display': True,
+                            'text': 'P99 延迟 (秒)',
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'beginAtZero': True,
+                        'grid': {'drawOnChartArea': False}
+                    }
+                }
+            }
+        }
+    
+    def has_endpoint_metrics(self) -> bool:
+        """数据中是否包含多端点运行的按端点统计"""
+        return any(StatisticsCalculator.get_row_endpoints(row) for row in self.data)
+    
+    def get_endpoint_chart_config(self) -> Dict:
+        """
+        获取多端点图表配置（柱为各端点的输出吞吐，按运行堆叠为整体吞吐；折线为各端点的P99延迟）
+        Returns:
+            Dict: 多端点图表的配置对象
+        """
+        rows = sorted((row for row in self.data if StatisticsCalculator.get_row_endpoints(row)),
+                      key=lambda r: (r.get('parallel', 0), r.get('test_name', '')))
+        endpoint_names = []
+        for row in rows:
+            for name in StatisticsCalculator.get_row_endpoints(row):
+                if name not in endpoint_names:
+                    endpoint_names.append(name)
+        palette = ['#667eea', '#ff6b6b', '#28a745', '#ffc107', '#17a2b8', '#6f42c1', '#fd7e14', '#20c997']
+        
+        datasets = []
+        for i, name in enumerate(endpoint_names):
+            color = palette[i % len(palette)]
+            datasets.append({
+                'type': 'bar',
+                'label': f'{name} 输出吞吐 (tok/s)',
+                'data': [row.get(f'ep_{name}_output_throughput', 0) for row in rows],
+                'backgroundColor': color,
+                'borderWidth': 1,
+                'stack': 'throughput',
+                'yAxisID': 'y'
+            })
+            datasets.append({
+                'type': 'line',
+                'label': f'{name} P99 延迟 (秒)',
+                'data': [row.get(f'ep_{name}_p99_latency') or None for row in rows],
+                'borderColor': color,
+                'backgroundColor': color,
+                'borderDash': [6, 4],
+                'pointRadius': 4,
+                'fill': False,
+                'yAxisID': 'y1'
+            })
+        
+        return {
+            'type': 'bar',
+            'data': {
+                'labels': [f"{row['test_name']} ({row['balance']})" if row.get('balance') else row['test_name']
+                           for row in rows],
+                'datasets': datasets
+            },
+            'options': {
+                'responsive': True,
+                'maintainAspectRatio': False,
+                'plugins': {
+                    'legend': {'display': True},
+                    'tooltip': {
+                        'backgroundColor': 'rgba(0,0,0,0.8)',
+                        'padding': 12,
+                        'titleFont': {'size': 14},
+                        'bodyFont': {'size': 13}
+                    }
+                },
+                'scales': {
+                    'x': {
+                        'stacked': True,
+                        'title': {
+                            'display': True,
+                            'text': '测试配置（负载均衡策略）',
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'grid': {'display': False}
+                    },
+                    'y': {
+                        'type': 'linear',
+                        'position': 'left',
+                        'stacked': True,
+                        'title': {
+                            'display': True,
+                            'text': '输出吞吐 (tokens/s)',
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'beginAtZero': True
+                    },
+                    'y1': {
+                        'type': 'linear',
+                        'position': 'right',
+                        'title': {
+                            'display': True,
+                            'text': 'P99 延迟 (秒)',
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'beginAtZero': True,
+                        'grid': {'drawOnChartArea': False}
+                    }
+                }
+            }
+        }
+    
+    def has_multi_turn_metrics(self) -> bool:
+        """数据中是否包含多轮会话的按轮次统计"""
+        return any(StatisticsCalculator.get_row_turns(row) for row in self.data)
+    
+    def get_multi_turn_chart_config(self) -> Dict:
+        """
+        获取多轮会话图表配置（横轴为轮次，实线为每个运行各轮的平均TTFT，虚线为各轮的平均累积上下文长度）
+        Returns:
+            Dict: 多轮会话图表的配置对象
+        """
+        rows = [row for row in self.data if StatisticsCalculator.get_row_turns(row)]
+        turns = sorted({turn for row in rows for turn in StatisticsCalculator.get_row_turns(row)})
+        palette = ['#667eea', '#ff6b6b', '#28a745', '#ffc107', '#17a2b8', '#6f42c1', '#fd7e14', '#20c997']
+        
+        datasets = []
+        for i, row in enumerate(rows):
+            color = palette[i % len(palette)]
+            datasets.append({
+                'label': f"{row['test_name']} TTFT (秒)",
+                'data': [row.get(f'turn{turn}_ttft') if row.get(f'turn{turn}_requests') else None for turn in turns],
+                'borderColor': color,
+                'backgroundColor': color,
+                'pointRadius': 4,
+                'fill': False,
+                'yAxisID': 'y'
+            })
+            datasets.append({
+                'label': f"{row['test_name']} 上下文 (tokens)",
+                'data': [row.get(f'turn{turn}_context_tokens') if row.get(f'turn{turn}_requests') else None
+                         for turn in turns],
+                'borderColor': color,
+                'backgroundColor': color,
+                'borderDash': [6, 4],
+                'pointRadius': 3,
+                'fill': False,
+                'yAxisID': 'y1'
+            })
+        
+        return {
+            'type': 'line',
+            'data': {
+                'labels': [f'第{turn}轮' for turn in turns],
+                'datasets': datasets
+            },
+            'options': {
+                'responsive': True,
+                'maintainAspectRatio': False,
+                'spanGaps': True,
+                'plugins': {
+                    'legend': {'display': True},
+                    'tooltip': {
+                        'backgroundColor': 'rgba(0,0,0,0.8)',
+                        'padding': 12,
+                        'titleFont': {'size': 14},
+                        'bodyFont': {'size': 13}
+                    }
+                },
+                'scales': {
+                    'x': {
+                        'title': {
+                            'display': True,
+                            'text': '会话轮次',
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'grid': {'display': False}
+                    },
+                    'y': {
+                        'type': 'linear',
+                        'position': 'left',
+                        'title': {
+                            'display': True,
+                            'text': '平均 TTFT (秒)',
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'beginAtZero': True
+                    },
+                    'y1': {
+                        'type': 'linear',
+                        'position': 'right',
+                        'title': {
+                            'display': True,
+                            'text': '平均累积上下文 (tokens)',
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'beginAtZero': True,
+                        'grid': {'drawOnChartArea': False}
+                    }
+                }
+            }
+        }
+    
+    def has_coordinated_omission_metrics(self) -> bool:
+        """数据中是否包含协调遗漏校正后的延迟百分位"""
+        return any(row.get('99p_latency_co_') for row in self.data)
+    
+    def get_coordinated_omission_chart_config(self) -> Dict:
+        """
+        获取协调遗漏校正图表配置（每个运行一组柱：原始 P99 延迟与校正后的 P99 延迟）
+        Returns:
+            Dict: 协调遗漏校正图表的配置对象
+        """
+        rows = sorted((row for row in self.data if row.get('99p_latency_co_')),
+                      key=lambda r: (r.get('parallel', 0), r.get('test_name', '')))
+        series = [
+            ('P99 延迟（原始）', lambda row: row.get('99p_latency_', row.get('p99_latency_ms', 0)), '#667eea'),
+            ('P99 延迟（协调遗漏校正）', lambda row: row.get('99p_latency_co_'), '#ff6b6b')
+        ]
+        if any(row.get('99p_ttft_co_') for row in rows):
+            series.append(('P99 TTFT（协调遗漏校正）', lambda row: row.get('99p_ttft_co_') or None, '#ffc107'))
+        
+        datasets = [{
+            'label': label,
+            'data': [value(row) for row in rows],
+            'backgroundColor': color.replace('#', 'rgba(').replace(')', ', 0.8)'),
+            'borderColor': color,
+            'borderWidth': 2,
+            'borderRadius': 6
+        } for label, value, color in series]
+        
+        return {
+            'type': 'bar',
+            'data': {
+                'labels': [row['test_name'] for row in rows],
+                'datasets': datasets
+            },
+            'options': {
+                'responsive': True,
+                'maintainAspectRatio': False,
+                'plugins': {
+                    'legend': {'display': True},
+                    'tooltip': {
+                        'backgroundColor': 'rgba(0,0,0,0.8)',
+                        'padding': 12,
+                        'titleFont': {'size': 14},
+                        'bodyFont': {'size': 13}
+                    }
+                },
+                'scales': {
+                    'x': {
+                        'title': {
+                            'display': True,
+                            'text': '测试运行',
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'grid': {'display': False}
+                    },
+                    'y': {
+                        'title': {
+                            'display': True,
+                            'text': 'P99 (秒)',
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'beginAtZero': True
+                    }
+                }
+            }
+        }
+    
+    def has_connection_metrics(self) -> bool:
+        """数据中是否包含原生驱动记录的连接阶段耗时"""
+        return any(row.get('conn_ttfb_ms') for row in self.data)
+    
+    def get_connection_chart_config(self) -> Dict:
+        """
+        获取连接阶段耗时图表配置（每个运行两根堆叠柱：新建连接的建连耗时、每个请求的收发耗时；
+        标签带 HTTP 版本，便于对比 HTTP/1.1 keep-alive 与 HTTP/2 多路复用）
+        Returns:
+            Dict: 连接阶段图表的配置对象
+        """
+        rows = sorted((row for row in self.data if row.get('conn_ttfb_ms')),
+                      key=lambda r: (r.get('parallel', 0), r.get('test_name', '')))
+        phases = [
+            ('DNS 解析', 'conn_dns_ms', '#9e9e9e', 'connect'),
+            ('TCP 连接', 'conn_connect_ms', '#764ba2', 'connect'),
+            ('TLS 握手', 'conn_tls_ms', '#ff6b6b', 'connect'),
+            ('请求发送', 'conn_send_ms', '#ffc107', 'request'),
+            ('首字节', 'conn_ttfb_ms', '#667eea', 'request'),
+            ('响应头', 'conn_headers_ms', '#4bc0c0', 'request'),
+            ('响应体传输', 'conn_body_ms', '#36a2eb', 'request')
+        ]
+        
+        datasets = [{
+            'label': label,
+            'data': [row.get(key, 0) for row in rows],
+            'stack': stack,
+            'backgroundColor': color.replace('#', 'rgba(').replace(')', ', 0.8)'),
+            'borderColor': color,
+            'borderWidth': 1
+        } for label, key, color, stack in phases]
+        
+        labels = []
+        for row in rows:
+            label = row['test_name']
+            if row.get('http_version'):
+                label += f" ({row['http_version']})"
+            labels.append(f"{label} 复用率{row.get('conn_reuse_pct', 0):.0f}%")
+        
+        return {
+            'type': 'bar',
+            'data': {
+                'labels': labels,
+                'datasets': datasets
+            },
+            'options': {
+                'responsive': True,
+                'maintainAspectRatio': False,
+                'plugins': {
+                    'legend': {'display': True},
+                    'tooltip': {
+                        'backgroundColor': 'rgba(0,0,0,0.8)',
+                        'padding': 12,
+                        'titleFont': {'size': 14},
+                        'bodyFont': {'size': 13}
+                    }
+                },
+                'scales': {
+                    'x': {
+                        'stacked': True,
+                        'title': {
+                            'display': True,
+                            'text': '测试运行（左柱：新建连接的建连耗时，右柱：每个请求的收发耗时）',
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'grid': {'display': False}
+                    },
+                    'y': {
+                        'stacked': True,
+                        'title': {
+                            'display': True,
+                            'text': '平均耗时 (毫秒)',
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'beginAtZero': True
+                    }
+                }
+            }
+        }
+    
+    def has_server_metrics(self) -> bool:
+        """数据中是否包含服务端引擎指标汇总"""
+        return any(row.get('server_running_max') or row.get('server_kv_cache_max_pct') for row in self.data)
+    
+    def get_server_chart_config(self) -> Dict:
+        """
+        获取服务端引擎状态图表配置（柱为排队/运行请求数，折线为KV Cache使用率峰值和P99延迟）
+        Returns:
+            Dict: 服务端指标图表的配置对象
+        """
+        labels = [f"{row['test_name']}" for row in self.data]
+        
+        datasets = [
+            {
+                'type': 'bar',
+                'label': '平均排队请求数',
+                'data': [row.get('server_waiting_avg', 0) for row in self.data],
+                'backgroundColor': 'rgba(255, 107, 107, 0.6)',
+                'borderColor': '#ff6b6b',
+                'borderWidth': 1,
+                'yAxisID': 'y'
+            },
+            {
+                'type': 'bar',
+                'label': '平均运行请求数 (批大小)',
+                'data': [row.get('server_running_avg', 0) for row in self.data],
+                'backgroundColor': 'rgba(102, 126, 234, 0.6)',
+                'borderColor': '#667eea',
+                'borderWidth': 1,
+                'yAxisID': 'y'
+            },
+            {
+                'type': 'line',
+                'label': 'KV Cache 使用率峰值 (%)',
+                'data': [row.get('server_kv_cache_max_pct', 0) for row in self.data],
+                'borderColor': '#ffc107',
+                'backgroundColor': '#ffc107',
+                'pointRadius': 4,
+                'fill': False,
+                'yAxisID': 'y1'
+            }
+        ]
+        
+        return {
+            'type': 'bar',
+            'data': {
+                'labels': labels,
+                'datasets': datasets
+            },
+            'options': {
+                'responsive': True,
+                'maintainAspectRatio': False,
+                'plugins': {
+                    'legend': {'display': True},
+                    'tooltip': {
+                        'backgroundColor': 'rgba(0,0,0,0.8)',
+                        'padding': 12,
+                        'titleFont': {'size': 14},
+                        'bodyFont': {'size': 13}
+                    }
+                },
+                'scales': {
+                    'x': {
+                        'title': {
+                            'display': True,
+                            'text': '测试配置',
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'grid': {'display': False}
+                    },
+                    'y': {
+                        'title': {
+                            'display': True,
+                            'text': '请求数',
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'beginAtZero': True
+                    },
+                    'y1': {
+                        'position': 'right',
+                        'title': {
+                            'display': True,
+                            'text': 'KV Cache (%)',
+                            'font': {'size': 14, 'weight': 'bold'}
+                        },
+                        'beginAtZero': True,
+                        'max': 100,
+                        'grid': {'drawOnChartArea': False}
+                    }
+                }
+            }
+        }
+    
     def extract_basic_chart_data(self) -> Dict[str, List]:
         """
         提取基础图表数据
@@ -118,10 +1089,14 @@ class ChartDataExtractor:
                 'borderRadius': 6
             })
         
+        # 叠加USL拟合曲线
+        overlay = self._get_usl_overlay('qps_model', parallels)
+        datasets.extend(overlay['datasets'])
+        
         return {
             'type': 'bar',
             'data': {
-                'labels': parallels,
+                'labels': overlay['labels'],
                 'datasets': datasets
             },
             'options': {
@@ -188,10 +1163,14 @@ class ChartDataExtractor:
                 'borderRadius': 6
             })
         
+        # 叠加USL拟合曲线
+        overlay = self._get_usl_overlay('throughput_model', parallels)
+        datasets.extend(overlay['datasets'])
+        
         return {
             'type': 'bar',
             'data': {
-                'labels': parallels,
+                'labels': overlay['labels'],
                 'datasets': datasets
             },
             'options': {
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+运行结果对比与回归检测模块
+Author: AI Assistant
+Date: 2024
+"""
+
+import json
+import math
+import random
+import sqlite3
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+from visualize.statistics import StatisticsCalculator
+from visualize.templates import HTMLTemplates
+
+
+class RunComparator:
+    """基线与候选结果集对比器"""
+    
+    # 对比指标: (字段名, 显示名, 是否越大越好)
+    METRICS = [
+        ('output_token_throughput', '输出吞吐 (tok/s)', True),
+        ('qps', 'QPS', True),
+        ('avg_latency_ms', '平均延迟', False),
+        ('p99_latency_ms', 'P99延迟', False),
+        ('avg_ttft_ms', 'TTFT', False)
+    ]
+    
+    # 可从单请求样本自助法估计置信区间的指标
+    SAMPLE_METRICS = {
+        'output_token_throughput': 'throughput',
+        'avg_latency_ms': 'latency_mean',
+        'p99_latency_ms': 'latency_p99',
+        'avg_ttft_ms': 'ttft_mean'
+    }
+    
+    # 自助法单侧最多使用的请求样本数
+    MAX_BOOTSTRAP_SAMPLES = 2000
+    
+    # 对齐键的字段（请求数不参与对齐）：汇总CSV按 (配置, 模型) 各一行，不同模型分别对比；
+    # 开环速率扫描的各步并发上限相同，按目标速率和时长区分
+    CONFIG_KEY_FIELDS = ('model', 'parallel', 'dataset', 'max_tokens', 'target_rate', 'duration')
+    
+    def __init__(self, baseline_data: List[Dict], candidate_data: List[Dict],
+                 threshold_pct: float = 5.0, confidence: float = 0.95,
+                 n_bootstrap: int = 1000, seed: int = 0):
+        self.baseline_data = baseline_data
+        self.candidate_data = candidate_data
+        self.threshold_pct = threshold_pct
+        self.confidence = confidence
+        self.n_bootstrap = n_bootstrap
+        self.rng = random.Random(seed)
+        self._sample_cache: Dict[str, Optional[Dict]] = {}
+    
+    @staticmethod
+    def _mean(values: List[float]) -> float:
+        """计算平均值"""
+        return sum(values) / len(values) if values else 0.0
+    
+    @classmethod
+    def _variance(cls, values: List[float]) -> float:
+        """计算样本方差"""
+        mean = cls._mean(values)
+        return sum((v - mean) ** 2 for v in values) / (len(values) - 1)
+    
+    @staticmethod
+    def _z_value(confidence: float) -> float:
+        """双侧置信度对应的标准正态分位数（二分求解 erf 反函数）"""
+        low, high = 0.0, 10.0
+        for _ in range(60):
+            mid = (low + high) / 2
+            if math.erf(mid / math.sqrt(2)) < confidence:
+                low = mid
+            else:
+                high = mid
+        return (low + high) / 2
+    
+    @staticmethod
+    def get_config_key(row: Dict) -> Tuple:
+        """获取对齐键: (模型, 并发数, 数据集, 最大令牌数, 目标速率, 时长)，闭环运行的目标速率和时长为0"""
+        return (str(row.get('model') or ''), row.get('parallel'), StatisticsCalculator.get_dataset_name(row),
+                row.get('max_tokens'), row.get('target_rate') or 0, row.get('duration') or 0)
+    
+    def _group_by_config(self, data: List[Dict]) -> Dict[Tuple, List[Dict]]:
+        """按对齐键分组"""
+        groups: Dict[Tuple, List[Dict]] = {}
+        for row in data:
+            groups.setdefault(self.get_config_key(row), []).append(row)
+        return groups
+    
+    def _load_request_samples(self, rows: List[Dict]) -> Optional[Dict]:
+        """
+        从 benchmark_data.db 读取单请求样本（需要CSV包含 result_dir 列）
+        Args:
+            rows: 同一配置的运行记录
+        Returns:
+            Optional[Dict]: 延迟、TTFT、输出token数及测试时长，无样本时返回None
+        """
+        samples = {'latency': [], 'ttft': [], 'tokens': [], 'duration': 0.0}
+        for row in rows:
+            result_dir = row.get('result_dir')
+            if not result_dir:
+                return None
+            if result_dir not in self._sample_cache:
+                self._sample_cache[result_dir] = self._read_db(Path(result_dir) / 'benchmark_data.db')
+            run_samples = self._sample_cache[result_dir]
+            if not run_samples:
+                return None
+            samples['latency'].extend(run_samples['latency'])
+            samples['ttft'].extend(run_samples['ttft'])
+            samples['tokens'].extend(run_samples['tokens'])
+            samples['duration'] += run_samples['duration']
+        return samples if samples['latency'] else None
+    
+    @staticmethod
+    def _read_db(db_file: Path) -> Optional[Dict]:
+        """读取单个运行的成功请求样本"""
+        if not db_file.exists():
+            return None
+        try:
+            conn = sqlite3.connect(str(db_file))
+            cursor = conn.cursor()
+            cursor.execute("SELECT latency, first_chunk_latency, completion_tokens, start_time, completed_time "
+                           "FROM result WHERE success = 1")
+            rows = cursor.fetchall()
+            conn.close()
+        except Exception as e:
+            print(f"[WARNING] 无法读取数据库 {db_file}: {e}")
+            return None
+        
+        if not rows:
+            return None
+        return {
+            'latency': [r[0] or 0 for r in rows],
+            'ttft': [r[1] or 0 for r in rows],
+            'tokens': [r[2] or 0 for r in rows],
+            'duration': max(r[4] or 0 for r in rows) - min(r[3] or 0 for r in rows)
+        }
+    
+    @staticmethod
+    def _sample_statistic(name: str, samples: Dict, indices: Optional[List[int]] = None) -> float:
+        """在（重采样后的）请求样本上计算统计量"""
+        def pick(values: List[float]) -> List[float]:
+            return values if indices is None else [values[i] for i in indices]
+        
+        if name == 'throughput':
+            # 测试时长固定，吞吐 = 总输出token数 / 时长（按样本比例缩放到全量请求数）
+            tokens = pick(samples['tokens'])
+            scale = len(samples['tokens']) / len(tokens) if tokens else 0
+            return sum(tokens) * scale / samples['duration'] if samples['duration'] > 0 else 0
+        if name == 'latency_mean':
+            values = pick(samples['latency'])
+            return sum(values) / len(values)
+        if name == 'ttft_mean':
+            values = pick(samples['ttft'])
+            return sum(values) / len(values)
+        values = sorted(pick(samples['latency']))
+        return values[min(len(values) - 1, int(len(values) * 0.99))]
+    
+    def _bootstrap_delta_ci(self, name: str, base: Dict, cand: Dict) -> Tuple[float, float]:
+        """自助法估计相对变化(%)的置信区间"""
+        def draw(samples: Dict) -> List[int]:
+            n = len(samples['latency'])
+            k = min(n, self.MAX_BOOTSTRAP_SAMPLES)
+            return self.rng.choices(range(n), k=k)
+        
+        deltas = []
+        for _ in range(self.n_bootstrap):
+            base_value = self._sample_statistic(name, base, draw(base))
+            cand_value = self._sample_statistic(name, cand, draw(cand))
+            if base_value:
+                deltas.append((cand_value - base_value) / base_value * 100)
+        deltas.sort()
+        if not deltas:
+            return 0.0, 0.0
+        alpha = (1 - self.confidence) / 2
+        low = deltas[int(alpha * (len(deltas) - 1))]
+        high = deltas[int((1 - alpha) * (len(deltas) - 1))]
+        return low, high
+    
+    def _runs_delta_ci(self, base_values: List[float], cand_values: List[float]) -> Optional[Tuple[float, float]]:
+        """基于多次运行间波动的正态近似置信区间（两侧均至少2次运行）"""
+        if len(base_values) < 2 or len(cand_values) < 2:
+            return None
+        base_mean = self._mean(base_values)
+        if not base_mean:
+            return None
+        z = self._z_value(self.confidence)
+        diff = self._mean(cand_values) - base_mean
+        stderr = (self._variance(base_values) / len(base_values)
+                  + self._variance(cand_values) / len(cand_values)) ** 0.5
+        return (diff - z * stderr) / base_mean * 100, (diff + z * stderr) / base_mean * 100
+    
+    def compare(self) -> Dict:
+        """
+        执行对比
+        Returns:
+            Dict: 机器可读的对比结论（verdict、逐项对比、未匹配配置）
+        """
+        base_groups = self._group_by_config(self.baseline_data)
+        cand_groups = self._group_by_config(self.candidate_data)
+        matched = sorted(set(base_groups) & set(cand_groups), key=lambda k: (k[0], str(k[2]), k[1] or 0, str(k[3:])))
+        
+        comparisons = []
+        for key in matched:
+            base_rows, cand_rows = base_groups[key], cand_groups[key]
+            base_samples = self._load_request_samples(base_rows)
+            cand_samples = self._load_request_samples(cand_rows)
+            
+            for field, label, higher_is_better in self.METRICS:
+                base_values = [row[field] for row in base_rows]
+                cand_values = [row[field] for row in cand_rows]
+                base_mean = self._mean(base_values)
+                cand_mean = self._mean(cand_values)
+                delta_pct = (cand_mean - base_mean) / base_mean * 100 if base_mean else 0.0
+                
+                ci, method = None, 'threshold'
+                if field in self.SAMPLE_METRICS and base_samples and cand_samples:
+                    # 点估计与置信区间均基于同一组请求样本，保证口径一致
+                    name = self.SAMPLE_METRICS[field]
+                    base_stat = self._sample_statistic(name, base_samples)
+                    if base_stat:
+                        delta_pct = (self._sample_statistic(name, cand_samples) - base_stat) / base_stat * 100
+                    ci, method = self._bootstrap_delta_ci(name, base_samples, cand_samples), 'bootstrap'
+                else:
+                    ci = self._runs_delta_ci(base_values, cand_values)
+                    if ci:
+                        method = 'runs'
+                
+                # 置信区间不含0时视为显著；无置信区间时只按阈值判断
+                significant = (ci[0] > 0 or ci[1] < 0) if ci else True
+                worse = delta_pct < 0 if higher_is_better else delta_pct > 0
+                exceeds = abs(delta_pct) >= self.threshold_pct
+                
+                comparisons.append({
+                    **dict(zip(self.CONFIG_KEY_FIELDS, key)),
+                    'metric': field,
+                    'label': label,
+                    'baseline': base_mean,
+                    'candidate': cand_mean,
+                    'delta_pct': delta_pct,
+                    'ci_low': ci[0] if ci else None,
+                    'ci_high': ci[1] if ci else None,
+                    'method': method,
+                    'significant': significant,
+                    'regression': worse and exceeds and significant,
+                    'improvement': not worse and exceeds and significant
+                })
+        
+        regressions = [c for c in comparisons if c['regression']]
+        return {
+            'verdict': 'regression' if regressions else 'pass',
+            'threshold_pct': self.threshold_pct,
+            'confidence': self.confidence,
+            'matched_configs': len(matched),
+            'regression_count': len(regressions),
+            'improvement_count': sum(1 for c in comparisons if c['improvement']),
+            'unmatched_baseline': [list(k) for k in sorted(set(base_groups) - set(cand_groups), key=str)],
+            'unmatched_candidate': [list(k) for k in sorted(set(cand_groups) - set(base_groups), key=str)],
+            'comparisons': comparisons
+        }
+    
+    @staticmethod
+    def write_verdict(result: Dict, verdict_file: Path) -> None:
+        """写入机器可读的对比结论"""
+        with open(verdict_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"[INFO] 对比结论已写入: {verdict_file}")
+    
+    @staticmethod
+    def write_html(result: Dict, output_file: Path, baseline_name: str, candidate_name: str) -> None:
+        """生成HTML对比报告"""
+        html_parts = [
+            HTMLTemplates.get_header(f"对比: {baseline_name} → {candidate_name}"),
+            HTMLTemplates.get_comparison_section(result),
+            HTMLTemplates.get_footer(f"{baseline_name} vs {candidate_name}"),
+            HTMLTemplates.get_document_end()
+        ]
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(html_parts))
+        print(f"[INFO] 对比报告已生成: {output_file}")
@@ -7,16 +7,18 @@ Date: 2024
 
 import csv
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
+from evalperf.profiler import StageProfiler
 
 
 class DataLoader:
     """性能测试数据加载器"""
     
-    def __init__(self, csv_file: str):
+    def __init__(self, csv_file: str, profiler: Optional[StageProfiler] = None):
         self.csv_file = Path(csv_file)
         self.data: List[Dict] = []
-        
+        self.profiler = profiler or StageProfiler(enabled=False)
+    
     def load_data(self) -> bool:
         """
         加载 CSV 数据
@@ -30,28 +32,31 @@ class DataLoader:
             return False
         
         try:
-            with open(self.csv_file, 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                self.data = list(reader)
+            with self.profiler.stage('load_csv', 'io', file=self.csv_file.name) as span:
+                with open(self.csv_file, 'r', encoding='utf-8-sig') as f:
+                    reader = csv.DictReader(f)
+                    self.data = list(reader)
+                span.add(files_read=1, bytes_read=self.csv_file.stat().st_size, rows=len(self.data))
         except Exception as e:
             print(f"[ERROR] 读取文件失败: {e}")
             return False
         
-        # 转换数值类型
-        for row in self.data:
-            for key in row:
-                if key in ['test_name', 'prompt_type', 'test_time', 'config', 'model', 'timestamp']:
-                    continue
-                try:
-                    if '.' in str(row[key]):
-                        row[key] = float(row[key])
-                    else:
-                        row[key] = int(row[key])
-                except (ValueError, KeyError):
-                    pass
-        
-        # 适配数据格式
-        self._adapt_data_format()
+        with self.profiler.stage('convert_types', rows=len(self.data)):
+            # 转换数值类型
+            for row in self.data:
+                for key in row:
+                    if key in ['test_name', 'prompt_type', 'test_time', 'config', 'model', 'timestamp', 'result_dir', 'workload', 'image_resolution', 'window', 'http_version', 'balance']:
+                        continue
+                    try:
+                        if '.' in str(row[key]):
+                            row[key] = float(row[key])
+                        else:
+                            row[key] = int(row[key])
+                    except (ValueError, KeyError):
+                        pass
+            
+            # 适配数据格式
+            self._adapt_data_format()
         
         print(f"[INFO] 已加载 {len(self.data)} 条记录")
         return len(self.data) > 0
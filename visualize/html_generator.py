@@ -6,45 +6,96 @@ Date: 2024
 """
 
 import json
+import re
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from visualize.templates import HTMLTemplates
 from visualize.statistics import StatisticsCalculator
 from visualize.chart_data import ChartDataExtractor
+from visualize.report_cache import ReportCache
+from evalperf.profiler import StageProfiler
 
 
 class HTMLGenerator:
     """HTML报告生成器"""
     
-    def __init__(self, data: List[Dict], output_file: str, file_name: str):
+    # 各图表依赖的数据字段，用于计算缓存键
+    CHART_FIELDS = {
+        # 柱状图叠加按 模型/数据集/max_tokens 拟合的USL曲线（不含速率扫描和浸泡测试）
+        'qps': ['qps', 'model', 'max_tokens', 'latency', 'avg_latency_ms', 'output_token_throughput',
+                'target_rate', 'duration', 'soak_windows'],
+        'throughput': ['output_token_throughput', 'model', 'max_tokens', 'latency', 'avg_latency_ms', 'qps',
+                       'target_rate', 'duration', 'soak_windows'],
+        'latency': ['p95_latency_ms'],
+        'ttft': ['avg_ttft_ms'],
+        'success': ['success_rate', 'error_rate'],
+        'client': ['output_token_throughput', 'client_cpu_avg_pct', 'client_host_cpu_max_pct', 'client_saturated'],
+        'output_length': ['output_tokens', 'max_tokens', 'output_tokens_min', 'output_tokens_max', 'fixed_output'],
+        'input_length': ['input_tokens_target', 'input_tokens', 'ttft', 'avg_ttft_ms', 'prefix_tokens'],
+        'prefix_share': ['prefix_tokens', 'prefix_share_pct', 'prefix_count', 'input_tokens_target',
+                         'ttft', 'avg_ttft_ms', 'output_token_throughput'],
+        'image_size': ['image_tokens', 'ttft', 'avg_ttft_ms', 'latency', 'avg_latency_ms'],
+        'offered_load': ['model', 'test_name', 'parallel', 'target_rate', 'duration', 'completed_rate',
+                         'p50_latency_ms', 'p99_latency_ms', '99p_latency_co_'],
+        'workload_mix': [],  # 分类列名随负载定义变化，按数据动态确定
+        'endpoints': [],  # 端点列名随端点地址变化，按数据动态确定
+        'multi_turn': [],  # 轮次列随会话轮数变化，按数据动态确定
+        'coordinated_omission': ['99p_latency_', '99p_latency_co_', '99p_ttft_co_', 'p99_latency_ms'],
+        'connection_phases': [],  # conn_ 列，按数据动态确定
+        'server': ['server_waiting_avg', 'server_running_avg', 'server_running_max', 'server_kv_cache_max_pct']
+    }
+    
+    # 列名随数据变化的图表: 名称 -> 依赖列的前缀
+    CHART_FIELD_PREFIXES = {
+        'workload_mix': 'class_',
+        'endpoints': ('ep_', 'balance'),
+        'multi_turn': 'turn',
+        'connection_phases': ('conn_', 'http_version')
+    }
+    
+    TABLE_FIELDS = [
+        'num_requests', 'qps', 'output_token_throughput', 'avg_latency_ms',
+        'p95_latency_ms', 'p99_latency_ms', 'avg_ttft_ms', 'success_rate', 'error_rate'
+    ]
+    
+    def __init__(self, data: List[Dict], output_file: str, file_name: str,
+                 cache_dir: Optional[str] = None, use_cache: bool = True,
+                 split_by: Optional[str] = None, slo_p99_latency: Optional[float] = None,
+                 profiler: Optional[StageProfiler] = None):
         self.data = data
         self.output_file = Path(output_file)
         self.file_name = file_name
+        self.split_by = split_by
+        self.slo_p99_latency = slo_p99_latency
+        self.pages: List[Path] = []
+        self.profiler = profiler or StageProfiler(enabled=False)
         
         # 初始化组件
-        self.stats_calculator = StatisticsCalculator(data)
+        self.stats_calculator = StatisticsCalculator(data, slo_p99_latency)
         self.chart_data_extractor = ChartDataExtractor(data)
+        self.cache = ReportCache(cache_dir or self.output_file.parent / '.report_cache',
+                                 enabled=use_cache)
     
     def generate_html_report(self) -> Path:
         """
         生成完整的HTML报告
         Returns:
-n            Path: 生成的HTML文件路径
+            Path: 生成的HTML文件路径（多页模式下为索引页）
         """
         print(f"[INFO] 生成 HTML 报告: {self.output_file}")
         
-        # 获取统计信息
-        stats = self.stats_calculator.calculate_basic_stats()
+        if self.split_by:
+            self._generate_multi_page_report()
+        else:
+            html_content, digest = self._render_report_page(self.chart_data_extractor)
+            self._write_page(self.output_file, html_content, digest)
         
-        # 获取图表配置
-        chart_configs = self._get_chart_configurations()
+        self.cache.save(self.output_file)
         
-        # 构建HTML内容
-        html_content = self._build_html_content(stats, chart_configs)
-        
-        # 写入文件
-        with open(self.output_file, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        cache_stats = self.cache.get_stats()
+        if self.cache.enabled:
+            print(f"[INFO] 缓存命中: {cache_stats['hits']}, 重新构建: {cache_stats['misses']}, "
+                  f"清理过期片段: {cache_stats['evicted']}")
         
         # 计算文件大小
         file_size = self.output_file.stat().st_size / 1024
@@ -53,39 +104,214 @@ n            Path: 生成的HTML文件路径
         
         return self.output_file
     
-    def _get_chart_configurations(self) -> Dict:
+    def _generate_multi_page_report(self) -> None:
+        """按模型或数据集拆分为多个页面，并生成索引页"""
+        pages_dir = self.output_file.parent / f"{self.output_file.stem}_pages"
+        pages_dir.mkdir(parents=True, exist_ok=True)
+        
+        index_entries = []
+        for group_name, group_data in self._group_data().items():
+            page_file = pages_dir / f"{self._slugify(group_name)}.html"
+            extractor = ChartDataExtractor(group_data)
+            nav_html = HTMLTemplates.get_nav_link(f"../{self.output_file.name}", '← 返回索引')
+            html_content, digest = self._render_report_page(extractor, title=group_name, nav_html=nav_html)
+            self._write_page(page_file, html_content, digest)
+            
+            stats = self._get_cached_stats(extractor.data)
+            index_entries.append({
+                'name': group_name,
+                'href': f"{pages_dir.name}/{page_file.name}",
+                'record_count': len(group_data),
+                'max_qps': stats.get('max_qps', 0),
+                'max_throughput': stats.get('max_throughput', 0)
+            })
+        
+        index_html = '\n'.join([
+            HTMLTemplates.get_header(),
+            HTMLTemplates.get_index_section(index_entries, self._get_split_label()),
+            HTMLTemplates.get_footer(self.file_name),
+            HTMLTemplates.get_document_end()
+        ])
+        digest = ReportCache.compute_digest([json.dumps(index_entries, sort_keys=True), self.file_name])
+        self._write_page(self.output_file, index_html, digest)
+    
+    def _group_data(self) -> Dict[str, List[Dict]]:
+        """按拆分维度分组数据"""
+        groups: Dict[str, List[Dict]] = {}
+        for row in self.data:
+            if self.split_by == 'model':
+                key = str(row.get('model') or 'unknown')
+            else:
+                key = StatisticsCalculator.get_dataset_name(row)
+            groups.setdefault(key, []).append(row)
+        return dict(sorted(groups.items()))
+    
+    def _get_split_label(self) -> str:
+        """获取拆分维度的显示名称"""
+        return '模型' if self.split_by == 'model' else '数据集'
+    
+    @staticmethod
+    def _slugify(name: str) -> str:
+        """将分组名转换为安全的文件名"""
+        return re.sub(r'[^A-Za-z0-9._-]+', '_', name).strip('_') or 'unknown'
+    
+    def _write_page(self, page_file: Path, html_content: str, digest: str) -> None:
+        """
+        写入页面，内容未变化时跳过
+        Args:
+            page_file: 页面路径
+            html_content: 页面内容
+            digest: 页面摘要
+        """
+        if page_file not in self.pages:
+            self.pages.append(page_file)
+        
+        if self.cache.is_page_fresh(page_file, digest):
+            print(f"[INFO] 页面未变化，跳过写入: {page_file}")
+            return
+        
+        with self.profiler.stage('html_write', 'io', file=page_file.name) as span:
+            with open(page_file, 'w', encoding='utf-8') as f:
+                f.write(html_content)
+            span.add(files_written=1, bytes_written=len(html_content.encode('utf-8')))
+        self.cache.record_page(page_file, digest)
+    
+    @staticmethod
+    def _data_slice(data: List[Dict], fields: List[str]) -> List[List]:
+        """提取片段依赖的数据切片（测试名称、并发数以及指定字段）"""
+        return [[row.get('test_name'), row.get('parallel')] + [row.get(field) for field in fields]
+                for row in data]
+    
+    def _get_stats_key(self, data: List[Dict]) -> str:
         """
-        获取所有图表配置
+        计算统计信息的缓存键（完整数据行 + SLO）
+        统计信息读取的列很多（运行点、USL拟合、速率扫描、浸泡窗口、客户端饱和等），且随功能增加，
+        不维护字段清单，按整行计算，避免新增列后命中过期片段
+        """
+        payload = {'rows': data, 'slo_p99_latency': self.slo_p99_latency}
+        return self.cache.compute_key('stats', payload)
+    
+    def _get_cached_stats(self, data: List[Dict], key: Optional[str] = None) -> Dict:
+        """获取统计信息（带缓存，key 为已计算的缓存键）"""
+        with self.profiler.stage('statistics', rows=len(data)):
+            return self.cache.get_or_build(
+                key or self._get_stats_key(data),
+                lambda: StatisticsCalculator(data, self.slo_p99_latency).calculate_basic_stats()
+            )
+    
+    def _render_report_page(self, extractor: ChartDataExtractor, title: str = '',
+                            nav_html: str = '') -> Tuple[str, str]:
+        """
+        渲染单个报告页面
+        Args:
+            extractor: 页面数据对应的图表数据提取器
+            title: 页面副标题
+            nav_html: 导航链接HTML
         Returns:
-            Dict: 包含所有图表配置的字典
+            Tuple[str, str]: 页面内容和页面摘要
         """
-        # 提取基础数据
-        basic_data = self.chart_data_extractor.extract_basic_chart_data()
+        sorted_data = extractor.data
+        keys = [self.file_name, title, nav_html]
         
-        return {
-            'parallels': json.dumps(basic_data['parallels']),
-            'qps': json.dumps(self.chart_data_extractor.get_qps_chart_config()),
-            'throughput': json.dumps(self.chart_data_extractor.get_throughput_chart_config()),
-            'latency': json.dumps(self.chart_data_extractor.get_latency_chart_config()),
-            'ttft': json.dumps(self.chart_data_extractor.get_ttft_chart_config()),
-            'success': json.dumps(self.chart_data_extractor.get_success_chart_config())
+        # 获取统计信息
+        stats_key = self._get_stats_key(sorted_data)
+        stats = self._get_cached_stats(sorted_data, stats_key)
+        keys.append(stats_key)
+        
+        # 获取图表配置
+        chart_configs, chart_keys = self._get_chart_configurations(extractor)
+        keys.extend(chart_keys)
+        
+        # 数据表（使用已排序的数据）
+        with self.profiler.stage('table', rows=len(sorted_data)):
+            table_key = self.cache.compute_key('table', self._data_slice(sorted_data, self.TABLE_FIELDS))
+            table_html = self.cache.get_or_build(table_key, lambda: HTMLTemplates.get_table_section(sorted_data))
+        keys.append(table_key)
+        
+        # 构建HTML内容
+        with self.profiler.stage('html_build'):
+            html_content = self._build_html_content(stats, chart_configs, table_html, title, nav_html)
+        
+        return html_content, ReportCache.compute_digest(keys)
+    
+    def _get_chart_configurations(self, extractor: Optional[ChartDataExtractor] = None) -> Tuple[Dict, List[str]]:
+        """
+        获取所有图表配置（按各图表的输入数据切片缓存）
+        Args:
+            extractor: 图表数据提取器，默认使用全量数据
+        Returns:
+            Tuple[Dict, List[str]]: 图表配置字典和对应的缓存键列表
+        """
+        extractor = extractor or self.chart_data_extractor
+        builders = {
+            'qps': extractor.get_qps_chart_config,
+            'throughput': extractor.get_throughput_chart_config,
+            'latency': extractor.get_latency_chart_config,
+            'ttft': extractor.get_ttft_chart_config,
+            'success': extractor.get_success_chart_config
+        }
+        # 可选图表：仅在数据包含对应列时生成
+        if extractor.has_output_length_metrics():
+            builders['output_length'] = extractor.get_output_length_chart_config
+        if extractor.has_input_length_metrics():
+            builders['input_length'] = extractor.get_input_length_chart_config
+        if extractor.has_prefix_share_metrics():
+            builders['prefix_share'] = extractor.get_prefix_share_chart_config
+        if extractor.has_image_size_metrics():
+            builders['image_size'] = extractor.get_image_size_chart_config
+        if extractor.has_offered_load_metrics():
+            builders['offered_load'] = extractor.get_offered_load_chart_config
+        if extractor.has_workload_mix_metrics():
+            builders['workload_mix'] = extractor.get_workload_mix_chart_config
+        if extractor.has_endpoint_metrics():
+            builders['endpoints'] = extractor.get_endpoint_chart_config
+        if extractor.has_multi_turn_metrics():
+            builders['multi_turn'] = extractor.get_multi_turn_chart_config
+        if extractor.has_coordinated_omission_metrics():
+            builders['coordinated_omission'] = extractor.get_coordinated_omission_chart_config
+        if extractor.has_connection_metrics():
+            builders['connection_phases'] = extractor.get_connection_chart_config
+        if extractor.has_client_metrics():
+            builders['client'] = extractor.get_client_chart_config
+        if extractor.has_server_metrics():
+            builders['server'] = extractor.get_server_chart_config
+        
+        chart_configs = {
+            'parallels': json.dumps([row['parallel'] for row in extractor.data])
         }
+        keys = []
+        for name, builder in builders.items():
+            with self.profiler.stage('chart_config', chart=name):
+                fields = self.CHART_FIELDS[name]
+                if name in self.CHART_FIELD_PREFIXES:
+                    prefix = self.CHART_FIELD_PREFIXES[name]
+                    fields = sorted({key for row in extractor.data for key in row if key.startswith(prefix)})
+                key = self.cache.compute_key(name, self._data_slice(extractor.data, fields))
+                chart_configs[name] = json.dumps(self.cache.get_or_build(key, builder))
+            keys.append(key)
+        
+        return chart_configs, keys
     
-    def _build_html_content(self, stats: Dict, chart_configs: Dict) -> str:
+    def _build_html_content(self, stats: Dict, chart_configs: Dict, table_html: str,
+                            title: str = '', nav_html: str = '') -> str:
         """
         构建完整的HTML内容
         Args:
             stats: 统计信息
             chart_configs: 图表配置
+            table_html: 数据表HTML
+            title: 页面副标题
+            nav_html: 导航链接HTML
         Returns:
             str: 完整的HTML内容
         """
-        # 组装HTML各个部分，使用已排序的数据
+        # 组装HTML各个部分
         html_parts = [
-            HTMLTemplates.get_header(),
+            HTMLTemplates.get_header(title),
+            nav_html,
             HTMLTemplates.get_stats_cards(stats),
-            HTMLTemplates.get_charts_section(),
-            HTMLTemplates.get_table_section(self.chart_data_extractor.data),  # 使用已排序的数据
+            HTMLTemplates.get_charts_section([name for name in HTMLTemplates.OPTIONAL_CHARTS if name in chart_configs]),
+            table_html,
             HTMLTemplates.get_footer(self.file_name),
             HTMLTemplates.get_chart_js_scripts(chart_configs)
         ]
@@ -106,5 +332,7 @@ n            Path: 生成的HTML文件路径
             'record_count': len(self.data),
             'stats': stats,
             'charts_count': 5,  # QPS, 吞吐量, 延迟, TTFT, 成功率
+            'page_count': len(self.pages),
+            'cache_stats': self.cache.get_stats(),
             'file_size_kb': self.output_file.stat().st_size / 1024 if self.output_file.exists() else 0
         }
@@ -9,6 +9,14 @@ import argparse
 import sys
 from pathlib import Path
 from visualize.visualizer import PerformanceVisualizer
+from visualize.data_loader import DataLoader
+from visualize.compare import RunComparator
+from visualize.trend import TrendAnalyzer
+from evalperf.profiler import StageProfiler
+
+
+# 对比模式下发现显著回归时的退出码
+EXIT_REGRESSION = 2
 
 
 def parse_arguments():
@@ -21,6 +29,11 @@ def parse_arguments():
   %(prog)s report.csv                           # 使用默认输出文件名
   %(prog)s report.csv -o custom_report.html     # 自定义输出文件名
   %(prog)s report_summary.csv                   # 使用精简版 CSV
+  %(prog)s report.csv --split-by model          # 按模型拆分为多页报告
+  %(prog)s report.csv --no-cache                # 禁用报告构建缓存
+  %(prog)s report.csv --summary --slo-p99 3     # 在 P99≤3 的约束下给出推荐并发
+  %(prog)s base.csv --compare new.csv           # 对比基线与候选结果，回归时退出码为 2
+  %(prog)s history.csv --trend --dataset p_short --parallel 64  # 历史趋势与变化点检测
         """
     )
     
@@ -46,6 +59,82 @@ def parse_arguments():
         help='只显示性能摘要，不生成报告'
     )
     
+    parser.add_argument(
+        '--split-by',
+        choices=['model', 'dataset'],
+        help='按模型或数据集拆分为多页报告（生成索引页 + 每组一页）'
+    )
+    
+    parser.add_argument(
+        '--cache-dir',
+        help='报告构建缓存目录 (默认: 输出目录下的 .report_cache)'
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='禁用报告构建缓存，全部重新生成'
+    )
+    
+    parser.add_argument(
+        '--slo-p99',
+        type=float,
+        help='P99 延迟 SLO，用于计算推荐工作并发（单位与数据中的延迟列一致）'
+    )
+    
+    parser.add_argument(
+        '--compare',
+        metavar='CANDIDATE_CSV',
+        help='对比模式：csv_file 作为基线，与指定的候选结果 CSV 对比'
+    )
+    
+    parser.add_argument(
+        '--verdict',
+        help='对比结论 JSON 输出路径 (默认: 与对比报告同名的 .json)'
+    )
+    
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=5.0,
+        help='判定回归的最小相对变化百分比 (默认: 5)'
+    )
+    
+    parser.add_argument(
+        '--confidence',
+        type=float,
+        default=0.95,
+        help='置信区间的置信度 (默认: 0.95)'
+    )
+    
+    parser.add_argument(
+        '--trend',
+        action='store_true',
+        help='趋势模式：按运行时间戳绘制固定配置的指标趋势并检测变化点'
+    )
+    
+    parser.add_argument(
+        '--trend-window',
+        type=int,
+        default=7,
+        help='趋势模式滚动基线窗口（天） (默认: 7)'
+    )
+    
+    parser.add_argument('--model', help='趋势模式：只分析指定模型')
+    parser.add_argument('--dataset', help='趋势模式：只分析指定数据集 (如 p_short)')
+    parser.add_argument('--parallel', type=int, help='趋势模式：只分析指定并发数')
+    
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='记录各阶段耗时（加载/统计/图表配置/HTML写入），打印汇总表并输出trace'
+    )
+    
+    parser.add_argument(
+        '--profile-output',
+        help='trace文件路径 (默认: <csv文件名>_profile_trace.json)'
+    )
+    
     return parser.parse_args()
 
 
@@ -123,6 +212,248 @@ def display_performance_summary(visualizer: PerformanceVisualizer):
     # 错误率统计
     if 'max_error_rate' in summary:
         print(f"最高错误率: {summary.get('max_error_rate', 0):.1f}%")
+    
+    # 推荐工作点
+    operating_points = summary.get('operating_points', [])
+    if operating_points:
+        print("\n=== 推荐工作点 ===")
+        for point in operating_points:
+            print(f"[{point['model']} / {point['dataset']} / max_tokens {point['max_tokens']}] "
+                  f"测试点: {point['points']} 个")
+            if point['saturated']:
+                print(f"  拐点并发: {point['knee_parallel']} "
+                      f"(吞吐 {point['knee_throughput']:.0f} tokens/s, P99 {point['knee_p99_latency']:.2f})")
+            else:
+                print(f"  吞吐尚未饱和，最高测试并发: {point['knee_parallel']}")
+            print(f"  帕累托前沿 (P50): {point['frontier_p50']}")
+            print(f"  帕累托前沿 (P99): {point['frontier_p99']}")
+            if point['recommended_parallel'] is None:
+                print(f"  推荐并发: 无 (没有工作点满足 P99 ≤ {point['slo_p99_latency']})")
+            else:
+                slo_text = f", SLO P99 ≤ {point['slo_p99_latency']}" if point['slo_p99_latency'] is not None else ""
+                print(f"  推荐并发: {point['recommended_parallel']} "
+                      f"(吞吐 {point['recommended_throughput']:.0f} tokens/s, "
+                      f"P99 {point['recommended_p99_latency']:.2f}{slo_text})")
+    
+    # 可扩展性模型
+    scalability = summary.get('scalability', [])
+    if scalability:
+        print("\n=== 可扩展性模型 (USL) ===")
+        for item in scalability:
+            print(f"[{item['model']} / {item['dataset']} / max_tokens {item['max_tokens']}]")
+            model = item['qps_model']
+            if not model:
+                print("  测试点不足 3 个，无法拟合")
+                continue
+            print(f"  λ={model['lambda']:.4g} 竞争系数 σ={model['sigma']:.4g} "
+                  f"一致性系数 κ={model['kappa']:.4g} 拟合误差 {model['mape']:.1f}%")
+            if model['peak_parallel']:
+                print(f"  预测峰值并发: {model['peak_parallel']} (QPS {model['peak_throughput']:.2f})")
+            else:
+                print("  预测峰值并发: 无 (吞吐随并发单调增长)")
+            for pred in item['predictions']:
+                throughput_text = f", 吞吐 {pred['throughput']:.0f} tokens/s" if pred['throughput'] is not None else ""
+                latency_text = f", 延迟 {pred['latency_s']:.2f} s" if pred['latency_s'] is not None else ""
+                print(f"  预测 并发={pred['parallel']}: QPS {pred['qps']:.2f}{throughput_text}{latency_text}")
+            if item['client_limited_parallels']:
+                print(f"  [WARNING] 利特尔定律校验未通过（在途请求数明显低于并发数），"
+                      f"可能为客户端受限: {item['client_limited_parallels']}")
+    
+    # 固定输出长度校验
+    mismatches = summary.get('output_length_mismatches', [])
+    if mismatches:
+        print("\n=== 固定输出长度未生效的运行 ===")
+        for item in mismatches:
+            print(f"  [WARNING] {item['test_name']} {item['timestamp']}: 请求 {item['max_tokens']} tokens, "
+                  f"平均实际 {item['output_tokens']:.1f}, 达到请求长度的比例 {item['output_exact_pct']:.1f}% "
+                  f"(服务端可能不支持 ignore_eos / min_tokens)")
+    
+    # 服务端引擎状态
+    server_states = summary.get('server_states', [])
+    if server_states:
+        print("\n=== 服务端引擎状态 ===")
+        for state in server_states:
+            print(f"  {state['test_name']}: P99 {state['p99_latency']:.2f}, "
+                  f"排队 平均 {state['waiting_avg']:.1f} / 峰值 {state['waiting_max']:.0f}, "
+                  f"运行 平均 {state['running_avg']:.1f}, KV Cache 峰值 {state['kv_cache_max_pct']:.0f}%, "
+                  f"抢占 {state['preemptions']:.0f} 次")
+    
+    # 混合负载分类统计
+    workload_classes = summary.get('workload_classes', [])
+    if workload_classes:
+        print("\n=== 混合负载分类统计 ===")
+        for run in workload_classes:
+            print(f"[{run['test_name']}] 负载 {run['workload']}, 并发 {run['parallel']}")
+            for item in run['classes']:
+                print(f"  {item['name']}: 请求 {item['requests']:.0f} ({item['share_pct']:.1f}%), "
+                      f"TTFT 平均 {item['ttft']:.3f} s / P99 {item['p99_ttft']:.3f} s, "
+                      f"延迟 平均 {item['latency']:.3f} s / P99 {item['p99_latency']:.3f} s, "
+                      f"输出吞吐 {item['output_throughput']:.0f} tokens/s")
+    
+    # 开环速率扫描的延迟-负载曲线
+    offered_load_curves = summary.get('offered_load_curves', [])
+    if offered_load_curves:
+        print("\n=== 请求速率扫描（延迟 vs 目标速率） ===")
+        for curve in offered_load_curves:
+            print(f"[{curve['model']} / {curve['dataset']} / max_tokens {curve['max_tokens']}] "
+                  f"并发上限 {curve['parallel']}")
+            for point in curve['points']:
+                mark = '  <- 饱和' if point['target_rate'] == curve['saturation_rate'] else ''
+                print(f"  目标 {point['target_rate']:g} req/s: 实际发送 {point['achieved_rate']:.2f} req/s, "
+                      f"完成 {point['completed_rate']:.2f} req/s, P50 {point['p50_latency']:.3f} s, "
+                      f"P99 {point['p99_latency']:.3f} s{mark}")
+            sustained = curve['max_sustained_rate']
+            if curve['saturation_rate'] is not None:
+                print(f"  饱和点: {curve['saturation_rate']:g} req/s ({curve['saturation_reason']})，最大可持续速率: "
+                      + (f"{sustained:g} req/s" if sustained is not None else '无（最低目标速率已饱和）'))
+            else:
+                print("  在测试的速率范围内未饱和")
+    
+    # 浸泡测试的延迟漂移和吞吐衰减
+    soak_drift = summary.get('soak_drift', [])
+    if soak_drift:
+        print("\n=== 浸泡测试（结尾 vs 开头） ===")
+        for run in soak_drift:
+            mark = '  <- 漂移' if run['drifted'] else ''
+            print(f"  {run['test_name']} (并发 {run['parallel']}, {run['hours']:.2f} h, {run['windows']:.0f} 个窗口, "
+                  f"空窗口 {run['empty_windows']:.0f}): P50 延迟 {run['p50_latency_drift_pct']:+.1f}%, "
+                  f"P99 延迟 {run['p99_latency_drift_pct']:+.1f}%, P99 TTFT {run['p99_ttft_drift_pct']:+.1f}%, "
+                  f"输出吞吐 {run['throughput_change_pct']:+.1f}%; 趋势 P99 延迟 {run['p99_latency_trend_pct_per_h']:+.1f}%/h, "
+                  f"输出吞吐 {run['throughput_trend_pct_per_h']:+.1f}%/h{mark}")
+    
+    # 多端点负载均衡
+    endpoint_breakdown = summary.get('endpoint_breakdown', [])
+    if endpoint_breakdown:
+        print("\n=== 多端点负载均衡 ===")
+        for run in endpoint_breakdown:
+            print(f"[{run['test_name']}] 策略 {run['balance']}, 并发 {run['parallel']}")
+            for item in run['endpoints']:
+                print(f"  {item['name']}: 请求 {item['requests']:.0f} ({item['share_pct']:.1f}%, 失败 {item['failed']:.0f}), "
+                      f"TTFT 平均 {item['ttft']:.3f} s, 延迟 平均 {item['latency']:.3f} s / P99 {item['p99_latency']:.3f} s, "
+                      f"输出吞吐 {item['output_throughput']:.0f} tokens/s")
+    
+    # 多轮会话按轮次统计
+    session_turns = summary.get('session_turns', [])
+    if session_turns:
+        print("\n=== 多轮会话按轮次统计 ===")
+        for run in session_turns:
+            print(f"[{run['test_name']}] 并发会话 {run['parallel']}, 思考时间 {run['think_time']} s")
+            for item in run['turns']:
+                print(f"  第{item['turn']}轮: 请求 {item['requests']:.0f}, 上下文 {item['context_tokens']:.0f} tokens, "
+                      f"TTFT 平均 {item['ttft']:.3f} s / P99 {item['p99_ttft']:.3f} s, "
+                      f"延迟 平均 {item['latency']:.3f} s")
+    
+    # 测量精度（原生驱动运行）
+    precision = summary.get('measurement_precision', [])
+    if precision:
+        print("\n=== 测量精度（95% 置信区间相对半宽） ===")
+        for run in precision:
+            state = '已收敛，提前停止' if run['stopped_early'] else '已收敛' if run['converged'] else '固定请求数或未收敛'
+            values = ', '.join(f"{name} ±{value:.2f}%" if value >= 0 else f"{name} 样本不足"
+                               for name, value in run['metrics'].items())
+            print(f"  {run['test_name']} (并发 {run['parallel']}, 请求 {run['requests']:.0f}, {state}): {values}")
+    
+    # 客户端资源饱和
+    saturated_runs = summary.get('client_saturated_runs', [])
+    if saturated_runs:
+        print("\n=== 客户端饱和的运行 ===")
+        for run in saturated_runs:
+            print(f"  [WARNING] {run['test_name']} {run['timestamp']}: 客户端CPU {run['client_cpu_avg_pct']:.0f}% (单核), "
+                  f"整机CPU峰值 {run['client_host_cpu_max_pct']:.0f}%, 调度延迟P99 {run['client_sched_lag_p99_ms']:.1f} ms")
+
+
+def run_compare(args) -> int:
+    """
+    执行基线与候选结果对比
+    Args:
+        args: 命令行参数
+    Returns:
+        int: 退出码（0=无回归, 1=错误, 2=存在显著回归）
+    """
+    if not validate_csv_file(args.compare):
+        return 1
+    
+    baseline_loader = DataLoader(args.csv_file)
+    candidate_loader = DataLoader(args.compare)
+    if not baseline_loader.load_data() or not candidate_loader.load_data():
+        print("[ERROR] 无法加载数据")
+        return 1
+    
+    baseline_path = Path(args.csv_file)
+    candidate_path = Path(args.compare)
+    output_file = Path(args.output) if args.output else \
+        candidate_path.parent / f"{candidate_path.stem}_vs_{baseline_path.stem}_compare.html"
+    verdict_file = Path(args.verdict) if args.verdict else output_file.with_suffix('.json')
+    
+    comparator = RunComparator(
+        baseline_loader.get_data(),
+        candidate_loader.get_data(),
+        threshold_pct=args.threshold,
+        confidence=args.confidence
+    )
+    result = comparator.compare()
+    result['baseline'] = str(baseline_path)
+    result['candidate'] = str(candidate_path)
+    
+    RunComparator.write_html(result, output_file, baseline_path.name, candidate_path.name)
+    RunComparator.write_verdict(result, verdict_file)
+    
+    print("=== 对比结论 ===")
+    print(f"已对齐配置: {result['matched_configs']} 组")
+    print(f"显著回归: {result['regression_count']} 项, 显著提升: {result['improvement_count']} 项")
+    for item in result['comparisons']:
+        if item['regression']:
+            rate_text = f" 目标速率={item['target_rate']:g}" if item.get('target_rate') else ""
+            print(f"  [回归] {item['model']} / {item['dataset']} 并发={item['parallel']}{rate_text} {item['label']}: "
+                  f"{item['baseline']:.4g} → {item['candidate']:.4g} ({item['delta_pct']:+.1f}%, {item['method']})")
+    
+    if result['verdict'] == 'regression':
+        print("[ERROR] 发现显著性能回归")
+        return EXIT_REGRESSION
+    print("[INFO] ✓ 未发现显著性能回归")
+    return 0
+
+
+def run_trend(args) -> int:
+    """
+    生成历史趋势报告
+    Args:
+        args: 命令行参数
+    Returns:
+        int: 退出码
+    """
+    loader = DataLoader(args.csv_file)
+    if not loader.load_data():
+        print("[ERROR] 无法加载数据")
+        return 1
+    
+    csv_path = Path(args.csv_file)
+    output_file = Path(args.output) if args.output else csv_path.parent / f"{csv_path.stem}_trend.html"
+    
+    analyzer = TrendAnalyzer(
+        loader.get_data(),
+        window=args.trend_window,
+        model=args.model,
+        dataset=args.dataset,
+        parallel=args.parallel
+    )
+    series = analyzer.write_report(output_file, csv_path.name)
+    if not series:
+        print("[ERROR] 没有符合条件且带有效时间戳的记录")
+        return 1
+    
+    print("=== 变化点 ===")
+    found = False
+    for key, item in series.items():
+        for field, metric in item['metrics'].items():
+            for change in metric['change_points']:
+                found = True
+                shift = (change['after'] - change['before']) / change['before'] * 100 if change['before'] else 0
+                print(f"[{key}] {metric['label']} 于 {change['day']}: "
+                      f"{change['before']:.4g} → {change['after']:.4g} ({shift:+.1f}%)")
+    if not found:
+        print("未检测到变化点")
+    return 0
 
 
 def main():
@@ -134,10 +465,24 @@ def main():
     if not validate_csv_file(args.csv_file):
         sys.exit(1)
     
+    # 对比模式
+    if args.compare:
+        sys.exit(run_compare(args))
+    
+    # 趋势模式
+    if args.trend:
+        sys.exit(run_trend(args))
+    
     # 创建可视化器实例
+    profiler = StageProfiler(enabled=args.profile)
     visualizer = PerformanceVisualizer(
         csv_file=args.csv_file,
-        output_file=args.output
+        output_file=args.output,
+        cache_dir=args.cache_dir,
+        use_cache=not args.no_cache,
+        split_by=args.split_by,
+        slo_p99_latency=args.slo_p99,
+        profiler=profiler
     )
     
     # 加载数据
@@ -146,14 +491,22 @@ def main():
         sys.exit(1)
     
     # 根据参数执行不同操作
+    success = True
     if args.info:
         display_data_info(visualizer)
     elif args.summary:
-        display_performance_summary(visualizer)
+        with profiler.stage('summary'):
+            display_performance_summary(visualizer)
     else:
         # 生成完整报告
         success = visualizer.run()
-        sys.exit(0 if success else 1)
+    
+    if args.profile:
+        profiler.print_summary()
+        csv_path = Path(args.csv_file)
+        profiler.write_trace(args.profile_output or str(csv_path.parent / f"{csv_path.stem}_profile_trace.json"))
+    
+    sys.exit(0 if success else 1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+报告构建缓存模块
+Author: AI Assistant
+Date: 2024
+"""
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+
+# 缓存格式版本，图表/统计的生成逻辑变化时需要递增
+CACHE_VERSION = 5
+
+# 页面摘要清单和各报告使用的片段清单（与片段文件同目录）
+PAGES_FILE = 'pages.json'
+FRAGMENTS_FILE = 'fragments.json'
+
+# 片段文件名：<片段类型>-<32位哈希>.json
+FRAGMENT_PATTERN = re.compile(r'^.+-[0-9a-f]{32}\.json$')
+
+
+class ReportCache:
+    """
+    基于内容哈希的报告片段缓存
+    每次构建结束时删除所有报告都不再使用的片段（数据刷新或 CACHE_VERSION 递增后留下的旧片段），缓存目录不会无限增长
+    """
+    
+    def __init__(self, cache_dir: str, enabled: bool = True):
+        self.cache_dir = Path(cache_dir)
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._page_digests: Dict[str, str] = {}
+        # 本次构建读取或写入的片段
+        self._used_keys: Set[str] = set()
+        
+        if self.enabled:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._page_digests = self._load_json(PAGES_FILE)
+    
+    @staticmethod
+    def compute_key(namespace: str, payload: Any) -> str:
+        """
+        计算缓存键
+        Args:
+            namespace: 片段类型（如 qps、stats）
+            payload: 片段依赖的输入数据切片
+        Returns:
+            str: 缓存键
+        """
+        canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        digest = hashlib.sha256(f"{CACHE_VERSION}:{namespace}:{canonical}".encode('utf-8')).hexdigest()
+        return f"{namespace}-{digest[:32]}"
+    
+    @staticmethod
+    def compute_digest(parts: List[str]) -> str:
+        """计算页面摘要（由各片段缓存键组合而成）"""
+        return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+    
+    def get_or_build(self, key: str, builder: Callable[[], Any]) -> Any:
+        """
+        读取缓存片段，不存在时构建并写入
+        Args:
+            key: 缓存键
+            builder: 片段构建函数，返回值必须可JSON序列化
+        Returns:
+            Any: 片段内容
+        """
+        if not self.enabled:
+            return builder()
+        
+        self._used_keys.add(key)
+        cache_file = self.cache_dir / f"{key}.json"
+        if cache_file.exists():
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    value = json.load(f)
+                self.hits += 1
+                return value
+            except (OSError, ValueError):
+                pass  # 缓存损坏时重新构建
+        
+        self.misses += 1
+        value = builder()
+        self._atomic_write(cache_file, json.dumps(value, ensure_ascii=False))
+        return value
+    
+    def is_page_fresh(self, page_file: Path, digest: str) -> bool:
+        """判断页面是否与上次构建时一致（无需重写）"""
+        if not self.enabled or not page_file.exists():
+            return False
+        return self._page_digests.get(str(page_file.resolve())) == digest
+    
+    def record_page(self, page_file: Path, digest: str) -> None:
+        """记录页面摘要"""
+        if not self.enabled:
+            return
+        self._page_digests[str(page_file.resolve())] = digest
+    
+    def save(self, owner: Optional[Path] = None) -> None:
+        """
+        保存页面摘要清单和本次构建使用的片段，删除所有报告都不再使用的片段
+        Args:
+            owner: 本次构建的报告文件（多个报告共用缓存目录时各自登记使用的片段，互不删除；报告文件已删除时其片段一并清理）
+        """
+        if not self.enabled:
+            return
+        self._page_digests = {page: digest for page, digest in self._page_digests.items() if Path(page).exists()}
+        self._atomic_write(self.cache_dir / PAGES_FILE,
+                           json.dumps(self._page_digests, indent=2, ensure_ascii=False))
+        
+        owner_key = str(owner.resolve()) if owner is not None else ''
+        fragments = {report: keys for report, keys in self._load_json(FRAGMENTS_FILE).items()
+                     if report and Path(report).exists()}
+        fragments[owner_key] = sorted(self._used_keys)
+        self._atomic_write(self.cache_dir / FRAGMENTS_FILE,
+                           json.dumps(fragments, indent=2, ensure_ascii=False))
+        self._evict(set().union(*fragments.values()))
+    
+    def get_stats(self) -> Dict[str, int]:
+        """获取缓存命中统计"""
+        return {'hits': self.hits, 'misses': self.misses, 'evicted': self.evicted}
+    
+    def _evict(self, live_keys: Set[str]) -> None:
+        """删除不在 live_keys 中的片段文件"""
+        for path in self.cache_dir.glob('*.json'):
+            if FRAGMENT_PATTERN.match(path.name) and path.stem not in live_keys:
+                try:
+                    path.unlink()
+                    self.evicted += 1
+                except OSError:
+                    pass  # 同时运行的构建已删除
+    
+    def _load_json(self, name: str) -> Dict:
+        """加载缓存目录中的清单文件（不存在或损坏时为空）"""
+        manifest = self.cache_dir / name
+        if not manifest.exists():
+            return {}
+        try:
+            with open(manifest, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    @staticmethod
+    def _atomic_write(path: Path, content: str) -> None:
+        """先写临时文件再替换，避免中断时留下半个文件"""
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
@@ -5,14 +5,42 @@ Author: AI Assistant
 Date: 2024
 """
 
-from typing import List, Dict, Tuple
+import re
+from typing import List, Dict, Tuple, Optional
 
 
 class StatisticsCalculator:
     """性能测试统计计算器"""
     
-    def __init__(self, data: List[Dict]):
+    # 边际吞吐低于低并发单流吞吐的该比例时，视为吞吐增长已崩塌（拐点）
+    KNEE_THRESHOLD = 0.1
+    
+    # 利特尔定律校验容差：实测在途请求数低于并发数的该比例时，视为客户端未能维持目标并发
+    LITTLES_LAW_TOLERANCE = 0.2
+    
+    # 开环速率扫描中完成速率的增量低于目标速率增量的该比例时，视为吞吐已不再跟随负载增长（服务端饱和）
+    RATE_SATURATION_GAIN = 0.5
+    
+    # 开环速率扫描中 P99 延迟超过最低目标速率下 P99 的该倍数时，视为延迟失控（排队开始累积）
+    LATENCY_BLOWUP_FACTOR = 3.0
+    
+    def __init__(self, data: List[Dict], slo_p99_latency: Optional[float] = None):
         self.data = data
+        self.slo_p99_latency = slo_p99_latency
+    
+    @staticmethod
+    def get_dataset_name(row: Dict) -> str:
+        """从测试名称（如 p64_n200_dp_short）中提取数据集名称"""
+        match = re.search(r'_d(.+)$', str(row.get('test_name', '')))
+        return match.group(1) if match else 'unknown'
+    
+    @staticmethod
+    def get_max_tokens(row: Dict) -> int:
+        """运行请求的 max_tokens（输出长度扫描中同一并发、同一数据集的不同输出长度是不同的配置），未知时为0"""
+        try:
+            return int(row.get('max_tokens') or 0)
+        except (TypeError, ValueError):
+            return 0
     
     def calculate_basic_stats(self) -> Dict:
         """
@@ -43,9 +71,339 @@ class StatisticsCalculator:
             'max_throughput': max_throughput,
             'min_latency': min_latency,
             'avg_success_rate': avg_success,
-            'total_tests': len(self.data)
+            'total_tests': len(self.data),
+            'operating_points': self.calculate_operating_points(),
+            'scalability': self.calculate_scalability_models(),
+            'client_saturated_runs': self.get_client_saturated_runs()
         }
     
+    def get_client_saturated_runs(self) -> List[Dict]:
+        """
+        获取客户端资源饱和的运行（需要 evalperf.sh 采集的客户端监控数据）
+        Returns:
+            List[Dict]: 运行标识及客户端CPU、整机CPU、调度延迟
+        """
+        return [{
+            'test_name': row.get('test_name'),
+            'timestamp': row.get('timestamp', ''),
+            'parallel': row.get('parallel'),
+            'client_cpu_avg_pct': row.get('client_cpu_avg_pct', 0),
+            'client_host_cpu_max_pct': row.get('client_host_cpu_max_pct', 0),
+            'client_sched_lag_p99_ms': row.get('client_sched_lag_p99_ms', 0)
+        } for row in self.data if row.get('client_saturated')]
+    
+    def _group_by_model_dataset(self) -> Dict[Tuple[str, str, int], List[Dict]]:
+        """
+        按(模型, 数据集, max_tokens)分组，同一并发数的多次运行取平均
+        Returns:
+            Dict: 分组键到按并发数排序的工作点列表
+        """
+        buckets: Dict[Tuple[str, str, int], Dict[int, List[Dict]]] = {}
+        for row in self.data:
+            # 速率扫描的各步并发上限相同，按目标速率单独分析（见 calculate_offered_load_curves）；
+            # 浸泡测试按时间窗口分析漂移（见 get_soak_drift），不参与并发扩展分析
+            if self.is_rate_step(row) or row.get('soak_windows'):
+                continue
+            key = (str(row.get('model') or 'unknown'), self.get_dataset_name(row), self.get_max_tokens(row))
+            buckets.setdefault(key, {}).setdefault(row['parallel'], []).append(row)
+        
+        groups = {}
+        for key, by_parallel in sorted(buckets.items()):
+            points = []
+            for parallel in sorted(by_parallel):
+                rows = by_parallel[parallel]
+                points.append({
+                    'parallel': parallel,
+                    'qps': sum(r['qps'] for r in rows) / len(rows),
+                    'latency_s': sum(self._latency_seconds(r) for r in rows) / len(rows),
+                    'throughput': sum(r['output_token_throughput'] for r in rows) / len(rows),
+                    'p50_latency': sum(r['p50_latency_ms'] for r in rows) / len(rows),
+                    'p99_latency': sum(r['p99_latency_ms'] for r in rows) / len(rows)
+                })
+            groups[key] = points
+        return groups
+    
+    @staticmethod
+    def _latency_seconds(row: Dict) -> float:
+        """获取以秒为单位的平均延迟（汇总脚本CSV的 latency 列为秒，原生格式 avg_latency_ms 为毫秒）"""
+        if 'latency' in row:
+            return row['latency'] or 0
+        return (row.get('avg_latency_ms') or 0) / 1000
+    
+    @staticmethod
+    def pareto_frontier(points: List[Dict], latency_key: str) -> List[Dict]:
+        """
+        计算吞吐-延迟帕累托前沿（吞吐越高越好，延迟越低越好）
+        Args:
+            points: 工作点列表
+            latency_key: 延迟字段名（p50_latency 或 p99_latency）
+        Returns:
+            List[Dict]: 不被其他工作点支配的工作点，按延迟升序
+        """
+        ordered = sorted(points, key=lambda p: (p[latency_key], -p['throughput']))
+        frontier = []
+        best_throughput = float('-inf')
+        for point in ordered:
+            if point['throughput'] > best_throughput:
+                frontier.append(point)
+                best_throughput = point['throughput']
+        return frontier
+    
+    @classmethod
+    def find_knee(cls, points: List[Dict]) -> Tuple[Dict, bool]:
+        """
+        检测拐点：继续增加并发带来的边际吞吐崩塌之前的最后一个工作点
+        Args:
+            points: 按并发数升序的工作点列表
+        Returns:
+            Tuple[Dict, bool]: 拐点工作点，以及吞吐是否已饱和
+        """
+        first = points[0]
+        baseline = first['throughput'] / first['parallel'] if first['parallel'] > 0 else 0
+        if baseline <= 0:
+            return first, False
+        
+        for prev, curr in zip(points, points[1:]):
+            step = curr['parallel'] - prev['parallel']
+            marginal = (curr['throughput'] - prev['throughput']) / step if step > 0 else 0
+            if marginal / baseline < cls.KNEE_THRESHOLD:
+                return prev, True
+        return points[-1], False
+    
+    def calculate_operating_points(self) -> List[Dict]:
+        """
+        按模型、数据集和 max_tokens 计算帕累托前沿、拐点和推荐工作并发
+        Returns:
+            List[Dict]: 每个(模型, 数据集, max_tokens)的工作点分析结果
+        """
+        results = []
+        for (model, dataset, max_tokens), points in self._group_by_model_dataset().items():
+            knee, saturated = self.find_knee(points)
+            
+            # 推荐并发：不超过拐点且满足SLO的工作点中吞吐最高者
+            candidates = [p for p in points if p['parallel'] <= knee['parallel']]
+            if self.slo_p99_latency is not None:
+                candidates = [p for p in candidates if p['p99_latency'] <= self.slo_p99_latency]
+            recommended = max(candidates, key=lambda p: p['throughput']) if candidates else None
+            
+            results.append({
+                'model': model,
+                'dataset': dataset,
+                'max_tokens': max_tokens,
+                'points': len(points),
+                'frontier_p50': [p['parallel'] for p in self.pareto_frontier(points, 'p50_latency')],
+                'frontier_p99': [p['parallel'] for p in self.pareto_frontier(points, 'p99_latency')],
+                'knee_parallel': knee['parallel'],
+                'knee_throughput': knee['throughput'],
+                'knee_p99_latency': knee['p99_latency'],
+                'saturated': saturated,
+                'slo_p99_latency': self.slo_p99_latency,
+                'recommended_parallel': recommended['parallel'] if recommended else None,
+                'recommended_throughput': recommended['throughput'] if recommended else 0,
+                'recommended_p99_latency': recommended['p99_latency'] if recommended else 0
+            })
+        return results
+    
+    @staticmethod
+    def is_rate_step(row: Dict) -> bool:
+        """是否为开环速率扫描的一步（按目标速率限速并按时长运行，限速的浸泡测试除外）"""
+        return bool(row.get('target_rate')) and bool(row.get('duration')) and not row.get('soak_windows')
+    
+    @staticmethod
+    def offered_load_p99(row: Dict) -> float:
+        """
+        速率扫描使用的 P99 延迟：优先按计划发送时间计量的协调遗漏校正值（包含客户端排队时间），
+        没有校正值时回退到 p99_latency_ms 列（单位与数据中的延迟列一致，汇总脚本CSV为秒）
+        """
+        return row.get('99p_latency_co_') or row.get('p99_latency_ms', 0)
+    
+    @classmethod
+    def find_saturation(cls, points: List[Dict]) -> Tuple[Optional[Dict], str]:
+        """
+        检测饱和点：完成速率不再随目标速率增长，或 P99 延迟相对最低负载急剧上升的第一个目标速率
+        Args:
+            points: 按目标速率升序的工作点列表
+        Returns:
+            Tuple[Optional[Dict], str]: 饱和工作点（未饱和时为None）及原因
+        """
+        baseline = points[0]['p99_latency']
+        for prev, point in zip([None] + points, points):
+            if prev is not None:
+                gain = (point['completed_rate'] - prev['completed_rate']) / (point['target_rate'] - prev['target_rate'])
+                if gain < cls.RATE_SATURATION_GAIN:
+                    return point, f"完成速率仅增至 {point['completed_rate']:.2f} req/s，不再跟随目标速率增长"
+            if baseline > 0 and point['p99_latency'] > baseline * cls.LATENCY_BLOWUP_FACTOR:
+                return point, f"P99 延迟超过最低负载的 {cls.LATENCY_BLOWUP_FACTOR:g} 倍"
+        return None, ''
+    
+    def calculate_offered_load_curves(self) -> List[Dict]:
+        """
+        按模型、数据集、max_tokens 和并发上限整理开环速率扫描的延迟-负载曲线并检测饱和点
+        （同一目标速率的多次运行取平均，至少两个目标速率才构成曲线）
+        Returns:
+            List[Dict]: 每条曲线的工作点、饱和速率和最大可持续速率
+        """
+        buckets: Dict[Tuple[str, str, int, int], Dict[float, List[Dict]]] = {}
+        for row in self.data:
+            if self.is_rate_step(row):
+                key = (str(row.get('model') or 'unknown'), self.get_dataset_name(row), self.get_max_tokens(row),
+                       row['parallel'])
+                buckets.setdefault(key, {}).setdefault(row['target_rate'], []).append(row)
+        
+        results = []
+        for (model, dataset, max_tokens, parallel), by_rate in sorted(buckets.items()):
+            if len(by_rate) < 2:
+                continue
+            points = []
+            for rate in sorted(by_rate):
+                rows = by_rate[rate]
+                points.append({
+                    'target_rate': rate,
+                    'achieved_rate': sum(r.get('achieved_rate', 0) for r in rows) / len(rows),
+                    'completed_rate': sum(r.get('completed_rate', 0) for r in rows) / len(rows),
+                    'p50_latency': sum(r['p50_latency_ms'] for r in rows) / len(rows),
+                    'p99_latency': sum(self.offered_load_p99(r) for r in rows) / len(rows)
+                })
+            saturation, reason = self.find_saturation(points)
+            sustained = [p for p in points if saturation is None or p['target_rate'] < saturation['target_rate']]
+            results.append({
+                'model': model,
+                'dataset': dataset,
+                'max_tokens': max_tokens,
+                'parallel': parallel,
+                'points': points,
+                'saturation_rate': saturation['target_rate'] if saturation else None,
+                'saturation_reason': reason,
+                'max_sustained_rate': sustained[-1]['target_rate'] if sustained else None
+            })
+        return results
+    
+    @staticmethod
+    def usl_predict(model: Dict, parallel: float) -> float:
+        """按通用可扩展性定律预测指定并发下的吞吐"""
+        n = parallel
+        return model['lambda'] * n / (1 + model['sigma'] * (n - 1) + model['kappa'] * n * (n - 1))
+    
+    @classmethod
+    def fit_usl(cls, parallels: List[float], throughputs: List[float]) -> Optional[Dict]:
+        """
+        拟合 Gunther 通用可扩展性定律 X(N) = λN / (1 + σ(N-1) + κN(N-1))
+        对给定λ，σ和κ由线性最小二乘求解；λ在[max(X/N), 2·max(X/N)]内做黄金分割搜索
+        Args:
+            parallels: 并发数列表
+            throughputs: 对应的吞吐列表
+        Returns:
+            Optional[Dict]: 拟合参数（lambda/sigma/kappa）、预测峰值并发和平均相对误差，测试点不足3个时返回None
+        """
+        points = [(n, x) for n, x in zip(parallels, throughputs) if n > 0 and x > 0]
+        if len(set(n for n, _ in points)) < 3:
+            return None
+        
+        def error(model: Dict) -> float:
+            return sum(((cls.usl_predict(model, n) - x) / x) ** 2 for n, x in points) / len(points)
+        
+        def solve(lam: float) -> Dict:
+            # 线性化: λN/X - 1 = σ(N-1) + κN(N-1)
+            a11 = a12 = a22 = b1 = b2 = 0.0
+            for n, x in points:
+                y = lam * n / x - 1
+                u, v = n - 1, n * (n - 1)
+                a11 += u * u
+                a12 += u * v
+                a22 += v * v
+                b1 += u * y
+                b2 += v * y
+            det = a11 * a22 - a12 * a12
+            if det > 1e-12:
+                sigma = (b1 * a22 - b2 * a12) / det
+                kappa = (a11 * b2 - a12 * b1) / det
+                if sigma >= 0 and kappa >= 0:
+                    return {'lambda': lam, 'sigma': sigma, 'kappa': kappa}
+            # 系数出现负值时退化为单参数拟合（σ≥0, κ≥0）
+            candidates = [{'lambda': lam, 'sigma': 0.0, 'kappa': 0.0}]
+            if a11 > 0:
+                candidates.append({'lambda': lam, 'sigma': max(b1 / a11, 0.0), 'kappa': 0.0})
+            if a22 > 0:
+                candidates.append({'lambda': lam, 'sigma': 0.0, 'kappa': max(b2 / a22, 0.0)})
+            return min(candidates, key=error)
+        
+        low = max(x / n for n, x in points)
+        high = 2 * low
+        ratio = (5 ** 0.5 - 1) / 2
+        for _ in range(60):
+            m1 = high - ratio * (high - low)
+            m2 = low + ratio * (high - low)
+            if error(solve(m1)) <= error(solve(m2)):
+                high = m2
+            else:
+                low = m1
+        model = solve((low + high) / 2)
+        
+        # 峰值并发 N* = sqrt((1-σ)/κ)，κ=0时吞吐单调趋近 λ/σ，无峰值
+        if model['kappa'] > 0 and model['sigma'] < 1:
+            peak = max(1, round(((1 - model['sigma']) / model['kappa']) ** 0.5))
+        else:
+            peak = None
+        
+        model['peak_parallel'] = peak
+        model['peak_throughput'] = cls.usl_predict(model, peak) if peak else None
+        model['mape'] = sum(abs(cls.usl_predict(model, n) - x) / x for n, x in points) / len(points) * 100
+        return model
+    
+    def calculate_scalability_models(self) -> List[Dict]:
+        """
+        按模型、数据集和 max_tokens 拟合可扩展性模型，并做利特尔定律一致性校验
+        Returns:
+            List[Dict]: 每个(模型, 数据集, max_tokens)的USL参数、未测试并发下的预测值及客户端受限标记
+        """
+        results = []
+        for (model, dataset, max_tokens), points in self._group_by_model_dataset().items():
+            parallels = [p['parallel'] for p in points]
+            qps_model = self.fit_usl(parallels, [p['qps'] for p in points])
+            throughput_model = self.fit_usl(parallels, [p['throughput'] for p in points])
+            
+            # 利特尔定律：在途请求数 L = 请求吞吐 × 平均延迟，闭环压测时应接近并发数
+            littles_law = []
+            for p in points:
+                inflight = p['qps'] * p['latency_s']
+                littles_law.append({
+                    'parallel': p['parallel'],
+                    'inflight': inflight,
+                    'ratio': inflight / p['parallel'] if p['parallel'] > 0 else 0
+                })
+            client_limited = [item['parallel'] for item in littles_law
+                              if item['ratio'] < 1 - self.LITTLES_LAW_TOLERANCE]
+            
+            predictions = []
+            if qps_model:
+                tested = set(parallels)
+                limit = max(2 * max(parallels), 2 * (qps_model['peak_parallel'] or 0))
+                # 候选点: 2的幂及相邻幂之间的中点（如 48、192、384）
+                grid = {n for i in range(13) for n in (2 ** i, 3 * 2 ** i // 2) if 1 <= n <= limit}
+                if qps_model['peak_parallel']:
+                    grid.add(qps_model['peak_parallel'])
+                for n in sorted(grid - tested):
+                    qps = self.usl_predict(qps_model, n)
+                    predictions.append({
+                        'parallel': n,
+                        'qps': qps,
+                        'throughput': self.usl_predict(throughput_model, n) if throughput_model else None,
+                        # 闭环、零思考时间下由利特尔定律推得: R = N / X
+                        'latency_s': n / qps if qps > 0 else None
+                    })
+            
+            results.append({
+                'model': model,
+                'dataset': dataset,
+                'max_tokens': max_tokens,
+                'qps_model': qps_model,
+                'throughput_model': throughput_model,
+                'predictions': predictions,
+                'littles_law': littles_law,
+                'client_limited_parallels': client_limited
+            })
+        return results
+    
     def calculate_percentiles(self) -> Dict[str, List[float]]:
         """
         计算各种百分位数的延迟
@@ -126,5 +484,203 @@ class StatisticsCalculator:
             **basic_stats,
             **throughput_stats,
             **latency_stats,
-            **success_stats
+            **success_stats,
+            'server_states': self.get_server_states(),
+            'workload_classes': self.get_workload_classes(),
+            'endpoint_breakdown': self.get_endpoint_breakdown(),
+            'offered_load_curves': self.calculate_offered_load_curves(),
+            'soak_drift': self.get_soak_drift(),
+            'session_turns': self.get_session_turns(),
+            'measurement_precision': self.get_measurement_precision(),
+            'output_length_mismatches': self.get_output_length_mismatches()
         }
+    
+    # 固定输出长度模式下，达到 max_tokens 的请求比例低于该值时视为服务端未生效
+    FIXED_OUTPUT_MIN_EXACT_PCT = 95.0
+    
+    def get_output_length_mismatches(self) -> List[Dict]:
+        """
+        获取固定输出长度模式下实际输出未达到 max_tokens 的运行（服务端可能不支持 ignore_eos/min_tokens）
+        Returns:
+            List[Dict]: 运行标识、请求长度、平均实际输出和达标比例
+        """
+        return [{
+            'test_name': row.get('test_name'),
+            'timestamp': row.get('timestamp', ''),
+            'max_tokens': row.get('max_tokens', 0),
+            'output_tokens': row.get('output_tokens', 0),
+            'output_exact_pct': row.get('output_exact_pct', 0)
+        } for row in self.data
+            if row.get('fixed_output') and row.get('output_exact_pct', 0) < self.FIXED_OUTPUT_MIN_EXACT_PCT]
+    
+    @staticmethod
+    def get_row_classes(row: Dict) -> List[str]:
+        """获取混合负载运行中的请求类别（由 class_<类别>_requests 列推断）"""
+        return [key[len('class_'):-len('_requests')] for key in row
+                if key.startswith('class_') and key.endswith('_requests') and row[key]]
+    
+    def get_workload_classes(self) -> List[Dict]:
+        """
+        获取混合负载运行中每类请求的延迟和吞吐（同一次测试内的对比，反映长请求对短请求的干扰）
+        Returns:
+            List[Dict]: 运行标识、负载名称和各类别指标列表
+        """
+        result = []
+        for row in sorted(self.data, key=lambda r: (r.get('test_name', ''), r.get('parallel', 0))):
+            classes = self.get_row_classes(row)
+            if not classes:
+                continue
+            result.append({
+                'test_name': row.get('test_name'),
+                'workload': row.get('workload', ''),
+                'parallel': row.get('parallel'),
+                'classes': [{
+                    'name': name,
+                    'requests': row.get(f'class_{name}_requests', 0),
+                    'share_pct': row.get(f'class_{name}_share_pct', 0),
+                    'ttft': row.get(f'class_{name}_ttft', 0),
+                    'p99_ttft': row.get(f'class_{name}_p99_ttft', 0),
+                    'latency': row.get(f'class_{name}_latency', 0),
+                    'p99_latency': row.get(f'class_{name}_p99_latency', 0),
+                    'output_throughput': row.get(f'class_{name}_output_throughput', 0)
+                } for name in classes]
+            })
+        return result
+    
+    # 浸泡测试结尾相对开头的 P99 延迟上升或输出吞吐下降超过该百分比时标记为漂移
+    SOAK_DRIFT_PCT = 10.0
+    
+    def get_soak_drift(self) -> List[Dict]:
+        """
+        获取浸泡测试的延迟漂移和吞吐衰减（开头与结尾若干窗口的对比，以及按窗口序列拟合的每小时趋势）
+        Returns:
+            List[Dict]: 运行标识、时长、漂移指标和是否超过阈值
+        """
+        result = []
+        for row in sorted(self.data, key=lambda r: (r.get('test_name', ''), r.get('parallel', 0))):
+            if not row.get('soak_windows'):
+                continue
+            p99_drift = row.get('soak_p99_latency_drift_pct', 0)
+            throughput_change = row.get('soak_throughput_change_pct', 0)
+            result.append({
+                'test_name': row.get('test_name'),
+                'parallel': row.get('parallel'),
+                'hours': row.get('soak_hours', 0),
+                'windows': row.get('soak_windows', 0),
+                'empty_windows': row.get('soak_empty_windows', 0),
+                'p50_latency_drift_pct': row.get('soak_p50_latency_drift_pct', 0),
+                'p99_latency_drift_pct': p99_drift,
+                'p99_ttft_drift_pct': row.get('soak_p99_ttft_drift_pct', 0),
+                'throughput_change_pct': throughput_change,
+                'p99_latency_trend_pct_per_h': row.get('soak_p99_latency_trend_pct_per_h', 0),
+                'throughput_trend_pct_per_h': row.get('soak_throughput_trend_pct_per_h', 0),
+                'drifted': p99_drift > self.SOAK_DRIFT_PCT or throughput_change < -self.SOAK_DRIFT_PCT
+            })
+        return result
+    
+    @staticmethod
+    def get_row_endpoints(row: Dict) -> List[str]:
+        """获取多端点运行中的端点（由 ep_<端点>_requests 列推断）"""
+        return [key[len('ep_'):-len('_requests')] for key in row
+                if key.startswith('ep_') and key.endswith('_requests') and row[key]]
+    
+    def get_endpoint_breakdown(self) -> List[Dict]:
+        """
+        获取多端点运行中每个端点的吞吐和延迟（同一次测试内各副本的对比，各端点吞吐之和为整体吞吐）
+        Returns:
+            List[Dict]: 运行标识、负载均衡策略和各端点指标列表
+        """
+        result = []
+        for row in sorted(self.data, key=lambda r: (r.get('test_name', ''), r.get('parallel', 0))):
+            endpoints = self.get_row_endpoints(row)
+            if not endpoints:
+                continue
+            result.append({
+                'test_name': row.get('test_name'),
+                'balance': row.get('balance', ''),
+                'parallel': row.get('parallel'),
+                'endpoints': [{
+                    'name': name,
+                    'requests': row.get(f'ep_{name}_requests', 0),
+                    'failed': row.get(f'ep_{name}_failed', 0),
+                    'share_pct': row.get(f'ep_{name}_share_pct', 0),
+                    'latency': row.get(f'ep_{name}_latency', 0),
+                    'p99_latency': row.get(f'ep_{name}_p99_latency', 0),
+                    'ttft': row.get(f'ep_{name}_ttft', 0),
+                    'output_throughput': row.get(f'ep_{name}_output_throughput', 0)
+                } for name in endpoints]
+            })
+        return result
+    
+    @staticmethod
+    def get_row_turns(row: Dict) -> List[int]:
+        """获取多轮会话运行中出现的轮次（由 turn<轮次>_requests 列推断）"""
+        return sorted(int(key[len('turn'):-len('_requests')]) for key in row
+                      if key.startswith('turn') and key.endswith('_requests') and row[key]
+                      and key[len('turn'):-len('_requests')].isdigit())
+    
+    def get_session_turns(self) -> List[Dict]:
+        """
+        获取多轮会话运行中每轮的上下文长度和延迟（上下文随轮次累积，反映长上下文和前缀缓存对 TTFT 的影响）
+        Returns:
+            List[Dict]: 运行标识、思考时间和各轮指标列表
+        """
+        result = []
+        for row in sorted(self.data, key=lambda r: (r.get('test_name', ''), r.get('parallel', 0))):
+            turns = self.get_row_turns(row)
+            if not turns:
+                continue
+            result.append({
+                'test_name': row.get('test_name'),
+                'parallel': row.get('parallel'),
+                'think_time': row.get('think_time', 0),
+                'turns': [{
+                    'turn': turn,
+                    'requests': row.get(f'turn{turn}_requests', 0),
+                    'context_tokens': row.get(f'turn{turn}_context_tokens', 0),
+                    'ttft': row.get(f'turn{turn}_ttft', 0),
+                    'p99_ttft': row.get(f'turn{turn}_p99_ttft', 0),
+                    'latency': row.get(f'turn{turn}_latency', 0)
+                } for turn in turns]
+            })
+        return result
+    
+    def get_measurement_precision(self) -> List[Dict]:
+        """
+        获取原生驱动运行的测量精度（各指标 95% 置信区间的相对半宽，-1 表示样本不足），按运行标识和并发数排序
+        Returns:
+            List[Dict]: 运行标识、实际请求数、收敛状态和各指标的相对半宽
+        """
+        result = []
+        for row in sorted(self.data, key=lambda r: (r.get('test_name', ''), r.get('parallel', 0))):
+            metrics = {key[len('ci_'):-len('_pct')]: row[key] for key in row
+                       if key.startswith('ci_') and key.endswith('_pct') and row[key]}
+            if not metrics:
+                continue
+            result.append({
+                'test_name': row.get('test_name'),
+                'parallel': row.get('parallel'),
+                'requests': row.get('requests', 0),
+                'converged': bool(row.get('converged')),
+                'stopped_early': bool(row.get('stopped_early')),
+                'metrics': metrics
+            })
+        return result
+    
+    def get_server_states(self) -> List[Dict]:
+        """
+        获取各运行的服务端引擎状态（需要测试期间采集的 Prometheus 指标），按并发数排序
+        Returns:
+            List[Dict]: 运行标识、P99延迟、排队深度、KV Cache 使用率和抢占次数
+        """
+        rows = [row for row in self.data if row.get('server_running_max') or row.get('server_kv_cache_max_pct')]
+        return [{
+            'test_name': row.get('test_name'),
+            'parallel': row.get('parallel'),
+            'p99_latency': row.get('p99_latency_ms', 0),
+            'waiting_avg': row.get('server_waiting_avg', 0),
+            'waiting_max': row.get('server_waiting_max', 0),
+            'running_avg': row.get('server_running_avg', 0),
+            'kv_cache_max_pct': row.get('server_kv_cache_max_pct', 0),
+            'preemptions': row.get('server_preemptions', 0)
+        } for row in sorted(rows, key=lambda r: r.get('parallel', 0))]
@@ -5,13 +5,29 @@ Author: AI Assistant
 Date: 2024
 """
 
-from typing import Dict, List
+from typing import Dict, List, Optional
 from datetime import datetime
 
 
 class HTMLTemplates:
     """HTML模板生成器"""
     
+    # 可选图表: 名称 -> (canvas id, 标题)，仅在数据包含对应列时显示
+    OPTIONAL_CHARTS = {
+        'output_length': ('outputLengthChart', '📏 请求 vs 实际输出长度'),
+        'input_length': ('inputLengthChart', '📝 输入长度 vs TTFT / 预填充吞吐'),
+        'prefix_share': ('prefixShareChart', '🧩 前缀共享比例 vs TTFT / 输出吞吐（前缀缓存收益）'),
+        'image_size': ('imageSizeChart', '🖼️ 图片大小 vs TTFT / 延迟（视觉预填充开销）'),
+        'offered_load': ('offeredLoadChart', '🎯 目标请求速率 vs P99 延迟 / 完成速率（红叉为饱和点）'),
+        'workload_mix': ('workloadMixChart', '🔀 混合负载各类请求的 TTFT 与 P99 延迟（同一次测试）'),
+        'endpoints': ('endpointsChart', '🌐 多端点各副本的输出吞吐（堆叠为整体）与 P99 延迟'),
+        'multi_turn': ('multiTurnChart', '💬 多轮会话各轮 TTFT vs 累积上下文长度'),
+        'coordinated_omission': ('coordinatedOmissionChart', '⏳ P99 延迟：原始 vs 协调遗漏校正'),
+        'connection_phases': ('connectionPhasesChart', '🔌 连接阶段耗时（HTTP/1.1 keep-alive vs HTTP/2 多路复用）'),
+        'client': ('clientChart', '🖥️ 客户端资源 vs 吞吐（红点为客户端饱和的运行）'),
+        'server': ('serverChart', '📡 服务端排队深度与 KV Cache 使用率')
+    }
+    
     @staticmethod
     def get_css_styles() -> str:
         """获取CSS样式"""
@@ -195,6 +211,22 @@ class HTMLTemplates:
             font-weight: 600;
         }
         
+        .nav-bar {
+            padding: 15px 40px;
+            background: #f8f9fa;
+            border-bottom: 1px solid #eee;
+        }
+        
+        .nav-bar a, .index-link {
+            color: #667eea;
+            font-weight: 600;
+            text-decoration: none;
+        }
+        
+        .nav-bar a:hover, .index-link:hover {
+            text-decoration: underline;
+        }
+        
         .footer {
             text-align: center;
             padding: 30px;
@@ -219,8 +251,9 @@ class HTMLTemplates:
         """
     
     @staticmethod
-    def get_header() -> str:
+    def get_header(title: str = '') -> str:
         """获取HTML头部"""
+        subtitle = f"<p>{title}</p>" if title else ""
         return f"""
         <!DOCTYPE html>
         <html lang="zh-CN">
@@ -238,10 +271,56 @@ class HTMLTemplates:
                 <!-- 头部 -->
                 <div class="header">
                     <h1>🚀 性能测试分析报告</h1>
+                    {subtitle}
                     <p>生成时间: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p>
                 </div>
         """
     
+    @staticmethod
+    def get_nav_link(href: str, text: str) -> str:
+        """获取页面导航链接HTML"""
+        return f"""
+                <div class="nav-bar">
+                    <a href="{href}">{text}</a>
+                </div>
+        """
+    
+    @staticmethod
+    def get_index_section(entries: List[Dict], group_label: str) -> str:
+        """获取多页报告索引HTML"""
+        rows = ""
+        for entry in entries:
+            rows += f"""
+                        <tr>
+                            <td><a class="index-link" href="{entry['href']}">{entry['name']}</a></td>
+                            <td>{entry['record_count']}</td>
+                            <td>{entry['max_qps']:.2f}</td>
+                            <td>{entry['max_throughput']:.0f}</td>
+                        </tr>
+            """
+        
+        return f"""
+                <!-- 报告索引 -->
+                <div class="table-container">
+                    <h2>📚 报告索引（按{group_label}）</h2>
+                    <div class="table-section">
+                        <table>
+                            <thead>
+                                <tr>
+                                    <th>{group_label}</th>
+                                    <th>记录数</th>
+                                    <th>最高 QPS</th>
+                                    <th>最高吞吐量<br>(tok/s)</th>
+                                </tr>
+                            </thead>
+                            <tbody>
+                                {rows}
+                            </tbody>
+                        </table>
+                    </div>
+                </div>
+        """
+    
     @staticmethod
     def get_stats_cards(stats: Dict) -> str:
         """获取统计卡片HTML"""
@@ -271,18 +350,112 @@ class HTMLTemplates:
                         <div class="value">{stats.get('avg_success_rate', 0):.1f}%</div>
                         <div class="label">总测试: {stats.get('total_tests', 0)} 组</div>
                     </div>
+                    {HTMLTemplates.get_operating_point_cards(stats.get('operating_points', []))}
+                    {HTMLTemplates.get_scalability_cards(stats.get('scalability', []))}
+                    {HTMLTemplates.get_client_saturation_card(stats.get('client_saturated_runs', []))}
                 </div>
         """
     
     @staticmethod
-    def get_charts_section() -> str:
-        """获取图表区域HTML"""
+    def get_operating_point_cards(operating_points: List[Dict]) -> str:
+        """获取推荐工作点卡片HTML（每个模型/数据集/max_tokens 一张）"""
+        cards = ""
+        for point in operating_points:
+            slo = point.get('slo_p99_latency')
+            slo_text = f" · SLO P99≤{slo:g}" if slo is not None else ""
+            knee_text = f"拐点: {point['knee_parallel']}" if point['saturated'] else f"未饱和 (最高测试 {point['knee_parallel']})"
+            if point['recommended_parallel'] is None:
+                value = "—"
+                detail = f"无工作点满足SLO{slo_text}"
+            else:
+                value = f"{point['recommended_parallel']}"
+                detail = (f"{point['recommended_throughput']:.0f} tok/s · "
+                          f"P99 {point['recommended_p99_latency']:.2f}{slo_text}")
+            cards += f"""
+                    <div class="stat-card">
+                        <h3>推荐并发 · {point['dataset']}</h3>
+                        <div class="value">{value}</div>
+                        <div class="label">{point['model']} · max_tokens {point['max_tokens']}</div>
+                        <div class="label">{detail}</div>
+                        <div class="label">{knee_text} · 前沿(P99): {', '.join(str(p) for p in point['frontier_p99'])}</div>
+                    </div>
+            """
+        return cards
+    
+    @staticmethod
+    def get_scalability_cards(scalability: List[Dict]) -> str:
+        """获取USL可扩展性预测卡片HTML（每个模型/数据集/max_tokens 一张）"""
+        cards = ""
+        for item in scalability:
+            model = item.get('qps_model')
+            if not model:
+                continue
+            if model['peak_parallel']:
+                value = f"{model['peak_parallel']}"
+                peak_text = f"峰值 QPS {model['peak_throughput']:.2f}"
+            else:
+                value = "—"
+                peak_text = f"无峰值，渐近 QPS {model['lambda'] / model['sigma']:.2f}" if model['sigma'] > 0 else "线性扩展"
+            limited = item.get('client_limited_parallels', [])
+            limited_html = (f'<div class="label warning">客户端受限并发: {", ".join(str(p) for p in limited)}</div>'
+                            if limited else "")
+            cards += f"""
+                    <div class="stat-card">
+                        <h3>USL 预测峰值并发 · {item['dataset']}</h3>
+                        <div class="value">{value}</div>
+                        <div class="label">{item['model']} · max_tokens {item['max_tokens']}</div>
+                        <div class="label">{peak_text} · 拟合误差 {model['mape']:.1f}%</div>
+                        <div class="label">竞争 σ={model['sigma']:.4g} · 一致性 κ={model['kappa']:.4g}</div>
+                        {limited_html}
+                    </div>
+            """
+        return cards
+    
+    @staticmethod
+    def get_client_saturation_card(runs: List[Dict]) -> str:
+        """获取客户端饱和运行的警告卡片HTML（无饱和运行时为空）"""
+        if not runs:
+            return ""
+        items = ''.join(
+            f'<div class="label">{run["test_name"]} {run["timestamp"]} · CPU {run["client_cpu_avg_pct"]:.0f}% · '
+            f'整机 {run["client_host_cpu_max_pct"]:.0f}% · 调度延迟P99 {run["client_sched_lag_p99_ms"]:.1f}ms</div>'
+            for run in runs[:10]
+        )
+        more = f'<div class="label">… 共 {len(runs)} 个</div>' if len(runs) > 10 else ""
+        return f"""
+                    <div class="stat-card">
+                        <h3>客户端饱和的运行</h3>
+                        <div class="value">{len(runs)}</div>
+                        <div class="label warning">这些运行测到的可能是压测客户端而非服务端</div>
+                        {items}
+                        {more}
+                    </div>
+        """
+    
+    @staticmethod
+    def get_charts_section(optional_charts: Optional[List[str]] = None) -> str:
+        """
+        获取图表区域HTML
+        Args:
+            optional_charts: 需要显示的可选图表名称（见 OPTIONAL_CHARTS）
+        """
+        optional_html = ""
+        for name in optional_charts or []:
+            canvas_id, title = HTMLTemplates.OPTIONAL_CHARTS[name]
+            optional_html += f"""
+                    <div class="chart-container">
+                        <h2>{title}</h2>
+                        <div class="chart-wrapper">
+                            <canvas id="{canvas_id}"></canvas>
+                        </div>
+                    </div>
+            """
         return """
                 <!-- 图表区域 -->
                 <div class="charts-section">
                     <!-- QPS 趋势 -->
                     <div class="chart-container">
-                        <h2>📊 QPS 随并发数变化趋势</h2>
+                        <h2>📊 QPS 随并发数变化趋势（虚线为 USL 拟合）</h2>
                         <div class="chart-wrapper">
                             <canvas id="qpsChart"></canvas>
                         </div>
@@ -290,7 +463,7 @@ class HTMLTemplates:
                     
                     <!-- 吞吐量趋势 -->
                     <div class="chart-container">
-                        <h2>📈 Token 吞吐量趋势</h2>
+                        <h2>📈 Token 吞吐量趋势（虚线为 USL 拟合）</h2>
                         <div class="chart-wrapper">
                             <canvas id="throughputChart"></canvas>
                         </div>
@@ -319,6 +492,7 @@ class HTMLTemplates:
                             <canvas id="successChart"></canvas>
                         </div>
                     </div>
+                    """ + optional_html + """
                 </div>
         """
     
@@ -432,6 +606,241 @@ class HTMLTemplates:
                 </div>
         """
     
+    @staticmethod
+    def get_comparison_section(result: Dict) -> str:
+        """获取对比报告HTML"""
+        def fmt(value) -> str:
+            return f"{value:.4g}" if isinstance(value, (int, float)) else "-"
+        
+        rows = ""
+        for item in result['comparisons']:
+            status_class = 'danger' if item['regression'] else ('success' if item['improvement'] else '')
+            status = '回归' if item['regression'] else ('提升' if item['improvement'] else '持平')
+            ci_text = (f"[{item['ci_low']:+.1f}%, {item['ci_high']:+.1f}%]"
+                       if item['ci_low'] is not None else "-")
+            rows += f"""
+                        <tr>
+                            <td>{item['model'] or '-'}</td>
+                            <td>{item['dataset']}</td>
+                            <td>{item['parallel']}</td>
+                            <td>{item['max_tokens'] if item['max_tokens'] is not None else '-'}</td>
+                            <td>{f"{item['target_rate']:g} req/s" if item.get('target_rate') else '-'}</td>
+                            <td>{item['label']}</td>
+                            <td>{fmt(item['baseline'])}</td>
+                            <td>{fmt(item['candidate'])}</td>
+                            <td class="{status_class}">{item['delta_pct']:+.1f}%</td>
+                            <td>{ci_text}</td>
+                            <td>{item['method']}</td>
+                            <td class="{status_class}">{status}</td>
+                        </tr>
+            """
+        
+        verdict_class = 'danger' if result['verdict'] == 'regression' else 'success'
+        verdict_text = '存在显著回归' if result['verdict'] == 'regression' else '未发现显著回归'
+        
+        return f"""
+                <!-- 对比结论 -->
+                <div class="stats-grid">
+                    <div class="stat-card">
+                        <h3>结论</h3>
+                        <div class="value {verdict_class}">{verdict_text}</div>
+                        <div class="label">阈值: ±{result['threshold_pct']:g}% · 置信度: {result['confidence'] * 100:g}%</div>
+                    </div>
+                    <div class="stat-card">
+                        <h3>回归项</h3>
+                        <div class="value">{result['regression_count']}</div>
+                        <div class="label">提升项: {result['improvement_count']}</div>
+                    </div>
+                    <div class="stat-card">
+                        <h3>已对齐配置</h3>
+                        <div class="value">{result['matched_configs']}</div>
+                        <div class="label">未匹配: 基线 {len(result['unmatched_baseline'])} / 候选 {len(result['unmatched_candidate'])}</div>
+                    </div>
+                </div>
+                
+                <!-- 逐项对比 -->
+                <div class="table-container">
+                    <h2>🔍 逐项对比（按 并发/数据集/最大令牌数 对齐）</h2>
+                    <div class="table-section">
+                        <table>
+                            <thead>
+                                <tr>
+                                    <th>模型</th>
+                                    <th>数据集</th>
+                                    <th>并发</th>
+                                    <th>最大令牌数</th>
+                                    <th>目标速率</th>
+                                    <th>指标</th>
+                                    <th>基线</th>
+                                    <th>候选</th>
+                                    <th>变化</th>
+                                    <th>置信区间</th>
+                                    <th>方法</th>
+                                    <th>判定</th>
+                                </tr>
+                            </thead>
+                            <tbody>
+                                {rows}
+                            </tbody>
+                        </table>
+                    </div>
+                </div>
+        """
+    
+    @staticmethod
+    def get_trend_section(series: Dict[str, Dict]) -> str:
+        """获取历史趋势页面HTML（序列选择、变化点汇总和趋势图表）"""
+        options = ""
+        rows = ""
+        for key, item in series.items():
+            options += f'<option value="{key}">{key}</option>'
+            change_count = sum(len(m['change_points']) for m in item['metrics'].values())
+            change_class = 'warning' if change_count else 'success'
+            latest = {field: m['daily'][-1] for field, m in item['metrics'].items()}
+            rows += f"""
+                        <tr>
+                            <td>{key}</td>
+                            <td>{item['run_count']}</td>
+                            <td>{item['days'][0]} ~ {item['days'][-1]}</td>
+                            <td>{latest['output_token_throughput']:.0f}</td>
+                            <td>{latest['p99_latency_ms']:.3g}</td>
+                            <td>{latest['avg_ttft_ms']:.3g}</td>
+                            <td class="{change_class}">{change_count}</td>
+                        </tr>
+            """
+        
+        return f"""
+                <!-- 趋势序列汇总 -->
+                <div class="table-container">
+                    <h2>🕒 趋势序列（模型 / 数据集 / 并发）</h2>
+                    <div class="table-section">
+                        <table>
+                            <thead>
+                                <tr>
+                                    <th>序列</th>
+                                    <th>运行次数</th>
+                                    <th>时间范围</th>
+                                    <th>最新吞吐<br>(tok/s)</th>
+                                    <th>最新P99</th>
+                                    <th>最新TTFT</th>
+                                    <th>变化点</th>
+                                </tr>
+                            </thead>
+                            <tbody>
+                                {rows}
+                            </tbody>
+                        </table>
+                    </div>
+                </div>
+                
+                <!-- 趋势图表 -->
+                <div class="charts-section">
+                    <div class="nav-bar">
+                        <select id="trendSeriesSelect" onchange="renderTrend(this.value)">{options}</select>
+                        <button onclick="loadTrendDetail()">加载单次运行明细</button>
+                        <span class="label">红色圆点为检测到的变化点，虚线为滚动基线</span>
+                    </div>
+                    <div class="chart-container">
+                        <h2>📈 输出吞吐趋势（按天中位数）</h2>
+                        <div class="chart-wrapper">
+                            <canvas id="trendThroughputChart"></canvas>
+                        </div>
+                    </div>
+                    <div class="chart-container">
+                        <h2>⏱️ P99 延迟趋势（按天中位数）</h2>
+                        <div class="chart-wrapper">
+                            <canvas id="trendP99Chart"></canvas>
+                        </div>
+                    </div>
+                    <div class="chart-container">
+                        <h2>🎯 TTFT 趋势（按天中位数）</h2>
+                        <div class="chart-wrapper">
+                            <canvas id="trendTtftChart"></canvas>
+                        </div>
+                    </div>
+                </div>
+        """
+    
+    @staticmethod
+    def get_trend_scripts(series_json: str) -> str:
+        """获取趋势图表脚本（单次运行明细按需加载）"""
+        return """
+            <script>
+                Chart.defaults.font.family = '-apple-system, BlinkMacSystemFont, "Segoe UI", Roboto';
+                Chart.defaults.color = '#666';
+                
+                const trendSeries = """ + series_json + """;
+                const trendDetails = {};
+                const trendCharts = {};
+                const trendCanvases = {
+                    'output_token_throughput': 'trendThroughputChart',
+                    'p99_latency_ms': 'trendP99Chart',
+                    'avg_ttft_ms': 'trendTtftChart'
+                };
+                
+                function renderTrend(key) {
+                    const series = trendSeries[key];
+                    if (!series) return;
+                    Object.entries(trendCanvases).forEach(([field, canvasId]) => {
+                        const metric = series.metrics[field];
+                        const changes = new Set(metric.change_points.map(c => c.index));
+                        const datasets = [
+                            {
+                                type: 'line',
+                                label: metric.label + ' (日中位数)',
+                                data: metric.daily.map((v, i) => ({x: series.days[i], y: v})),
+                                borderColor: '#667eea',
+                                backgroundColor: '#667eea',
+                                pointRadius: metric.daily.map((_, i) => changes.has(i) ? 7 : 2),
+                                pointBackgroundColor: metric.daily.map((_, i) => changes.has(i) ? '#dc3545' : '#667eea')
+                            },
+                            {
+                                type: 'line',
+                                label: '滚动基线',
+                                data: metric.baseline.map((v, i) => ({x: series.days[i], y: v})),
+                                borderColor: '#999',
+                                borderDash: [6, 4],
+                                pointRadius: 0
+                            }
+                        ];
+                        if (trendDetails[key]) {
+                            datasets.push({
+                                type: 'scatter',
+                                label: '单次运行',
+                                data: trendDetails[key].map(r => ({x: r.day, y: r[field]})),
+                                backgroundColor: 'rgba(255, 107, 107, 0.4)'
+                            });
+                        }
+                        if (trendCharts[field]) trendCharts[field].destroy();
+                        trendCharts[field] = new Chart(document.getElementById(canvasId), {
+                            data: {labels: series.days, datasets: datasets},
+                            options: {
+                                responsive: true,
+                                maintainAspectRatio: false,
+                                scales: {x: {type: 'category'}}
+                            }
+                        });
+                    });
+                }
+                
+                function registerTrendDetail(key, runs) {
+                    trendDetails[key] = runs;
+                    renderTrend(key);
+                }
+                
+                function loadTrendDetail() {
+                    const key = document.getElementById('trendSeriesSelect').value;
+                    if (trendDetails[key]) return renderTrend(key);
+                    const script = document.createElement('script');
+                    script.src = trendSeries[key].detail_src;
+                    document.body.appendChild(script);
+                }
+                
+                const firstKey = Object.keys(trendSeries)[0];
+                if (firstKey) renderTrend(firstKey);
+            </script>
+        """ + HTMLTemplates.get_document_end()
+    
     @staticmethod
     def get_footer(file_name: str) -> str:
         """获取HTML底部"""
@@ -490,10 +899,23 @@ class HTMLTemplates:
                 new Chart(document.getElementById('successChart'), {chart_configs['success']});
             """
         
+        # 可选图表
+        for name, (canvas_id, _) in HTMLTemplates.OPTIONAL_CHARTS.items():
+            if name in chart_configs:
+                scripts += f"""
+                new Chart(document.getElementById('{canvas_id}'), {chart_configs[name]});
+            """
+        
         scripts += """
             </script>
+        """ + HTMLTemplates.get_document_end()
+        
+        return scripts
+    
+    @staticmethod
+    def get_document_end() -> str:
+        """获取HTML文档结尾"""
+        return """
         </body>
         </html>
         """
-        
-        return scripts
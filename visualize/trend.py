@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+历史趋势分析模块
+Author: AI Assistant
+Date: 2024
+"""
+
+import json
+import math
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+from visualize.statistics import StatisticsCalculator
+from visualize.templates import HTMLTemplates
+
+
+class TrendAnalyzer:
+    """按固定配置分析指标随时间的变化趋势"""
+    
+    # 趋势指标: (字段名, 显示名, 是否越大越好)
+    METRICS = [
+        ('output_token_throughput', '输出吞吐 (tok/s)', True),
+        ('p99_latency_ms', 'P99 延迟', False),
+        ('avg_ttft_ms', 'TTFT', False)
+    ]
+    
+    def __init__(self, data: List[Dict], window: int = 7, min_segment: int = 3,
+                 min_shift_pct: float = 2.0, model: Optional[str] = None,
+                 dataset: Optional[str] = None, parallel: Optional[int] = None):
+        self.data = data
+        self.window = window
+        self.min_segment = min_segment
+        self.min_shift_pct = min_shift_pct
+        self.filters = {'model': model, 'dataset': dataset, 'parallel': parallel}
+    
+    @staticmethod
+    def parse_timestamp(timestamp: str) -> Optional[datetime]:
+        """解析 evalscope 时间戳（如 20251130_092648）"""
+        try:
+            return datetime.strptime(str(timestamp), '%Y%m%d_%H%M%S')
+        except ValueError:
+            return None
+    
+    @staticmethod
+    def _median(values: List[float]) -> float:
+        """计算中位数"""
+        ordered = sorted(values)
+        mid = len(ordered) // 2
+        return ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+    
+    @staticmethod
+    def _in_days(values: List[float], days: List[str], start: datetime, end: datetime) -> List[float]:
+        """日期落在 [start, end) 内的按天值"""
+        return [value for value, day in zip(values, days) if start <= datetime.strptime(day, '%Y-%m-%d') < end]
+    
+    @classmethod
+    def rolling_baseline(cls, values: List[float], days: List[str], window: int) -> List[Optional[float]]:
+        """
+        滚动基线：每天之前 window 个自然日内各天值的中位数（不含当天，缺少运行的日期不占窗口）
+        Args:
+            values: 按天聚合的指标序列
+            days: 对应的日期（YYYY-MM-DD，升序）
+            window: 窗口天数
+        Returns:
+            List[Optional[float]]: 基线序列，窗口内没有运行时为None
+        """
+        baseline = []
+        for day in days:
+            end = datetime.strptime(day, '%Y-%m-%d')
+            history = cls._in_days(values, days, end - timedelta(days=window), end)
+            baseline.append(cls._median(history) if history else None)
+        return baseline
+    
+    def detect_change_points(self, values: List[float]) -> List[int]:
+        """
+        二分分割法检测均值阶跃变化点
+        以一阶差分的MAD估计噪声，分割带来的误差平方和下降超过 2·σ²·ln(n) 且相对均值变化超过
+        min_shift_pct 时接受该变化点，并在两侧递归
+        Args:
+            values: 按时间排序的指标序列
+        Returns:
+            List[int]: 变化点位置（新段第一个点的下标）
+        """
+        n = len(values)
+        if n < 2 * self.min_segment:
+            return []
+        
+        diffs = [abs(b - a) for a, b in zip(values, values[1:])]
+        sigma = self._median(diffs) / (0.6745 * math.sqrt(2)) if diffs else 0
+        mean_level = abs(sum(values) / n) or 1.0
+        sigma2 = max(sigma ** 2, (1e-3 * mean_level) ** 2)
+        penalty = 2 * sigma2 * math.log(n)
+        
+        change_points = []
+        
+        def segment(start: int, end: int) -> None:
+            length = end - start
+            if length < 2 * self.min_segment:
+                return
+            
+            # 前缀和，O(n) 计算每个切分点两侧的误差平方和
+            prefix, prefix_sq = [0.0], [0.0]
+            for v in values[start:end]:
+                prefix.append(prefix[-1] + v)
+                prefix_sq.append(prefix_sq[-1] + v * v)
+            
+            def sse(i: int, j: int) -> float:
+                count = j - i
+                total = prefix[j] - prefix[i]
+                return (prefix_sq[j] - prefix_sq[i]) - total * total / count
+            
+            total_sse = sse(0, length)
+            best_k, best_sse = None, total_sse
+            for k in range(self.min_segment, length - self.min_segment + 1):
+                split_sse = sse(0, k) + sse(k, length)
+                if split_sse < best_sse:
+                    best_k, best_sse = k, split_sse
+            
+            if best_k is None or total_sse - best_sse <= penalty:
+                return
+            
+            left_mean = (prefix[best_k] - prefix[0]) / best_k
+            right_mean = (prefix[length] - prefix[best_k]) / (length - best_k)
+            if left_mean and abs(right_mean - left_mean) / abs(left_mean) * 100 < self.min_shift_pct:
+                return
+            
+            change_points.append(start + best_k)
+            segment(start, start + best_k)
+            segment(start + best_k, end)
+        
+        segment(0, n)
+        return sorted(change_points)
+    
+    def _matches_filters(self, row: Dict) -> bool:
+        """判断记录是否满足模型/数据集/并发过滤条件"""
+        if self.filters['model'] and row.get('model') != self.filters['model']:
+            return False
+        if self.filters['dataset'] and StatisticsCalculator.get_dataset_name(row) != self.filters['dataset']:
+            return False
+        if self.filters['parallel'] is not None and row.get('parallel') != self.filters['parallel']:
+            return False
+        return True
+    
+    def build_series(self) -> Dict[str, Dict]:
+        """
+        按 (模型, 测试名称) 构建按天预聚合的趋势序列：测试名称即配置目录名（并发、请求数、最大令牌数、目标速率、数据集等），
+        每个序列是一个完全固定的配置
+        Returns:
+            Dict: 序列键到趋势数据（按天中位数、滚动基线、变化点及单次运行明细）
+        """
+        runs_by_key: Dict[Tuple, List[Tuple[datetime, Dict]]] = {}
+        skipped = 0
+        for row in self.data:
+            if not self._matches_filters(row):
+                continue
+            run_time = self.parse_timestamp(row.get('timestamp', ''))
+            if run_time is None:
+                skipped += 1
+                continue
+            key = (str(row.get('model') or 'unknown'), str(row.get('test_name', '')))
+            runs_by_key.setdefault(key, []).append((run_time, row))
+        
+        if skipped:
+            print(f"[WARNING] {skipped} 条记录缺少有效时间戳，已跳过")
+        
+        series = {}
+        for (model, test_name), runs in sorted(runs_by_key.items(), key=lambda item: str(item[0])):
+            runs.sort(key=lambda item: item[0])
+            
+            # 按天预聚合（中位数），成千上万次运行也只保留每天一个点
+            by_day: Dict[str, List[Dict]] = {}
+            for run_time, row in runs:
+                by_day.setdefault(run_time.strftime('%Y-%m-%d'), []).append(row)
+            days = sorted(by_day)
+            
+            metrics = {}
+            for field, label, higher_is_better in self.METRICS:
+                daily = [self._median([row[field] for row in by_day[day]]) for day in days]
+                change_points = self.detect_change_points(daily)
+                metrics[field] = {
+                    'label': label,
+                    'higher_is_better': higher_is_better,
+                    'daily': daily,
+                    'baseline': self.rolling_baseline(daily, days, self.window),
+                    'change_points': [self._change_point(daily, days, idx) for idx in change_points]
+                }
+            
+            first = runs[0][1]
+            key = f"{model} / {test_name}"
+            series[key] = {
+                'model': model,
+                'test_name': test_name,
+                'dataset': StatisticsCalculator.get_dataset_name(first),
+                'parallel': first.get('parallel'),
+                'target_rate': first.get('target_rate') or 0,
+                'slug': re.sub(r'[^A-Za-z0-9._-]+', '_', key).strip('_'),
+                'days': days,
+                'day_counts': [len(by_day[day]) for day in days],
+                'run_count': len(runs),
+                'metrics': metrics,
+                'runs': [{
+                    'time': run_time.strftime('%Y-%m-%d %H:%M:%S'),
+                    'day': run_time.strftime('%Y-%m-%d'),
+                    **{field: row[field] for field, _, _ in self.METRICS}
+                } for run_time, row in runs]
+            }
+        return series
+    
+    def _change_point(self, daily: List[float], days: List[str], idx: int) -> Dict:
+        """变化点前后各 window 个自然日内的均值"""
+        day = datetime.strptime(days[idx], '%Y-%m-%d')
+        before = self._in_days(daily, days, day - timedelta(days=self.window), day)
+        after = self._in_days(daily, days, day, day + timedelta(days=self.window))
+        return {
+            'index': idx,
+            'day': days[idx],
+            'before': sum(before) / len(before) if before else daily[idx - 1],
+            'after': sum(after) / len(after)
+        }
+    
+    def write_report(self, output_file: Path, file_name: str) -> Dict[str, Dict]:
+        """
+        生成趋势报告：主页面只内嵌按天聚合数据，单次运行明细按序列拆分为独立脚本文件、按需加载
+        Args:
+            output_file: 输出HTML路径
+            file_name: 数据来源文件名
+        Returns:
+            Dict: 趋势序列
+        """
+        series = self.build_series()
+        detail_dir = output_file.parent / f"{output_file.stem}_detail"
+        detail_dir.mkdir(parents=True, exist_ok=True)
+        
+        summary_series = {}
+        for key, item in series.items():
+            detail_file = detail_dir / f"{item['slug']}.js"
+            with open(detail_file, 'w', encoding='utf-8') as f:
+                f.write(f"registerTrendDetail({json.dumps(key, ensure_ascii=False)}, "
+                        f"{json.dumps(item['runs'], ensure_ascii=False)});\n")
+            summary_series[key] = {k: v for k, v in item.items() if k != 'runs'}
+            summary_series[key]['detail_src'] = f"{detail_dir.name}/{detail_file.name}"
+        
+        html_parts = [
+            HTMLTemplates.get_header('历史趋势'),
+            HTMLTemplates.get_trend_section(summary_series),
+            HTMLTemplates.get_footer(file_name),
+            HTMLTemplates.get_trend_scripts(json.dumps(summary_series, ensure_ascii=False))
+        ]
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(html_parts))
+        
+        print(f"[INFO] 趋势报告已生成: {output_file} ({len(series)} 个序列)")
+        return series
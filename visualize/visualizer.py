@@ -7,21 +7,29 @@ Date: 2024
 
 import sys
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
 from visualize.data_loader import DataLoader
 from visualize.html_generator import HTMLGenerator
+from evalperf.profiler import StageProfiler
 
 
 class PerformanceVisualizer:
     """性能测试可视化分析器"""
     
-    def __init__(self, csv_file: str, output_file: str = None):
+    def __init__(self, csv_file: str, output_file: str = None, cache_dir: Optional[str] = None,
+                 use_cache: bool = True, split_by: Optional[str] = None,
+                 slo_p99_latency: Optional[float] = None, profiler: Optional[StageProfiler] = None):
         self.csv_file = csv_file
         self.output_file = output_file or self._get_default_output_file()
+        self.cache_dir = cache_dir
+        self.use_cache = use_cache
+        self.split_by = split_by
+        self.slo_p99_latency = slo_p99_latency
+        self.profiler = profiler or StageProfiler(enabled=False)
         self.data: List[Dict] = []
         
         # 初始化组件
-        self.data_loader = DataLoader(csv_file)
+        self.data_loader = DataLoader(csv_file, self.profiler)
         self.html_generator = None
     
     def _get_default_output_file(self) -> str:
@@ -53,7 +61,14 @@ class PerformanceVisualizer:
         file_name = Path(self.csv_file).name
         
         # 初始化HTML生成器
-        self.html_generator = HTMLGenerator(self.data, self.output_file, file_name)
+        self.html_generator = HTMLGenerator(
+            self.data, self.output_file, file_name,
+            cache_dir=self.cache_dir,
+            use_cache=self.use_cache,
+            split_by=self.split_by,
+            slo_p99_latency=self.slo_p99_latency,
+            profiler=self.profiler
+        )
         
         # 生成报告
         return self.html_generator.generate_html_report()
@@ -88,6 +103,8 @@ class PerformanceVisualizer:
                 print(f"  数据源: {summary['data_source']}")
                 print(f"  记录数: {summary['record_count']} 条")
                 print(f"  图表数: {summary['charts_count']} 个")
+                if summary['page_count'] > 1:
+                    print(f"  页面数: {summary['page_count']} 个")
                 print(f"  文件大小: {summary['file_size_kb']:.1f} KB")
             
             print(f"\n打开方式:")
@@ -97,7 +114,7 @@ class PerformanceVisualizer:
             print("="*60)
             
             return True
-            
+        
         except Exception as e:
             print(f"[ERROR] 生成报告失败: {e}")
             return False
@@ -129,5 +146,5 @@ class PerformanceVisualizer:
             return {}
         
         from visualize.statistics import StatisticsCalculator
-        stats_calc = StatisticsCalculator(self.data)
+        stats_calc = StatisticsCalculator(self.data, self.slo_p99_latency)
         return stats_calc.get_performance_summary()